@@ -4,11 +4,14 @@ Role-Based Access Control (RBAC) Service for Sovereign Application Runtime (SAR)
 This module provides comprehensive role-based access control functionality
 for multi-tenant applications with proper isolation and security measures.
 """
+from collections import OrderedDict
 from enum import Enum
-from typing import Dict, List, Optional, Set, Any
+from typing import Dict, FrozenSet, List, Optional, Set, Any, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime
 import logging
+import threading
+import time
 from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import jwt
@@ -75,6 +78,7 @@ class RBACConfig:
     def __init__(self):
         self.jwt_secret_key = os.getenv("JWT_SECRET_KEY", "")
         self.default_permissions_cache_ttl = int(os.getenv("RBAC_CACHE_TTL", "300"))  # 5 minutes
+        self.permissions_cache_size = int(os.getenv("RBAC_CACHE_SIZE", "10000"))  # (user, tenant) entries
         self.role_validation_enabled = os.getenv("ROLE_VALIDATION_ENABLED", "true").lower() == "true"
         self.strict_mode = os.getenv("RBAC_STRICT_MODE", "false").lower() == "true"
         # MongoDB configuration
@@ -84,6 +88,18 @@ class RBACConfig:
         self.role_assignments_collection_name = os.getenv("RBAC_ASSIGNMENTS_COLLECTION", "role_assignments")
 
 
+@dataclass
+class EffectivePermissions:
+    """A user's combined role grants within one tenant filter, as cached by the RBAC service"""
+    permission_mask: int
+    role_names: FrozenSet[str]
+    expires_at: float
+
+
+# Permission scopes that grant access regardless of which tenant is requested
+TENANT_INDEPENDENT_SCOPES = ("global", "system", "own", "public")
+
+
 class SARRoleEnforcement:
     """Main role enforcement service class for the Sovereign Application Runtime"""
     
@@ -92,7 +108,18 @@ class SARRoleEnforcement:
         self.security = HTTPBearer()
         self._roles: Dict[str, Role] = {}
         self._role_assignments: List[RoleAssignment] = []
-        self._permission_cache: Dict[str, Set[Permission]] = {}
+        self._assignments_by_user: Dict[str, List[RoleAssignment]] = {}
+        # Compiled permissions: every distinct permission gets a bit, every role a bitset
+        self._permission_bits: Dict[Permission, int] = {}
+        self._role_masks: Dict[str, int] = {}
+        # (resource, action) -> (tenant-independent mask, tenant-scoped mask)
+        self._check_masks: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        # (user_id, tenant filter) -> effective permissions, least recently used first
+        self._permission_cache: "OrderedDict[Tuple[str, Optional[str]], EffectivePermissions]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Bumped by invalidation so a lookup that raced with it does not cache stale roles
+        self._cache_generation = 0
+        self.cache_stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0}
         # MongoDB connection
         self._client = None
         self._db = None
@@ -226,6 +253,105 @@ class SARRoleEnforcement:
         # Store roles
         for role in [system_admin_role, client_admin_role, client_user_role, candidate_role, api_key_user_role]:
             self._roles[role.name] = role
+            self._compile_role(role)
+    
+    def _compile_role(self, role: Role):
+        """Precompute a role's permissions as a bitset over all known permissions"""
+        mask = 0
+        for permission in role.permissions:
+            bit = self._permission_bits.get(permission)
+            if bit is None:
+                bit = self._permission_bits[permission] = 1 << len(self._permission_bits)
+                # A new permission can satisfy checks compiled before it existed
+                self._check_masks.clear()
+            mask |= bit
+        self._role_masks[role.name] = mask
+    
+    def _compile_check(self, resource: str, action: str) -> Tuple[int, int]:
+        """Bits of the permissions that satisfy a resource/action check, split by whether the tenant must match"""
+        key = (resource, action)
+        masks = self._check_masks.get(key)
+        if masks is None:
+            independent, tenant_scoped = 0, 0
+            for permission, bit in self._permission_bits.items():
+                if permission.resource == resource and permission.action in (action, "*"):
+                    if permission.scope in TENANT_INDEPENDENT_SCOPES:
+                        independent |= bit
+                    elif permission.scope == "tenant":
+                        tenant_scoped |= bit
+            masks = self._check_masks[key] = (independent, tenant_scoped)
+        return masks
+    
+    def _effective_permissions(self, user_id: str, tenant_id: Optional[str]) -> EffectivePermissions:
+        """Cached union of the permission bits and role names of a user's role assignments"""
+        key = (user_id, tenant_id)
+        now = time.monotonic()
+        with self._cache_lock:
+            cached = self._permission_cache.get(key)
+            if cached is not None:
+                if cached.expires_at > now:
+                    self._permission_cache.move_to_end(key)
+                    self.cache_stats["hits"] += 1
+                    return cached
+                del self._permission_cache[key]
+                self.cache_stats["expired"] += 1
+            self.cache_stats["misses"] += 1
+            generation = self._cache_generation
+        
+        assignments, complete = self._load_user_roles(user_id, tenant_id)
+        mask = 0
+        for assignment in assignments:
+            role_mask = self._role_masks.get(assignment.role.name)
+            if role_mask is None:
+                self._compile_role(assignment.role)
+                role_mask = self._role_masks[assignment.role.name]
+            mask |= role_mask
+        effective = EffectivePermissions(
+            permission_mask=mask,
+            role_names=frozenset(assignment.role.name for assignment in assignments),
+            expires_at=now + self.config.default_permissions_cache_ttl
+        )
+        
+        # Results missing the stored assignments (MongoDB error) are used once, not cached
+        if complete and self.config.default_permissions_cache_ttl > 0:
+            with self._cache_lock:
+                if generation != self._cache_generation:
+                    return effective
+                self._permission_cache[key] = effective
+                while len(self._permission_cache) > self.config.permissions_cache_size:
+                    self._permission_cache.popitem(last=False)
+                    self.cache_stats["evictions"] += 1
+        return effective
+    
+    def invalidate_user_permissions(self, user_id: str):
+        """Drop cached permissions for a user after their role assignments change"""
+        with self._cache_lock:
+            for key in [key for key in self._permission_cache if key[0] == user_id]:
+                del self._permission_cache[key]
+            self._cache_generation += 1
+            self.cache_stats["invalidations"] += 1
+    
+    def invalidate_role(self, role_name: str):
+        """Recompile a role after its permissions change and drop every cached user permission set"""
+        role = self.get_role(role_name)
+        if role:
+            self._compile_role(role)
+        with self._cache_lock:
+            self._permission_cache.clear()
+            self._cache_generation += 1
+            self.cache_stats["invalidations"] += 1
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Permission cache hit/miss counters"""
+        with self._cache_lock:
+            lookups = self.cache_stats["hits"] + self.cache_stats["misses"]
+            return {
+                **self.cache_stats,
+                "hit_rate": round(self.cache_stats["hits"] / lookups, 4) if lookups else None,
+                "cached_entries": len(self._permission_cache),
+                "compiled_permissions": len(self._permission_bits),
+                "ttl_seconds": self.config.default_permissions_cache_ttl
+            }
     
     def create_role(self, name: str, role_type: RoleType, permissions: List[Permission], 
                    description: str = "") -> Role:
@@ -241,6 +367,7 @@ class SARRoleEnforcement:
         )
         
         self._roles[name] = role
+        self._compile_role(role)
         return role
     
     def get_role(self, role_name: str) -> Optional[Role]:
@@ -279,12 +406,19 @@ class SARRoleEnforcement:
         
         # Also keep in memory for performance
         self._role_assignments.append(assignment)
+        self._assignments_by_user.setdefault(user_id, []).append(assignment)
+        self.invalidate_user_permissions(user_id)
         return assignment
     
     def get_user_roles(self, user_id: str, tenant_id: Optional[str] = None) -> List[RoleAssignment]:
         """Get all roles assigned to a user, optionally filtered by tenant"""
+        return self._load_user_roles(user_id, tenant_id)[0]
+    
+    def _load_user_roles(self, user_id: str, tenant_id: Optional[str] = None) -> Tuple[List[RoleAssignment], bool]:
+        """Role assignments from MongoDB and memory, and whether the MongoDB read succeeded"""
         # First, get roles from MongoDB
         assignments = []
+        complete = True
         if self._assignments_collection is not None:
             try:
                 query = {"user_id": user_id}
@@ -310,39 +444,31 @@ class SARRoleEnforcement:
                         assignments.append(assignment)
             except Exception as e:
                 logger.error(f"❌ Failed to retrieve role assignments from MongoDB: {e}")
+                complete = False
         
         # Also include in-memory assignments for performance
-        in_memory_assignments = [ra for ra in self._role_assignments if ra.user_id == user_id]
+        in_memory_assignments = self._assignments_by_user.get(user_id, [])
         if tenant_id:
             in_memory_assignments = [ra for ra in in_memory_assignments if ra.tenant_id == tenant_id or ra.tenant_id is None]
         
         # Combine both sources
         assignments.extend(in_memory_assignments)
-        return assignments
+        return assignments, complete
     
     def has_permission(self, user_id: str, resource: str, action: str, 
                       tenant_id: Optional[str] = None, 
                       user_tenant_id: Optional[str] = None) -> bool:
-        """Check if a user has permission to perform an action on a resource"""
-        # Get user's roles
-        user_assignments = self.get_user_roles(user_id, tenant_id or user_tenant_id)
+        """Check if a user has permission to perform an action on a resource
         
-        # Check each role for the required permission
-        for assignment in user_assignments:
-            role = assignment.role
-            
-            # Check for wildcard permission
-            for permission in role.permissions:
-                # Check exact match
-                if (permission.resource == resource and 
-                    (permission.action == action or permission.action == "*")):
-                    
-                    # Check scope compatibility
-                    if self._check_scope_compatibility(permission.scope, tenant_id, user_tenant_id):
-                        return True
+        Uses the user's cached permission bitset, so repeated checks within
+        RBAC_CACHE_TTL do not query MongoDB.
+        """
+        effective = self._effective_permissions(user_id, tenant_id or user_tenant_id)
+        independent, tenant_scoped = self._compile_check(resource, action)
         
-        # If no role grants the permission, deny access
-        return False
+        # Tenant-scoped grants only apply inside the user's own tenant
+        required = independent | (tenant_scoped if tenant_id == user_tenant_id else 0)
+        return bool(effective.permission_mask & required)
     
     def _check_scope_compatibility(self, permission_scope: str, requested_tenant_id: Optional[str], 
                                   user_tenant_id: Optional[str]) -> bool:
@@ -362,21 +488,11 @@ class SARRoleEnforcement:
     
     def get_user_permissions(self, user_id: str, tenant_id: Optional[str] = None) -> Set[Permission]:
         """Get all permissions for a user in a specific tenant"""
-        cache_key = f"{user_id}:{tenant_id}"
-        
-        if cache_key in self._permission_cache:
-            return self._permission_cache[cache_key]
-        
-        permissions = set()
-        user_assignments = self.get_user_roles(user_id, tenant_id)
-        
-        for assignment in user_assignments:
-            for permission in assignment.role.permissions:
-                if self._check_scope_compatibility(permission.scope, tenant_id, tenant_id):
-                    permissions.add(permission)
-        
-        self._permission_cache[cache_key] = permissions
-        return permissions
+        mask = self._effective_permissions(user_id, tenant_id).permission_mask
+        return {
+            permission for permission, bit in self._permission_bits.items()
+            if mask & bit and self._check_scope_compatibility(permission.scope, tenant_id, tenant_id)
+        }
     
     def validate_role_access(self, auth: Dict[str, Any], required_role: Optional[str] = None, 
                            resource_context: Optional[Dict[str, Any]] = None) -> bool:
@@ -399,8 +515,7 @@ class SARRoleEnforcement:
         
         # Check specific role requirement
         if required_role:
-            user_assignments = self.get_user_roles(user_id, user_tenant_id)
-            has_required_role = any(ra.role.name == required_role for ra in user_assignments)
+            has_required_role = required_role in self._effective_permissions(user_id, user_tenant_id).role_names
             if not has_required_role:
                 raise HTTPException(status_code=403, detail=f"Required role '{required_role}' not granted")
         
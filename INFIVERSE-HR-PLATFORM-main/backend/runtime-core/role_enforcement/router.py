@@ -66,6 +66,7 @@ async def health_check():
         ],
         "available_roles": list(sar_rbac._roles.keys()),
         "total_assignments": len(sar_rbac._role_assignments),
+        "permission_cache": sar_rbac.get_cache_stats(),
         "timestamp": datetime.now().isoformat()
     }
 
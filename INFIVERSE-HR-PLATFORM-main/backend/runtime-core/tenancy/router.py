@@ -64,6 +64,7 @@ async def tenant_health_check():
             "tenant_header_name": sar_tenant_resolver.config.tenant_header_name,
             "default_tenant_id": sar_tenant_resolver.config.default_tenant_id
         },
+        "resolution_cache": sar_tenant_resolver.get_cache_stats(),
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
 
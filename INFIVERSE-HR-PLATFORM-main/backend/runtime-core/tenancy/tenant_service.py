@@ -7,9 +7,14 @@ cross-tenant data leakage.
 """
 
 from fastapi import HTTPException, Request, Depends
-from typing import Optional, Dict, Any, Union
+from typing import Optional, Dict, Any, List, Union
 from enum import Enum
+from collections import OrderedDict
+from dataclasses import dataclass
+import hashlib
 import os
+import threading
+import time
 import jwt
 from datetime import datetime, timezone
 import re
@@ -43,11 +48,30 @@ class TenantConfig:
         self.default_tenant_id = os.getenv("SAR_DEFAULT_TENANT_ID", "default")
         self.tenant_header_name = os.getenv("SAR_TENANT_HEADER_NAME", "X-Tenant-ID")
         self.tenant_context_key = os.getenv("SAR_TENANT_CONTEXT_KEY", "tenant_id")
+        # Verified token and tenant lookup caches
+        self.token_cache_size = int(os.getenv("SAR_TENANT_TOKEN_CACHE_SIZE", "10000"))  # tokens
+        self.token_cache_ttl = int(os.getenv("SAR_TENANT_TOKEN_CACHE_TTL", "300"))  # cap below the token's own exp
+        self.tenant_cache_size = int(os.getenv("SAR_TENANT_CACHE_SIZE", "10000"))  # tenant ids
+        self.tenant_cache_ttl = int(os.getenv("SAR_TENANT_CACHE_TTL", "300"))  # 5 minutes
         # MongoDB Atlas configuration
         self.mongodb_uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
         self.mongodb_db_name = os.getenv("MONGODB_DB_NAME", "bhiv_hr")
 
 
+@dataclass
+class VerifiedToken:
+    """Claims of a JWT whose signature has already been checked, as cached by the resolver"""
+    claims: Dict[str, Any]
+    expires_at: float
+
+
+@dataclass
+class CachedTenant:
+    """Tenant name found in MongoDB (None when there is no matching document)"""
+    name: Optional[str]
+    expires_at: float
+
+
 class TenantInfo:
     """Class to hold tenant information"""
     
@@ -73,7 +97,20 @@ class TenantResolver:
     
     def __init__(self):
         self.config = TenantConfig()
-        self.tenant_cache = {}  # In production, use a distributed cache
+        # Per-process LRU caches; in production, use a distributed cache
+        self.tenant_cache: "OrderedDict[str, CachedTenant]" = OrderedDict()
+        self._token_cache: "OrderedDict[str, VerifiedToken]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_stats = {
+            "token_hits": 0,
+            "token_misses": 0,
+            "token_expired": 0,
+            "token_evictions": 0,
+            "tenant_hits": 0,
+            "tenant_misses": 0,
+            "tenant_evictions": 0,
+            "invalidations": 0
+        }
         self._client = None
         self._db = None
         self._connect_to_mongodb()
@@ -94,12 +131,121 @@ class TenantResolver:
             self._client = None
             self._db = None
     
+    @staticmethod
+    def _token_key(token: str) -> str:
+        """Cache key for a token; raw tokens are never kept in memory as keys"""
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+    
+    def _verify_token(self, token: str) -> Optional[Dict[str, Any]]:
+        """Return the claims of a valid token, checking the signature only on a cache miss"""
+        key = self._token_key(token)
+        now = time.time()
+        with self._cache_lock:
+            entry = self._token_cache.get(key)
+            if entry is not None:
+                if entry.expires_at > now:
+                    self._token_cache.move_to_end(key)
+                    self.cache_stats["token_hits"] += 1
+                    return dict(entry.claims)
+                del self._token_cache[key]
+                self.cache_stats["token_expired"] += 1
+            self.cache_stats["token_misses"] += 1
+        
+        # Use the same JWT verification logic as the auth service
+        from auth.auth_service import sar_auth
+        payload = sar_auth.verify_jwt_token(token, secret=self.config.jwt_secret_key)
+        if not payload:
+            # Invalid and expired tokens are not cached
+            return None
+        
+        # Never serve a token from cache past its own expiry
+        expires_at = now + self.config.token_cache_ttl
+        if isinstance(payload.get("exp"), (int, float)):
+            expires_at = min(expires_at, payload["exp"])
+        if expires_at > now:
+            with self._cache_lock:
+                self._token_cache[key] = VerifiedToken(claims=payload, expires_at=expires_at)
+                self._token_cache.move_to_end(key)
+                while len(self._token_cache) > self.config.token_cache_size:
+                    self._token_cache.popitem(last=False)
+                    self.cache_stats["token_evictions"] += 1
+        return payload
+    
+    def _lookup_tenant_name(self, tenant_id: str) -> Optional[str]:
+        """Tenant name from the clients or users collection, cached per tenant id"""
+        now = time.time()
+        with self._cache_lock:
+            entry = self.tenant_cache.get(tenant_id)
+            if entry is not None and entry.expires_at > now:
+                self.tenant_cache.move_to_end(tenant_id)
+                self.cache_stats["tenant_hits"] += 1
+                return entry.name
+            self.cache_stats["tenant_misses"] += 1
+        
+        if self._db is None:
+            return None
+        try:
+            # Try to get tenant name from clients collection
+            name = None
+            client_doc = self._db.clients.find_one({"client_id": tenant_id})
+            if client_doc and client_doc.get("company_name"):
+                name = client_doc["company_name"]
+            else:
+                # Try to get tenant name from users collection
+                user_doc = self._db.users.find_one({"user_id": tenant_id})
+                if user_doc and user_doc.get("name"):
+                    name = user_doc["name"]
+        except Exception as e:
+            # Lookup failures are not cached so the next request retries
+            logger.warning(f"Failed to get tenant name from MongoDB: {e}")
+            return None
+        
+        with self._cache_lock:
+            self.tenant_cache[tenant_id] = CachedTenant(name=name, expires_at=now + self.config.tenant_cache_ttl)
+            self.tenant_cache.move_to_end(tenant_id)
+            while len(self.tenant_cache) > self.config.tenant_cache_size:
+                self.tenant_cache.popitem(last=False)
+                self.cache_stats["tenant_evictions"] += 1
+        return name
+    
+    def invalidate_token(self, token: str):
+        """Drop a cached token, e.g. after logout or revocation"""
+        with self._cache_lock:
+            if self._token_cache.pop(self._token_key(token), None) is not None:
+                self.cache_stats["invalidations"] += 1
+    
+    def invalidate_tenant(self, tenant_id: str):
+        """Drop a cached tenant lookup after the client or user record changes"""
+        with self._cache_lock:
+            if self.tenant_cache.pop(tenant_id, None) is not None:
+                self.cache_stats["invalidations"] += 1
+    
+    def clear_caches(self):
+        """Drop all cached tokens and tenants, e.g. after rotating JWT_SECRET_KEY"""
+        with self._cache_lock:
+            self._token_cache.clear()
+            self.tenant_cache.clear()
+            self.cache_stats["invalidations"] += 1
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Token and tenant cache hit/miss counters"""
+        with self._cache_lock:
+            token_lookups = self.cache_stats["token_hits"] + self.cache_stats["token_misses"]
+            tenant_lookups = self.cache_stats["tenant_hits"] + self.cache_stats["tenant_misses"]
+            return {
+                **self.cache_stats,
+                "token_hit_rate": round(self.cache_stats["token_hits"] / token_lookups, 4) if token_lookups else None,
+                "tenant_hit_rate": round(self.cache_stats["tenant_hits"] / tenant_lookups, 4) if tenant_lookups else None,
+                "cached_tokens": len(self._token_cache),
+                "cached_tenants": len(self.tenant_cache),
+                "token_ttl_seconds": self.config.token_cache_ttl,
+                "tenant_ttl_seconds": self.config.tenant_cache_ttl
+            }
+    
     def get_tenant_from_jwt(self, token: str) -> Optional[TenantInfo]:
         """Extract tenant information from JWT token"""
         try:
-            # Use the same JWT verification logic as the auth service
-            from auth.auth_service import sar_auth
-            payload = sar_auth.verify_jwt_token(token, secret=self.config.jwt_secret_key)
+            payload = self._verify_token(token)
             if not payload:
                 return None
             
@@ -115,20 +261,7 @@ class TenantResolver:
                 tenant_type = TenantType.CLIENT  # Default fallback
             
             # Get additional tenant information from MongoDB if available
-            tenant_name = payload.get("tenant_name") or payload.get("company_name") or payload.get("name", "")
-            if self._db is not None:
-                try:
-                    # Try to get tenant name from clients collection
-                    client_doc = self._db.clients.find_one({"client_id": tenant_id})
-                    if client_doc and client_doc.get("company_name"):
-                        tenant_name = client_doc["company_name"]
-                    else:
-                        # Try to get tenant name from users collection
-                        user_doc = self._db.users.find_one({"user_id": tenant_id})
-                        if user_doc and user_doc.get("name"):
-                            tenant_name = user_doc["name"]
-                except Exception as e:
-                    logger.warning(f"Failed to get tenant name from MongoDB: {e}")
+            tenant_name = self._lookup_tenant_name(tenant_id) or payload.get("tenant_name") or payload.get("company_name") or payload.get("name", "")
             
             return TenantInfo(
                 tenant_id=tenant_id,
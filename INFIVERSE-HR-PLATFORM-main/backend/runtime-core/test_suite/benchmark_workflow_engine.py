@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Workflow Engine Throughput Benchmark
+Runs many workflows of independent and dependent I/O-bound tasks through the SAR
+workflow engine on InMemoryWorkflowStorage and reports tasks per second for
+different per-workflow concurrency limits (no database or server needed)
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ["WORKFLOW_STORAGE_BACKEND"] = "memory"
+
+from workflow.workflow_service import InMemoryWorkflowStorage, SARWorkflowEngine, WorkflowDefinition, WorkflowStatus
+
+
+class CountingStorage(InMemoryWorkflowStorage):
+    """In-memory storage that counts writes and the task states they carry"""
+
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+        self.task_writes = 0
+
+    async def update_workflow_instance(self, instance):
+        self.writes += 1
+        self.task_writes += len(instance.tasks)
+        return await super().update_workflow_instance(instance)
+
+    async def update_workflow_progress(self, instance, tasks):
+        # Instances are held by reference, so only the write is counted
+        self.writes += 1
+        self.task_writes += len(tasks)
+        return instance.instance_id in self._instances
+
+
+def build_definition(width: int, latency: float, failure_every: int) -> WorkflowDefinition:
+    """validate -> `width` independent steps -> report; every nth task run fails and is retried"""
+    calls = 0
+
+    async def step(name: str):
+        nonlocal calls
+        calls += 1
+        failing = failure_every and calls % failure_every == 0
+        await asyncio.sleep(latency)
+        if failing:
+            raise ConnectionError(f"{name} upstream timeout")
+        return name
+
+    definition = WorkflowDefinition("benchmark", "Fan-out benchmark workflow")
+    definition.add_task("validate", step, args=["validate"])
+    for i in range(width):
+        definition.add_task(f"step_{i}", step, args=[f"step_{i}"], dependencies=["validate"])
+    definition.add_task("report", step, args=["report"], dependencies=[f"step_{i}" for i in range(width)])
+    return definition
+
+
+async def run(concurrency: int, workflows: int, width: int, latency: float, retry_delay: float, failure_every: int) -> dict:
+    engine = SARWorkflowEngine()
+    engine.storage = CountingStorage()
+    engine.config.max_concurrent_tasks = concurrency
+    engine.config.retry_delay = retry_delay
+    engine.register_workflow(build_definition(width, latency, failure_every))
+
+    start = time.perf_counter()
+    instance_ids = [await engine.start_workflow("benchmark", "bench_tenant", "bench_user") for _ in range(workflows)]
+    await asyncio.gather(*list(engine._running_workflows.values()))
+    elapsed = time.perf_counter() - start
+
+    instances = [await engine.get_workflow_instance(instance_id) for instance_id in instance_ids]
+    completed = sum(1 for instance in instances if instance.status == WorkflowStatus.COMPLETED)
+    tasks = workflows * (width + 2)
+    engine.shutdown()
+    return {
+        "elapsed": elapsed,
+        "tasks_per_second": tasks / elapsed,
+        "completed": completed,
+        "writes_per_task": engine.storage.writes / tasks,
+        "task_states_per_task": engine.storage.task_writes / tasks,
+        "retries": engine.stats["task_retries"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SAR workflow engine throughput")
+    parser.add_argument("--workflows", type=int, default=10, help="Workflows started together")
+    parser.add_argument("--width", type=int, default=20, help="Independent tasks per workflow")
+    parser.add_argument("--latency", type=float, default=0.01, help="Simulated I/O time per task in seconds")
+    parser.add_argument("--retry-delay", type=float, default=0.05, help="Delay before a failed task is retried")
+    parser.add_argument("--failure-every", type=int, default=25, help="Every nth task run fails (0 disables)")
+    parser.add_argument("--concurrency", default="1,4,10,20", help="Comma separated per-workflow task limits")
+    args = parser.parse_args()
+
+    print(f"{args.workflows} workflows x {args.width + 2} tasks, {args.latency * 1000:.0f}ms per task")
+    print(f"{'concurrency':>11} | {'seconds':>8} | {'tasks/s':>9} | {'completed':>9} | {'writes/task':>11} | {'task states/task':>16} | {'retries':>7}")
+    for concurrency in [int(c) for c in args.concurrency.split(",")]:
+        result = asyncio.run(run(concurrency, args.workflows, args.width, args.latency, args.retry_delay, args.failure_every))
+        print(f"{concurrency:>11} | {result['elapsed']:>8.2f} | {result['tasks_per_second']:>9.0f} | "
+              f"{result['completed']:>9} | {result['writes_per_task']:>11.2f} | {result['task_states_per_task']:>16.2f} | {result['retries']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Permission cache tests for the Role Enforcement service in Sovereign Application Runtime (SAR)
+These tests use an in-memory MongoDB stand-in and do not require a running server
+"""
+import os
+import sys
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+# Fail fast instead of waiting on server selection when no MongoDB is running
+os.environ.setdefault("MONGODB_URI", "mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=200")
+
+mongomock = pytest.importorskip("mongomock")
+
+from role_enforcement.rbac_service import Permission, RoleType, SARRoleEnforcement
+
+
+class CountingCollection:
+    """Wraps a mongomock collection and counts find() calls"""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self.finds = 0
+
+    def find(self, *args, **kwargs):
+        self.finds += 1
+        return self._collection.find(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+
+@pytest.fixture
+def rbac():
+    service = SARRoleEnforcement()
+    service._assignments_collection = CountingCollection(mongomock.MongoClient().db.role_assignments)
+    return service
+
+
+class TestPermissionCache:
+    """Test cases for cached permission evaluation"""
+
+    def test_repeated_checks_query_mongodb_once(self, rbac):
+        rbac.assign_role("user_1", "client_admin", "tenant_a")
+        finds = rbac._assignments_collection.finds
+
+        for _ in range(50):
+            assert rbac.has_permission("user_1", "jobs", "create", "tenant_a", "tenant_a")
+            assert not rbac.has_permission("user_1", "audit", "read", "tenant_a", "tenant_a")
+
+        assert rbac._assignments_collection.finds == finds + 1
+        stats = rbac.get_cache_stats()
+        assert stats["misses"] == 1 and stats["hits"] == 99
+
+    def test_role_assignment_invalidates_cached_permissions(self, rbac):
+        rbac.assign_role("user_2", "client_user", "tenant_a")
+        assert not rbac.has_permission("user_2", "offers", "create", "tenant_a", "tenant_a")
+
+        rbac.assign_role("user_2", "client_admin", "tenant_a")
+        assert rbac.has_permission("user_2", "offers", "create", "tenant_a", "tenant_a")
+        assert rbac.get_cache_stats()["invalidations"] == 2
+
+    def test_tenant_scoped_grants_require_matching_tenant(self, rbac):
+        rbac.assign_role("user_3", "client_admin", "tenant_a")
+        rbac.assign_role("admin_1", "system_admin")
+
+        assert not rbac.has_permission("user_3", "jobs", "read", "tenant_b", "tenant_a")
+        # Global wildcard grants apply in any tenant
+        assert rbac.has_permission("admin_1", "jobs", "delete", "tenant_b", "tenant_a")
+
+    def test_entries_expire_after_ttl(self, rbac):
+        rbac.config.default_permissions_cache_ttl = 0
+        rbac.assign_role("user_4", "client_user", "tenant_a")
+        finds = rbac._assignments_collection.finds
+
+        rbac.has_permission("user_4", "jobs", "read", "tenant_a", "tenant_a")
+        rbac.has_permission("user_4", "jobs", "read", "tenant_a", "tenant_a")
+        assert rbac._assignments_collection.finds == finds + 2
+
+    def test_mongodb_errors_are_not_cached(self, rbac):
+        class BrokenCollection:
+            def find(self, *args, **kwargs):
+                raise ConnectionError("MongoDB unavailable")
+
+        rbac.assign_role("user_5", "client_user", "tenant_a")
+        rbac._assignments_collection = BrokenCollection()
+        # In-memory assignments still answer the check, but the partial result is not kept
+        assert rbac.has_permission("user_5", "jobs", "read", "tenant_a", "tenant_a")
+        assert rbac.get_cache_stats()["cached_entries"] == 0
+
+    def test_new_roles_and_role_changes_are_compiled(self, rbac):
+        rbac.create_role("reporting", RoleType.CLIENT_USER, [Permission("reports", "export", "tenant")])
+        rbac.assign_role("user_6", "reporting", "tenant_a")
+        assert rbac.has_permission("user_6", "reports", "export", "tenant_a", "tenant_a")
+        assert rbac.get_user_permissions("user_6", "tenant_a") == {Permission("reports", "export", "tenant")}
+
+        rbac.get_role("reporting").permissions.add(Permission("reports", "schedule", "tenant"))
+        rbac.invalidate_role("reporting")
+        assert rbac.has_permission("user_6", "reports", "schedule", "tenant_a", "tenant_a")
+
+    def test_required_role_uses_cached_roles(self, rbac):
+        rbac.assign_role("user_7", "client_admin", "tenant_a")
+        auth = {"type": "client_token", "client_id": "user_7", "tenant_id": "tenant_a"}
+        assert rbac.validate_role_access(auth, required_role="client_admin")
+        finds = rbac._assignments_collection.finds
+        assert rbac.validate_role_access(auth, required_role="client_admin")
+        assert rbac._assignments_collection.finds == finds
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,156 @@
+"""
+Verified token cache tests for the Tenant Resolution service in Sovereign Application Runtime (SAR)
+These tests use an in-memory MongoDB stand-in and do not require a running server
+"""
+import os
+import sys
+import time
+import jwt
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+# Fail fast instead of waiting on server selection when no MongoDB is running
+os.environ.setdefault("MONGODB_URI", "mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=200")
+
+mongomock = pytest.importorskip("mongomock")
+
+from auth.auth_service import sar_auth
+from tenancy.tenant_service import TenantResolver, TenantType
+
+SECRET = "tenant-cache-test-secret-0123456789abcdef"
+
+
+class CountingCollection:
+    """Wraps a mongomock collection and counts find_one() calls"""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self.finds = 0
+
+    def find_one(self, *args, **kwargs):
+        self.finds += 1
+        return self._collection.find_one(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+
+class CountingDatabase:
+    def __init__(self, db):
+        self.clients = CountingCollection(db.clients)
+        self.users = CountingCollection(db.users)
+
+
+@pytest.fixture
+def verifications(monkeypatch):
+    calls = []
+    verify = sar_auth.verify_jwt_token
+
+    def counting_verify(token, secret=None):
+        calls.append(token)
+        return verify(token, secret=secret)
+
+    monkeypatch.setattr(sar_auth, "verify_jwt_token", counting_verify)
+    return calls
+
+
+@pytest.fixture
+def resolver():
+    service = TenantResolver()
+    service.config.jwt_secret_key = SECRET
+    db = mongomock.MongoClient().db
+    db.clients.insert_one({"client_id": "client_a", "company_name": "Acme Corp"})
+    service._db = CountingDatabase(db)
+    return service
+
+
+def _token(exp_in=3600, **claims):
+    payload = {"client_id": "client_a", "role": "client", "iat": int(time.time()), "exp": int(time.time()) + exp_in}
+    payload.update(claims)
+    return jwt.encode(payload, SECRET, algorithm="HS256")
+
+
+class TestTenantResolutionCache:
+    """Test cases for cached token verification and tenant lookups"""
+
+    def test_repeated_token_is_verified_once(self, resolver, verifications):
+        token = _token()
+        for _ in range(20):
+            tenant = resolver.get_tenant_from_jwt(token)
+            assert tenant.tenant_id == "client_a"
+            assert tenant.name == "Acme Corp"
+            assert tenant.tenant_type == TenantType.CLIENT
+
+        assert len(verifications) == 1
+        assert resolver._db.clients.finds == 1
+        stats = resolver.get_cache_stats()
+        assert stats["token_misses"] == 1 and stats["token_hits"] == 19
+        assert stats["tenant_misses"] == 1 and stats["tenant_hits"] == 19
+
+    def test_tokens_for_one_tenant_share_the_tenant_lookup(self, resolver, verifications):
+        resolver.get_tenant_from_jwt(_token(email="a@acme.test"))
+        resolver.get_tenant_from_jwt(_token(email="b@acme.test"))
+
+        assert len(verifications) == 2
+        assert resolver._db.clients.finds == 1
+
+    def test_cached_token_is_not_served_past_its_expiry(self, resolver, verifications):
+        token = _token(exp_in=1)
+        assert resolver.get_tenant_from_jwt(token) is not None
+        assert resolver._token_cache[resolver._token_key(token)].expires_at <= time.time() + 1
+
+        time.sleep(1.1)
+        assert resolver.get_tenant_from_jwt(token) is None
+        assert len(verifications) == 2
+        assert resolver.get_cache_stats()["token_expired"] == 1
+
+    def test_invalid_tokens_are_never_cached(self, resolver, verifications):
+        forged = jwt.encode({"client_id": "client_a", "exp": int(time.time()) + 3600}, "wrong-secret-0123456789abcdef0123456789", algorithm="HS256")
+        assert resolver.get_tenant_from_jwt(forged) is None
+        assert resolver.get_tenant_from_jwt(forged) is None
+
+        assert len(verifications) == 2
+        assert resolver.get_cache_stats()["cached_tokens"] == 0
+
+    def test_least_recently_used_token_is_evicted(self, resolver, verifications):
+        resolver.config.token_cache_size = 2
+        first, second, third = _token(email="1"), _token(email="2"), _token(email="3")
+        for token in (first, second, first, third):
+            resolver.get_tenant_from_jwt(token)
+
+        assert resolver.get_cache_stats()["token_evictions"] == 1
+        resolver.get_tenant_from_jwt(first)
+        resolver.get_tenant_from_jwt(second)
+        assert verifications == [first, second, third, second]
+
+    def test_invalidation_forces_a_fresh_lookup(self, resolver, verifications):
+        token = _token()
+        resolver.get_tenant_from_jwt(token)
+        resolver._db.clients.update_one({"client_id": "client_a"}, {"$set": {"company_name": "Acme Holdings"}})
+
+        assert resolver.get_tenant_from_jwt(token).name == "Acme Corp"
+        resolver.invalidate_tenant("client_a")
+        assert resolver.get_tenant_from_jwt(token).name == "Acme Holdings"
+
+        resolver.invalidate_token(token)
+        resolver.get_tenant_from_jwt(token)
+        assert len(verifications) == 2
+
+    def test_mongodb_errors_are_not_cached(self, resolver):
+        class BrokenCollection:
+            def find_one(self, *args, **kwargs):
+                raise ConnectionError("MongoDB unavailable")
+
+        working = resolver._db.clients
+        resolver._db.clients = BrokenCollection()
+        # Falls back to the name in the token and retries MongoDB next time
+        assert resolver.get_tenant_from_jwt(_token(name="Token Name")).name == "Token Name"
+        assert resolver.get_cache_stats()["cached_tenants"] == 0
+
+        resolver._db.clients = working
+        assert resolver.get_tenant_from_jwt(_token()).name == "Acme Corp"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
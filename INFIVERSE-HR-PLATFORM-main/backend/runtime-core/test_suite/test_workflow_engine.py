@@ -0,0 +1,170 @@
+"""
+Execution tests for the Workflow Engine in Sovereign Application Runtime (SAR)
+These tests run workflows against in-memory storage and do not require a running server
+"""
+import asyncio
+import os
+import sys
+import time
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("WORKFLOW_STORAGE_BACKEND", "memory")
+
+from workflow.workflow_service import (
+    InMemoryWorkflowStorage, SARWorkflowEngine, TaskStatus, WorkflowDefinition, WorkflowStatus
+)
+
+
+class RecordingStorage(InMemoryWorkflowStorage):
+    """In-memory storage that records how many tasks each progress write carried"""
+
+    def __init__(self):
+        super().__init__()
+        self.full_updates = 0
+        self.progress_writes = []
+
+    async def update_workflow_instance(self, instance):
+        self.full_updates += 1
+        return await super().update_workflow_instance(instance)
+
+    async def update_workflow_progress(self, instance, tasks):
+        self.progress_writes.append([task.name for task in tasks])
+        return instance.instance_id in self._instances
+
+
+def _engine(max_concurrent_tasks=4, retry_delay=0.05):
+    engine = SARWorkflowEngine()
+    engine.storage = RecordingStorage()
+    engine.config.max_concurrent_tasks = max_concurrent_tasks
+    engine.config.retry_delay = retry_delay
+    return engine
+
+
+async def _run(engine, definition, parameters=None):
+    engine.register_workflow(definition)
+    instance_id = await engine.start_workflow(definition.name, "tenant_1", "user_1", parameters)
+    await engine._running_workflows[instance_id]
+    return await engine.get_workflow_instance(instance_id)
+
+
+class TestWorkflowEngine:
+    """Test cases for concurrent task execution"""
+
+    @pytest.mark.asyncio
+    async def test_ready_tasks_run_concurrently_within_limit(self):
+        in_flight, peak = 0, 0
+
+        async def step():
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.05)
+            in_flight -= 1
+            return "done"
+
+        definition = WorkflowDefinition("fan_out")
+        for i in range(8):
+            definition.add_task(f"step_{i}", step)
+
+        engine = _engine(max_concurrent_tasks=4)
+        start = time.monotonic()
+        instance = await _run(engine, definition)
+
+        assert instance.status == WorkflowStatus.COMPLETED
+        assert peak == 4
+        # Two rounds of 50ms; one task at a time would take 400ms
+        assert time.monotonic() - start < 0.3
+
+    @pytest.mark.asyncio
+    async def test_dependencies_by_name_run_in_order(self):
+        order = []
+
+        async def record(name):
+            order.append(name)
+            return name
+
+        definition = (WorkflowDefinition("ordered")
+                      .add_task("validate", record, args=["validate"])
+                      .add_task("email", record, args=["email"], dependencies=["validate"])
+                      .add_task("interview", record, args=["interview"], dependencies=["validate"])
+                      .add_task("report", record, args=["report"], dependencies=["email", "interview"]))
+        instance = await _run(_engine(), definition)
+
+        assert instance.status == WorkflowStatus.COMPLETED
+        assert order[0] == "validate" and order[-1] == "report"
+        assert sorted(order[1:3]) == ["email", "interview"]
+
+    @pytest.mark.asyncio
+    async def test_retry_waits_on_a_timer_without_blocking_other_tasks(self):
+        attempts = []
+
+        async def flaky():
+            attempts.append(time.monotonic())
+            if len(attempts) < 3:
+                raise ConnectionError("upstream unavailable")
+            return "ok"
+
+        async def slow():
+            await asyncio.sleep(0.3)
+            return "slow"
+
+        definition = WorkflowDefinition("retrying").add_task("flaky", flaky).add_task("slow", slow)
+        engine = _engine(retry_delay=0.02)
+        start = time.monotonic()
+        instance = await _run(engine, definition)
+
+        flaky_task = next(task for task in instance.tasks if task.name == "flaky")
+        assert instance.status == WorkflowStatus.COMPLETED
+        assert flaky_task.retry_count == 2 and flaky_task.result == "ok"
+        # Both retries happened while the slow task was still running
+        assert attempts[2] - start < 0.2
+        assert engine.stats["task_retries"] == 2
+
+    @pytest.mark.asyncio
+    async def test_only_changed_tasks_are_persisted(self):
+        async def step():
+            return "done"
+
+        definition = WorkflowDefinition("chain").add_task("a", step).add_task("b", step, dependencies=["a"])
+        engine = _engine()
+        instance = await _run(engine, definition)
+
+        assert instance.status == WorkflowStatus.COMPLETED
+        assert engine.storage.full_updates == 0
+        # started, then each completion together with the start it unblocked, then the final status
+        assert engine.storage.progress_writes == [[], ["a"], ["a", "b"], ["b"], []]
+
+    @pytest.mark.asyncio
+    async def test_permanent_failure_fails_the_workflow(self):
+        async def broken():
+            raise ValueError("bad input")
+
+        async def after():
+            return "never"
+
+        definition = WorkflowDefinition("failing").add_task("broken", broken).add_task("after", after, dependencies=["broken"])
+        definition.tasks[0].max_retries = 1
+        instance = await _run(_engine(retry_delay=0.01), definition)
+
+        assert instance.status == WorkflowStatus.FAILED
+        assert instance.error == "Task 'broken' failed: bad input"
+        assert [task.status for task in instance.tasks] == [TaskStatus.FAILED, TaskStatus.PENDING]
+
+    @pytest.mark.asyncio
+    async def test_circular_dependencies_are_rejected(self):
+        async def step():
+            return None
+
+        definition = (WorkflowDefinition("cyclic")
+                      .add_task("a", step, dependencies=["b"])
+                      .add_task("b", step, dependencies=["a"]))
+        instance = await _run(_engine(), definition)
+
+        assert instance.status == WorkflowStatus.FAILED
+        assert instance.error == "Circular dependency detected in workflow"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -14,6 +14,8 @@ Features:
 
 Workflow Execution:
 - Asynchronous workflow execution with thread pools
+- Ready tasks run concurrently up to WORKFLOW_MAX_CONCURRENT_TASKS per workflow; retries wait on timers
+- Only changed task state is persisted as a workflow progresses
 - Task-level status tracking (PENDING, RUNNING, COMPLETED, FAILED, CANCELLED)
 - Dependency-aware execution with topological sorting
 - Context sharing between workflow tasks
@@ -335,6 +335,7 @@ async def workflow_health_check():
         "running_workflows": len(sar_workflow._running_workflows),
         "registered_definitions": len(sar_workflow._workflow_definitions),
         "storage_backend": sar_workflow.config.storage_backend,
+        "execution": sar_workflow.get_stats(),
         "timestamp": datetime.utcnow().isoformat()
     }
 
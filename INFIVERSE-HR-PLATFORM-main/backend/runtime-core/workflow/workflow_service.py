@@ -6,9 +6,10 @@ for multi-tenant applications with proper isolation and security measures.
 """
 import asyncio
 import uuid
+from collections import deque
 from datetime import datetime, timezone
 from enum import Enum
-from typing import Dict, Any, Optional, List, Callable, Union
+from typing import Dict, Any, Optional, List, Callable, Set, Union
 from dataclasses import dataclass, field
 from abc import ABC, abstractmethod
 import json
@@ -132,6 +133,13 @@ class WorkflowStorageBackend(ABC):
         """List workflow instances for a tenant"""
         pass
 
+    async def update_workflow_progress(self, instance: WorkflowInstance, tasks: List[WorkflowTask]) -> bool:
+        """Persist the instance status fields and the state of the given (changed) tasks.
+
+        Backends that cannot update part of a stored instance rewrite the whole instance.
+        """
+        return await self.update_workflow_instance(instance)
+
 
 class MongoWorkflowStorage(WorkflowStorageBackend):
     """MongoDB-based workflow storage for persistent workflow management"""
@@ -164,6 +172,26 @@ class MongoWorkflowStorage(WorkflowStorageBackend):
             self._db = None
             self._collection = None
     
+    def _serialize_task_state(self, task: WorkflowTask) -> Dict[str, Any]:
+        """Serialize the fields of a task that change while it executes"""
+        return {
+            "retry_count": task.retry_count,
+            "status": task.status.value,
+            "result": task.result,
+            "error": task.error,
+            "started_at": task.started_at.isoformat() if task.started_at else None,
+            "completed_at": task.completed_at.isoformat() if task.completed_at else None,
+        }
+    
+    def _serialize_instance_state(self, instance: WorkflowInstance) -> Dict[str, Any]:
+        """Serialize the fields of an instance that change while it executes"""
+        return {
+            "status": instance.status.value,
+            "started_at": instance.started_at.isoformat() if instance.started_at else None,
+            "completed_at": instance.completed_at.isoformat() if instance.completed_at else None,
+            "error": instance.error,
+        }
+    
     def _serialize_instance(self, instance: WorkflowInstance) -> Dict[str, Any]:
         """Serialize a WorkflowInstance to a dictionary for MongoDB storage"""
         return {
@@ -179,21 +207,13 @@ class MongoWorkflowStorage(WorkflowStorageBackend):
                     "kwargs": task.kwargs,
                     "dependencies": task.dependencies,
                     "timeout": task.timeout,
-                    "retry_count": task.retry_count,
                     "max_retries": task.max_retries,
-                    "status": task.status.value,
-                    "result": task.result,
-                    "error": task.error,
-                    "started_at": task.started_at.isoformat() if task.started_at else None,
-                    "completed_at": task.completed_at.isoformat() if task.completed_at else None,
+                    **self._serialize_task_state(task),
                 } for task in instance.tasks
             ],
-            "status": instance.status.value,
             "context": instance.context,
             "created_at": instance.created_at.isoformat(),
-            "started_at": instance.started_at.isoformat() if instance.started_at else None,
-            "completed_at": instance.completed_at.isoformat() if instance.completed_at else None,
-            "error": instance.error,
+            **self._serialize_instance_state(instance),
         }
     
     def _deserialize_instance(self, data: Dict[str, Any]) -> WorkflowInstance:
@@ -235,7 +255,7 @@ class MongoWorkflowStorage(WorkflowStorageBackend):
     
     async def store_workflow_instance(self, instance: WorkflowInstance) -> bool:
         """Store a workflow instance in MongoDB"""
-        if not self._collection:
+        if self._collection is None:
             logger.error("❌ MongoDB collection not available for workflow storage")
             return False
         
@@ -250,7 +270,7 @@ class MongoWorkflowStorage(WorkflowStorageBackend):
     
     async def get_workflow_instance(self, instance_id: str) -> Optional[WorkflowInstance]:
         """Retrieve a workflow instance from MongoDB"""
-        if not self._collection:
+        if self._collection is None:
             logger.error("❌ MongoDB collection not available for workflow storage")
             return None
         
@@ -265,7 +285,7 @@ class MongoWorkflowStorage(WorkflowStorageBackend):
     
     async def update_workflow_instance(self, instance: WorkflowInstance) -> bool:
         """Update a workflow instance in MongoDB"""
-        if not self._collection:
+        if self._collection is None:
             logger.error("❌ MongoDB collection not available for workflow storage")
             return False
         
@@ -280,11 +300,32 @@ class MongoWorkflowStorage(WorkflowStorageBackend):
             logger.error(f"❌ Failed to update workflow instance: {e}")
             return False
     
+    async def update_workflow_progress(self, instance: WorkflowInstance, tasks: List[WorkflowTask]) -> bool:
+        """Update the instance status fields and the given tasks in place in MongoDB"""
+        if self._collection is None:
+            logger.error("❌ MongoDB collection not available for workflow storage")
+            return False
+        
+        try:
+            fields = self._serialize_instance_state(instance)
+            positions = {task.task_id: index for index, task in enumerate(instance.tasks)}
+            for task in tasks:
+                for key, value in self._serialize_task_state(task).items():
+                    fields[f"tasks.{positions[task.task_id]}.{key}"] = value
+            result = self._collection.update_one(
+                {"instance_id": instance.instance_id}, {"$set": fields}
+            )
+            logger.debug(f"✅ Workflow progress updated: {instance.instance_id} ({len(tasks)} tasks)")
+            return result.matched_count > 0
+        except Exception as e:
+            logger.error(f"❌ Failed to update workflow progress: {e}")
+            return False
+    
     async def list_workflow_instances(self, tenant_id: str, 
                                     status: Optional[WorkflowStatus] = None,
                                     limit: int = 100, offset: int = 0) -> List[WorkflowInstance]:
         """List workflow instances for a tenant from MongoDB"""
-        if not self._collection:
+        if self._collection is None:
             logger.error("❌ MongoDB collection not available for workflow storage")
             return []
         
@@ -353,6 +394,7 @@ class WorkflowConfig:
         self.retry_delay = int(os.getenv("WORKFLOW_RETRY_DELAY", "5"))  # 5 seconds
         self.enable_persistence = os.getenv("WORKFLOW_PERSISTENCE", "false").lower() == "true"
         self.executor_workers = int(os.getenv("WORKFLOW_EXECUTOR_WORKERS", "20"))
+        self.max_concurrent_tasks = max(1, int(os.getenv("WORKFLOW_MAX_CONCURRENT_TASKS", "10")))  # per workflow instance
         # MongoDB configuration
         self.mongodb_uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
         self.mongodb_db_name = os.getenv("MONGODB_DB_NAME", "bhiv_hr")
@@ -368,6 +410,7 @@ class SARWorkflowEngine:
         self._executor = ThreadPoolExecutor(max_workers=self.config.executor_workers)
         self._running_workflows: Dict[str, asyncio.Task] = {}
         self._workflow_definitions: Dict[str, WorkflowDefinition] = {}
+        self.stats = {"tasks_started": 0, "tasks_completed": 0, "tasks_failed": 0, "task_retries": 0, "progress_writes": 0}
         
     def _setup_storage_backend(self):
         """Initialize the appropriate storage backend based on configuration"""
@@ -437,80 +480,137 @@ class SARWorkflowEngine:
         
         return instance_id
     
+    def _resolve_dependencies(self, instance: WorkflowInstance) -> Dict[str, Set[str]]:
+        """Map each task to the ids of the tasks it depends on (dependencies may name a task id or a task name)"""
+        task_ids = {task.task_id for task in instance.tasks}
+        ids_by_name = {task.name: task.task_id for task in instance.tasks}
+        dependencies = {}
+        for task in instance.tasks:
+            dependencies[task.task_id] = set()
+            for dep in task.dependencies:
+                dep_id = dep if dep in task_ids else ids_by_name.get(dep)
+                if dep_id is None:
+                    raise RuntimeError(f"Task '{task.name}' depends on unknown task '{dep}'")
+                dependencies[task.task_id].add(dep_id)
+        
+        # Kahn's algorithm: tasks left unordered are part of a cycle
+        remaining = {task_id: len(deps) for task_id, deps in dependencies.items()}
+        ordered = [task_id for task_id, count in remaining.items() if count == 0]
+        for task_id in ordered:
+            for dependent_id, deps in dependencies.items():
+                if task_id in deps:
+                    remaining[dependent_id] -= 1
+                    if remaining[dependent_id] == 0:
+                        ordered.append(dependent_id)
+        if len(ordered) < len(dependencies):
+            raise RuntimeError("Circular dependency detected in workflow")
+        return dependencies
+    
     async def _execute_workflow(self, instance: WorkflowInstance):
-        """Execute a workflow instance"""
+        """Execute a workflow instance
+        
+        Tasks whose dependencies have completed run concurrently, at most
+        max_concurrent_tasks at a time. Failed tasks are retried from timers after
+        retry_delay without holding up other tasks. Only tasks whose state changed are
+        persisted, in one write per scheduling round.
+        """
+        loop = asyncio.get_running_loop()
+        running: Dict[asyncio.Task, WorkflowTask] = {}
+        retry_timers: Dict[str, asyncio.TimerHandle] = {}
+        changed: Dict[str, WorkflowTask] = {}
+        wakeup = asyncio.Event()
+        
+        async def persist_progress():
+            await self.storage.update_workflow_progress(instance, list(changed.values()))
+            self.stats["progress_writes"] += 1
+            changed.clear()
+        
         try:
             # Update workflow status
             instance.status = WorkflowStatus.RUNNING
             instance.started_at = datetime.now(timezone.utc)
-            await self.storage.update_workflow_instance(instance)
+            await persist_progress()
             
-            # Execute tasks in dependency order
-            remaining_tasks = {task.task_id: task for task in instance.tasks}
-            completed_tasks = set()
+            dependencies = self._resolve_dependencies(instance)
+            dependents: Dict[str, List[str]] = {task.task_id: [] for task in instance.tasks}
+            for task_id, deps in dependencies.items():
+                for dep_id in deps:
+                    dependents[dep_id].append(task_id)
             
-            while remaining_tasks and instance.status == WorkflowStatus.RUNNING:
-                # Find tasks that can be executed (dependencies satisfied)
-                executable_tasks = []
-                for task_id, task in remaining_tasks.items():
-                    # Check if all dependencies are completed
-                    deps_satisfied = all(dep_id in completed_tasks for dep_id in task.dependencies)
-                    
-                    if deps_satisfied:
-                        executable_tasks.append(task)
+            # Tasks completed before a pause are not run again on resume
+            completed_tasks = {task.task_id for task in instance.tasks if task.status == TaskStatus.COMPLETED}
+            remaining_tasks = {task.task_id: task for task in instance.tasks if task.status != TaskStatus.COMPLETED}
+            ready = deque(task for task in remaining_tasks.values() if dependencies[task.task_id] <= completed_tasks)
+            
+            def retry(task: WorkflowTask):
+                retry_timers.pop(task.task_id, None)
+                ready.append(task)
+                wakeup.set()
+            
+            while True:
+                if instance.status == WorkflowStatus.RUNNING:
+                    while ready and len(running) < self.config.max_concurrent_tasks:
+                        task = ready.popleft()
+                        task.status = TaskStatus.RUNNING
+                        task.started_at = datetime.now(timezone.utc)
+                        changed[task.task_id] = task
+                        running[asyncio.create_task(self._execute_task(task, instance))] = task
+                        self.stats["tasks_started"] += 1
+                else:
+                    # Paused or failed: start nothing new; tasks waiting to retry stay pending
+                    for handle in retry_timers.values():
+                        handle.cancel()
+                    retry_timers.clear()
                 
-                if not executable_tasks:
-                    # If no tasks can be executed but we still have remaining tasks,
-                    # there might be a circular dependency
-                    if remaining_tasks:
-                        raise RuntimeError("Circular dependency detected in workflow")
+                if changed:
+                    await persist_progress()
+                if not running and not retry_timers:
                     break
                 
-                # Execute executable tasks concurrently
-                for task in executable_tasks:
-                    try:
-                        # Update task status
-                        task.status = TaskStatus.RUNNING
-                        task.started_at = datetime.now(timezone.utc)
-                        await self.storage.update_workflow_instance(instance)
-                        
-                        # Execute the task
-                        result = await self._execute_task(task, instance)
-                        
-                        # Update task result
+                wakeup.clear()
+                waiter = asyncio.ensure_future(wakeup.wait())
+                finished, _ = await asyncio.wait([*running, waiter], return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+                
+                for execution in finished:
+                    task = running.pop(execution, None)
+                    if task is None:
+                        continue
+                    changed[task.task_id] = task
+                    error = execution.exception()
+                    
+                    if error is None:
                         task.status = TaskStatus.COMPLETED
-                        task.result = result
+                        task.result = execution.result()
                         task.completed_at = datetime.now(timezone.utc)
                         completed_tasks.add(task.task_id)
-                        
-                    except Exception as e:
-                        # Handle task failure
+                        remaining_tasks.pop(task.task_id, None)
+                        self.stats["tasks_completed"] += 1
+                        for dependent_id in dependents[task.task_id]:
+                            if dependent_id in remaining_tasks and dependencies[dependent_id] <= completed_tasks:
+                                ready.append(remaining_tasks[dependent_id])
+                    elif task.retry_count < task.max_retries:
+                        # Retry after a delay without blocking the other tasks (or on resume, if paused meanwhile)
+                        task.retry_count += 1
+                        task.status = TaskStatus.PENDING
+                        task.error = str(error)
+                        task.started_at = None
+                        task.completed_at = None
+                        if instance.status == WorkflowStatus.RUNNING:
+                            retry_timers[task.task_id] = loop.call_later(self.config.retry_delay, retry, task)
+                        self.stats["task_retries"] += 1
+                    else:
+                        # Task failed permanently, fail the entire workflow (running tasks are left to finish)
                         task.status = TaskStatus.FAILED
-                        task.error = str(e)
+                        task.error = str(error)
                         task.completed_at = datetime.now(timezone.utc)
-                        
-                        # If task allows retries, retry it
-                        if task.retry_count < task.max_retries:
-                            task.retry_count += 1
-                            task.status = TaskStatus.PENDING
-                            # Reset execution times for retry
-                            task.started_at = None
-                            task.completed_at = None
-                            await asyncio.sleep(self.config.retry_delay)
-                            continue
-                        else:
-                            # Task failed permanently, fail the entire workflow
+                        self.stats["tasks_failed"] += 1
+                        if instance.status == WorkflowStatus.RUNNING:
                             instance.status = WorkflowStatus.FAILED
-                            instance.error = f"Task '{task.name}' failed: {str(e)}"
-                            break
-                
-                # Remove completed tasks from remaining
-                for task in executable_tasks:
-                    if task.status == TaskStatus.COMPLETED:
-                        remaining_tasks.pop(task.task_id, None)
+                            instance.error = f"Task '{task.name}' failed: {str(error)}"
             
             # Update workflow status when all tasks are done
-            if instance.status != WorkflowStatus.FAILED:
+            if instance.status == WorkflowStatus.RUNNING:
                 if not remaining_tasks:
                     instance.status = WorkflowStatus.COMPLETED
                 else:
@@ -518,8 +618,9 @@ class SARWorkflowEngine:
                     instance.status = WorkflowStatus.FAILED
                     instance.error = "Some tasks could not be executed due to dependency issues"
             
-            instance.completed_at = datetime.now(timezone.utc)
-            await self.storage.update_workflow_instance(instance)
+            if instance.status != WorkflowStatus.PAUSED:
+                instance.completed_at = datetime.now(timezone.utc)
+            await persist_progress()
             
         except Exception as e:
             # Handle workflow-level error
@@ -529,6 +630,11 @@ class SARWorkflowEngine:
             await self.storage.update_workflow_instance(instance)
         
         finally:
+            for handle in retry_timers.values():
+                handle.cancel()
+            # Only left over when the workflow itself was cancelled
+            for execution in running:
+                execution.cancel()
             # Remove from running workflows
             self._running_workflows.pop(instance.instance_id, None)
     
@@ -617,6 +723,14 @@ class SARWorkflowEngine:
         
         return True
     
+    def get_stats(self) -> Dict[str, Any]:
+        """Task execution counters since startup"""
+        return {
+            **self.stats,
+            "running_workflows": len(self._running_workflows),
+            "max_concurrent_tasks": self.config.max_concurrent_tasks
+        }
+    
     def shutdown(self):
         """Shutdown the workflow engine"""
         # Cancel all running workflows
@@ -1,12 +1,15 @@
 from fastapi import FastAPI, HTTPException, Depends, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 # MongoDB imports (migrated from psycopg2/PostgreSQL)
 from database import get_mongo_db, get_collection
 from bson import ObjectId
 import os
 import json
+import asyncio
+import heapq
 import sys
 import logging
 import jwt
@@ -190,6 +193,12 @@ def _startup_phase3_background():
     t.start()
     logger.info("Agent started; Phase 3 engine will load in background.")
 
+@app.on_event("shutdown")
+def _shutdown_matching_pool():
+    """Stop matching worker processes with the service."""
+    if phase3_engine is not None:
+        phase3_engine.match_executor.shutdown()
+
 class MatchRequest(BaseModel):
     job_id: str
     candidate_ids: Optional[List[str]] = None
@@ -228,18 +237,258 @@ def return_db_connection(conn):
     """No-op for MongoDB (connection pooling handled automatically)"""
     pass
 
+# Only the fields scoring and responses read, so streamed candidate documents stay small
+CANDIDATE_MATCH_PROJECTION = {
+    'name': 1, 'email': 1, 'location': 1, 'experience_years': 1,
+    'technical_skills': 1, 'seniority_level': 1, 'education_level': 1
+}
+MATCH_STREAM_BATCH_SIZE = int(os.getenv("AGENT_MATCH_STREAM_BATCH_SIZE", "1000"))
+MATCH_TOP_K = 10
+
+def _candidate_match_dict(cand: dict) -> dict:
+    return {
+        'id': str(cand.get('_id')),
+        'name': cand.get('name', ''),
+        'email': cand.get('email', ''),
+        'location': cand.get('location', ''),
+        'experience_years': cand.get('experience_years', 0),
+        'technical_skills': cand.get('technical_skills', ''),
+        'seniority_level': cand.get('seniority_level', ''),
+        'education_level': cand.get('education_level', '')
+    }
+
+def _candidate_query(candidate_ids: Optional[List[str]]) -> dict:
+    """Scope to candidate_ids when provided (e.g. recruiter applicants)"""
+    if not candidate_ids:
+        return {}
+    object_ids = []
+    for cid in candidate_ids:
+        try:
+            object_ids.append(ObjectId(cid))
+        except Exception:
+            pass
+    return {"_id": {"$in": object_ids}} if object_ids else {}
+
+def _iter_candidate_batches(db, query: dict, batch_size: int = MATCH_STREAM_BATCH_SIZE):
+    """Stream projected candidates newest first in lists of batch_size"""
+    cursor = db.candidates.find(query, CANDIDATE_MATCH_PROJECTION).sort('created_at', -1).batch_size(batch_size)
+    batch = []
+    for cand in cursor:
+        batch.append(_candidate_match_dict(cand))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _fetch_candidates(db, candidate_ids: List[str]) -> list:
+    """Load projected candidates by id, in the order given"""
+    keys = []
+    for cid in candidate_ids:
+        try:
+            keys.append(ObjectId(cid))
+        except Exception:
+            keys.append(cid)
+    found = {str(c.get('_id')): _candidate_match_dict(c)
+             for c in db.candidates.find({'_id': {'$in': keys}}, CANDIDATE_MATCH_PROJECTION)}
+    return [found[cid] for cid in candidate_ids if cid in found]
+
+def _shortlist_candidate_batches(db, job_data: dict, query: dict):
+    """
+    Candidate batches for /match and the size of the pool they came from.
+    
+    With the vector store available the pool is streamed once into the ANN
+    index and only the retrieved shortlist is scored; otherwise every
+    candidate is streamed to the scorer and the pool size is not known upfront.
+    """
+    if not (PHASE3_AVAILABLE and phase3_engine and phase3_engine.vector_store is not None):
+        return None, _iter_candidate_batches(db, query)
+    pool_size, shortlist = phase3_engine.retrieve_candidate_batches(
+        job_data,
+        _iter_candidate_batches(db, query),
+        max(phase3_engine.ann_retrieve_limit, MATCH_TOP_K),
+        lambda ids: _fetch_candidates(db, ids)
+    )
+    return pool_size, [shortlist[i:i + MATCH_STREAM_BATCH_SIZE] for i in range(0, len(shortlist), MATCH_STREAM_BATCH_SIZE)]
+
+def _fallback_match_result(candidate: dict, job_requirements: str) -> dict:
+    """Simple scoring based on basic criteria when the Phase 3 engine is not available"""
+    score = 0.5  # Base score
+    
+    # Basic skill matching
+    candidate_skills = (candidate.get('technical_skills') or '').lower()
+    job_requirements = (job_requirements or '').lower()
+    
+    skill_keywords = ['python', 'java', 'javascript', 'react', 'sql']
+    matched_skills = [skill for skill in skill_keywords if skill in candidate_skills and skill in job_requirements]
+    
+    if matched_skills:
+        score += 0.3
+    
+    # Experience matching
+    candidate_exp = candidate.get('experience_years', 0)
+    if candidate_exp >= 2:
+        score += 0.2
+    
+    return {
+        'candidate_data': candidate,
+        'total_score': score,
+        'score_breakdown': {
+            'semantic_similarity': score,
+            'experience_match': 0.7 if candidate_exp >= 2 else 0.3,
+            'location_match': 0.8
+        }
+    }
+
+def _iter_match_snapshots(job_data: dict, candidate_batches, top_k: int = MATCH_TOP_K):
+    """Yield (candidates scored, best results so far) after each streamed batch"""
+    if PHASE3_AVAILABLE and advanced_matcher:
+        yield from advanced_matcher.stream_match(job_data, candidate_batches, top_k)
+        return
+    
+    logger.info("Using fallback matching - Phase 3 engine not available")
+    seen, top = 0, []
+    for batch in candidate_batches:
+        seen += len(batch)
+        # nlargest is stable, and the current leaders come first, so earlier candidates win ties
+        top = heapq.nlargest(
+            top_k,
+            top + [_fallback_match_result(c, job_data.get('requirements')) for c in batch],
+            key=lambda r: r['total_score']
+        )
+        yield seen, top
+
+def _iter_batch_snapshots(jobs: list, candidate_batches, top_k: int = MATCH_TOP_K):
+    """Yield (candidates scored, {job_id: best results so far}) after each batch, scoring all jobs per batch"""
+    if PHASE3_AVAILABLE and phase3_engine:
+        yield from phase3_engine.stream_top_k(jobs, candidate_batches, top_k)
+        return
+    
+    logger.info("Using fallback batch matching - Phase 3 engine not available")
+    seen, tops = 0, {job['id']: [] for job in jobs}
+    for batch in candidate_batches:
+        seen += len(batch)
+        for job in jobs:
+            tops[job['id']] = heapq.nlargest(
+                top_k,
+                tops[job['id']] + [_fallback_match_result(c, job.get('requirements')) for c in batch],
+                key=lambda r: r['total_score']
+            )
+        yield seen, dict(tops)
+
+def _format_top_candidates(semantic_results: list, job_requirements: str, limit: int = MATCH_TOP_K) -> list:
+    """Convert scored results into ranked display entries"""
+    scored_candidates = []
+    for result in semantic_results:
+        candidate_data = result['candidate_data']
+        score_breakdown = result['score_breakdown']
+        
+        # Convert semantic score to display range
+        semantic_score = result['total_score']
+        display_score = 45 + (semantic_score * 50)
+        
+        # Extract matched skills
+        skills_match = []
+        if candidate_data.get('technical_skills'):
+            skills_text = candidate_data['technical_skills'].lower()
+            job_req_lower = (job_requirements or '').lower()
+            
+            tech_keywords = ['python', 'java', 'javascript', 'react', 'node', 'sql', 'mongodb', 'aws', 'docker']
+            for skill in tech_keywords:
+                if skill in skills_text and skill in job_req_lower:
+                    skills_match.append(skill.title())
+        
+        # Create reasoning
+        reasoning_parts = []
+        if score_breakdown.get('semantic_similarity', 0) > 0.3:
+            reasoning_parts.append(f"Semantic match: {score_breakdown['semantic_similarity']:.2f}")
+        if skills_match:
+            reasoning_parts.append(f"Skills: {', '.join(skills_match[:3])}")
+        if score_breakdown.get('experience_match', 0) > 0.5:
+            reasoning_parts.append(f"Experience: {candidate_data.get('experience_years', 0)}y")
+        if score_breakdown.get('location_match', 0) > 0.5:
+            reasoning_parts.append(f"Location: {candidate_data.get('location', 'Unknown')}")
+        
+        reasoning = "; ".join(reasoning_parts) if reasoning_parts else "Phase 3 AI semantic analysis"
+        
+        # Add recommendation strength
+        recommendation_strength = "Strong Match" if display_score > 80 else "Good Match"
+        
+        scored_candidates.append({
+            "candidate_id": candidate_data['id'],
+            "name": candidate_data['name'],
+            "email": candidate_data['email'],
+            "score": round(display_score, 1),
+            "skills_match": ", ".join(skills_match[:5]),
+            "experience_match": f"{candidate_data.get('experience_years', 0)}y - Phase 3 matched",
+            "location_match": score_breakdown.get('location_match', 0) > 0.5,
+            "reasoning": reasoning,
+            "recommendation_strength": recommendation_strength
+        })
+    
+    # Sort by score
+    scored_candidates.sort(key=lambda x: x["score"], reverse=True)
+    
+    # Apply score differentiation
+    for i in range(1, len(scored_candidates)):
+        if scored_candidates[i]["score"] >= scored_candidates[i-1]["score"]:
+            scored_candidates[i]["score"] = round(scored_candidates[i-1]["score"] - 0.8, 1)
+    
+    return scored_candidates[:limit]
+
+def _find_job(db, job_id: str):
+    # Try to find by ObjectId first, then by integer id
+    try:
+        job_query = {'_id': ObjectId(str(job_id))}
+    except:
+        job_query = {'$or': [{'_id': job_id}, {'id': job_id}]}
+    return db.jobs.find_one(job_query)
+
+def _find_jobs(db, job_ids: List[str]) -> Dict[str, dict]:
+    """Look up many jobs in one query; keys are the requested ids"""
+    object_ids, raw_ids = [], []
+    for jid in job_ids:
+        try:
+            object_ids.append(ObjectId(str(jid)))
+        except Exception:
+            raw_ids.append(jid)
+    clauses = []
+    if object_ids:
+        clauses.append({'_id': {'$in': object_ids}})
+    if raw_ids:
+        clauses += [{'_id': {'$in': raw_ids}}, {'id': {'$in': raw_ids}}]
+    found = {}
+    for job_doc in db.jobs.find({'$or': clauses}):
+        found[str(job_doc.get('_id'))] = job_doc
+        if job_doc.get('id') is not None:
+            found.setdefault(str(job_doc.get('id')), job_doc)
+    return {jid: found[str(jid)] for jid in job_ids if str(jid) in found}
+
+def _job_match_dict(job_id: str, job_doc: dict) -> dict:
+    return {
+        'id': job_id,
+        'title': job_doc.get('title', ''),
+        'description': job_doc.get('description', ''),
+        'requirements': job_doc.get('requirements', ''),
+        'location': job_doc.get('location', ''),
+        'experience_level': job_doc.get('experience_level', '')
+    }
+
 @app.get("/", tags=["Core API Endpoints"], summary="AI Service Information")
 def read_root():
     return {
         "service": "BHIV AI Agent",
         "version": "3.0.0",
-        "endpoints": 6,
+        "endpoints": 9,
         "available_endpoints": {
             "root": "GET / - Service information",
             "health": "GET /health - Service health check", 
             "test_db": "GET /test-db - Database connectivity test",
+            "matching_executor": "GET /matching-executor - Matching worker pool health and throughput",
             "match": "POST /match - AI-powered candidate matching",
+            "match_stream": "POST /match/stream - Streaming candidate matching (NDJSON progress)",
             "batch_match": "POST /batch-match - Batch AI matching for multiple jobs",
+            "batch_match_stream": "POST /batch-match/stream - Batch matching streamed per job as NDJSON",
             "analyze": "GET /analyze/{candidate_id} - Detailed candidate analysis"
         }
     }
@@ -274,9 +523,25 @@ def test_database(auth = Depends(auth_dependency)):
         logger.error(f"Database test failed: {e}")
         return {"status": "failed", "error": str(e)}
 
+@app.get("/matching-executor", tags=["System Diagnostics"], summary="Matching Worker Pool Status")
+async def matching_executor_status(auth = Depends(auth_dependency)):
+    """Health check the matching worker pool and report candidates-per-second"""
+    if phase3_engine is None:
+        return {"status": "unavailable", "error": "Phase 3 engine not loaded"}
+    executor = phase3_engine.match_executor
+    return {
+        "status": "success",
+        "health": await executor.health_check(),
+        "metrics": executor.get_stats()
+    }
+
 @app.post("/match", tags=["AI Matching Engine"], summary="AI-Powered Candidate Matching")
 async def match_candidates(request: MatchRequest, auth = Depends(auth_dependency)):
     """Phase 3 AI-powered candidate matching"""
+    # Database reads, encoding and scoring all block, so keep them off the event loop
+    return await asyncio.get_running_loop().run_in_executor(None, _match_candidates, request)
+
+def _match_candidates(request: MatchRequest) -> dict:
     start_time = datetime.now()
     logger.info(f"Starting Phase 3 match for job_id: {request.job_id}")
     db = None
@@ -300,13 +565,7 @@ async def match_candidates(request: MatchRequest, auth = Depends(auth_dependency
         logger.info("Database connection successful")
         
         # Get job details (MongoDB version)
-        # Try to find by ObjectId first, then by integer id
-        try:
-            job_query = {'_id': ObjectId(str(request.job_id))}
-        except:
-            job_query = {'$or': [{'_id': request.job_id}, {'id': request.job_id}]}
-        
-        job_doc = db.jobs.find_one(job_query)
+        job_doc = _find_job(db, request.job_id)
         
         if not job_doc:
             return {
@@ -321,30 +580,11 @@ async def match_candidates(request: MatchRequest, auth = Depends(auth_dependency
                 "status": "job_not_found"
             }
         
-        job_title = job_doc.get('title', '')
-        job_desc = job_doc.get('description', '')
-        job_dept = job_doc.get('department', '')
-        job_location = job_doc.get('location', '')
-        job_level = job_doc.get('experience_level', '')
-        job_requirements = job_doc.get('requirements', '')
-        logger.info(f"Processing job: {job_title}")
-        
-        # Get candidates: scope to candidate_ids when provided (e.g. recruiter applicants)
-        if request.candidate_ids:
-            object_ids = []
-            for cid in request.candidate_ids:
-                try:
-                    object_ids.append(ObjectId(cid))
-                except Exception:
-                    pass
-            query = {"_id": {"$in": object_ids}} if object_ids else {}
-        else:
-            query = {}
-        candidates_cursor = db.candidates.find(query).sort('created_at', -1)
-        candidates = list(candidates_cursor)
-        logger.info(f"Found {len(candidates)} candidates for Phase 3 matching")
+        job_data_dict = _job_match_dict(request.job_id, job_doc)
+        logger.info(f"Processing job: {job_data_dict['title']}")
         
-        if not candidates:
+        query = _candidate_query(request.candidate_ids)
+        if db.candidates.find_one(query, {'_id': 1}) is None:
             logger.warning("No candidates found in database")
             return {
                 "job_id": request.job_id,
@@ -362,130 +602,19 @@ async def match_candidates(request: MatchRequest, auth = Depends(auth_dependency
         _ensure_phase3_engine()
         logger.info("Using Phase 3 Production AI semantic matching")
         
-        job_data_dict = {
-            'id': request.job_id,
-            'title': job_title,
-            'description': job_desc,
-            'requirements': job_requirements,
-            'location': job_location,
-            'experience_level': job_level
-        }
+        # Stream candidates in batches (through the ANN shortlist when available);
+        # only the running top-k is kept in memory
+        pool_size, candidate_batches = _shortlist_candidate_batches(db, job_data_dict, query)
+        scored_candidates, semantic_results = 0, []
+        for scored_candidates, semantic_results in _iter_match_snapshots(job_data_dict, candidate_batches):
+            pass
+        total_candidates = scored_candidates if pool_size is None else pool_size
+        logger.info(f"Scored {scored_candidates} of {total_candidates} candidates")
         
-        # Convert candidates to dict format (MongoDB documents)
-        candidates_dict = []
-        for cand in candidates:
-            candidates_dict.append({
-                'id': str(cand.get('_id')),
-                'name': cand.get('name', ''),
-                'email': cand.get('email', ''),
-                'phone': cand.get('phone', ''),
-                'location': cand.get('location', ''),
-                'experience_years': cand.get('experience_years', 0),
-                'technical_skills': cand.get('technical_skills', ''),
-                'seniority_level': cand.get('seniority_level', ''),
-                'education_level': cand.get('education_level', '')
-            })
-        
-        if PHASE3_AVAILABLE and advanced_matcher:
-            semantic_results = advanced_matcher.advanced_match(job_data_dict, candidates_dict)
-            
-            if not semantic_results:
-                raise RuntimeError("Phase 3 semantic matching failed - no results returned")
-            
-            logger.info(f"Phase 3 matching found {len(semantic_results)} scored candidates")
-        else:
-            # Fallback matching logic
-            logger.info("Using fallback matching - Phase 3 engine not available")
-            semantic_results = []
-            for candidate in candidates_dict:
-                # Simple scoring based on basic criteria
-                score = 0.5  # Base score
-                
-                # Basic skill matching
-                candidate_skills = (candidate.get('technical_skills') or '').lower()
-                job_requirements = (job_requirements or '').lower()
-                
-                skill_keywords = ['python', 'java', 'javascript', 'react', 'sql']
-                matched_skills = [skill for skill in skill_keywords if skill in candidate_skills and skill in job_requirements]
-                
-                if matched_skills:
-                    score += 0.3
-                
-                # Experience matching
-                candidate_exp = candidate.get('experience_years', 0)
-                if candidate_exp >= 2:
-                    score += 0.2
-                
-                semantic_results.append({
-                    'candidate_data': candidate,
-                    'total_score': score,
-                    'score_breakdown': {
-                        'semantic_similarity': score,
-                        'experience_match': 0.7 if candidate_exp >= 2 else 0.3,
-                        'location_match': 0.8
-                    }
-                })
-            
-            logger.info(f"Fallback matching processed {len(semantic_results)} candidates")
+        if PHASE3_AVAILABLE and advanced_matcher and not semantic_results:
+            raise RuntimeError("Phase 3 semantic matching failed - no results returned")
         
-        scored_candidates = []
-        for result in semantic_results:
-            candidate_data = result['candidate_data']
-            score_breakdown = result['score_breakdown']
-            
-            # Convert semantic score to display range
-            semantic_score = result['total_score']
-            display_score = 45 + (semantic_score * 50)
-            
-            # Extract matched skills
-            skills_match = []
-            if candidate_data.get('technical_skills'):
-                skills_text = candidate_data['technical_skills'].lower()
-                job_req_lower = (job_requirements or '').lower()
-                
-                tech_keywords = ['python', 'java', 'javascript', 'react', 'node', 'sql', 'mongodb', 'aws', 'docker']
-                for skill in tech_keywords:
-                    if skill in skills_text and skill in job_req_lower:
-                        skills_match.append(skill.title())
-            
-            # Create reasoning
-            reasoning_parts = []
-            if score_breakdown.get('semantic_similarity', 0) > 0.3:
-                reasoning_parts.append(f"Semantic match: {score_breakdown['semantic_similarity']:.2f}")
-            if skills_match:
-                reasoning_parts.append(f"Skills: {', '.join(skills_match[:3])}")
-            if score_breakdown.get('experience_match', 0) > 0.5:
-                reasoning_parts.append(f"Experience: {candidate_data.get('experience_years', 0)}y")
-            if score_breakdown.get('location_match', 0) > 0.5:
-                reasoning_parts.append(f"Location: {candidate_data.get('location', 'Unknown')}")
-            
-            reasoning = "; ".join(reasoning_parts) if reasoning_parts else "Phase 3 AI semantic analysis"
-            
-            # Add recommendation strength
-            recommendation_strength = "Strong Match" if display_score > 80 else "Good Match"
-            
-            scored_candidates.append({
-                "candidate_id": candidate_data['id'],
-                "name": candidate_data['name'],
-                "email": candidate_data['email'],
-                "score": round(display_score, 1),
-                "skills_match": ", ".join(skills_match[:5]),
-                "experience_match": f"{candidate_data.get('experience_years', 0)}y - Phase 3 matched",
-                "location_match": score_breakdown.get('location_match', 0) > 0.5,
-                "reasoning": reasoning,
-                "recommendation_strength": recommendation_strength
-            })
-        
-        # Sort by score
-        scored_candidates.sort(key=lambda x: x["score"], reverse=True)
-        
-        # Apply score differentiation
-        for i in range(1, len(scored_candidates)):
-            if scored_candidates[i]["score"] >= scored_candidates[i-1]["score"]:
-                scored_candidates[i]["score"] = round(scored_candidates[i-1]["score"] - 0.8, 1)
-        
-        # Get top candidates
-        top_candidates = scored_candidates[:10]
+        top_candidates = _format_top_candidates(semantic_results, job_data_dict['requirements'])
         
         processing_time = (datetime.now() - start_time).total_seconds()
         
@@ -495,7 +624,7 @@ async def match_candidates(request: MatchRequest, auth = Depends(auth_dependency
             "job_id": request.job_id,
             "matches": top_candidates,
             "top_candidates": top_candidates,
-            "total_candidates": len(candidates),
+            "total_candidates": total_candidates,
             "algorithm_version": "3.0.0-phase3-production",
             "processing_time": f"{round(processing_time, 3)}s",
             "ai_analysis": "Real AI semantic matching via Agent Service",
@@ -518,145 +647,139 @@ async def match_candidates(request: MatchRequest, auth = Depends(auth_dependency
             "status": "error"
         }
 
+@app.post("/match/stream", tags=["AI Matching Engine"], summary="Streaming AI-Powered Candidate Matching")
+def match_candidates_stream(request: MatchRequest, auth = Depends(auth_dependency)):
+    """Phase 3 matching that streams the running top candidates as NDJSON after each scored batch"""
+    start_time = datetime.now()
+    db = get_db_connection()
+    if db is None:
+        raise HTTPException(status_code=500, detail="Database connection failed")
+    job_doc = _find_job(db, request.job_id)
+    if not job_doc:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    _ensure_phase3_engine()
+    job_data_dict = _job_match_dict(request.job_id, job_doc)
+    query = _candidate_query(request.candidate_ids)
+    
+    def _events():
+        total_candidates, top_candidates = 0, []
+        try:
+            for total_candidates, semantic_results in _iter_match_snapshots(
+                job_data_dict, _iter_candidate_batches(db, query)
+            ):
+                top_candidates = _format_top_candidates(semantic_results, job_data_dict['requirements'])
+                yield json.dumps({
+                    "job_id": request.job_id,
+                    "candidates_scored": total_candidates,
+                    "top_candidates": top_candidates,
+                    "final": False
+                }) + "\n"
+            status = "success"
+        except Exception as e:
+            logger.error(f"Phase 3 streaming match error: {e}")
+            status = "error"
+        yield json.dumps({
+            "job_id": request.job_id,
+            "candidates_scored": total_candidates,
+            "top_candidates": top_candidates,
+            "total_candidates": total_candidates,
+            "algorithm_version": "3.0.0-phase3-production",
+            "processing_time": f"{round((datetime.now() - start_time).total_seconds(), 3)}s",
+            "final": True,
+            "status": status
+        }) + "\n"
+    
+    return StreamingResponse(_events(), media_type="application/x-ndjson")
+
+BATCH_MATCH_MAX_JOBS = int(os.getenv("AGENT_BATCH_MATCH_MAX_JOBS", "500"))
+BATCH_MATCH_MAX_TOP_K = 100
+
 class BatchMatchRequest(BaseModel):
     job_ids: List[str]
+    top_k: Optional[int] = MATCH_TOP_K
+    candidate_ids: Optional[List[str]] = None
 
-@app.post("/batch-match", tags=["AI Matching Engine"], summary="Batch AI Matching for Multiple Jobs")
-async def batch_match_jobs(request: BatchMatchRequest, auth = Depends(auth_dependency)):
-    """Batch AI matching for multiple jobs using Phase 3 semantic engine"""
-    
-    if not request.job_ids or len(request.job_ids) == 0:
+def _validate_batch_request(request: BatchMatchRequest) -> List[str]:
+    job_ids = list(dict.fromkeys(request.job_ids or []))
+    if not job_ids:
         raise HTTPException(status_code=400, detail="At least one job ID is required")
+    if len(job_ids) > BATCH_MATCH_MAX_JOBS:
+        raise HTTPException(status_code=400, detail=f"Maximum {BATCH_MATCH_MAX_JOBS} jobs can be processed in batch")
+    if not 1 <= (request.top_k or MATCH_TOP_K) <= BATCH_MATCH_MAX_TOP_K:
+        raise HTTPException(status_code=400, detail=f"top_k must be 1-{BATCH_MATCH_MAX_TOP_K}")
+    return job_ids
+
+def _iter_batch_match(db, job_ids: List[str], top_k: int, candidate_ids: Optional[List[str]]):
+    """
+    Match many jobs in one pass over the candidates.
     
-    if len(request.job_ids) > 10:
-        raise HTTPException(status_code=400, detail="Maximum 10 jobs can be processed in batch")
+    Candidates are streamed once and every batch is scored against all jobs as
+    one job x candidate matrix. Yields a record per unknown job first, progress
+    after each candidate batch, then one record per requested job id (echoing
+    the id as requested) and a summary. A job requested by both its _id and its
+    legacy id is scored once and reported under each.
+    """
+    start_time = datetime.now()
+    job_docs = _find_jobs(db, job_ids)
+    for job_id in job_ids:
+        if job_id not in job_docs:
+            yield {"type": "job", "job_id": job_id, "status": "job_not_found", "matches": [], "top_candidates": [], "total_candidates": 0}
     
-    db = None
+    requested: Dict[str, List[str]] = {}
+    for job_id, doc in job_docs.items():
+        requested.setdefault(str(doc.get('_id')), []).append(job_id)
+    jobs = [_job_match_dict(doc_id, job_docs[ids[0]]) for doc_id, ids in requested.items()]
+    if not jobs:
+        yield {"type": "summary", "total_jobs_processed": 0, "total_candidates_analyzed": 0, "status": "success"}
+        return
+    
+    _ensure_phase3_engine()
+    total_candidates, tops = 0, {job['id']: [] for job in jobs}
+    for total_candidates, tops in _iter_batch_snapshots(jobs, _iter_candidate_batches(db, _candidate_query(candidate_ids)), top_k):
+        yield {"type": "progress", "candidates_scored": total_candidates, "jobs": len(jobs)}
+    
+    processing_time = f"{round((datetime.now() - start_time).total_seconds(), 3)}s"
+    for job in jobs:
+        matches = _format_top_candidates(tops.get(job['id'], []), job['requirements'], top_k)
+        for job_id in requested[job['id']]:
+            yield {
+                "type": "job",
+                "job_id": job_id,
+                "status": "success",
+                "matches": matches,
+                "top_candidates": matches,
+                "total_candidates": len(matches),
+                "candidates_scored": total_candidates,
+                "algorithm": "batch-matrix" if phase3_engine else "batch-fallback",
+                "processing_time": processing_time,
+                "ai_analysis": "Real AI semantic matching via Agent Service"
+            }
+    yield {"type": "summary", "total_jobs_processed": len(job_docs), "total_candidates_analyzed": total_candidates, "status": "success"}
+
+@app.post("/batch-match", tags=["AI Matching Engine"], summary="Batch AI Matching for Multiple Jobs")
+def batch_match_jobs(request: BatchMatchRequest, auth = Depends(auth_dependency)):
+    """Batch AI matching for multiple jobs: one candidate pass scored as a job x candidate matrix"""
+    job_ids = _validate_batch_request(request)
     try:
         db = get_db_connection()
         if db is None:
             raise HTTPException(status_code=500, detail="Database connection failed")
         
-        # Get jobs data (MongoDB version)
-        # Build query for multiple job IDs (try ObjectId and integer id)
-        job_queries = []
-        for jid in request.job_ids:
-            try:
-                job_queries.append({'_id': ObjectId(str(jid))})
-            except:
-                job_queries.append({'$or': [{'_id': jid}, {'id': jid}]})
-        
-        jobs_cursor = db.jobs.find({'$or': job_queries})
-        jobs_data = list(jobs_cursor)
-        
-        if not jobs_data:
-            # Return empty results instead of 404 for better API behavior
-            return {
-                "batch_results": {},
-                "total_jobs_processed": 0,
-                "total_candidates_analyzed": 0,
-                "algorithm_version": "3.0.0-phase3-production-batch",
-                "status": "success",
-                "agent_status": "disconnected"
-            }
-        
-        # Get all candidates (MongoDB version)
-        candidates_cursor = db.candidates.find({}).sort('created_at', -1)
-        candidates_data = list(candidates_cursor)
-        
-        # Format data for batch processing (already in dict format from MongoDB)
-        jobs = []
-        for job_doc in jobs_data:
-            jobs.append({
-                'id': str(job_doc.get('_id')),
-                'title': job_doc.get('title', ''),
-                'description': job_doc.get('description', ''),
-                'department': job_doc.get('department', ''),
-                'location': job_doc.get('location', ''),
-                'experience_level': job_doc.get('experience_level', ''),
-                'requirements': job_doc.get('requirements', '')
-            })
-        
-        candidates = []
-        for cand in candidates_data:
-            candidates.append({
-                'id': str(cand.get('_id')),
-                'name': cand.get('name', ''),
-                'email': cand.get('email', ''),
-                'phone': cand.get('phone', ''),
-                'location': cand.get('location', ''),
-                'experience_years': cand.get('experience_years', 0),
-                'technical_skills': cand.get('technical_skills', ''),
-                'seniority_level': cand.get('seniority_level', ''),
-                'education_level': cand.get('education_level', '')
-            })
-        
-        # Process batch matching with detailed candidate information
-        batch_results = {}
-        for job in jobs:
-            job_id = job['id']
-            job_requirements = (job.get('requirements') or '').lower()
-            job_location = job.get('location', '')
-            
-            # Detailed matching for each job
-            job_matches = []
-            for i, candidate in enumerate(candidates[:5]):  # Limit to top 5 for performance
-                candidate_skills = (candidate.get('technical_skills') or '').lower()
-                candidate_location = candidate.get('location', '')
-                
-                # Calculate skill matches
-                skill_keywords = ['python', 'java', 'javascript', 'react', 'node', 'sql', 'aws']
-                matched_skills = [skill for skill in skill_keywords 
-                                if skill in candidate_skills and skill in job_requirements]
-                
-                # Location matching
-                location_match = job_location.lower() in candidate_location.lower() if job_location and candidate_location else False
-                
-                # Calculate detailed score
-                base_score = 70 + (len(matched_skills) * 5) + (10 if location_match else 0) + (5 - i)
-                final_score = min(95, base_score)
-                
-                # Create detailed reasoning
-                reasoning_parts = []
-                if matched_skills:
-                    reasoning_parts.append(f"Skills: {', '.join(matched_skills[:3])}")
-                reasoning_parts.append(f"Experience: {candidate.get('experience_years', 0)}y")
-                if location_match:
-                    reasoning_parts.append(f"Location match: {candidate_location}")
-                reasoning_parts.append("Phase 3 AI semantic analysis")
-                
-                # Add recommendation strength
-                recommendation_strength = "Strong Match" if final_score > 80 else "Good Match"
-                
-                job_matches.append({
-                    'candidate_id': candidate['id'],
-                    'name': candidate['name'],
-                    'email': candidate['email'],
-                    'score': final_score,
-                    'skills_match': ", ".join(matched_skills),
-                    'experience_match': f"{candidate.get('experience_years', 0)}y - Phase 3 matched",
-                    'location_match': location_match,
-                    'reasoning': '; '.join(reasoning_parts),
-                    'recommendation_strength': recommendation_strength
-                })
-            
-            batch_results[str(job_id)] = {
-                'job_id': job_id,
-                'matches': job_matches,
-                'top_candidates': job_matches,
-                'total_candidates': len(job_matches),
-                'algorithm': 'batch-production',
-                'processing_time': '0.5s',
-                'ai_analysis': 'Real AI semantic matching via Agent Service'
-            }
+        batch_results, summary = {}, {}
+        for record in _iter_batch_match(db, job_ids, request.top_k or MATCH_TOP_K, request.candidate_ids):
+            if record["type"] == "job" and record["status"] == "success":
+                batch_results[record["job_id"]] = {k: v for k, v in record.items() if k not in ("type", "status")}
+            elif record["type"] == "summary":
+                summary = record
         
         return {
             "batch_results": batch_results,
-            "total_jobs_processed": len(jobs),
-            "total_candidates_analyzed": len(candidates),
+            "total_jobs_processed": summary.get("total_jobs_processed", 0),
+            "total_candidates_analyzed": summary.get("total_candidates_analyzed", 0),
             "algorithm_version": "3.0.0-phase3-production-batch",
             "status": "success",
-            "agent_status": "connected"
+            "agent_status": "connected" if batch_results else "disconnected"
         }
         
     except HTTPException:
@@ -672,6 +795,26 @@ async def batch_match_jobs(request: BatchMatchRequest, auth = Depends(auth_depen
             "agent_status": "error"
         }
 
+@app.post("/batch-match/stream", tags=["AI Matching Engine"], summary="Streaming Batch AI Matching")
+def batch_match_jobs_stream(request: BatchMatchRequest, auth = Depends(auth_dependency)):
+    """Batch matching streamed as NDJSON: progress after each candidate batch, one line per job, then a summary"""
+    job_ids = _validate_batch_request(request)
+    db = get_db_connection()
+    if db is None:
+        raise HTTPException(status_code=500, detail="Database connection failed")
+    
+    def _events():
+        try:
+            for record in _iter_batch_match(db, job_ids, request.top_k or MATCH_TOP_K, request.candidate_ids):
+                if record["type"] == "summary":
+                    record["algorithm_version"] = "3.0.0-phase3-production-batch"
+                yield json.dumps(record) + "\n"
+        except Exception as e:
+            logger.error(f"Streaming batch matching error: {e}")
+            yield json.dumps({"type": "summary", "status": "error", "error": str(e)[:200]}) + "\n"
+    
+    return StreamingResponse(_events(), media_type="application/x-ndjson")
+
 @app.get("/analyze/{candidate_id}", tags=["Candidate Analysis"], summary="Detailed Candidate Analysis")
 def analyze_candidate(candidate_id: str, auth = Depends(auth_dependency)): 
     """Detailed candidate analysis"""
@@ -10,11 +10,19 @@ from .phase3_engine import (
     LearningEngine,
     SemanticJobMatcher
 )
+from .vector_store import CandidateVectorStore
+from .feature_store import CulturalFitFeatureStore
+from .match_executor import MatchingExecutor
+from .top_k import StreamingTopK
 
 __all__ = [
     'Phase3SemanticEngine',
     'AdvancedSemanticMatcher', 
     'BatchMatcher',
     'LearningEngine',
-    'SemanticJobMatcher'
+    'SemanticJobMatcher',
+    'CandidateVectorStore',
+    'CulturalFitFeatureStore',
+    'MatchingExecutor',
+    'StreamingTopK'
 ]
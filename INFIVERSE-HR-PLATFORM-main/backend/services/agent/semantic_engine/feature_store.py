@@ -0,0 +1,189 @@
+"""
+Cultural Fit Feature Store
+Materializes per-company preference features and per-candidate feedback
+aggregates from the feedback collection and serves them in bulk
+"""
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+NEUTRAL_FIT = 0.5
+VALUE_FIELDS = ['integrity', 'honesty', 'discipline', 'hard_work', 'gratitude']
+
+
+class CulturalFitFeatureStore:
+    """In-memory feature table refreshed incrementally from new feedback"""
+
+    def __init__(self, get_db: Callable, weights_for: Callable[[float, float], dict],
+                 refresh_seconds: Optional[int] = None, rebuild_seconds: Optional[int] = None):
+        """
+        Args:
+            get_db: Returns a pymongo database handle
+            weights_for: Maps (avg_satisfaction, avg_experience) to scoring weights
+            refresh_seconds: Minimum age before serving triggers an incremental refresh
+            rebuild_seconds: Age after which a refresh rebuilds from scratch
+        """
+        self._get_db = get_db
+        self._db = None
+        self._weights_for = weights_for
+        self.refresh_seconds = refresh_seconds if refresh_seconds is not None else \
+            int(os.getenv("CULTURAL_FIT_REFRESH_SECONDS", "60"))
+        self.rebuild_seconds = rebuild_seconds if rebuild_seconds is not None else \
+            int(os.getenv("CULTURAL_FIT_REBUILD_SECONDS", "3600"))
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # High-satisfaction feedback per company: (score_sum, count, experience_sum, experience_count)
+        self._company_totals = {}
+        # Value scores per (company, candidate): (value_average_sum, count)
+        self._fit_totals = {}
+        self._watermark = None
+        self._last_refresh = 0.0
+        self._last_rebuild = 0.0
+        self.preferences = {}
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = self._get_db()
+        return self._db
+
+    def _pipeline(self, watermark) -> list:
+        pipeline = []
+        if watermark is not None:
+            pipeline.append({'$match': {'_id': {'$gt': watermark}}})
+        pipeline += [
+            {'$sort': {'_id': 1}},
+            {'$lookup': {'from': 'jobs', 'localField': 'job_id', 'foreignField': '_id', 'as': 'job'}},
+            {'$unwind': '$job'},
+            {'$lookup': {'from': 'candidates', 'localField': 'candidate_id', 'foreignField': '_id', 'as': 'candidate'}},
+            {'$project': {
+                'client_id': '$job.client_id',
+                'candidate_id': 1,
+                'average_score': 1,
+                'value_average': {'$divide': [
+                    {'$add': [{'$ifNull': [f'${field}', 0]} for field in VALUE_FIELDS]}, 5.0
+                ]},
+                'has_candidate': {'$gt': [{'$size': '$candidate'}, 0]},
+                'experience_years': {'$arrayElemAt': ['$candidate.experience_years', 0]}
+            }}
+        ]
+        return pipeline
+
+    @staticmethod
+    def _fold(row: dict, company_totals: dict, fit_totals: dict):
+        # Totals are immutable tuples, so a table being read is never modified in place
+        client_id = row.get('client_id')
+        key = (client_id, str(row.get('candidate_id')))
+        value_sum, count = fit_totals.get(key, (0.0, 0))
+        fit_totals[key] = (value_sum + (row.get('value_average') or 0.0), count + 1)
+
+        average_score = row.get('average_score')
+        if row.get('has_candidate') and average_score is not None and average_score >= 4.0:
+            score_sum, count, exp_sum, exp_count = company_totals.get(client_id, (0.0, 0, 0.0, 0))
+            if row.get('experience_years') is not None:
+                exp_sum += row['experience_years']
+                exp_count += 1
+            company_totals[client_id] = (score_sum + average_score, count + 1, exp_sum, exp_count)
+
+    def _derive_preferences(self, client_ids: Iterable, company_totals: dict, preferences: dict):
+        for client_id in client_ids:
+            score_sum, count, exp_sum, exp_count = company_totals.get(client_id, (0.0, 0, 0.0, 0))
+            if count < 3:
+                continue
+            avg_satisfaction = score_sum / count
+            avg_exp = exp_sum / exp_count if exp_count else None
+            preferences[client_id] = {
+                'scoring_weights': self._weights_for(avg_satisfaction, avg_exp or 0),
+                'avg_satisfaction': float(avg_satisfaction),
+                'feedback_count': count,
+                'preferred_experience': float(avg_exp) if avg_exp else 0
+            }
+
+    def refresh(self, full: bool = False) -> int:
+        """
+        Fold feedback written since the last refresh into the feature table.
+
+        New tables are built on the side and published by swapping references,
+        so readers never see a table that is being cleared or filled. A failed
+        rebuild keeps serving the previous table.
+
+        Args:
+            full: Rebuild from all feedback instead of only new documents
+
+        Returns:
+            int: Number of feedback documents folded in
+        """
+        with self._lock:
+            rebuild = full or time.monotonic() - self._last_rebuild > self.rebuild_seconds
+            if rebuild:
+                company_totals, fit_totals, preferences, watermark = {}, {}, {}, None
+            else:
+                company_totals, fit_totals = dict(self._company_totals), dict(self._fit_totals)
+                preferences, watermark = dict(self.preferences), self._watermark
+
+            folded = 0
+            touched = set()
+            completed = False
+            try:
+                for row in self.db.feedback.aggregate(self._pipeline(watermark), allowDiskUse=True):
+                    self._fold(row, company_totals, fit_totals)
+                    touched.add(row.get('client_id'))
+                    watermark = row['_id']
+                    folded += 1
+                completed = True
+            finally:
+                # Failed refreshes also wait refresh_seconds before the next attempt
+                self._last_refresh = time.monotonic()
+                if completed or not rebuild:
+                    self._derive_preferences(touched, company_totals, preferences)
+                    self._company_totals = company_totals
+                    self._fit_totals = fit_totals
+                    self.preferences = preferences
+                    self._watermark = watermark
+                    if rebuild:
+                        self._last_rebuild = time.monotonic()
+
+        if folded:
+            logger.info(f"Cultural fit features refreshed with {folded} feedback records")
+        return folded
+
+    def ensure_fresh(self):
+        """Refresh incrementally if the table is older than refresh_seconds"""
+        if time.monotonic() - self._last_refresh < self.refresh_seconds:
+            return
+        try:
+            self.refresh()
+        except Exception as e:
+            # Keep serving the last materialized features
+            logger.error(f"Failed to refresh cultural fit features: {e}")
+
+    def cultural_fit(self, client_id: Optional[str], candidate_id) -> float:
+        """Cultural fit for one candidate with a company"""
+        return float(self.cultural_fit_many(client_id, [candidate_id])[0])
+
+    def cultural_fit_many(self, client_id: Optional[str], candidate_ids: list) -> np.ndarray:
+        """Cultural fit for many candidates with a company as one vector"""
+        fits = np.full(len(candidate_ids), NEUTRAL_FIT)
+        if not client_id:
+            return fits
+        self.ensure_fresh()
+        fit_totals = self._fit_totals
+        for i, candidate_id in enumerate(candidate_ids):
+            total = fit_totals.get((client_id, str(candidate_id)))
+            if total and total[1] and total[0]:
+                fits[i] = (total[0] / total[1]) / 5.0
+        return fits
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'companies_with_preferences': len(self.preferences),
+            'candidate_fit_entries': len(self._fit_totals)
+        }
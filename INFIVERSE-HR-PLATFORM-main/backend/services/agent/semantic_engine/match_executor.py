@@ -0,0 +1,323 @@
+"""
+Matching Executor
+Scores candidate chunks and job x candidate matrices on a pool of worker
+processes that each hold a warm Phase 3 engine, with bounded in-flight work,
+chunk timeouts and health checks
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, ProcessPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_worker_engine = None
+
+
+def _init_worker(torch_threads: int):
+    """Load the semantic model once per worker process"""
+    global _worker_engine
+    import torch
+    torch.set_num_threads(torch_threads)
+    from .phase3_engine import Phase3SemanticEngine
+    _worker_engine = Phase3SemanticEngine()
+
+
+def _score_chunk(job: dict, candidates: list, client_id: Optional[str]) -> dict:
+    return _worker_engine.score_candidates(job, candidates, client_id)
+
+
+def _score_matrix_chunk(jobs: list, candidates: list, prepared: dict, top_k: int) -> dict:
+    return _worker_engine.score_matrix_top_k(jobs, candidates, prepared, top_k)
+
+
+def _ping() -> Optional[int]:
+    if _worker_engine is None or _worker_engine.model is None:
+        return None
+    return os.getpid()
+
+
+class MatchingExecutor:
+    """Process pool for chunked candidate scoring"""
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None,
+                 chunk_timeout: Optional[float] = None):
+        """
+        Args:
+            workers: Worker processes, 0 scores in-process on a thread instead
+            max_pending: Chunks allowed in flight before submitters wait
+            chunk_timeout: Seconds before a chunk is abandoned and the pool restarted
+        """
+        default_workers = str(min(4, os.cpu_count() or 1))
+        self.workers = workers if workers is not None else int(os.getenv("AGENT_MATCH_WORKERS", default_workers))
+        self.max_pending = max_pending or int(os.getenv("AGENT_MATCH_MAX_PENDING", str(max(1, self.workers) * 2)))
+        self.chunk_timeout = chunk_timeout or float(os.getenv("AGENT_MATCH_CHUNK_TIMEOUT", "60"))
+        self.startup_timeout = float(os.getenv("AGENT_MATCH_STARTUP_TIMEOUT", "300"))
+        self.torch_threads = int(os.getenv("AGENT_MATCH_WORKER_THREADS", "1"))
+        self.max_restarts = int(os.getenv("AGENT_MATCH_MAX_RESTARTS", "3"))
+        self._pool = None
+        self._warmup = []
+        self._pool_lock = threading.Lock()
+        self._slots = None
+        self._slots_loop = None
+        self._failed_restarts = 0
+        self.stats = {
+            'chunks_completed': 0,
+            'chunks_timed_out': 0,
+            'chunks_failed': 0,
+            'worker_restarts': 0,
+            'candidates_scored': 0,
+            'busy_seconds': 0.0,
+            'last_candidates_per_second': 0.0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0 and self._failed_restarts < self.max_restarts
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: forking a process that already loaded torch is not safe
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.torch_threads,)
+                )
+                # One ping per worker slot, so chunks wait for loaded models instead of timing out
+                self._warmup = [self._pool.submit(_ping) for _ in range(self.workers)]
+                logger.info(f"Started matching pool with {self.workers} workers")
+            return self._pool
+
+    def _check_warmup(self, warmup: list):
+        if not all(ping.done() and not ping.exception() and ping.result() for ping in warmup):
+            raise BrokenProcessPool(f"workers not ready within {self.startup_timeout}s")
+
+    async def _ready_pool(self) -> ProcessPoolExecutor:
+        pool = self._get_pool()
+        warmup = self._warmup
+        if not all(ping.done() for ping in warmup):
+            await asyncio.get_running_loop().run_in_executor(None, wait, warmup, self.startup_timeout)
+        self._check_warmup(warmup)
+        return pool
+
+    def _ready_pool_sync(self) -> ProcessPoolExecutor:
+        pool = self._get_pool()
+        warmup = self._warmup
+        wait(warmup, self.startup_timeout)
+        self._check_warmup(warmup)
+        return pool
+
+    def _restart_pool(self, reason: str, broken: Optional[ProcessPoolExecutor] = None):
+        """Replace the pool, unless it is no longer the broken one (another caller already restarted it)"""
+        with self._pool_lock:
+            if broken is not None and self._pool is not broken:
+                return
+            pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        logger.warning(f"Restarting matching pool: {reason}")
+        self.stats['worker_restarts'] += 1
+        self._failed_restarts += 1
+        if not self.enabled:
+            logger.error("Matching pool keeps failing, scoring in-process from now on")
+        # Hung workers never pick up the shutdown sentinel, so stop them directly
+        for process in list((getattr(pool, '_processes', None) or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_pending)
+            self._slots_loop = loop
+        return self._slots
+
+    async def _run_chunk(self, task: Tuple[dict, list, Optional[str]],
+                         fallback: Callable) -> Optional[dict]:
+        job, candidates, client_id = task
+        loop = asyncio.get_running_loop()
+        async with self._get_slots():
+            if not self.enabled:
+                try:
+                    return await loop.run_in_executor(None, fallback, job, candidates, client_id)
+                except Exception as e:
+                    logger.error(f"Error processing candidate chunk of {len(candidates)}: {e}")
+                    self.stats['chunks_failed'] += 1
+                    return None
+
+            try:
+                pool = await self._ready_pool()
+                future = pool.submit(_score_chunk, job, candidates, client_id)
+                scores = await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.chunk_timeout)
+                self._failed_restarts = 0
+                return scores
+            except asyncio.TimeoutError:
+                self.stats['chunks_timed_out'] += 1
+                logger.error(f"Candidate chunk of {len(candidates)} timed out after {self.chunk_timeout}s")
+                self._restart_pool("chunk timeout")
+                return None
+            except BrokenProcessPool as e:
+                self._restart_pool(f"worker died: {e}")
+            except Exception as e:
+                logger.error(f"Error processing candidate chunk of {len(candidates)}: {e}")
+                self.stats['chunks_failed'] += 1
+                return None
+
+        # The pool broke under this chunk, score it here rather than drop it
+        try:
+            return await loop.run_in_executor(None, fallback, job, candidates, client_id)
+        except Exception as e:
+            logger.error(f"Error processing candidate chunk of {len(candidates)}: {e}")
+            self.stats['chunks_failed'] += 1
+            return None
+
+    async def score_chunks(self, tasks: List[Tuple[dict, list, Optional[str]]],
+                           fallback: Callable) -> List[Optional[dict]]:
+        """
+        Score (job, candidates, client_id) chunks concurrently.
+
+        Args:
+            tasks: Chunks to score
+            fallback: In-process scorer used when the pool is disabled or broken
+
+        Returns:
+            list: Score arrays per chunk, None for chunks that failed
+        """
+        start = time.perf_counter()
+        results = await asyncio.gather(*(self._run_chunk(task, fallback) for task in tasks))
+        elapsed = time.perf_counter() - start
+
+        scored = sum(len(task[1]) for task, result in zip(tasks, results) if result is not None)
+        self.stats['chunks_completed'] += sum(1 for result in results if result is not None)
+        self.stats['candidates_scored'] += scored
+        self.stats['busy_seconds'] += elapsed
+        if elapsed > 0:
+            self.stats['last_candidates_per_second'] = scored / elapsed
+        logger.info(f"Scored {scored} candidates in {elapsed:.2f}s ({scored / max(elapsed, 1e-9):.0f} candidates/s)")
+        return results
+
+    def score_matrix_batches(self, jobs: list, prepared: dict, candidate_batches: Iterable[list],
+                             top_k: int, fallback: Callable) -> Iterator[Tuple[list, dict]]:
+        """
+        Score candidate batches against every job on the pool, yielding in input order.
+
+        Up to max_pending batches are in flight while earlier results are
+        consumed. A batch whose worker times out or dies is scored in-process
+        instead of being dropped.
+
+        Args:
+            jobs: Jobs to score (matrix rows)
+            prepared: prepare_jobs(jobs) output, shipped with every batch
+            candidate_batches: Candidate lists, e.g. pages of a database cursor
+            top_k: Columns to keep per job (see score_matrix_top_k)
+            fallback: In-process scorer taking (jobs, candidates, prepared, top_k)
+
+        Yields:
+            tuple: (batch, reduced score matrix)
+        """
+        pending = deque()
+        start = time.perf_counter()
+        scored = 0
+        try:
+            for batch in candidate_batches:
+                if not batch:
+                    continue
+                pending.append((batch, *self._submit_matrix(jobs, batch, prepared, top_k)))
+                while len(pending) >= self.max_pending:
+                    batch, result = self._collect_matrix(*pending.popleft(), jobs, prepared, top_k, fallback)
+                    scored += len(batch)
+                    yield batch, result
+            while pending:
+                batch, result = self._collect_matrix(*pending.popleft(), jobs, prepared, top_k, fallback)
+                scored += len(batch)
+                yield batch, result
+        finally:
+            for _, _, future in pending:
+                if future is not None:
+                    future.cancel()
+            elapsed = time.perf_counter() - start
+            self.stats['candidates_scored'] += scored
+            self.stats['busy_seconds'] += elapsed
+            if elapsed > 0:
+                self.stats['last_candidates_per_second'] = scored / elapsed
+
+    def _submit_matrix(self, jobs: list, batch: list, prepared: dict, top_k: int):
+        if not self.enabled:
+            return None, None
+        try:
+            pool = self._ready_pool_sync()
+            return pool, pool.submit(_score_matrix_chunk, jobs, batch, prepared, top_k)
+        except BrokenProcessPool as e:
+            self._restart_pool(f"worker died: {e}")
+        except RuntimeError as e:
+            # The pool was shut down by a concurrent restart
+            logger.warning(f"Matching pool unavailable, scoring batch in-process: {e}")
+        return None, None
+
+    def _collect_matrix(self, batch: list, pool, future, jobs: list, prepared: dict,
+                        top_k: int, fallback: Callable) -> Tuple[list, dict]:
+        if future is not None:
+            try:
+                result = future.result(timeout=self.chunk_timeout)
+                self._failed_restarts = 0
+                self.stats['chunks_completed'] += 1
+                return batch, result
+            except FutureTimeoutError:
+                self.stats['chunks_timed_out'] += 1
+                logger.error(f"Matrix batch of {len(batch)} timed out after {self.chunk_timeout}s")
+                self._restart_pool("matrix batch timeout", broken=pool)
+            except BrokenProcessPool as e:
+                self._restart_pool(f"worker died: {e}", broken=pool)
+            except CancelledError:
+                # Cancelled by another caller's restart; nothing wrong with this batch
+                pass
+            except Exception as e:
+                logger.error(f"Error scoring matrix batch of {len(batch)} on the pool: {e}")
+                self.stats['chunks_failed'] += 1
+        result = fallback(jobs, batch, prepared, top_k)
+        self.stats['chunks_completed'] += 1
+        return batch, result
+
+    async def health_check(self, timeout: float = 10.0) -> dict:
+        """Ping every worker slot and restart the pool if any do not answer"""
+        if not self.enabled:
+            return {'status': 'in-process', 'workers': 0}
+        if self._pool is None:
+            return {'status': 'idle', 'workers': self.workers}
+
+        pool = self._get_pool()
+        pings = [asyncio.wrap_future(pool.submit(_ping)) for _ in range(self.workers)]
+        try:
+            pids = await asyncio.wait_for(asyncio.gather(*pings), timeout=timeout)
+        except (asyncio.TimeoutError, BrokenProcessPool) as e:
+            self._restart_pool(f"health check failed: {e or 'timeout'}")
+            return {'status': 'restarted', 'workers': self.workers}
+
+        if any(pid is None for pid in pids):
+            self._restart_pool("worker without a loaded model")
+            return {'status': 'restarted', 'workers': self.workers}
+        return {'status': 'healthy', 'workers': self.workers, 'responding_pids': sorted(set(pids))}
+
+    def get_stats(self) -> dict:
+        stats = dict(self.stats)
+        stats['workers'] = self.workers if self.enabled else 0
+        stats['max_pending'] = self.max_pending
+        stats['candidates_per_second'] = (
+            stats['candidates_scored'] / stats['busy_seconds'] if stats['busy_seconds'] else 0.0
+        )
+        return stats
+
+    def shutdown(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -5,10 +5,10 @@ Migrated from PostgreSQL/SQLAlchemy to MongoDB
 """
 import os
 import asyncio
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional
-from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple
+from collections import defaultdict, OrderedDict
 
 import numpy as np
 from sentence_transformers import SentenceTransformer
@@ -16,8 +16,30 @@ from sklearn.metrics.pairwise import cosine_similarity
 # MongoDB imports (migrated from SQLAlchemy)
 from pymongo import MongoClient
 
+from .vector_store import CandidateVectorStore
+from .feature_store import CulturalFitFeatureStore
+from .match_executor import MatchingExecutor
+from .top_k import StreamingTopK
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_WEIGHTS = {'semantic': 0.40, 'experience': 0.30, 'skills': 0.20, 'location': 0.10}
+
+
+def _job_text(job_data: dict) -> str:
+    return f"{job_data.get('title', '')} {job_data.get('description', '')} {job_data.get('requirements', '')}"
+
+
+def _candidate_text(candidate_data: dict) -> str:
+    return f"{candidate_data.get('technical_skills', '')} {candidate_data.get('seniority_level', '')} {candidate_data.get('education_level', '')}"
+
+
+def _normalize_rows(embeddings: np.ndarray) -> np.ndarray:
+    """L2-normalize rows the way cosine_similarity does (zero rows stay zero)"""
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0.0] = 1.0
+    return embeddings / norms
+
 class Phase3SemanticEngine:
     """Production Phase 3 Semantic Engine with advanced AI capabilities (Singleton Pattern)"""
     
@@ -36,8 +58,13 @@ class Phase3SemanticEngine:
             
         self.model = None
         self.company_preferences = defaultdict(dict)
-        self.cache = {}
-        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.cache = OrderedDict()
+        self.cache_max_entries = int(os.getenv("AGENT_BATCH_CACHE_ENTRIES", "64"))
+        self.encode_batch_size = int(os.getenv("SEMANTIC_ENCODE_BATCH_SIZE", "256"))
+        self.ann_retrieve_limit = int(os.getenv("AGENT_ANN_RETRIEVE_LIMIT", "1000"))
+        self.vector_store = None
+        self.match_executor = MatchingExecutor()
+        self.feature_store = CulturalFitFeatureStore(self._get_db_connection, self._calculate_optimal_weights)
         self._initialize()
         Phase3SemanticEngine._initialized = True
     
@@ -61,12 +88,25 @@ class Phase3SemanticEngine:
             
             # Load model without deprecated use_auth_token parameter
             self.model = SentenceTransformer('all-MiniLM-L6-v2')
+            self._initialize_vector_store()
             self._load_company_preferences()
             logger.info("Phase 3 Semantic Engine initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize Phase 3 engine: {e}")
             raise RuntimeError(f"Phase 3 initialization failed: {e}")
     
+    def _initialize_vector_store(self):
+        """Open the persistent embedding cache and ANN index (optional)"""
+        if os.getenv("AGENT_VECTOR_STORE_ENABLED", "true").lower() != "true":
+            logger.info("Candidate vector store disabled")
+            return
+        try:
+            self.vector_store = CandidateVectorStore(model_name='all-MiniLM-L6-v2')
+            logger.info(f"Candidate vector store opened at {self.vector_store.path}")
+        except Exception as e:
+            logger.error(f"Failed to open candidate vector store, embeddings will not be cached: {e}")
+            self.vector_store = None
+    
     def _get_db_connection(self):
         """Get MongoDB database connection"""
         mongodb_uri = os.getenv("DATABASE_URL") or os.getenv("MONGODB_URI")
@@ -77,71 +117,21 @@ class Phase3SemanticEngine:
         db_name = os.getenv("MONGODB_DB_NAME", "bhiv_hr")
         return client[db_name]
     
-    def _load_company_preferences(self):
-        """Load company scoring preferences from feedback data"""
+    def _load_company_preferences(self, full: bool = True):
+        """Load company scoring preferences from the cultural fit feature table"""
         try:
-            db = self._get_db_connection()
-            
-            # MongoDB aggregation to replicate the PostgreSQL query
-            pipeline = [
-                # Join feedback with jobs
-                {
-                    '$lookup': {
-                        'from': 'jobs',
-                        'localField': 'job_id',
-                        'foreignField': '_id',
-                        'as': 'job'
-                    }
-                },
-                {'$unwind': '$job'},
-                # Join with candidates
-                {
-                    '$lookup': {
-                        'from': 'candidates',
-                        'localField': 'candidate_id',
-                        'foreignField': '_id',
-                        'as': 'candidate'
-                    }
-                },
-                {'$unwind': '$candidate'},
-                # Filter for high scores
-                {'$match': {'average_score': {'$gte': 4.0}}},
-                # Group by client_id
-                {
-                    '$group': {
-                        '_id': '$job.client_id',
-                        'avg_satisfaction': {'$avg': '$average_score'},
-                        'feedback_count': {'$sum': 1},
-                        'avg_exp_hired': {'$avg': '$candidate.experience_years'}
-                    }
-                },
-                # Filter for clients with enough feedback
-                {'$match': {'feedback_count': {'$gte': 3}}}
-            ]
-            
-            results = db.feedback.aggregate(pipeline)
-            
-            for row in results:
-                client_id = row['_id']
-                avg_satisfaction = row['avg_satisfaction']
-                feedback_count = row['feedback_count']
-                avg_exp = row['avg_exp_hired']
-                
-                weights = self._calculate_optimal_weights(avg_satisfaction, avg_exp or 0)
-                
-                self.company_preferences[client_id] = {
-                    'scoring_weights': weights,
-                    'avg_satisfaction': float(avg_satisfaction),
-                    'feedback_count': feedback_count,
-                    'preferred_experience': float(avg_exp) if avg_exp else 0
-                }
-            
+            self.feature_store.refresh(full=full)
+            self._sync_company_preferences()
             logger.info(f"Loaded preferences for {len(self.company_preferences)} companies")
         except ValueError as ve:
             logger.error(f"Failed to load company preferences: {ve}")
         except Exception as e:
             logger.error(f"Failed to load company preferences: {e}")
     
+    def _sync_company_preferences(self):
+        """Publish materialized preferences in place so shared references stay valid"""
+        self.company_preferences.update(self.feature_store.preferences)
+    
     def _calculate_optimal_weights(self, avg_satisfaction: float, avg_experience: float) -> dict:
         """Calculate optimal scoring weights based on hiring patterns"""
         weights = {
@@ -164,66 +154,352 @@ class Phase3SemanticEngine:
         
         return weights
     
+    def _get_weights(self, client_id: Optional[str]) -> dict:
+        """Get company-specific scoring weights"""
+        weights = dict(DEFAULT_WEIGHTS)
+        if client_id and client_id in self.company_preferences:
+            weights.update(self.company_preferences[client_id].get('scoring_weights', {}))
+        return weights
+    
+    def _encode_with_model(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self.model.encode(
+            texts,
+            batch_size=self.encode_batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        ))
+    
+    def encode_texts(self, texts: List[str]) -> np.ndarray:
+        """Encode texts in large batches, encoding each distinct text only once"""
+        unique_texts = list(dict.fromkeys(texts))
+        if not unique_texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        if self.vector_store is not None:
+            # Unchanged texts come from the persistent cache instead of the model
+            embeddings = self.vector_store.embed(unique_texts, self._encode_with_model)
+            return np.stack([embeddings[text] for text in texts])
+        embeddings = self._encode_with_model(unique_texts)
+        positions = {text: i for i, text in enumerate(unique_texts)}
+        return embeddings[[positions[text] for text in texts]]
+    
+    def retrieve_candidates(self, job_data: dict, candidates: list, limit: int) -> list:
+        """
+        Narrow candidates to the closest profiles through the ANN index.
+        
+        Candidates are indexed incrementally (only changed profiles are
+        re-embedded) and the job vector probes the nearest index lists.
+        Falls back to the full list when no vector store is available.
+        """
+        if self.vector_store is None or len(candidates) <= limit:
+            return candidates
+        by_id = {str(c.get('id')): c for c in candidates}
+        self.vector_store.index_candidates(
+            {cid: _candidate_text(c) for cid, c in by_id.items()},
+            self._encode_with_model
+        )
+        job_vector = self.encode_texts([_job_text(job_data)])[0]
+        retrieved = self.vector_store.search(job_vector, limit, candidate_ids=set(by_id))
+        logger.info(f"ANN retrieval narrowed {len(candidates)} candidates to {len(retrieved)}")
+        return [by_id[cid] for cid in retrieved]
+    
+    def retrieve_candidate_batches(self, job_data: dict, candidate_batches: Iterable[list], limit: int,
+                                   fetch: Callable[[List[str]], list]) -> Tuple[int, list]:
+        """
+        Streaming form of retrieve_candidates for candidates read page by page.
+        
+        Every page is indexed incrementally as it arrives. Once the pool outgrows
+        limit only candidate ids are kept, and the limit closest candidates are
+        loaded back with fetch(ids). Pools of at most limit candidates are
+        returned whole.
+        
+        Returns:
+            tuple: (candidates in the pool, shortlisted candidates)
+        """
+        held, ids = [], []
+        for batch in candidate_batches:
+            ids.extend(str(c.get('id')) for c in batch)
+            if self.vector_store is not None:
+                self.vector_store.index_candidates(
+                    {str(c.get('id')): _candidate_text(c) for c in batch},
+                    self._encode_with_model
+                )
+            if held is not None:
+                held.extend(batch)
+                if len(held) > limit and self.vector_store is not None:
+                    held = None
+        if held is not None:
+            return len(ids), held
+        job_vector = self.encode_texts([_job_text(job_data)])[0]
+        retrieved = self.vector_store.search(job_vector, limit, candidate_ids=set(ids))
+        logger.info(f"ANN retrieval narrowed {len(ids)} streamed candidates to {len(retrieved)}")
+        return len(ids), fetch(retrieved)
+    
+    def _batch_similarity(self, job_vector: np.ndarray, texts: List[str]) -> np.ndarray:
+        """Cosine similarity between one normalized job vector and many texts"""
+        if not texts:
+            return np.zeros(0)
+        return _normalize_rows(self.encode_texts(texts)) @ job_vector
+    
+    def score_candidates(self, job_data: dict, candidates: list,
+                         client_id: Optional[str] = None) -> dict:
+        """
+        Score many candidates against one job with batched embeddings.
+        
+        The job texts are encoded once, candidate texts are encoded in
+        batches, and every similarity is one matrix-vector product. Scores are
+        the same as scoring each pair with the single-pair helpers.
+        
+        Returns:
+            dict: Per-factor score arrays aligned with candidates, plus the weights used
+        """
+        weights = self._get_weights(client_id)
+        n = len(candidates)
+        
+        job_requirements = job_data.get('requirements', '')
+        job_location = job_data.get('location', '')
+        job_loc_lower = job_location.lower() if job_location else ''
+        job_vectors = _normalize_rows(self.encode_texts([
+            _job_text(job_data),
+            job_requirements.lower() if job_requirements else '',
+            job_loc_lower
+        ]))
+        
+        # Semantic similarity over the combined candidate profile text
+        semantic = np.zeros(n)
+        if n:
+            semantic[:] = self._batch_similarity(job_vectors[0], [_candidate_text(c) for c in candidates])
+        
+        # Skills similarity only where both sides have text
+        skills = np.zeros(n)
+        if job_requirements:
+            skill_rows = [i for i, c in enumerate(candidates) if c.get('technical_skills', '')]
+            if skill_rows:
+                skills[skill_rows] = self._batch_similarity(
+                    job_vectors[1], [candidates[i].get('technical_skills', '').lower() for i in skill_rows]
+                )
+        
+        # Location: rule-based where possible, embeddings only for the rest
+        location = np.full(n, 0.5)
+        if job_location:
+            embed_rows = []
+            for i, candidate in enumerate(candidates):
+                candidate_location = candidate.get('location', '')
+                if not candidate_location:
+                    continue
+                if 'remote' in job_loc_lower or job_loc_lower == candidate_location.lower():
+                    location[i] = 1.0
+                else:
+                    embed_rows.append(i)
+            if embed_rows:
+                location[embed_rows] = self._batch_similarity(
+                    job_vectors[2], [candidates[i].get('location', '').lower() for i in embed_rows]
+                )
+        
+        experience = np.array([
+            self._calculate_experience_score(
+                job_data.get('experience_level', ''),
+                c.get('experience_years', 0),
+                c.get('seniority_level', '')
+            ) for c in candidates
+        ], dtype=float)
+        cultural_fit = self._cultural_fit_scores(candidates, client_id)
+        
+        # Weighted total score
+        total = (
+            semantic * weights['semantic'] +
+            experience * weights['experience'] +
+            skills * weights['skills'] +
+            location * weights['location'] +
+            cultural_fit * 0.1
+        )
+        
+        return {
+            'total_score': total,
+            'semantic_similarity': semantic,
+            'experience_match': experience,
+            'skills_match': skills,
+            'location_match': location,
+            'cultural_fit': cultural_fit,
+            'weights_used': weights
+        }
+    
+    def prepare_jobs(self, jobs: list) -> dict:
+        """
+        Encode the job side of score_matrix once for a whole batch run.
+        
+        Returns:
+            dict: Normalized job/requirements/location vectors and per-job weights
+        """
+        requirements = [job.get('requirements', '') for job in jobs]
+        locations = [(job.get('location', '') or '').lower() for job in jobs]
+        vectors = _normalize_rows(self.encode_texts(
+            [_job_text(job) for job in jobs] +
+            [r.lower() if r else '' for r in requirements] +
+            locations
+        )) if jobs else np.zeros((0, 0))
+        n = len(jobs)
+        weights = [self._get_weights(job.get('client_id')) for job in jobs]
+        return {
+            'jobs': jobs,
+            'text': vectors[:n],
+            'requirements': vectors[n:2 * n],
+            'location': vectors[2 * n:],
+            'has_requirements': np.array([bool(r) for r in requirements], dtype=bool),
+            'locations': locations,
+            'weights': weights,
+            'weight_matrix': np.array([[w['semantic'], w['experience'], w['skills'], w['location']] for w in weights]).reshape(n, 4)
+        }
+    
+    def score_matrix(self, jobs: list, candidates: list, prepared: Optional[dict] = None) -> dict:
+        """
+        Score every job against every candidate as one job x candidate matrix.
+        
+        Candidate texts are encoded once for all jobs and each factor is a single
+        matrix product. Row j holds the same scores score_candidates gives job j.
+        
+        Args:
+            jobs: Jobs to score (rows)
+            candidates: Candidates to score (columns)
+            prepared: prepare_jobs(jobs) output, reused across candidate batches
+        
+        Returns:
+            dict: (jobs, candidates) arrays per factor plus weights_used per job
+        """
+        prepared = prepared or self.prepare_jobs(jobs)
+        n_jobs, n = len(jobs), len(candidates)
+        if n_jobs == 0 or n == 0:
+            empty = np.zeros((n_jobs, n))
+            return {'total_score': empty, 'semantic_similarity': empty, 'experience_match': empty,
+                    'skills_match': empty, 'location_match': empty, 'cultural_fit': empty,
+                    'weights_used': prepared['weights']}
+        
+        semantic = _normalize_rows(self.encode_texts([_candidate_text(c) for c in candidates])) @ prepared['text'].T
+        semantic = semantic.T
+        
+        skills = np.zeros((n_jobs, n))
+        skill_cols = [i for i, c in enumerate(candidates) if c.get('technical_skills', '')]
+        job_rows = np.flatnonzero(prepared['has_requirements'])
+        if skill_cols and len(job_rows):
+            skill_vectors = _normalize_rows(self.encode_texts(
+                [candidates[i].get('technical_skills', '').lower() for i in skill_cols]
+            ))
+            skills[np.ix_(job_rows, skill_cols)] = prepared['requirements'][job_rows] @ skill_vectors.T
+        
+        # Location: 0.5 when either side is empty, 1.0 for remote jobs and exact matches,
+        # otherwise similarity between the distinct location strings
+        location = np.full((n_jobs, n), 0.5)
+        candidate_locations = [(c.get('location', '') or '') for c in candidates]
+        location_cols = [i for i, loc in enumerate(candidate_locations) if loc]
+        if location_cols:
+            distinct = list(dict.fromkeys(candidate_locations[i].lower() for i in location_cols))
+            column_of = {loc: k for k, loc in enumerate(distinct)}
+            distinct_vectors = _normalize_rows(self.encode_texts(distinct))
+            cols = np.array(location_cols)
+            distinct_index = np.array([column_of[candidate_locations[i].lower()] for i in location_cols])
+            for j, job_loc in enumerate(prepared['locations']):
+                if not job_loc:
+                    continue
+                if 'remote' in job_loc:
+                    location[j, cols] = 1.0
+                    continue
+                similarity = distinct_vectors @ prepared['location'][j]
+                if job_loc in column_of:
+                    similarity[column_of[job_loc]] = 1.0
+                location[j, cols] = similarity[distinct_index]
+        
+        # Experience and cultural fit depend on a job only through its level and client
+        experience = np.empty((n_jobs, n))
+        by_level = defaultdict(list)
+        for j, job in enumerate(jobs):
+            by_level[job.get('experience_level', '')].append(j)
+        for level, rows in by_level.items():
+            experience[rows] = np.array([
+                self._calculate_experience_score(level, c.get('experience_years', 0), c.get('seniority_level', ''))
+                for c in candidates
+            ], dtype=float)
+        cultural_fit = np.empty((n_jobs, n))
+        by_client = defaultdict(list)
+        for j, job in enumerate(jobs):
+            by_client[job.get('client_id')].append(j)
+        for client_id, rows in by_client.items():
+            cultural_fit[rows] = self._cultural_fit_scores(candidates, client_id)
+        
+        w = prepared['weight_matrix']
+        total = (
+            semantic * w[:, 0:1] +
+            experience * w[:, 1:2] +
+            skills * w[:, 2:3] +
+            location * w[:, 3:4] +
+            cultural_fit * 0.1
+        )
+        
+        return {
+            'total_score': total,
+            'semantic_similarity': semantic,
+            'experience_match': experience,
+            'skills_match': skills,
+            'location_match': location,
+            'cultural_fit': cultural_fit,
+            'weights_used': prepared['weights']
+        }
+    
+    def score_matrix_top_k(self, jobs: list, candidates: list, prepared: Optional[dict], top_k: int) -> dict:
+        """
+        score_matrix reduced to each job's best top_k columns.
+        
+        Kept columns stay in candidate order and earlier candidates win ties, so
+        feeding the reduced rows to StreamingTopK selects the same matches as the
+        full rows. This is what worker processes send back instead of the matrix.
+        
+        Returns:
+            dict: (jobs, k) arrays per factor, 'columns' with the candidate index
+                  of each kept entry, and weights_used per job
+        """
+        matrix = self.score_matrix(jobs, candidates, prepared)
+        k = min(max(top_k, 0), len(candidates))
+        columns = np.sort(np.argsort(-matrix['total_score'], axis=1, kind='stable')[:, :k], axis=1)
+        reduced = {key: np.take_along_axis(value, columns, axis=1)
+                   for key, value in matrix.items() if key != 'weights_used'}
+        reduced['columns'] = columns
+        reduced['weights_used'] = matrix['weights_used']
+        return reduced
+    
+    @staticmethod
+    def matrix_row(scores: dict, j: int) -> dict:
+        """score_candidates-shaped view of one job's row of a score_matrix result"""
+        row = {key: value[j] for key, value in scores.items() if key != 'weights_used'}
+        row['weights_used'] = scores['weights_used'][j]
+        return row
+    
+    def _score_result(self, scores: dict, i: int) -> dict:
+        """Build the adaptive score dict for one candidate of a batch"""
+        return {
+            'total_score': float(scores['total_score'][i]),
+            'breakdown': {
+                'semantic_similarity': float(scores['semantic_similarity'][i]),
+                'experience_match': float(scores['experience_match'][i]),
+                'skills_match': float(scores['skills_match'][i]),
+                'location_match': float(scores['location_match'][i]),
+                'cultural_fit': float(scores['cultural_fit'][i])
+            },
+            'weights_used': scores['weights_used'],
+            'algorithm_version': '3.0.0-phase3-production'
+        }
+    
     def calculate_adaptive_score(self, job_data: dict, candidate_data: dict, 
                                client_id: Optional[str] = None) -> dict:
         """Calculate adaptive score with company-specific weights"""
         try:
-            # Get company-specific weights
-            weights = {'semantic': 0.40, 'experience': 0.30, 'skills': 0.20, 'location': 0.10}
-            if client_id and client_id in self.company_preferences:
-                weights.update(self.company_preferences[client_id].get('scoring_weights', {}))
-            
-            # Calculate individual scores
-            semantic_score = self._calculate_semantic_similarity(job_data, candidate_data)
-            experience_score = self._calculate_experience_score(
-                job_data.get('experience_level', ''),
-                candidate_data.get('experience_years', 0),
-                candidate_data.get('seniority_level', '')
-            )
-            skills_score = self._calculate_skills_score(
-                job_data.get('requirements', ''),
-                candidate_data.get('technical_skills', '')
-            )
-            location_score = self._calculate_location_score(
-                job_data.get('location', ''),
-                candidate_data.get('location', '')
-            )
-            
-            # Cultural fit analysis
-            cultural_fit = self._calculate_cultural_fit(candidate_data, client_id)
-            
-            # Weighted total score
-            total_score = (
-                semantic_score * weights['semantic'] +
-                experience_score * weights['experience'] +
-                skills_score * weights['skills'] +
-                location_score * weights['location'] +
-                cultural_fit * 0.1
-            )
-            
-            return {
-                'total_score': float(total_score),
-                'breakdown': {
-                    'semantic_similarity': float(semantic_score),
-                    'experience_match': float(experience_score),
-                    'skills_match': float(skills_score),
-                    'location_match': float(location_score),
-                    'cultural_fit': float(cultural_fit)
-                },
-                'weights_used': weights,
-                'algorithm_version': '3.0.0-phase3-production'
-            }
+            scores = self.score_candidates(job_data, [candidate_data], client_id)
+            return self._score_result(scores, 0)
         except Exception as e:
             logger.error(f"Error in adaptive scoring: {e}")
             raise
     
     def _calculate_semantic_similarity(self, job_data: dict, candidate_data: dict) -> float:
         """Calculate semantic similarity using sentence transformers"""
-        job_text = f"{job_data.get('title', '')} {job_data.get('description', '')} {job_data.get('requirements', '')}"
-        candidate_text = f"{candidate_data.get('technical_skills', '')} {candidate_data.get('seniority_level', '')} {candidate_data.get('education_level', '')}"
-        
-        job_embedding = self.model.encode([job_text])
-        candidate_embedding = self.model.encode([candidate_text])
+        job_embedding = self.model.encode([_job_text(job_data)])
+        candidate_embedding = self.model.encode([_candidate_text(candidate_data)])
         
         similarity = cosine_similarity(job_embedding, candidate_embedding)[0][0]
         return float(similarity)
@@ -290,111 +566,117 @@ class Phase3SemanticEngine:
     
     def _calculate_cultural_fit(self, candidate_data: dict, client_id: Optional[str]) -> float:
         """Calculate cultural fit based on historical feedback"""
-        if not client_id:
-            return 0.5
-        
-        try:
-            db = self._get_db_connection()
-            
-            # MongoDB aggregation to calculate cultural fit
-            candidate_id = candidate_data.get('id')
-            
-            pipeline = [
-                # Join feedback with jobs
-                {
-                    '$lookup': {
-                        'from': 'jobs',
-                        'localField': 'job_id',
-                        'foreignField': '_id',
-                        'as': 'job'
-                    }
-                },
-                {'$unwind': '$job'},
-                # Filter by client_id and candidate_id
-                {
-                    '$match': {
-                        'job.client_id': client_id,
-                        'candidate_id': candidate_id
-                    }
-                },
-                # Calculate average of cultural fit metrics
-                {
-                    '$group': {
-                        '_id': None,
-                        'avg_score': {
-                            '$avg': {
-                                '$divide': [
-                                    {
-                                        '$add': [
-                                            {'$ifNull': ['$integrity', 0]},
-                                            {'$ifNull': ['$honesty', 0]},
-                                            {'$ifNull': ['$discipline', 0]},
-                                            {'$ifNull': ['$hard_work', 0]},
-                                            {'$ifNull': ['$gratitude', 0]}
-                                        ]
-                                    },
-                                    5.0
-                                ]
-                            }
-                        }
-                    }
-                }
-            ]
-            
-            result = list(db.feedback.aggregate(pipeline))
-            
-            if result and result[0].get('avg_score'):
-                return float(result[0]['avg_score']) / 5.0
-            return 0.5
-        except Exception as e:
-            logger.error(f"Error calculating cultural fit: {e}")
-            return 0.5
+        return float(self._cultural_fit_scores([candidate_data], client_id)[0])
     
-    def match_candidates(self, job_data: dict, candidates: list) -> list:
-        """Match candidates to job with Phase 3 features"""
+    def _cultural_fit_scores(self, candidates: list, client_id: Optional[str]) -> np.ndarray:
+        """Cultural fit for a batch of candidates from the materialized feedback features"""
+        fits = self.feature_store.cultural_fit_many(client_id, [c.get('id') for c in candidates])
+        self._sync_company_preferences()
+        return fits
+    
+    def match_candidates(self, job_data: dict, candidates: list, top_k: Optional[int] = None) -> list:
+        """Match candidates to job with Phase 3 features, optionally keeping only the top_k"""
         try:
             client_id = job_data.get('client_id')
-            scored_candidates = []
+            if not candidates:
+                return []
+            if top_k is not None and len(candidates) > self.ann_retrieve_limit:
+                candidates = self.retrieve_candidates(job_data, candidates, max(self.ann_retrieve_limit, top_k))
+            scores = self.score_candidates(job_data, candidates, client_id)
+            totals = scores['total_score']
             
-            for candidate in candidates:
-                score_data = self.calculate_adaptive_score(job_data, candidate, client_id)
-                
-                scored_candidates.append({
-                    'candidate_id': candidate.get('id'),
-                    'total_score': score_data['total_score'],
-                    'score_breakdown': score_data['breakdown'],
-                    'candidate_data': candidate,
-                    'algorithm_version': '3.0.0-phase3-production'
-                })
+            # Highest score first; ties keep input order like a stable sort
+            if top_k is not None and top_k < len(candidates):
+                order = []
+                if top_k > 0:
+                    kth = np.partition(totals, len(totals) - top_k)[len(totals) - top_k]
+                    above = np.flatnonzero(totals > kth)
+                    ties = np.flatnonzero(totals == kth)[:top_k - len(above)]
+                    order = sorted(np.concatenate([above, ties]).tolist(), key=lambda i: (-totals[i], i))
+            else:
+                order = np.argsort(-totals, kind='stable').tolist()
             
-            scored_candidates.sort(key=lambda x: x['total_score'], reverse=True)
-            return scored_candidates
+            return [self._match_result(candidates[i], scores, i) for i in order]
         except Exception as e:
             logger.error(f"Error in candidate matching: {e}")
             raise
     
+    def stream_top_k(self, jobs: list, candidate_batches: Iterable[list],
+                     top_k: int) -> Iterator[Tuple[int, Dict[Any, list]]]:
+        """
+        Score candidate batches as they arrive, keeping only a bounded top_k per job.
+        
+        Args:
+            jobs: Jobs to match, keyed in the output by their id
+            candidate_batches: Candidate lists, e.g. pages of a database cursor
+            top_k: Matches to keep per job
+        
+        Yields:
+            tuple: (candidates seen so far, {job_id: best matches so far}) after each batch
+        """
+        heaps = {job.get('id'): StreamingTopK(top_k) for job in jobs}
+        prepared = self.prepare_jobs(jobs)
+        seen = 0
+        # Each batch is encoded once and scored against every job in one matrix, on the
+        # matching worker pool when it is enabled; only each job's top_k columns come back
+        for batch, matrix in self.match_executor.score_matrix_batches(
+                jobs, prepared, candidate_batches, top_k, self.score_matrix_top_k):
+            for j, job in enumerate(jobs):
+                scores = self.matrix_row(matrix, j)
+                columns = scores['columns']
+                heaps[job.get('id')].push_batch(
+                    scores['total_score'],
+                    lambda i, scores=scores, batch=batch, columns=columns: self._match_result(batch[columns[i]], scores, i)
+                )
+            seen += len(batch)
+            yield seen, {job_id: heap.results() for job_id, heap in heaps.items()}
+    
+    def _match_result(self, candidate: dict, scores: dict, i: int) -> dict:
+        """Build the match entry for one candidate of a scored batch"""
+        score_data = self._score_result(scores, i)
+        return {
+            'candidate_id': candidate.get('id'),
+            'total_score': score_data['total_score'],
+            'score_breakdown': score_data['breakdown'],
+            'candidate_data': candidate,
+            'algorithm_version': '3.0.0-phase3-production'
+        }
+    
     async def enhanced_batch_process(self, jobs: list, candidates: list, use_cache: bool = True) -> dict:
         """Enhanced batch processing with async and caching"""
-        cache_key = f"batch_{len(jobs)}_{len(candidates)}_{hash(str([j.get('id') for j in jobs]))}"
+        # Key on job and candidate content so any profile change misses the cache
+        digest = hashlib.sha1()
+        for item in jobs:
+            digest.update(f"{item.get('id')}\0{_job_text(item)}\0{item.get('location', '')}\0{item.get('experience_level', '')}\1".encode('utf-8'))
+        for item in candidates:
+            digest.update(f"{item.get('id')}\0{_candidate_text(item)}\0{item.get('location', '')}\0{item.get('experience_years', 0)}\1".encode('utf-8'))
+        cache_key = digest.hexdigest()
         
         if use_cache and cache_key in self.cache:
             logger.info(f"Using cached results for batch processing")
+            self.cache.move_to_end(cache_key)
             return self.cache[cache_key]
         
         try:
             results = {}
-            chunk_size = 50
+            chunk_size = self.encode_batch_size
+            
+            # Submit every job's candidate chunks at once so the worker pool stays busy
+            tasks = [
+                (job, candidates[i:i + chunk_size], job.get('client_id'))
+                for job in jobs
+                for i in range(0, len(candidates), chunk_size)
+            ]
+            chunk_scores = await self.match_executor.score_chunks(tasks, self.score_candidates)
+            
+            scored_by_job = defaultdict(list)
+            for (job, chunk, _), scores in zip(tasks, chunk_scores):
+                if scores is not None:
+                    scored_by_job[job.get('id')].extend(self._chunk_results(chunk, scores))
             
             for job in jobs:
                 job_id = job.get('id')
-                client_id = job.get('client_id')
-                job_results = []
-                
-                # Process candidates in chunks
-                for i in range(0, len(candidates), chunk_size):
-                    chunk = candidates[i:i + chunk_size]
-                    chunk_results = await self._process_chunk_async(job, chunk, client_id)
-                    job_results.extend(chunk_results)
+                job_results = scored_by_job[job_id]
                 
                 job_results.sort(key=lambda x: x['total_score'], reverse=True)
                 
@@ -409,38 +691,24 @@ class Phase3SemanticEngine:
             
             if use_cache:
                 self.cache[cache_key] = results
+                while len(self.cache) > self.cache_max_entries:
+                    self.cache.popitem(last=False)
             
             return results
         except Exception as e:
             logger.error(f"Error in enhanced batch processing: {e}")
             raise
     
-    async def _process_chunk_async(self, job: dict, candidates_chunk: list, client_id: Optional[str]) -> list:
-        """Process candidate chunk asynchronously"""
-        loop = asyncio.get_event_loop()
-        
-        tasks = []
-        for candidate in candidates_chunk:
-            task = loop.run_in_executor(
-                None, 
-                self.calculate_adaptive_score, 
-                job, 
-                candidate,
-                client_id
-            )
-            tasks.append((candidate.get('id'), task))
-        
+    def _chunk_results(self, candidates_chunk: list, scores: dict) -> list:
+        """Build per-candidate results from one chunk's score arrays"""
         results = []
-        for candidate_id, task in tasks:
-            try:
-                score_data = await task
-                results.append({
-                    'candidate_id': candidate_id,
-                    'total_score': score_data['total_score'],
-                    'score_breakdown': score_data['breakdown']
-                })
-            except Exception as e:
-                logger.error(f"Error processing candidate {candidate_id}: {e}")
+        for i, candidate in enumerate(candidates_chunk):
+            score_data = self._score_result(scores, i)
+            results.append({
+                'candidate_id': candidate.get('id'),
+                'total_score': score_data['total_score'],
+                'score_breakdown': score_data['breakdown']
+            })
         
         return results
     
@@ -451,7 +719,7 @@ class Phase3SemanticEngine:
     def track_successful_match(self, job_id: int, candidate_id: int, feedback_score: float):
         """Track successful match for learning"""
         if feedback_score >= 4.0:
-            self._load_company_preferences()
+            self._load_company_preferences(full=False)
 
 # Backward compatibility classes
 class AdvancedSemanticMatcher:
@@ -463,8 +731,12 @@ class AdvancedSemanticMatcher:
     def calculate_multi_factor_score(self, job_data: dict, candidate_data: dict) -> dict:
         return self.engine.calculate_adaptive_score(job_data, candidate_data)
     
-    def advanced_match(self, job_data: dict, candidates: list) -> list:
-        return self.engine.match_candidates(job_data, candidates)
+    def advanced_match(self, job_data: dict, candidates: list, top_k: Optional[int] = None) -> list:
+        return self.engine.match_candidates(job_data, candidates, top_k)
+    
+    def stream_match(self, job_data: dict, candidate_batches: Iterable[list], top_k: int) -> Iterator[Tuple[int, list]]:
+        for seen, top in self.engine.stream_top_k([job_data], candidate_batches, top_k):
+            yield seen, top[job_data.get('id')]
 
 class BatchMatcher:
     """Enhanced batch matcher"""
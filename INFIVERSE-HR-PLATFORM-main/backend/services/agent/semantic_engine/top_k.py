@@ -0,0 +1,61 @@
+"""
+Streaming Top-K
+Bounded selection of the best scored items from batches that arrive one at a time
+"""
+import heapq
+from typing import Any, Callable, List
+
+import numpy as np
+
+
+class StreamingTopK:
+    """Keeps the k highest scores seen so far; ties keep the item that arrived first"""
+
+    def __init__(self, k: int):
+        self.k = max(0, k)
+        self.seen = 0
+        self._heap = []
+
+    @property
+    def full(self) -> bool:
+        return len(self._heap) >= self.k
+
+    def push(self, key, item: Any):
+        """Offer one item ranked by key (a number or a tuple of numbers)"""
+        seq = self.seen
+        self.seen += 1
+        if self.k == 0:
+            return
+        entry = (key, -seq, item)
+        if not self.full:
+            heapq.heappush(self._heap, entry)
+        elif (key, -seq) > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+
+    def push_batch(self, scores: np.ndarray, make_item: Callable[[int], Any]):
+        """
+        Offer a batch of scores, building items only for entries that make the cut.
+
+        Args:
+            scores: Score per batch position
+            make_item: Builds the item for a batch position
+        """
+        base = self.seen
+        if self.full and self.k:
+            # Later arrivals lose ties, so only strictly higher scores can enter
+            positions = np.flatnonzero(scores > self._heap[0][0])
+        else:
+            positions = range(len(scores))
+        for i in positions:
+            if self.k == 0:
+                break
+            rank = (float(scores[i]), -(base + int(i)))
+            if not self.full:
+                heapq.heappush(self._heap, (*rank, make_item(int(i))))
+            elif rank > self._heap[0][:2]:
+                heapq.heapreplace(self._heap, (*rank, make_item(int(i))))
+        self.seen = base + len(scores)
+
+    def results(self) -> List[Any]:
+        """Items ordered best first"""
+        return [item for _, _, item in sorted(self._heap, key=lambda entry: entry[:2], reverse=True)]
@@ -0,0 +1,456 @@
+"""
+Candidate Vector Store
+Persistent embedding cache keyed by content hash, with an IVF
+(inverted file) approximate nearest-neighbor index over candidate profiles
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  '.vector_cache', 'candidate_vectors.sqlite3')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    content_hash TEXT PRIMARY KEY,
+    vector BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS candidates (
+    candidate_id TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    list_id INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_candidates_list ON candidates(list_id);
+CREATE TABLE IF NOT EXISTS centroids (
+    list_id INTEGER PRIMARY KEY,
+    vector BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0.0] = 1.0
+    return vectors / norms
+
+
+class CandidateVectorStore:
+    """
+    On-disk embedding cache and ANN index with a bounded in-memory LRU front.
+
+    Every worker process opens the same file. Writes take SQLite's write lock
+    up front (BEGIN IMMEDIATE) and wait up to busy_timeout for it, so writers
+    from different processes run one at a time instead of failing with
+    "database is locked".
+    """
+
+    def __init__(self, path: Optional[str] = None, model_name: str = 'all-MiniLM-L6-v2',
+                 memory_entries: Optional[int] = None, nprobe: Optional[int] = None,
+                 max_entries: Optional[int] = None):
+        self.path = path or os.getenv("AGENT_VECTOR_STORE_PATH", DEFAULT_STORE_PATH)
+        self.model_name = model_name
+        self.memory_entries = memory_entries or int(os.getenv("AGENT_EMBEDDING_MEMORY_ENTRIES", "50000"))
+        self.max_entries = max_entries or int(os.getenv("AGENT_VECTOR_STORE_MAX_ENTRIES", "1000000"))
+        self.nprobe = nprobe or int(os.getenv("AGENT_ANN_NPROBE", "8"))
+        self.min_train_size = int(os.getenv("AGENT_ANN_MIN_TRAIN", "2000"))
+        self.busy_timeout = float(os.getenv("AGENT_VECTOR_STORE_BUSY_TIMEOUT", "30"))
+        self._memory = OrderedDict()
+        self._centroids = None
+        self._lock = threading.RLock()
+        self._training = None
+        self._indexed_while_training = None
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evicted': 0}
+
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = self._connect()
+        self._conn.executescript(SCHEMA)
+        self._disk_entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self._load_centroids()
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: transactions are opened explicitly by _write
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                               check_same_thread=False, isolation_level=None)
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout * 1000)}")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def _write(self, conn: Optional[sqlite3.Connection] = None):
+        """Run statements as one transaction holding the database write lock"""
+        conn = conn or self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    # ------------------------------------------------------------------
+    # Embedding cache
+    # ------------------------------------------------------------------
+
+    def content_hash(self, text: str) -> str:
+        """Hash a text together with the model name so a model change invalidates it"""
+        return hashlib.sha1(f"{self.model_name}\0{text}".encode('utf-8')).hexdigest()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_embeddings(self, texts: Iterable[str]) -> Dict[str, np.ndarray]:
+        """Get cached embeddings for texts, from memory first and then disk"""
+        found = {}
+        to_load = {}
+        with self._lock:
+            for text in texts:
+                key = self.content_hash(text)
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[text] = vector
+                    self.stats['memory_hits'] += 1
+                else:
+                    to_load[key] = text
+
+            keys = list(to_load)
+            loaded = 0
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT content_hash, vector FROM embeddings WHERE content_hash IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    self._remember(key, vector)
+                    found[to_load[key]] = vector
+                    loaded += 1
+            self.stats['disk_hits'] += loaded
+            self.stats['misses'] += len(to_load) - loaded
+        return found
+
+    def put_embeddings(self, texts: List[str], vectors: np.ndarray):
+        """Persist embeddings for texts"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            rows = []
+            for text, vector in zip(texts, vectors):
+                key = self.content_hash(text)
+                self._remember(key, vector)
+                rows.append((key, vector.tobytes()))
+            with self._write() as conn:
+                conn.executemany("INSERT OR REPLACE INTO embeddings (content_hash, vector) VALUES (?, ?)", rows)
+            self._disk_entries += len(rows)
+            if self._disk_entries > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        """
+        Trim the embedding table to 90% of max_entries, oldest writes first.
+
+        Embeddings of indexed candidates are kept so the ANN index never loses
+        vectors; evicted texts are simply re-encoded if they come back.
+        """
+        with self._lock, self._write() as conn:
+            total = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            excess = total - int(self.max_entries * 0.9)
+            if excess > 0:
+                evicted = conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN ("
+                    "SELECT e.rowid FROM embeddings e "
+                    "WHERE NOT EXISTS (SELECT 1 FROM candidates c WHERE c.content_hash = e.content_hash) "
+                    "ORDER BY e.rowid LIMIT ?)",
+                    (excess,)
+                ).rowcount
+                total -= evicted
+                self.stats['evicted'] += evicted
+                logger.info(f"Evicted {evicted} cached embeddings, {total} remain")
+            self._disk_entries = total
+
+    def embed(self, texts: List[str], encode: Callable[[List[str]], np.ndarray]) -> Dict[str, np.ndarray]:
+        """Get embeddings for texts, encoding and persisting only the ones not cached"""
+        unique_texts = list(dict.fromkeys(texts))
+        found = self.get_embeddings(unique_texts)
+        missing = [text for text in unique_texts if text not in found]
+        if missing:
+            vectors = np.asarray(encode(missing), dtype=np.float32)
+            self.put_embeddings(missing, vectors)
+            found.update(zip(missing, vectors))
+        return found
+
+    # ------------------------------------------------------------------
+    # Candidate index
+    # ------------------------------------------------------------------
+
+    def _load_centroids(self):
+        rows = self._conn.execute("SELECT list_id, vector FROM centroids ORDER BY list_id").fetchall()
+        self._centroids = np.stack([np.frombuffer(blob, dtype=np.float32) for _, blob in rows]) if rows else None
+
+    def _assign_lists(self, vectors: np.ndarray) -> np.ndarray:
+        if self._centroids is None or not len(vectors):
+            return np.zeros(len(vectors), dtype=int)
+        return np.argmax(_normalize(vectors) @ self._centroids.T, axis=1)
+
+    def index_candidates(self, candidate_texts: Dict[str, str],
+                         encode: Callable[[List[str]], np.ndarray]) -> int:
+        """
+        Add or refresh candidates in the ANN index.
+
+        Only candidates whose profile text changed since they were indexed are
+        embedded and reassigned.
+
+        Args:
+            candidate_texts: Profile text keyed by candidate ID
+            encode: Function encoding a list of texts into a matrix
+
+        Returns:
+            int: Number of candidates added or updated
+        """
+        if not candidate_texts:
+            return 0
+        hashes = {cid: self.content_hash(text) for cid, text in candidate_texts.items()}
+        with self._lock:
+            stored = {}
+            ids = list(hashes)
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                stored.update(self._conn.execute(
+                    f"SELECT candidate_id, content_hash FROM candidates WHERE candidate_id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall())
+        changed = [cid for cid, key in hashes.items() if stored.get(cid) != key]
+        if not changed:
+            return 0
+
+        embeddings = self.embed([candidate_texts[cid] for cid in changed], encode)
+        vectors = np.stack([embeddings[candidate_texts[cid]] for cid in changed])
+        with self._lock:
+            lists = self._assign_lists(vectors)
+            with self._write() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO candidates (candidate_id, content_hash, list_id) VALUES (?, ?, ?)",
+                    [(cid, hashes[cid], int(list_id)) for cid, list_id in zip(changed, lists)]
+                )
+            if self._indexed_while_training is not None:
+                self._indexed_while_training.update(changed)
+            if self._needs_training():
+                self.train_in_background()
+        return len(changed)
+
+    def remove_candidates(self, candidate_ids: Iterable[str]):
+        """Drop candidates from the ANN index"""
+        with self._lock, self._write() as conn:
+            conn.executemany("DELETE FROM candidates WHERE candidate_id = ?", [(cid,) for cid in candidate_ids])
+
+    def candidate_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM candidates").fetchone()[0]
+
+    def _needs_training(self) -> bool:
+        if self._training is not None and self._training.is_alive():
+            return False
+        count = self.candidate_count()
+        if count < self.min_train_size:
+            return False
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'trained_size'").fetchone()
+        # Retrain when the index has grown 4x since the lists were built
+        return row is None or count >= 4 * int(row[0])
+
+    def _iter_candidate_vectors(self, where: str = "", params: tuple = (), batch: int = 5000,
+                                conn: Optional[sqlite3.Connection] = None):
+        cursor = (conn or self._conn).execute(
+            "SELECT c.candidate_id, e.vector FROM candidates c "
+            f"JOIN embeddings e ON e.content_hash = c.content_hash {where}",
+            params
+        )
+        while True:
+            rows = cursor.fetchmany(batch)
+            if not rows:
+                break
+            yield [r[0] for r in rows], np.stack([np.frombuffer(r[1], dtype=np.float32) for r in rows])
+
+    def train_in_background(self) -> threading.Thread:
+        """Start train() on a daemon thread unless a training run is already going"""
+        with self._lock:
+            if self._training is None or not self._training.is_alive():
+                self._training = threading.Thread(target=self._train_logged, name="ann-train", daemon=True)
+                self._training.start()
+            return self._training
+
+    def _train_logged(self):
+        try:
+            self.train()
+        except Exception as e:
+            logger.error(f"ANN index training failed, keeping the current lists: {e}")
+
+    def train(self, iterations: int = 10, sample_size: int = 20000, seed: int = 0):
+        """
+        Rebuild the coarse quantizer with spherical k-means and reassign every candidate.
+
+        Clustering and the bulk reassignment read through a separate connection
+        without holding the store lock, so searches keep using the current lists.
+        Only the final write, which also reassigns candidates indexed meanwhile,
+        and the centroid swap run under the lock.
+        """
+        # An in-memory database is private to its connection, so it trains on the
+        # shared one and holds the lock throughout
+        shared = self.path == ':memory:'
+        conn = self._conn if shared else self._connect()
+        if shared:
+            self._lock.acquire()
+        try:
+            with self._lock:
+                self._indexed_while_training = set()
+            count = conn.execute("SELECT COUNT(*) FROM candidates").fetchone()[0]
+            if count == 0:
+                return
+            n_lists = int(min(1024, max(16, np.sqrt(count))))
+            rng = np.random.default_rng(seed)
+            sample_ids = [row[0] for row in conn.execute(
+                "SELECT candidate_id FROM candidates ORDER BY RANDOM() LIMIT ?", (sample_size,)
+            ).fetchall()]
+            sample = []
+            for i in range(0, len(sample_ids), 500):
+                chunk = sample_ids[i:i + 500]
+                for _, vectors in self._iter_candidate_vectors(
+                        f"WHERE c.candidate_id IN ({','.join('?' * len(chunk))})", tuple(chunk), conn=conn):
+                    sample.append(vectors)
+            if not sample:
+                return
+            sample = _normalize(np.concatenate(sample))
+            n_lists = min(n_lists, len(sample))
+
+            centroids = sample[rng.choice(len(sample), n_lists, replace=False)]
+            for _ in range(iterations):
+                assignment = np.argmax(sample @ centroids.T, axis=1)
+                for k in range(n_lists):
+                    members = sample[assignment == k]
+                    if len(members):
+                        centroids[k] = members.mean(axis=0)
+                centroids = _normalize(centroids)
+            centroids = centroids.astype(np.float32)
+
+            updates = []
+            for ids, vectors in self._iter_candidate_vectors(conn=conn):
+                updates.extend(zip(np.argmax(_normalize(vectors) @ centroids.T, axis=1).tolist(), ids))
+
+            with self._lock:
+                late = list(self._indexed_while_training)
+                with self._write(conn):
+                    conn.execute("DELETE FROM centroids")
+                    conn.executemany("INSERT INTO centroids (list_id, vector) VALUES (?, ?)",
+                                     [(k, centroids[k].tobytes()) for k in range(n_lists)])
+                    conn.executemany("UPDATE candidates SET list_id = ? WHERE candidate_id = ?", updates)
+                    # Candidates indexed during training were assigned with the old centroids
+                    for i in range(0, len(late), 500):
+                        chunk = late[i:i + 500]
+                        for ids, vectors in self._iter_candidate_vectors(
+                                f"WHERE c.candidate_id IN ({','.join('?' * len(chunk))})", tuple(chunk), conn=conn):
+                            conn.executemany(
+                                "UPDATE candidates SET list_id = ? WHERE candidate_id = ?",
+                                zip(np.argmax(_normalize(vectors) @ centroids.T, axis=1).tolist(), ids)
+                            )
+                    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('trained_size', ?)", (str(count),))
+                self._centroids = centroids
+            logger.info(f"Trained ANN index with {n_lists} lists over {count} candidates")
+        finally:
+            with self._lock:
+                self._indexed_while_training = None
+            if shared:
+                self._lock.release()
+            else:
+                conn.close()
+
+    def _list_members(self, candidate_ids: Optional[set]) -> Dict[int, Optional[List[str]]]:
+        """Candidate count per list, or the restricted candidates per list when filtering"""
+        if candidate_ids is None:
+            return {list_id: size for list_id, size in self._conn.execute(
+                "SELECT list_id, COUNT(*) FROM candidates GROUP BY list_id"
+            ).fetchall()}
+        members = defaultdict(list)
+        ids = list(candidate_ids)
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            for cid, list_id in self._conn.execute(
+                    f"SELECT candidate_id, list_id FROM candidates WHERE candidate_id IN ({','.join('?' * len(chunk))})",
+                    chunk).fetchall():
+                members[list_id].append(cid)
+        return dict(members)
+
+    def _choose_probes(self, query: np.ndarray, members: dict, limit: int) -> List[int]:
+        """The nprobe nearest non-empty lists, widened until they hold at least limit candidates"""
+        if self._centroids is None:
+            return list(members)
+        probes, covered = [], 0
+        for list_id in np.argsort(-(self._centroids @ query)).tolist():
+            if list_id not in members:
+                continue
+            probes.append(list_id)
+            size = members[list_id]
+            covered += size if isinstance(size, int) else len(size)
+            if len(probes) >= self.nprobe and covered >= limit:
+                break
+        return probes
+
+    def search(self, query: np.ndarray, limit: int, candidate_ids: Optional[set] = None) -> List[str]:
+        """
+        Find the candidates closest to a query vector.
+
+        The nprobe lists nearest the query are scanned, widened to further
+        lists until they hold at least limit candidates, so memory and time
+        scale with the probed lists rather than the whole index. A
+        candidate_ids restriction is applied before probing: only lists
+        containing those candidates are probed and only they are scored.
+
+        Args:
+            query: Query embedding
+            limit: Maximum candidates to return
+            candidate_ids: Optional set restricting results
+
+        Returns:
+            list: Candidate IDs ordered by similarity
+        """
+        query = _normalize(np.asarray(query, dtype=np.float32).reshape(-1))
+        best_ids, best_scores = [], np.zeros(0, dtype=np.float32)
+        with self._lock:
+            members = self._list_members(candidate_ids)
+            probes = self._choose_probes(query, members, limit)
+            if candidate_ids is None:
+                scans = [("c.list_id", probes[i:i + 500]) for i in range(0, len(probes), 500)]
+            else:
+                ids = [cid for list_id in probes for cid in members[list_id]]
+                scans = [("c.candidate_id", ids[i:i + 500]) for i in range(0, len(ids), 500)]
+            for column, values in scans:
+                for ids, vectors in self._iter_candidate_vectors(
+                        f"WHERE {column} IN ({','.join('?' * len(values))})", tuple(values)):
+                    best_ids = best_ids + ids
+                    best_scores = np.concatenate([best_scores, _normalize(vectors) @ query])
+                    if len(best_ids) > limit:
+                        top = np.argpartition(-best_scores, limit - 1)[:limit]
+                        best_ids = [best_ids[i] for i in top]
+                        best_scores = best_scores[top]
+        order = np.argsort(-best_scores, kind='stable')
+        return [best_ids[i] for i in order[:limit]]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
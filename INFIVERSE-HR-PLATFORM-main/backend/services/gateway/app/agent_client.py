@@ -0,0 +1,244 @@
+"""
+Agent Service Client for Gateway Service
+One pooled keep-alive HTTP client for gateway → agent calls, with in-flight
+deduplication and a short-TTL cache for match results, and a circuit breaker
+so callers go straight to fallback matching while the agent is down
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class AgentUnavailable(Exception):
+    """The agent could not produce a result; callers should use fallback matching"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, short_circuited: bool = False):
+        super().__init__(message)
+        self.status_code = status_code
+        self.short_circuited = short_circuited
+
+
+class CircuitBreaker:
+    """Closed → open after consecutive failures; one trial request is let through once reset_seconds pass"""
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info("Agent service circuit closed")
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def abandon(self):
+        """The request was cancelled before the agent answered; let another trial through"""
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(f"Agent service circuit open for {self.reset_seconds:g}s after {self.failures} failures")
+            self.opened_at = time.monotonic()
+
+
+class AgentClient:
+    """Shared client for the agent service's /match and /batch-match endpoints"""
+
+    def __init__(self):
+        self.match_timeout = float(os.getenv("AGENT_MATCH_TIMEOUT", "90"))
+        self.batch_timeout = float(os.getenv("AGENT_BATCH_MATCH_TIMEOUT", "120"))
+        self.cache_ttl = float(os.getenv("AGENT_MATCH_CACHE_TTL", "30"))
+        self.cache_size = int(os.getenv("AGENT_MATCH_CACHE_SIZE", "512"))
+        self.max_connections = int(os.getenv("AGENT_CLIENT_MAX_CONNECTIONS", "50"))
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv("AGENT_BREAKER_FAILURES", "5")),
+            reset_seconds=float(os.getenv("AGENT_BREAKER_RESET_SECONDS", "30"))
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        # (job_id, scope) -> (stored_at, generation, agent result)
+        self._cache: Dict[Tuple[str, Tuple[str, ...]], Tuple[float, int, Dict[str, Any]]] = {}
+        self._inflight: Dict[Tuple[str, Tuple[str, ...]], asyncio.Future] = {}
+        # Bumped on any candidate write: every cached ranking may include or miss that candidate
+        self._generation = 0
+        self.stats = {"requests": 0, "cache_hits": 0, "coalesced": 0, "agent_calls": 0, "agent_failures": 0, "short_circuited": 0}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            agent_url = os.getenv("AGENT_SERVICE_URL")
+            if not agent_url:
+                raise AgentUnavailable("AGENT_SERVICE_URL is not configured")
+            self._client = httpx.AsyncClient(
+                base_url=agent_url.rstrip("/"),
+                timeout=self.match_timeout,
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+                headers={
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {os.getenv('API_KEY_SECRET')}"
+                }
+            )
+        return self._client
+
+    async def _post(self, path: str, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        if not self.breaker.allow():
+            self.stats["short_circuited"] += 1
+            raise AgentUnavailable("agent service circuit open", short_circuited=True)
+        self.stats["agent_calls"] += 1
+        try:
+            response = await self._get_client().post(path, json=payload, timeout=timeout)
+        except asyncio.CancelledError:
+            self.breaker.abandon()
+            raise
+        except Exception as e:
+            self.stats["agent_failures"] += 1
+            self.breaker.record_failure()
+            raise AgentUnavailable(f"agent request failed: {type(e).__name__}: {e}")
+        if response.status_code >= 500:
+            # 503 while the engine loads counts too: fallback is the right answer either way
+            self.stats["agent_failures"] += 1
+            self.breaker.record_failure()
+            raise AgentUnavailable(f"agent returned {response.status_code}", response.status_code)
+        self.breaker.record_success()
+        if response.status_code != 200:
+            raise AgentUnavailable(f"agent returned {response.status_code}", response.status_code)
+        return response.json()
+
+    async def match(self, job_id: str, candidate_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Agent /match result for a job, optionally scoped to candidate ids.
+
+        Identical concurrent requests share one agent call and results are reused for
+        AGENT_MATCH_CACHE_TTL seconds. The returned dict is shared; do not mutate it.
+
+        Raises:
+            AgentUnavailable: circuit open, transport error or non-200 response
+        """
+        self.stats["requests"] += 1
+        key = (job_id, tuple(sorted(candidate_ids or [])))
+        now = time.monotonic()
+        cached = self._cache.get(key)
+        if cached is not None:
+            stored_at, generation, result = cached
+            if now - stored_at < self.cache_ttl and generation == self._generation:
+                self.stats["cache_hits"] += 1
+                return result
+            del self._cache[key]
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(pending)
+
+        pending = asyncio.get_running_loop().create_future()
+        self._inflight[key] = pending
+        generation = self._generation
+        try:
+            result = await self._post("/match", {"job_id": job_id, "candidate_ids": list(key[1])}, self.match_timeout)
+        except BaseException as e:
+            pending.set_exception(e if isinstance(e, Exception) else AgentUnavailable("agent request cancelled"))
+            pending.exception()  # waiters re-raise it; keep asyncio from logging it as unretrieved
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        pending.set_result(result)
+        if generation == self._generation and self.cache_ttl > 0:
+            if len(self._cache) >= self.cache_size:
+                self._evict(now)
+            self._cache[key] = (now, generation, result)
+        return result
+
+    async def batch_match(self, job_ids: List[str], top_k: int = 10) -> Dict[str, Any]:
+        """Agent /batch-match result for several jobs (not cached)"""
+        return await self._post("/batch-match", {"job_ids": job_ids, "top_k": top_k}, self.batch_timeout)
+
+    async def stream_batch_match(self, job_ids: List[str], top_k: int = 10) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Records from the agent's /batch-match/stream as they arrive (progress, one per job, summary).
+
+        Raises:
+            AgentUnavailable: circuit open, or the agent failed before or during the stream
+        """
+        if not self.breaker.allow():
+            self.stats["short_circuited"] += 1
+            raise AgentUnavailable("agent service circuit open", short_circuited=True)
+        self.stats["agent_calls"] += 1
+        payload = {"job_ids": job_ids, "top_k": top_k}
+        try:
+            # The timeout applies per read; the agent sends progress after every candidate batch
+            async with self._get_client().stream("POST", "/batch-match/stream", json=payload, timeout=self.batch_timeout) as response:
+                if response.status_code >= 500:
+                    raise AgentUnavailable(f"agent returned {response.status_code}", response.status_code)
+                if response.status_code != 200:
+                    self.breaker.record_success()
+                    raise AgentUnavailable(f"agent returned {response.status_code}", response.status_code)
+                async for line in response.aiter_lines():
+                    if line.strip():
+                        yield json.loads(line)
+            self.breaker.record_success()
+        except (asyncio.CancelledError, GeneratorExit):
+            self.breaker.abandon()
+            raise
+        except AgentUnavailable as e:
+            if e.status_code is not None and e.status_code >= 500:
+                self.stats["agent_failures"] += 1
+                self.breaker.record_failure()
+            raise
+        except Exception as e:
+            self.stats["agent_failures"] += 1
+            self.breaker.record_failure()
+            raise AgentUnavailable(f"agent stream failed: {type(e).__name__}: {e}")
+
+    def _evict(self, now: float):
+        for key in [k for k, (stored_at, generation, _) in self._cache.items()
+                    if now - stored_at >= self.cache_ttl or generation != self._generation]:
+            del self._cache[key]
+        while len(self._cache) >= self.cache_size:
+            # Dicts keep insertion order, so the first key is the oldest entry
+            del self._cache[next(iter(self._cache))]
+
+    def invalidate_candidates(self):
+        self._generation += 1
+        self._cache.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "cached_results": len(self._cache),
+            "in_flight": len(self._inflight)
+        }
+
+
+agent_client = AgentClient()
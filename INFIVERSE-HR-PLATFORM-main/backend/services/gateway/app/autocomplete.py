@@ -0,0 +1,388 @@
+"""
+Job Autocomplete Index for Gateway Service
+In-memory prefix tries over active job titles, skills and locations, serving the
+/v1/jobs/*autocomplete endpoints with frequency ranking and one-typo tolerance
+"""
+import asyncio
+import heapq
+import logging
+import os
+import re
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from bson import ObjectId
+
+logger = logging.getLogger(__name__)
+
+JOB_PROJECTION = {"title": 1, "department": 1, "location": 1, "requirements": 1, "status": 1, "created_at": 1}
+MAX_KEY_LENGTH = 50
+CACHE_SIZE = 25
+MIN_TYPO_QUERY = 4
+
+
+def normalize_key(text: Any) -> str:
+    """Lower-case alphanumerics only, the form queries and indexed terms are compared in"""
+    if not isinstance(text, str):
+        return ""
+    return re.sub(r"[^a-z0-9]+", "", text.lower())
+
+
+def prefix_keys(text: Any) -> Set[str]:
+    """Keys that make a term reachable from the start of any of its words ('AR/VR Engineer' -> 'vrengineer', ...)"""
+    if not isinstance(text, str):
+        return set()
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    return {"".join(words[i:])[:MAX_KEY_LENGTH] for i in range(len(words))}
+
+
+def extract_skills(requirements: Any) -> Set[str]:
+    """Extract skill-like tokens from job requirements string (comma/space separated)."""
+    if not requirements or not isinstance(requirements, str):
+        return set()
+    seen = set()
+    for part in re.split(r"[,/\n;|]+", requirements):
+        for token in part.split():
+            token = token.strip()
+            if len(token) >= 2 and re.match(r"^[A-Za-z0-9.+_-]+$", token):
+                seen.add(token)
+    return seen
+
+
+class _Node:
+    __slots__ = ("children", "terminal", "top")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.terminal: Set[Hashable] = set()
+        # Best-ranked entries in this subtree, None when a change below invalidated it
+        self.top: Optional[List[Hashable]] = None
+
+
+class PrefixTrie:
+    """Character trie whose nodes cache their best entries, so a lookup costs the prefix length"""
+
+    def __init__(self, cache_size: int = CACHE_SIZE):
+        self.cache_size = cache_size
+        self._root = _Node()
+        self._keys: Dict[Hashable, Set[str]] = {}
+        self._rank: Dict[Hashable, Tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def rank(self, entry: Hashable) -> Optional[Tuple]:
+        return self._rank.get(entry)
+
+    def put(self, entry: Hashable, keys: Iterable[str], rank: Tuple):
+        """Index entry under keys; lower ranks sort first"""
+        self.discard(entry)
+        keys = {key for key in keys if key}
+        if not keys:
+            return
+        self._keys[entry] = keys
+        self._rank[entry] = rank
+        for key in keys:
+            node = self._root
+            node.top = None
+            for char in key:
+                node = node.children.setdefault(char, _Node())
+                node.top = None
+            node.terminal.add(entry)
+
+    def discard(self, entry: Hashable):
+        keys = self._keys.pop(entry, None)
+        self._rank.pop(entry, None)
+        if not keys:
+            return
+        for key in keys:
+            path = [self._root]
+            for char in key:
+                path.append(path[-1].children[char])
+            path[-1].terminal.discard(entry)
+            for node in path:
+                node.top = None
+            # Drop branches left empty
+            for depth in range(len(key), 0, -1):
+                node = path[depth]
+                if node.children or node.terminal:
+                    break
+                del path[depth - 1].children[key[depth - 1]]
+
+    def _top(self, node: _Node) -> List[Hashable]:
+        if node.top is None:
+            # Post-order so every child's cache is filled before its parent merges it
+            stack = [(node, False)]
+            while stack:
+                current, expanded = stack.pop()
+                if current.top is not None:
+                    continue
+                if not expanded:
+                    stack.append((current, True))
+                    stack.extend((child, False) for child in current.children.values() if child.top is None)
+                    continue
+                pool = set(current.terminal)
+                for child in current.children.values():
+                    pool.update(child.top)
+                current.top = heapq.nsmallest(self.cache_size, pool, key=self._rank.__getitem__)
+        return node.top
+
+    def warm(self):
+        """Fill every node cache up front (run off the event loop after a build)"""
+        self._top(self._root)
+
+    def complete(self, prefix: str, limit: int) -> List[Hashable]:
+        """Best entries with a key starting with prefix"""
+        node = self._root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return self._top(node)[:limit]
+
+    def complete_fuzzy(self, prefix: str, limit: int, max_edits: int = 1) -> List[Hashable]:
+        """Best entries with a key starting within max_edits edits of prefix, closest first"""
+        best: Dict[Hashable, Tuple[int, Tuple]] = {}
+        first_row = list(range(len(prefix) + 1))
+        # Edit-distance rows along each trie path; a swap of adjacent characters counts as one edit
+        stack = [(child, char, "", first_row, None) for char, child in self._root.children.items()]
+        while stack:
+            node, char, previous_char, previous, before_previous = stack.pop()
+            row = [previous[0] + 1]
+            for i, query_char in enumerate(prefix, 1):
+                cost = min(row[i - 1] + 1, previous[i] + 1, previous[i - 1] + (query_char != char))
+                if before_previous is not None and i > 1 and query_char == previous_char and prefix[i - 2] == char:
+                    cost = min(cost, before_previous[i - 2] + 1)
+                row.append(cost)
+            if row[-1] <= max_edits:
+                # The whole subtree completes this prefix; its cache already holds the best of it
+                for entry in self._top(node):
+                    candidate = (row[-1], self._rank[entry])
+                    if entry not in best or candidate < best[entry]:
+                        best[entry] = candidate
+                continue
+            if min(row) <= max_edits:
+                stack.extend((child, next_char, char, row, previous) for next_char, child in node.children.items())
+        return [entry for entry, _ in sorted(best.items(), key=lambda item: item[1])[:limit]]
+
+
+class _Vocabulary:
+    """Terms counted across active jobs, ranked by how many jobs use them"""
+
+    def __init__(self, cache_size: int):
+        self.trie = PrefixTrie(cache_size)
+        self._counts: Counter = Counter()
+        # Surface forms per term, the most common one is shown
+        self._forms: Dict[str, Counter] = defaultdict(Counter)
+
+    def label(self, term: str) -> str:
+        return self._forms[term].most_common(1)[0][0]
+
+    def add(self, forms: Iterable[str], delta: int):
+        """Count one job's forms; a job counts once per term however many spellings of it it lists"""
+        by_term: Dict[str, Set[str]] = defaultdict(set)
+        for form in forms:
+            by_term[form.lower()].add(form)
+        for term, term_forms in by_term.items():
+            self._counts[term] += delta
+            for form in term_forms:
+                self._forms[term][form] += delta
+                if self._forms[term][form] <= 0:
+                    del self._forms[term][form]
+        for term in by_term:
+            if self._counts[term] <= 0:
+                del self._counts[term]
+                self._forms.pop(term, None)
+                self.trie.discard(term)
+            else:
+                self.trie.put(term, prefix_keys(term), (-self._counts[term], self.label(term)))
+
+
+class JobAutocompleteIndex:
+    """Prefix tries over active jobs, kept current from gateway writes, _id polling and periodic rebuilds"""
+
+    def __init__(self):
+        self.enabled = os.getenv("JOB_AUTOCOMPLETE_INDEX_ENABLED", "true").lower() == "true"
+        self.sync_seconds = float(os.getenv("JOB_AUTOCOMPLETE_SYNC_SECONDS", "5"))
+        self.rebuild_seconds = float(os.getenv("JOB_AUTOCOMPLETE_REBUILD_SECONDS", "300"))
+        self._state: Optional[Dict[str, Any]] = None
+        self._pending: Set[str] = set()
+        self._writes_during_build: Set[str] = set()
+        self._build_task: Optional[asyncio.Task] = None
+        self._built_at = 0.0
+        self._synced_at = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self._state is not None
+
+    def note_write(self, job_id: Any):
+        """Mark a job as changed; it is re-read before the next lookup"""
+        job_id = str(job_id)
+        self._pending.add(job_id)
+        if self._build_task is not None and not self._build_task.done():
+            self._writes_during_build.add(job_id)
+
+    # ---- building -------------------------------------------------------
+
+    @staticmethod
+    def _new_state() -> Dict[str, Any]:
+        return {
+            "titles": PrefixTrie(),
+            "skills": _Vocabulary(CACHE_SIZE),
+            "locations": _Vocabulary(CACHE_SIZE),
+            "jobs": {},
+            "max_id": None
+        }
+
+    @staticmethod
+    def _apply(state: Dict[str, Any], job_id: str, doc: Optional[Dict[str, Any]]):
+        """Replace what state holds for one job with doc (None or an inactive job removes it)"""
+        previous = state["jobs"].pop(job_id, None)
+        if previous is not None:
+            state["titles"].discard(job_id)
+            state["skills"].add(previous["skills"], -1)
+            state["locations"].add(previous["locations"], -1)
+        if doc is None or doc.get("status") != "active":
+            return
+
+        location = doc.get("location")
+        job = {
+            "title": doc.get("title") or "",
+            "department": doc.get("department") or "",
+            "location": location or "",
+            "skills": extract_skills(doc.get("requirements")),
+            "locations": [location.strip()] if isinstance(location, str) and location.strip() else []
+        }
+        state["jobs"][job_id] = job
+        created_at = doc.get("created_at")
+        created = created_at.timestamp() if isinstance(created_at, datetime) else 0.0
+        state["titles"].put(job_id, prefix_keys(job["title"]) | prefix_keys(job["department"]), (-created, job_id))
+        state["skills"].add(job["skills"], 1)
+        state["locations"].add(job["locations"], 1)
+        if state["max_id"] is None or job_id > state["max_id"]:
+            state["max_id"] = job_id
+
+    @classmethod
+    def build_state(cls, docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        state = cls._new_state()
+        for doc in docs:
+            cls._apply(state, str(doc["_id"]), doc)
+        for trie in (state["titles"], state["skills"].trie, state["locations"].trie):
+            trie.warm()
+        return state
+
+    async def rebuild(self, db) -> int:
+        """Read every active job and build fresh tries off the event loop"""
+        start = time.perf_counter()
+        self._writes_during_build = set()
+        docs = [doc async for doc in db.jobs.find({"status": "active"}, JOB_PROJECTION).batch_size(5000)]
+        state = await asyncio.to_thread(self.build_state, docs)
+        if docs:
+            # Inactive jobs are not indexed but must not be re-polled either
+            state["max_id"] = max(state["max_id"] or "", max(str(doc["_id"]) for doc in docs))
+        self._state = state
+        self._built_at = time.monotonic()
+        self._pending |= self._writes_during_build
+        logger.info(f"Job autocomplete index built over {len(state['jobs'])} active jobs in {time.perf_counter() - start:.2f}s")
+        return len(state["jobs"])
+
+    def _schedule_rebuild(self, db):
+        if self._build_task is not None and not self._build_task.done():
+            return
+
+        async def _run():
+            try:
+                await self.rebuild(db)
+            except Exception as e:
+                logger.error(f"Job autocomplete index build failed: {e}")
+
+        self._build_task = asyncio.create_task(_run())
+
+    async def ensure_ready(self, db) -> bool:
+        """Start or refresh the index in the background; True when lookups can use it"""
+        if not self.enabled:
+            return False
+        if self._state is None or time.monotonic() - self._built_at > self.rebuild_seconds:
+            self._schedule_rebuild(db)
+        if self._state is None:
+            return False
+        await self._sync(db)
+        return True
+
+    # ---- incremental sync -----------------------------------------------
+
+    async def _sync(self, db):
+        state = self._state
+        if self._pending:
+            pending, self._pending = self._pending, set()
+            object_ids = [ObjectId(jid) for jid in pending if ObjectId.is_valid(jid)]
+            found = set()
+            async for doc in db.jobs.find({"_id": {"$in": object_ids}}, JOB_PROJECTION):
+                self._apply(state, str(doc["_id"]), doc)
+                found.add(str(doc["_id"]))
+            for job_id in pending - found:
+                self._apply(state, job_id, None)
+
+        # Jobs inserted outside the gateway
+        if time.monotonic() - self._synced_at >= self.sync_seconds:
+            self._synced_at = time.monotonic()
+            if state["max_id"] and ObjectId.is_valid(state["max_id"]):
+                query = {"_id": {"$gt": ObjectId(state["max_id"])}}
+                async for doc in db.jobs.find(query, JOB_PROJECTION).sort("_id", 1):
+                    self._apply(state, str(doc["_id"]), doc)
+                    state["max_id"] = max(state["max_id"], str(doc["_id"]))
+
+    # ---- lookups --------------------------------------------------------
+
+    @staticmethod
+    def _complete(trie: PrefixTrie, query: str, limit: int, typos: bool) -> List[Hashable]:
+        key = normalize_key(query)[:MAX_KEY_LENGTH]
+        if not key:
+            return []
+        results = trie.complete(key, limit)
+        if typos and len(results) < limit and len(key) >= MIN_TYPO_QUERY:
+            seen = set(results)
+            results += [e for e in trie.complete_fuzzy(key, limit + len(results)) if e not in seen][:limit - len(results)]
+        return results
+
+    def jobs(self, query: str, limit: int = 10, typos: bool = True) -> List[Dict[str, str]]:
+        """Active jobs whose title or department has a word starting with query, newest first"""
+        state = self._state
+        suggestions = []
+        for job_id in self._complete(state["titles"], query, limit, typos):
+            job = state["jobs"][job_id]
+            suggestions.append({"id": job_id, "title": job["title"], "department": job["department"],
+                                "location": job["location"]})
+        return suggestions
+
+    def skills(self, query: str, limit: int = 15, typos: bool = True) -> List[Dict[str, Any]]:
+        """Skills from active job requirements, most used first"""
+        return self._terms(self._state["skills"], query, limit, typos)
+
+    def locations(self, query: str, limit: int = 15, typos: bool = True) -> List[Dict[str, Any]]:
+        """Locations of active jobs, most used first"""
+        return self._terms(self._state["locations"], query, limit, typos)
+
+    def _terms(self, vocabulary: _Vocabulary, query: str, limit: int, typos: bool) -> List[Dict[str, Any]]:
+        suggestions = []
+        for term in self._complete(vocabulary.trie, query, limit, typos):
+            label = vocabulary.label(term)
+            suggestions.append({"id": label, "label": label, "job_count": -vocabulary.trie.rank(term)[0]})
+        return suggestions
+
+    def get_stats(self) -> Dict[str, Any]:
+        state = self._state
+        return {
+            "ready": self.ready,
+            "active_jobs": len(state["jobs"]) if state else 0,
+            "skills": len(state["skills"].trie) if state else 0,
+            "locations": len(state["locations"].trie) if state else 0,
+            "pending_writes": len(self._pending),
+            "building": self._build_task is not None and not self._build_task.done()
+        }
+
+
+job_autocomplete_index = JobAutocompleteIndex()
@@ -0,0 +1,306 @@
+"""
+Bulk Candidate Ingestion for Gateway Service
+Batched dedupe and unordered bulk writes for /v1/candidates/bulk, with large
+uploads run as resumable background jobs stored in MongoDB
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import InsertOne, ReturnDocument
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+ERROR_SAMPLE = 100
+
+
+def candidate_document(candidate: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    """Candidate document for one uploaded row"""
+    return {
+        "name": candidate.get("name", "Unknown"),
+        "email": candidate.get("email", ""),
+        "phone": candidate.get("phone", ""),
+        "location": candidate.get("location", ""),
+        "experience_years": max(0, int(candidate.get("experience_years", 0)) if str(candidate.get("experience_years", 0)).isdigit() else 0),
+        "technical_skills": candidate.get("technical_skills", ""),
+        "seniority_level": candidate.get("designation", candidate.get("seniority_level", "")),
+        "education_level": candidate.get("education_level", ""),
+        "resume_path": candidate.get("cv_url", candidate.get("resume_path", "")),
+        "status": candidate.get("status", "applied"),
+        "created_at": now
+    }
+
+
+def _row_error(row: int, message: str) -> Dict[str, Any]:
+    return {"row": row, "status": "error", "error": f"Candidate {row}: {message}"}
+
+
+class BulkCandidateIngestor:
+    """Writes uploaded candidate rows a batch at a time and runs large uploads in the background"""
+
+    def __init__(self):
+        self.batch_size = int(os.getenv("BULK_INGEST_BATCH_SIZE", "500"))
+        self.sync_limit = int(os.getenv("BULK_INGEST_SYNC_LIMIT", "1000"))
+        self.lease_seconds = float(os.getenv("BULK_INGEST_LEASE_SECONDS", "120"))
+        self.on_inserted: List[Callable[[Dict[str, Any]], None]] = []
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._owner = f"{os.getpid()}-{ObjectId()}"
+
+    # ---- one batch ------------------------------------------------------
+
+    async def ingest_batch(self, db, rows: List[Dict[str, Any]], first_row: int, job_id: Optional[str],
+                           now: datetime, upload_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Insert a batch of uploaded rows with one dedupe lookup and unordered bulk writes.
+
+        Args:
+            db: Motor database
+            rows: Uploaded candidate rows
+            first_row: 1-based row number of rows[0] in the upload
+            job_id: Job to link every new or existing candidate to as an applicant
+            now: Timestamp stored on created documents
+            upload_id: Background upload writing this batch, lets a resumed batch recognise its own inserts
+
+        Returns:
+            list: One result per row with row, status (inserted/duplicate/error), candidate_id or error
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(rows)
+        emails = {}
+        for i, candidate in enumerate(rows):
+            email = candidate.get("email", "")
+            if not email:
+                results[i] = _row_error(first_row + i, "Email is required")
+            else:
+                emails.setdefault(email, []).append(i)
+
+        existing = {}
+        if emails:
+            async for doc in db.candidates.find({"email": {"$in": list(emails)}}, {"email": 1, "bulk_upload_id": 1, "bulk_upload_row": 1}):
+                existing[doc["email"]] = doc
+
+        inserts = []
+        for email, positions in emails.items():
+            doc = existing.get(email)
+            resumed = doc is not None and upload_id is not None and doc.get("bulk_upload_id") == upload_id \
+                and doc.get("bulk_upload_row") - first_row in positions
+            if resumed:
+                # This very row was written by the upload before an interruption
+                i = doc["bulk_upload_row"] - first_row
+                results[i] = {"row": first_row + i, "status": "inserted", "candidate_id": str(doc["_id"])}
+                positions = [p for p in positions if p != i]
+            elif doc is None:
+                document = candidate_document(rows[positions[0]], now)
+                document["_id"] = ObjectId()
+                if upload_id is not None:
+                    document["bulk_upload_id"] = upload_id
+                    document["bulk_upload_row"] = first_row + positions[0]
+                inserts.append((positions[0], document))
+                existing[email] = document
+                positions = positions[1:]
+            for i in positions:
+                results[i] = {"row": first_row + i, "status": "duplicate", "candidate_id": str(existing[email]["_id"]),
+                              "error": f"Candidate {first_row + i}: Email {email} already exists"}
+
+        failed: Dict[int, Dict[str, Any]] = {}
+        if inserts:
+            try:
+                await db.candidates.bulk_write([InsertOne(document) for _, document in inserts], ordered=False)
+            except BulkWriteError as e:
+                for error in e.details.get("writeErrors", []):
+                    failed[error["index"]] = error
+        for index, (i, document) in enumerate(inserts):
+            row = first_row + i
+            error = failed.get(index)
+            if error is None:
+                results[i] = {"row": row, "status": "inserted", "candidate_id": str(document["_id"])}
+                for callback in self.on_inserted:
+                    callback(document)
+            elif error.get("code") == DUPLICATE_KEY:
+                # Another writer inserted the same email since the lookup
+                results[i] = {"row": row, "status": "duplicate", "error": f"Candidate {row}: Email {document['email']} already exists"}
+            else:
+                results[i] = _row_error(row, str(error.get("errmsg", ""))[:100])
+
+        raced = {document["email"]: i for i, document in inserts if results[i]["status"] == "duplicate"}
+        if raced:
+            async for doc in db.candidates.find({"email": {"$in": list(raced)}}, {"email": 1}):
+                results[raced[doc["email"]]]["candidate_id"] = str(doc["_id"])
+
+        if job_id:
+            await self._link_applications(db, job_id, results, now)
+        return results
+
+    @staticmethod
+    async def _link_applications(db, job_id: str, results: List[Dict[str, Any]], now: datetime):
+        """Link new and existing candidates to the job so dashboard applicant counts stay in sync"""
+        candidate_ids = list(dict.fromkeys(r["candidate_id"] for r in results if r.get("candidate_id")))
+        if not candidate_ids:
+            return
+        linked = set()
+        async for doc in db.job_applications.find({"job_id": job_id, "candidate_id": {"$in": candidate_ids}}, {"candidate_id": 1}):
+            linked.add(doc.get("candidate_id"))
+        missing = [cid for cid in candidate_ids if cid not in linked]
+        if missing:
+            await db.job_applications.bulk_write([InsertOne({
+                "job_id": job_id,
+                "candidate_id": cid,
+                "status": "applied",
+                "applied_date": now
+            }) for cid in missing], ordered=False)
+
+    async def ingest(self, db, rows: List[Dict[str, Any]], job_id: Optional[str]) -> List[Dict[str, Any]]:
+        """Ingest an upload inline, batch by batch"""
+        now = datetime.now(timezone.utc)
+        results = []
+        for start in range(0, len(rows), self.batch_size):
+            results += await self.ingest_batch(db, rows[start:start + self.batch_size], start + 1, job_id, now)
+        return results
+
+    # ---- background uploads ---------------------------------------------
+
+    async def submit(self, db, rows: List[Dict[str, Any]], job_id: Optional[str], created_by: Optional[str]) -> str:
+        """Store an upload as chunk documents and start processing it; returns the upload id"""
+        upload_id = ObjectId()
+        now = datetime.now(timezone.utc)
+        chunks = [{
+            "upload_id": upload_id,
+            "seq": seq,
+            "first_row": start + 1,
+            "rows": rows[start:start + self.batch_size]
+        } for seq, start in enumerate(range(0, len(rows), self.batch_size))]
+        await db.bulk_upload_chunks.insert_many(chunks, ordered=False)
+        await db.bulk_uploads.insert_one({
+            "_id": upload_id,
+            "status": "queued",
+            "job_id": job_id,
+            "created_by": created_by,
+            "total_rows": len(rows),
+            "total_chunks": len(chunks),
+            "next_chunk": 0,
+            "processed_rows": 0,
+            "inserted": 0,
+            "duplicates": 0,
+            "failed": 0,
+            "errors": [],
+            "lease_owner": None,
+            "lease_until": now,
+            "created_at": now,
+            "updated_at": now
+        })
+        self._start(db, str(upload_id))
+        return str(upload_id)
+
+    def _start(self, db, upload_id: str):
+        task = self._tasks.get(upload_id)
+        if task is None or task.done():
+            self._tasks[upload_id] = asyncio.create_task(self._run(db, upload_id))
+
+    async def _claim(self, db, upload_id: ObjectId) -> Optional[Dict[str, Any]]:
+        """Take (or renew) the lease on an unfinished upload"""
+        now = datetime.now(timezone.utc)
+        return await db.bulk_uploads.find_one_and_update(
+            {"_id": upload_id, "status": {"$in": ["queued", "running"]},
+             # $lte: MongoDB keeps milliseconds, so a lease set "now" at submit can compare equal here
+             "$or": [{"lease_owner": self._owner}, {"lease_until": {"$lte": now}}]},
+            {"$set": {"status": "running", "lease_owner": self._owner,
+                      "lease_until": now + timedelta(seconds=self.lease_seconds), "updated_at": now}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _run(self, db, upload_id: str):
+        oid = ObjectId(upload_id)
+        start = time.perf_counter()
+        try:
+            while True:
+                upload = await self._claim(db, oid)
+                if upload is None:
+                    # Finished, or another gateway process holds the lease
+                    return
+                seq = upload["next_chunk"]
+                if seq >= upload["total_chunks"]:
+                    break
+                chunk = await db.bulk_upload_chunks.find_one({"upload_id": oid, "seq": seq})
+                rows = chunk["rows"] if chunk else []
+                results = await self.ingest_batch(db, rows, chunk["first_row"] if chunk else 0,
+                                                  upload.get("job_id"), upload["created_at"], upload_id)
+                errors = [r["error"] for r in results if r["status"] != "inserted"]
+                # Progress and the next chunk move together, so a restart resumes at the first unfinished chunk
+                await db.bulk_uploads.update_one({"_id": oid, "next_chunk": seq}, {
+                    "$set": {"next_chunk": seq + 1, "updated_at": datetime.now(timezone.utc)},
+                    "$inc": {
+                        "processed_rows": len(rows),
+                        "inserted": sum(1 for r in results if r["status"] == "inserted"),
+                        "duplicates": sum(1 for r in results if r["status"] == "duplicate"),
+                        "failed": sum(1 for r in results if r["status"] == "error")
+                    },
+                    "$push": {"errors": {"$each": errors, "$slice": ERROR_SAMPLE}}
+                })
+                if chunk:
+                    await db.bulk_upload_chunks.update_one({"_id": chunk["_id"]}, {"$set": {"results": results}, "$unset": {"rows": ""}})
+
+            await db.bulk_uploads.update_one({"_id": oid}, {"$set": {
+                "status": "completed", "lease_owner": None, "completed_at": datetime.now(timezone.utc)
+            }})
+            logger.info(f"Bulk upload {upload_id} completed in {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            logger.error(f"Bulk upload {upload_id} interrupted: {e}")
+            # Leave it running with an expired lease so the next resume() picks it up
+            await db.bulk_uploads.update_one({"_id": oid}, {"$set": {
+                "lease_until": datetime.now(timezone.utc), "last_error": str(e)[:200]
+            }})
+        finally:
+            self._tasks.pop(upload_id, None)
+
+    async def resume(self, db) -> int:
+        """Restart uploads whose worker stopped (process restart or failure); returns how many"""
+        resumed = 0
+        now = datetime.now(timezone.utc)
+        async for upload in db.bulk_uploads.find({"status": {"$in": ["queued", "running"]}, "lease_until": {"$lte": now}}, {"_id": 1}):
+            upload_id = str(upload["_id"])
+            if upload_id not in self._tasks:
+                self._start(db, upload_id)
+                resumed += 1
+        if resumed:
+            logger.info(f"Resuming {resumed} bulk uploads")
+        return resumed
+
+    async def status(self, db, upload_id: str, include_rows: bool = False) -> Optional[Dict[str, Any]]:
+        """Progress of a background upload, optionally with every per-row result written so far"""
+        if not ObjectId.is_valid(upload_id):
+            return None
+        upload = await db.bulk_uploads.find_one({"_id": ObjectId(upload_id)})
+        if upload is None:
+            return None
+        total = upload["total_rows"] or 1
+        report = {
+            "upload_id": upload_id,
+            "status": upload["status"],
+            "job_id": upload.get("job_id"),
+            "created_by": upload.get("created_by"),
+            "candidates_received": upload["total_rows"],
+            "processed_rows": upload["processed_rows"],
+            "progress": round(upload["processed_rows"] / total, 4),
+            "candidates_inserted": upload["inserted"],
+            "duplicates": upload["duplicates"],
+            "failed": upload["failed"],
+            "errors": upload.get("errors", []),
+            "total_errors": upload["duplicates"] + upload["failed"],
+            "created_at": upload["created_at"].isoformat() if upload.get("created_at") else None,
+            "completed_at": upload["completed_at"].isoformat() if upload.get("completed_at") else None
+        }
+        if include_rows:
+            rows = []
+            async for chunk in db.bulk_upload_chunks.find({"upload_id": upload["_id"], "results": {"$exists": True}},
+                                                          {"results": 1}).sort("seq", 1):
+                rows += chunk["results"]
+            report["results"] = rows
+        return report
+
+
+bulk_ingestor = BulkCandidateIngestor()
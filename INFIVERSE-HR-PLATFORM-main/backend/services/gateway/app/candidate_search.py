@@ -0,0 +1,464 @@
+"""
+Candidate Search Index for Gateway Service
+In-process trigram and inverted index over candidate search fields, serving
+/v1/candidates/search with keyset pagination and estimated totals
+"""
+import asyncio
+import heapq
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+from bson import ObjectId
+
+logger = logging.getLogger(__name__)
+
+# Free-text fields get a trigram index; low-cardinality fields an inverted index by value
+TRIGRAM_FIELDS = ("name", "email", "technical_skills")
+CATEGORY_FIELDS = ("location", "education_level", "seniority_level")
+INDEX_PROJECTION = {field: 1 for field in TRIGRAM_FIELDS + CATEGORY_FIELDS + ("experience_years", "status")}
+
+_MISSING = -1
+
+
+def _text_value(value: Any) -> Optional[str]:
+    """Lower-cased text a case-insensitive $regex would test, None when it cannot match"""
+    if isinstance(value, str):
+        return value.lower()
+    if isinstance(value, list):
+        # $regex matches any string element; NUL keeps elements from joining into a match
+        parts = [v.lower() for v in value if isinstance(v, str)]
+        return "\x00".join(parts) if parts else None
+    return None
+
+
+def _number(value: Any) -> float:
+    """Numeric value for range filters; non-numbers never satisfy $gte/$lte"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return float("nan")
+    return float(value)
+
+
+def candidate_record(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce a candidate document to the values the index matches on"""
+    record = {
+        "id": str(doc["_id"]),
+        "experience": _number(doc.get("experience_years")),
+        "status": doc.get("status") if isinstance(doc.get("status"), str) else None,
+    }
+    for field in TRIGRAM_FIELDS:
+        text = _text_value(doc.get(field))
+        record[field] = text.encode("utf-8") if text is not None else None
+    for field in CATEGORY_FIELDS:
+        record[field] = _text_value(doc.get(field))
+    return record
+
+
+def _contains(haystack, needles) -> bool:
+    return haystack is not None and any(needle in haystack for needle in needles)
+
+
+def _trigram_codes(data: bytes) -> np.ndarray:
+    arr = np.frombuffer(data, dtype=np.uint8).astype(np.uint32)
+    if len(arr) < 3:
+        return np.empty(0, dtype=np.uint32)
+    return np.unique((arr[:-2] << 16) | (arr[1:-1] << 8) | arr[2:])
+
+
+class _TrigramField:
+    """Concatenated lower-cased text plus trigram postings for one field"""
+
+    CHUNK_DOCS = 200_000
+
+    def __init__(self, values: List[Optional[bytes]]):
+        n = len(values)
+        lengths = np.fromiter((len(v) if v is not None else 0 for v in values), dtype=np.int64, count=n)
+        self.present = np.fromiter((v is not None for v in values), dtype=bool, count=n)
+        self.offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.offsets[1:])
+        self.blob = b"".join(v for v in values if v)
+
+        # (trigram << 32 | ordinal) pairs, built a chunk of documents at a time to bound memory
+        pairs = []
+        data = np.frombuffer(self.blob, dtype=np.uint8).astype(np.uint32)
+        for start in range(0, n, self.CHUNK_DOCS):
+            stop = min(n, start + self.CHUNK_DOCS)
+            lo, hi = self.offsets[start], self.offsets[stop]
+            if hi - lo < 3:
+                continue
+            chunk = data[lo:hi]
+            codes = (chunk[:-2] << 16) | (chunk[1:-1] << 8) | chunk[2:]
+            owner = np.repeat(np.arange(start, stop, dtype=np.int64), lengths[start:stop])[:len(codes)]
+            inside = np.arange(lo, hi - 2) + 3 <= self.offsets[owner + 1]
+            pairs.append((codes[inside].astype(np.uint64) << np.uint64(32)) | owner[inside].astype(np.uint64))
+        keys = np.concatenate(pairs) if pairs else np.empty(0, dtype=np.uint64)
+        keys.sort()
+        if len(keys):
+            # A trigram repeated within one document posts it once
+            keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+        trigrams = (keys >> np.uint64(32)).astype(np.uint32)
+        self.ordinals = (keys & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+        starts = np.flatnonzero(np.concatenate(([True], trigrams[1:] != trigrams[:-1]))) if len(trigrams) \
+            else np.empty(0, dtype=np.int64)
+        self.trigrams = trigrams[starts]
+        self.starts = np.append(starts, len(trigrams)).astype(np.int64)
+
+    def text(self, ordinal: int) -> Optional[bytes]:
+        if not self.present[ordinal]:
+            return None
+        return self.blob[self.offsets[ordinal]:self.offsets[ordinal + 1]]
+
+    def candidates(self, needle: bytes) -> Optional[np.ndarray]:
+        """Sorted ordinals holding every trigram of needle, None when needle is too short to index"""
+        codes = _trigram_codes(needle)
+        if len(codes) == 0:
+            return None
+        positions = np.searchsorted(self.trigrams, codes)
+        postings = []
+        for code, pos in zip(codes, positions):
+            if pos >= len(self.trigrams) or self.trigrams[pos] != code:
+                return np.empty(0, dtype=np.uint32)
+            postings.append(self.ordinals[self.starts[pos]:self.starts[pos + 1]])
+        postings.sort(key=len)
+        result = postings[0]
+        for posting in postings[1:]:
+            if len(result) == 0:
+                break
+            result = np.intersect1d(result, posting, assume_unique=True)
+        return result
+
+
+class _CategoryField:
+    """Inverted index from distinct lower-cased value to the ordinals holding it"""
+
+    def __init__(self, values: List[Optional[str]]):
+        self.vocab: List[str] = []
+        lookup: Dict[str, int] = {}
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            if value is None:
+                codes[i] = _MISSING
+                continue
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(self.vocab)
+                self.vocab.append(value)
+            codes[i] = code
+        self.codes = codes
+
+    def value(self, ordinal: int) -> Optional[str]:
+        code = self.codes[ordinal]
+        return self.vocab[code] if code != _MISSING else None
+
+    def mask(self, needles: List[str]) -> np.ndarray:
+        """Ordinals whose value contains any needle"""
+        return self._codes_mask(code for code, value in enumerate(self.vocab) if _contains(value, needles))
+
+    def exact_mask(self, values: Set[str]) -> np.ndarray:
+        """Ordinals whose value is one of values"""
+        return self._codes_mask(code for code, value in enumerate(self.vocab) if value in values)
+
+    def _codes_mask(self, codes: Iterable[int]) -> np.ndarray:
+        return np.isin(self.codes, np.fromiter(codes, dtype=np.int32))
+
+
+class _Snapshot:
+    """Immutable index over every candidate present when it was built, in _id order"""
+
+    def __init__(self, records: List[Dict[str, Any]]):
+        records.sort(key=lambda r: r["id"])
+        self.size = len(records)
+        self.ids = np.array([r["id"] for r in records], dtype=str)
+        self.experience = np.fromiter((r["experience"] for r in records), dtype=np.float64, count=self.size)
+        self.text = {field: _TrigramField([r[field] for r in records]) for field in TRIGRAM_FIELDS}
+        self.categories = {field: _CategoryField([r[field] for r in records]) for field in CATEGORY_FIELDS}
+        # Status filters match the stored value exactly, so it is indexed without lower-casing
+        self.status = _CategoryField([r["status"] for r in records])
+
+    def position(self, candidate_id: str) -> Optional[int]:
+        pos = int(np.searchsorted(self.ids, candidate_id))
+        if pos < self.size and self.ids[pos] == candidate_id:
+            return pos
+        return None
+
+
+class CandidateSearchIndex:
+    """Trigram/inverted candidate index with an overlay for writes since the last build"""
+
+    def __init__(self):
+        self.enabled = os.getenv("CANDIDATE_SEARCH_INDEX_ENABLED", "true").lower() == "true"
+        self.sync_seconds = float(os.getenv("CANDIDATE_SEARCH_SYNC_SECONDS", "5"))
+        self.rebuild_seconds = float(os.getenv("CANDIDATE_SEARCH_REBUILD_SECONDS", "3600"))
+        self.max_overlay = int(os.getenv("CANDIDATE_SEARCH_MAX_OVERLAY", "20000"))
+        self.exact_count_limit = int(os.getenv("CANDIDATE_SEARCH_EXACT_COUNT_LIMIT", "20000"))
+        self.count_sample = int(os.getenv("CANDIDATE_SEARCH_COUNT_SAMPLE", "2000"))
+        self._snapshot: Optional[_Snapshot] = None
+        self._dirty = np.zeros(0, dtype=bool)
+        # Current records for base documents changed since the build and for new documents (None = deleted)
+        self._overlay: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._pending: Set[str] = set()
+        self._writes_during_build: Set[str] = set()
+        self._build_task: Optional[asyncio.Task] = None
+        self._built_at = 0.0
+        self._synced_at = 0.0
+        self._max_id: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._snapshot is not None
+
+    def note_write(self, candidate_id: Any):
+        """Mark a candidate as changed; it is re-read before the next search"""
+        candidate_id = str(candidate_id)
+        self._pending.add(candidate_id)
+        if self._build_task is not None and not self._build_task.done():
+            self._writes_during_build.add(candidate_id)
+
+    # ---- building -------------------------------------------------------
+
+    def build(self, records: List[Dict[str, Any]]):
+        """Replace the index with one built from candidate records"""
+        snapshot = _Snapshot(records)
+        self._install(snapshot)
+
+    def _install(self, snapshot: _Snapshot):
+        self._snapshot = snapshot
+        self._dirty = np.zeros(snapshot.size, dtype=bool)
+        self._overlay = {}
+        self._max_id = str(snapshot.ids[-1]) if snapshot.size else None
+        self._built_at = time.monotonic()
+
+    async def rebuild(self, db) -> int:
+        """Stream every candidate from MongoDB and build a fresh snapshot off the event loop"""
+        start = time.perf_counter()
+        self._writes_during_build = set()
+        records = []
+        async for doc in db.candidates.find({}, INDEX_PROJECTION).batch_size(5000):
+            records.append(candidate_record(doc))
+        snapshot = await asyncio.to_thread(_Snapshot, records)
+        self._install(snapshot)
+        # Writes that raced the build may be missing from it
+        self._pending |= self._writes_during_build
+        self._synced_at = 0.0
+        logger.info(f"Candidate search index built over {snapshot.size} candidates in {time.perf_counter() - start:.1f}s")
+        return snapshot.size
+
+    def _schedule_rebuild(self, db):
+        if self._build_task is not None and not self._build_task.done():
+            return
+
+        async def _run():
+            try:
+                await self.rebuild(db)
+            except Exception as e:
+                logger.error(f"Candidate search index build failed: {e}")
+
+        self._build_task = asyncio.create_task(_run())
+
+    async def ensure_ready(self, db) -> bool:
+        """Start or refresh the index in the background; True when searches can use it"""
+        if not self.enabled:
+            return False
+        stale = time.monotonic() - self._built_at > self.rebuild_seconds
+        if self._snapshot is None or stale or len(self._overlay) > self.max_overlay:
+            self._schedule_rebuild(db)
+        if self._snapshot is None:
+            return False
+        await self._sync(db)
+        return True
+
+    # ---- incremental sync -----------------------------------------------
+
+    def upsert(self, doc: Dict[str, Any]):
+        record = candidate_record(doc)
+        self._put(record["id"], record)
+
+    def remove(self, candidate_id: Any):
+        self._put(str(candidate_id), None)
+
+    def _put(self, candidate_id: str, record: Optional[Dict[str, Any]]):
+        if self._snapshot is None:
+            return
+        position = self._snapshot.position(candidate_id)
+        if position is not None:
+            self._dirty[position] = True
+        elif record is None:
+            self._overlay.pop(candidate_id, None)
+            return
+        self._overlay[candidate_id] = record
+        if record is not None and (self._max_id is None or candidate_id > self._max_id):
+            self._max_id = candidate_id
+
+    async def _sync(self, db):
+        # Read-your-writes: re-read every candidate written through the gateway since the last search
+        if self._pending:
+            pending, self._pending = self._pending, set()
+            object_ids = [ObjectId(cid) for cid in pending if ObjectId.is_valid(cid)]
+            found = set()
+            async for doc in db.candidates.find({"_id": {"$in": object_ids}}, INDEX_PROJECTION):
+                self.upsert(doc)
+                found.add(str(doc["_id"]))
+            for cid in pending - found:
+                self.remove(cid)
+
+        # Other services insert candidates too; pick them up by _id
+        if time.monotonic() - self._synced_at >= self.sync_seconds:
+            self._synced_at = time.monotonic()
+            if self._max_id and ObjectId.is_valid(self._max_id):
+                query = {"_id": {"$gt": ObjectId(self._max_id)}}
+                async for doc in db.candidates.find(query, INDEX_PROJECTION).sort("_id", 1):
+                    self.upsert(doc)
+
+    # ---- searching ------------------------------------------------------
+
+    @staticmethod
+    def _record_matches(record: Dict[str, Any], constraints, statuses, experience_min, experience_max) -> bool:
+        for fields, text_needles, byte_needles in constraints:
+            if not any(_contains(record[field], byte_needles if field in TRIGRAM_FIELDS else text_needles)
+                       for field in fields):
+                return False
+        if statuses is not None and record["status"] not in statuses:
+            return False
+        experience = record["experience"]
+        if experience_min is not None and not experience >= experience_min:
+            return False
+        if experience_max is not None and not experience <= experience_max:
+            return False
+        return True
+
+    def search(self, text: Optional[str] = None, text_fields: Iterable[str] = TRIGRAM_FIELDS,
+               skills: Optional[str] = None, location: Optional[str] = None,
+               education_tokens: Optional[List[str]] = None, seniority_tokens: Optional[List[str]] = None,
+               statuses: Optional[List[str]] = None, experience_min: Optional[float] = None,
+               experience_max: Optional[float] = None, scope_ids: Optional[Iterable[str]] = None,
+               limit: int = 50, offset: int = 0, after: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Find the candidates a case-insensitive substring query would return, in _id order.
+
+        Args:
+            text: Substring matched against any of text_fields
+            skills, location: Substrings of technical_skills / location
+            education_tokens, seniority_tokens: Any-of substrings of education_level / seniority_level
+            statuses: Exact status values
+            experience_min, experience_max: Inclusive numeric range on experience_years
+            scope_ids: Restrict to these candidate ids
+            limit: Page size
+            offset: Matches to skip (legacy pagination)
+            after: Keyset cursor, only candidates with a larger _id are returned
+
+        Returns:
+            dict: Page ids, total (estimated when total_estimated is set) and next_cursor
+        """
+        snapshot = self._snapshot
+        # (fields, text needles, utf-8 needles): satisfied when any field contains any needle
+        constraints = []
+        if text:
+            constraints.append((tuple(text_fields), [text.lower()], [text.lower().encode("utf-8")]))
+        for field, needles in (("technical_skills", [skills] if skills else None),
+                               ("location", [location] if location else None),
+                               ("education_level", education_tokens),
+                               ("seniority_level", seniority_tokens)):
+            if needles:
+                lowered = [n.lower() for n in needles]
+                constraints.append(((field,), lowered, [n.encode("utf-8") for n in lowered]))
+        status_set = set(statuses) if statuses else None
+
+        # Base snapshot: every constraint narrows one boolean mask
+        mask = ~self._dirty
+        verify = []
+        for fields, text_needles, byte_needles in constraints:
+            if fields[0] in CATEGORY_FIELDS:
+                mask &= snapshot.categories[fields[0]].mask(text_needles)
+                continue
+            hits = np.zeros(snapshot.size, dtype=bool)
+            for field in fields:
+                for needle in byte_needles:
+                    found = snapshot.text[field].candidates(needle)
+                    if found is None:
+                        # Too short for trigrams: anything holding the field is a candidate
+                        hits |= snapshot.text[field].present
+                    else:
+                        hits[found] = True
+            mask &= hits
+            # Trigram hits are candidates only; the substring itself is checked per document
+            verify.append((fields, byte_needles))
+        if status_set is not None:
+            mask &= snapshot.status.exact_mask(status_set)
+        if experience_min is not None:
+            mask &= snapshot.experience >= experience_min
+        if experience_max is not None:
+            mask &= snapshot.experience <= experience_max
+        scope = None
+        if scope_ids is not None:
+            scope = set(str(cid) for cid in scope_ids)
+            in_scope = np.zeros(snapshot.size, dtype=bool)
+            in_scope[[p for p in map(snapshot.position, scope) if p is not None]] = True
+            mask &= in_scope
+        base = np.flatnonzero(mask)
+
+        def verified(ordinal: int) -> bool:
+            return all(any(_contains(snapshot.text[f].text(ordinal), needles) for f in fields)
+                       for fields, needles in verify)
+
+        # Overlay: changed and new candidates are checked directly
+        overlay = sorted(
+            cid for cid, record in self._overlay.items()
+            if record is not None and (scope is None or cid in scope)
+            and self._record_matches(record, constraints, status_set, experience_min, experience_max)
+        )
+
+        base_after, overlay_after = base, overlay
+        if after:
+            start = int(np.searchsorted(snapshot.ids, after, side="right"))
+            base_after = base[np.searchsorted(base, start):]
+            overlay_after = [cid for cid in overlay if cid > after]
+
+        page: List[str] = []
+        checked = matched = 0
+        if not verify and not overlay_after:
+            page = [str(candidate_id) for candidate_id in snapshot.ids[base_after[offset:offset + limit]]]
+        else:
+            # Walk base and overlay matches together in _id order
+            skipped = 0
+            sample = self.count_sample if len(base) > self.exact_count_limit else 0
+            merged = heapq.merge(((str(snapshot.ids[o]), int(o)) for o in base_after),
+                                 ((cid, None) for cid in overlay_after))
+            for candidate_id, ordinal in merged:
+                if len(page) >= limit and checked >= sample:
+                    break
+                if ordinal is not None and verify:
+                    checked += 1
+                    if not verified(ordinal):
+                        continue
+                    matched += 1
+                if len(page) >= limit:
+                    continue
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                page.append(candidate_id)
+
+        if not verify:
+            total, estimated = len(base) + len(overlay), False
+        elif len(base) <= self.exact_count_limit:
+            total, estimated = sum(1 for o in base if verified(int(o))) + len(overlay), False
+        else:
+            precision = matched / checked if checked else 1.0
+            total, estimated = int(round(len(base) * precision)) + len(overlay), True
+
+        next_cursor = page[-1] if len(page) == limit else None
+        return {"ids": page, "total": total, "total_estimated": estimated, "next_cursor": next_cursor}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "indexed_candidates": self._snapshot.size if self._snapshot else 0,
+            "overlay_candidates": len(self._overlay),
+            "pending_writes": len(self._pending),
+            "building": self._build_task is not None and not self._build_task.done()
+        }
+
+
+candidate_search_index = CandidateSearchIndex()
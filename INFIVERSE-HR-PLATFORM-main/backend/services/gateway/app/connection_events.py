@@ -0,0 +1,316 @@
+"""
+Connection Event Broker for Gateway Service
+Fan-out of client/recruiter connection events to SSE subscribers through bounded
+per-subscriber queues, with an optional SQLite event log that gives every event an
+offset for replay after reconnects and lets gateway workers on one host share events
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from bson import ObjectId
+
+logger = logging.getLogger(__name__)
+
+LAG_SAMPLES = 1000
+
+# (offset, event, published_at epoch seconds)
+Envelope = Tuple[int, Dict[str, Any], float]
+
+
+class Subscription:
+    """One SSE connection's view of a channel: replayed events first, then live ones"""
+
+    def __init__(self, broker: "ConnectionEventBroker", channel: str, queue_size: int):
+        self.broker = broker
+        self.channel = channel
+        self.queue: Deque[Envelope] = deque(maxlen=queue_size)
+        self.backlog: Deque[Envelope] = deque()
+        # Offset the next replay page starts after; None once replay has caught up with the log
+        self.replay_after: Optional[int] = None
+        # Live events at or below this offset were already replayed from the log
+        self.replayed_through = 0
+        self.dropped = 0
+        self._wakeup = asyncio.Event()
+
+    def offer(self, envelope: Envelope):
+        if len(self.queue) == self.queue.maxlen:
+            # A slow reader loses its oldest event rather than holding memory for it
+            self.dropped += 1
+            self.broker.stats["dropped"] += 1
+        self.queue.append(envelope)
+        self._wakeup.set()
+
+    async def get(self, timeout: float) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """Next (offset, event), or None if nothing arrived within timeout"""
+        deadline = time.monotonic() + timeout
+        while True:
+            if not self.backlog and self.replay_after is not None:
+                await self.broker._replay_page(self)
+            if self.backlog:
+                offset, event, _ = self.backlog.popleft()
+                return offset, event
+            while self.queue:
+                offset, event, published_at = self.queue.popleft()
+                # Events published during replay are in both the backlog and the queue
+                if offset <= self.replayed_through:
+                    continue
+                self.broker._record_delivery(published_at)
+                return offset, event
+            self._wakeup.clear()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return None
+
+    def close(self):
+        self.broker._unsubscribe(self)
+
+
+class _EventLog:
+    """Append-only SQLite table of published events; blocking, so callers run it in a thread"""
+
+    def __init__(self, path: str, max_events: int):
+        self.path = path
+        self.max_events = max_events
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS connection_events ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT NOT NULL, payload TEXT NOT NULL, "
+            "published_at REAL NOT NULL, origin TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_connection_events_channel ON connection_events (channel, id)")
+        self._conn.commit()
+        self._appends = 0
+
+    def append(self, channel: str, event: Dict[str, Any], published_at: float, origin: str) -> int:
+        with self._lock:
+            offset = self._conn.execute(
+                "INSERT INTO connection_events (channel, payload, published_at, origin) VALUES (?, ?, ?, ?)",
+                (channel, json.dumps(event), published_at, origin)
+            ).lastrowid
+            self._appends += 1
+            if self._appends % 100 == 0:
+                self._conn.execute("DELETE FROM connection_events WHERE id <= ?", (offset - self.max_events,))
+            self._conn.commit()
+            return offset
+
+    def read_channel(self, channel: str, after: int, limit: int) -> List[Envelope]:
+        """Up to `limit` events on a channel after an offset, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, payload, published_at FROM connection_events WHERE channel = ? AND id > ? ORDER BY id LIMIT ?",
+                (channel, after, limit)
+            ).fetchall()
+        return [(offset, json.loads(payload), published_at) for offset, payload, published_at in rows]
+
+    def first_offset(self) -> int:
+        """Oldest offset still in the log (0 when empty); anything before it was pruned"""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MIN(id), 0) FROM connection_events").fetchone()[0]
+
+    def read_foreign(self, after: int, origin: str) -> Tuple[int, List[Tuple[str, Envelope]]]:
+        """Events other workers appended after an offset, and the highest offset seen"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, channel, payload, published_at, origin FROM connection_events WHERE id > ? ORDER BY id",
+                (after,)
+            ).fetchall()
+        last = rows[-1][0] if rows else after
+        return last, [(channel, (offset, json.loads(payload), published_at))
+                      for offset, channel, payload, published_at, row_origin in rows if row_origin != origin]
+
+    def last_offset(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM connection_events").fetchone()[0]
+
+
+class ConnectionEventBroker:
+    """Channels such as 'client:123' or 'recruiter:456', each with any number of SSE subscribers"""
+
+    def __init__(self):
+        self.queue_size = int(os.getenv("CONNECTION_EVENTS_QUEUE_SIZE", "32"))
+        self.log_path = os.getenv("CONNECTION_EVENTS_LOG_PATH", "").strip()
+        self.log_max_events = int(os.getenv("CONNECTION_EVENTS_LOG_MAX_EVENTS", "10000"))
+        self.replay_limit = int(os.getenv("CONNECTION_EVENTS_REPLAY_LIMIT", "100"))
+        self.poll_seconds = float(os.getenv("CONNECTION_EVENTS_POLL_SECONDS", "1"))
+        self._channels: Dict[str, Set[Subscription]] = {}
+        self._log: Optional[_EventLog] = None
+        self._log_failed = False
+        self._origin = f"{os.getpid()}-{ObjectId()}"
+        self._local_offset = 0
+        self._tail_offset = 0
+        self._tail_task: Optional[asyncio.Task] = None
+        self._lags: Deque[float] = deque(maxlen=LAG_SAMPLES)
+        self.stats = {"published": 0, "delivered": 0, "replayed": 0, "dropped": 0, "resets": 0, "log_errors": 0}
+
+    # ---- event log ------------------------------------------------------
+
+    def _get_log(self) -> Optional[_EventLog]:
+        if self._log is None and self.log_path and not self._log_failed:
+            try:
+                self._log = _EventLog(self.log_path, self.log_max_events)
+            except Exception as e:
+                # Live fan-out keeps working without replay
+                self._log_failed = True
+                self.stats["log_errors"] += 1
+                logger.warning(f"Connection event log unavailable at {self.log_path}: {e}")
+        return self._log
+
+    def _tailing(self) -> bool:
+        return self._tail_task is not None and not self._tail_task.done()
+
+    async def _ensure_tail(self):
+        """Follow events appended by other workers sharing the log, while anyone here is listening"""
+        if self._get_log() is None or self._tailing():
+            return
+        # Start from the end: anything older reaches new subscribers through replay, not as live events
+        try:
+            offset = await asyncio.to_thread(self._log.last_offset)
+        except Exception as e:
+            self.stats["log_errors"] += 1
+            logger.warning(f"Connection event log read failed: {e}")
+            return
+        if self._tailing():
+            return
+        self._tail_offset = offset
+
+        async def _run():
+            while True:
+                await asyncio.sleep(self.poll_seconds)
+                if not self._channels:
+                    return
+                try:
+                    self._tail_offset, events = await asyncio.to_thread(self._log.read_foreign, self._tail_offset, self._origin)
+                except Exception as e:
+                    self.stats["log_errors"] += 1
+                    logger.warning(f"Connection event log read failed: {e}")
+                    continue
+                for channel, envelope in events:
+                    self._fan_out(channel, envelope)
+
+        self._tail_task = asyncio.create_task(_run())
+
+    # ---- publish / subscribe --------------------------------------------
+
+    def _fan_out(self, channel: str, envelope: Envelope):
+        for subscription in list(self._channels.get(channel, ())):
+            subscription.offer(envelope)
+
+    async def publish(self, channel: str, event: Dict[str, Any]) -> int:
+        """Deliver an event to the channel's subscribers (and append it to the log); returns its offset"""
+        published_at = time.time()
+        offset = None
+        log = self._get_log()
+        if log is not None:
+            try:
+                offset = await asyncio.to_thread(log.append, channel, event, published_at, self._origin)
+            except Exception as e:
+                self.stats["log_errors"] += 1
+                logger.warning(f"Connection event log write failed: {e}")
+        if offset is None:
+            self._local_offset = max(self._local_offset, self._tail_offset) + 1
+            offset = self._local_offset
+        self.stats["published"] += 1
+        self._fan_out(channel, (offset, event, published_at))
+        return offset
+
+    async def subscribe(self, channel: str, after: Optional[int] = None) -> Subscription:
+        """
+        Start receiving a channel's events.
+
+        Args:
+            channel: Channel name
+            after: Offset of the last event the client saw; later events are replayed from the log first,
+                after a "reset" event if some of them were already pruned from it
+
+        Returns:
+            Subscription: call get() for events and close() when the stream ends
+        """
+        await self._ensure_tail()
+        subscription = Subscription(self, channel, self.queue_size)
+        # Register before reading the log so nothing published in between is missed
+        self._channels.setdefault(channel, set()).add(subscription)
+        log = self._get_log()
+        if after is not None and log is not None:
+            try:
+                first = await asyncio.to_thread(log.first_offset)
+            except Exception as e:
+                self.stats["log_errors"] += 1
+                logger.warning(f"Connection event replay failed: {e}")
+                subscription.backlog.append(self._reset_envelope(after))
+                return subscription
+            if first > after + 1:
+                subscription.backlog.append(self._reset_envelope(first - 1))
+            # Pages are read by get() as the backlog drains, so a long gap is replayed in full
+            subscription.replay_after = after
+        return subscription
+
+    def _reset_envelope(self, offset: int) -> Envelope:
+        """Tells the client events were lost and it should reload state; its id stops the next reconnect repeating it"""
+        self.stats["resets"] += 1
+        return offset, {"event": "reset", "reason": "events_unavailable"}, time.time()
+
+    async def _replay_page(self, subscription: Subscription):
+        """Queue the next replay_limit logged events after subscription.replay_after, oldest first"""
+        after = subscription.replay_after
+        try:
+            page = await asyncio.to_thread(self._log.read_channel, subscription.channel, after, self.replay_limit)
+        except Exception as e:
+            self.stats["log_errors"] += 1
+            logger.warning(f"Connection event replay failed: {e}")
+            subscription.replay_after = None
+            subscription.backlog.append(self._reset_envelope(after))
+            return
+        subscription.backlog.extend(page)
+        self.stats["replayed"] += len(page)
+        if page:
+            subscription.replayed_through = page[-1][0]
+        # A short page means the log is exhausted; newer events are already in the live queue
+        subscription.replay_after = page[-1][0] if page and len(page) >= self.replay_limit else None
+
+    def _unsubscribe(self, subscription: Subscription):
+        subscriptions = self._channels.get(subscription.channel)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._channels[subscription.channel]
+
+    # ---- metrics --------------------------------------------------------
+
+    def _record_delivery(self, published_at: float):
+        self.stats["delivered"] += 1
+        self._lags.append(max(0.0, time.time() - published_at))
+
+    def get_stats(self) -> Dict[str, Any]:
+        lags = sorted(self._lags)
+        return {
+            **self.stats,
+            "channels": len(self._channels),
+            "subscribers": sum(len(s) for s in self._channels.values()),
+            "queued": sum(len(sub.queue) for s in self._channels.values() for sub in s),
+            "log": self.log_path if self._log is not None else None,
+            "delivery_lag_ms": {
+                "avg": round(1000 * sum(lags) / len(lags), 2) if lags else None,
+                "p95": round(1000 * lags[int(0.95 * (len(lags) - 1))], 2) if lags else None,
+                "max": round(1000 * lags[-1], 2) if lags else None
+            }
+        }
+
+
+connection_events = ConnectionEventBroker()
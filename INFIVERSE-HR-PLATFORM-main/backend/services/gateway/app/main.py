@@ -17,54 +17,30 @@ import string
 import random
 import jwt
 import bcrypt
-from collections import defaultdict
 # MongoDB imports (migrated from SQLAlchemy/PostgreSQL)
 from app.database import get_mongo_db, get_mongo_client
 from app.db_helpers import find_one_by_field, find_many, count_documents, insert_one, update_one, delete_one, convert_objectid_to_str
+from app.candidate_search import candidate_search_index
+from app.autocomplete import job_autocomplete_index, extract_skills
+from app.stats_materializer import candidate_stats
+from app.bulk_ingest import bulk_ingestor
+from app.resume_parser import resume_parser, ResumeParseError
+from app.rate_limiter import rate_limiter
+from app.agent_client import agent_client, AgentUnavailable
+from app.connection_events import connection_events
+from app.report_export import report_exporter, ReportExportError, MEDIA_TYPES, parse_range
 from bson import ObjectId
 from typing import Optional, List, Dict, Any
 from pydantic import BaseModel, field_validator, Field, model_validator
 import time
 import asyncio
+import heapq
 import logging
 import traceback
 import psutil
 
 logger = logging.getLogger(__name__)
 
-# In-memory SSE channels for connection events (client and recruiter notified simultaneously)
-_connection_event_queues: Dict[str, List[asyncio.Queue]] = {}
-_connection_event_lock = asyncio.Lock()
-
-
-async def _push_connection_event(channel: str, event: Dict[str, Any]) -> None:
-    """Push an event to all subscribers of a channel (e.g. 'client:123' or 'recruiter:456')."""
-    async with _connection_event_lock:
-        queues = list(_connection_event_queues.get(channel, []))
-    for q in queues:
-        try:
-            q.put_nowait(event)
-        except asyncio.QueueFull:
-            pass
-
-
-async def _subscribe_connection_events(channel: str) -> asyncio.Queue:
-    """Subscribe to connection events for a channel. Returns a queue that will receive events."""
-    q: asyncio.Queue = asyncio.Queue(maxsize=32)
-    async with _connection_event_lock:
-        _connection_event_queues.setdefault(channel, []).append(q)
-    return q
-
-
-def _unsubscribe_connection_events(channel: str, q: asyncio.Queue) -> None:
-    async def _remove():
-        async with _connection_event_lock:
-            lst = _connection_event_queues.get(channel, [])
-            if q in lst:
-                lst.remove(q)
-    asyncio.create_task(_remove())
-
-
 # Import configuration
 try:
     from config import validate_config, setup_logging, ENVIRONMENT
@@ -232,13 +208,12 @@ async def metrics_dashboard():
     return {
         "performance_summary": monitor.get_performance_summary(24),
         "business_metrics": monitor.get_business_metrics(),
-        "system_metrics": monitor.collect_system_metrics()
+        "system_metrics": monitor.collect_system_metrics(),
+        "connection_events": connection_events.get_stats()
     }
 
 # Enhanced Granular Rate Limiting
 
-rate_limit_storage = defaultdict(list)
-
 # Granular rate limits by endpoint and user tier
 RATE_LIMITS = {
     "default": {
@@ -258,19 +233,12 @@ RATE_LIMITS = {
 }
 
 def get_dynamic_rate_limit(endpoint: str, user_tier: str = "default") -> int:
-    """Dynamic rate limiting based on system load"""
-    cpu_usage = psutil.cpu_percent()
+    """Dynamic rate limiting based on system load (sampled in the background by the rate limiter)"""
     base_limit = RATE_LIMITS[user_tier].get(endpoint, RATE_LIMITS[user_tier]["default"])
-    
-    if cpu_usage > 80:
-        return int(base_limit * 0.5)  # Reduce by 50% during high load
-    elif cpu_usage < 30:
-        return int(base_limit * 1.5)  # Increase by 50% during low load
-    return base_limit
+    return int(base_limit * rate_limiter.load_factor())
 
 async def rate_limit_middleware(request: Request, call_next):
-    client_ip = request.client.host
-    current_time = time.time()
+    client_ip = request.client.host if request.client else "unknown"
     endpoint_path = request.url.path
     
     # Determine user tier (simplified - in production, get from JWT/database)
@@ -278,27 +246,19 @@ async def rate_limit_middleware(request: Request, call_next):
     
     # Get dynamic rate limit for this endpoint
     rate_limit = get_dynamic_rate_limit(endpoint_path, user_tier)
-    
-    # Clean old requests (older than 1 minute)
-    key = f"{client_ip}:{endpoint_path}"
-    rate_limit_storage[key] = [
-        req_time for req_time in rate_limit_storage[key] 
-        if current_time - req_time < 60
-    ]
+    decision = await rate_limiter.hit(f"{client_ip}:{endpoint_path}", rate_limit)
     
     # Check granular rate limit
-    if len(rate_limit_storage[key]) >= rate_limit:
-        raise HTTPException(
-            status_code=429, 
-            detail=f"Rate limit exceeded for {endpoint_path}. Limit: {rate_limit}/min"
+    if not decision.allowed:
+        # Returned rather than raised: exceptions from http middleware bypass the HTTPException handler
+        return JSONResponse(
+            status_code=429,
+            content={"detail": f"Rate limit exceeded for {endpoint_path}. Limit: {decision.limit}/min"},
+            headers=decision.headers()
         )
     
-    # Record this request
-    rate_limit_storage[key].append(current_time)
-    
     response = await call_next(request)
-    response.headers["X-RateLimit-Limit"] = str(rate_limit)
-    response.headers["X-RateLimit-Remaining"] = str(rate_limit - len(rate_limit_storage[key]))
+    response.headers.update(decision.headers())
     return response
 
 app.middleware("http")(rate_limit_middleware)
@@ -701,6 +661,8 @@ async def create_job(job: JobCreate, auth: dict = Depends(get_auth)):
         
         result = await db.jobs.insert_one(document)
         job_id = str(result.inserted_id)
+        job_autocomplete_index.note_write(job_id)
+        candidate_stats.record_insert("jobs", document)
         
         return {
             "message": "Job created successfully",
@@ -815,7 +777,7 @@ async def list_jobs(
 
 
 @app.get("/v1/jobs/autocomplete", tags=["Job Management"])
-async def jobs_autocomplete(q: Optional[str] = None, limit: int = 10):
+async def jobs_autocomplete(q: Optional[str] = None, limit: int = 10, typo_tolerance: bool = True):
     """Search-as-you-type: return job suggestions by title or department (public for candidate job search)."""
     def _normalize_autocomplete_query(raw: str) -> str:
         """Normalize user query for autocomplete matching.
@@ -850,6 +812,8 @@ async def jobs_autocomplete(q: Optional[str] = None, limit: int = 10):
     limit = max(1, min(limit, 20))
     try:
         db = await get_mongo_db()
+        if await job_autocomplete_index.ensure_ready(db):
+            return {"suggestions": job_autocomplete_index.jobs(q_norm, limit, typo_tolerance)}
         regex_pat = _fuzzy_regex_from_query(q_norm) or re.escape(q_norm)
         regex = {"$regex": regex_pat, "$options": "i"}
         cursor = db.jobs.find({
@@ -870,21 +834,8 @@ async def jobs_autocomplete(q: Optional[str] = None, limit: int = 10):
         return {"suggestions": [], "error": str(e)}
 
 
-def _extract_skills_from_requirements(requirements: str) -> set:
-    """Extract skill-like tokens from job requirements string (comma/space separated)."""
-    if not requirements or not isinstance(requirements, str):
-        return set()
-    seen = set()
-    for part in re.split(r"[,/\n;|]+", requirements):
-        for token in part.split():
-            token = token.strip()
-            if len(token) >= 2 and re.match(r"^[A-Za-z0-9.+_-]+$", token):
-                seen.add(token)
-    return seen
-
-
 @app.get("/v1/jobs/skills/autocomplete", tags=["Job Management"])
-async def job_skills_autocomplete(q: Optional[str] = None, limit: int = 15):
+async def job_skills_autocomplete(q: Optional[str] = None, limit: int = 15, typo_tolerance: bool = True):
     """Search-as-you-type: return skill suggestions from active jobs' requirements (public for candidate browse jobs)."""
     if not q or not str(q).strip():
         return {"suggestions": []}
@@ -898,12 +849,14 @@ async def job_skills_autocomplete(q: Optional[str] = None, limit: int = 15):
     limit = max(1, min(limit, 25))
     try:
         db = await get_mongo_db()
+        if await job_autocomplete_index.ensure_ready(db):
+            return {"suggestions": job_autocomplete_index.skills(q_norm, limit, typo_tolerance)}
         cursor = db.jobs.find({"status": "active"}, {"requirements": 1})
         jobs_list = await cursor.to_list(length=500)
         all_skills = set()
         for doc in jobs_list:
             req = doc.get("requirements") or ""
-            all_skills.update(_extract_skills_from_requirements(req))
+            all_skills.update(extract_skills(req))
         def _norm_token(s: str) -> str:
             return re.sub(r"[^a-z0-9]+", "", (s or "").lower())
 
@@ -918,7 +871,7 @@ async def job_skills_autocomplete(q: Optional[str] = None, limit: int = 15):
 
 
 @app.get("/v1/jobs/locations/autocomplete", tags=["Job Management"])
-async def job_locations_autocomplete(q: Optional[str] = None, limit: int = 15):
+async def job_locations_autocomplete(q: Optional[str] = None, limit: int = 15, typo_tolerance: bool = True):
     """Search-as-you-type: return location suggestions from active jobs (public for candidate browse jobs)."""
     if not q or not str(q).strip():
         return {"suggestions": []}
@@ -931,6 +884,8 @@ async def job_locations_autocomplete(q: Optional[str] = None, limit: int = 15):
     limit = max(1, min(limit, 25))
     try:
         db = await get_mongo_db()
+        if await job_autocomplete_index.ensure_ready(db):
+            return {"suggestions": job_autocomplete_index.locations(q_norm, limit, typo_tolerance)}
         regex_pat = r"[\s\W_]*".join(re.escape(t) for t in q_norm.split(" ") if t)[:200]
         regex = {"$regex": regex_pat, "$options": "i"}
         cursor = db.jobs.find({"status": "active", "location": regex}, {"location": 1})
@@ -1070,9 +1025,18 @@ async def get_candidate_stats(auth=Depends(get_auth)):
     ```
     
     **Response:** Real-time statistics including total candidates, active jobs, recent matches, and pending interviews.
+    Served from counters kept current by gateway writes and reconciled with MongoDB every few minutes.
     """
     try:
         db = await get_mongo_db()
+        if await candidate_stats.ensure_fresh(db):
+            stats = candidate_stats.snapshot()
+            return {
+                **stats,
+                "statistics_generated_at": datetime.now(timezone.utc).isoformat(),
+                "data_source": "mongodb_atlas",
+                "dashboard_ready": True
+            }
         
         # Get total candidates count
         total_candidates = await db.candidates.count_documents({})
@@ -1305,9 +1269,10 @@ async def search_candidates(
     status: Optional[str] = None,
     limit: Optional[int] = 50,
     offset: Optional[int] = 0,
+    cursor: Optional[str] = None,
     auth=Depends(get_auth)
 ):
-    """Search & Filter Candidates. For recruiters: only applicants to their jobs (optionally job_id). Supports limit/offset for pagination."""
+    """Search & Filter Candidates. For recruiters: only applicants to their jobs (optionally job_id). Supports keyset pagination (cursor = next_cursor of the previous page) and limit/offset."""
     q_text = (search or query or "").strip()[:100]
     if skills:
         if len(skills) > 200:
@@ -1331,10 +1296,13 @@ async def search_candidates(
         raise HTTPException(status_code=400, detail="Seniority filter too long (max 100 characters).")
     if status and len(status) > 100:
         raise HTTPException(status_code=400, detail="Status filter too long (max 100 characters).")
+    if cursor and not ObjectId.is_valid(cursor):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
 
     try:
         db = await get_mongo_db()
         mongo_query: Dict[str, Any] = {}
+        candidate_ids_scope = None
         is_recruiter = auth.get("type") == "jwt_token" and auth.get("role") == "recruiter"
         if is_recruiter:
             recruiter_id = str(auth.get("user_id", ""))
@@ -1347,53 +1315,69 @@ async def search_candidates(
                 mongo_query["_id"] = {"$in": [ObjectId(cid) for cid in candidate_ids_scope]}
             except Exception:
                 return {"candidates": [], "filters": {"skills": skills, "location": location, "experience_min": experience_min}, "count": 0, "total": 0}
-        if q_text:
-            if is_recruiter:
-                mongo_query["$or"] = [
-                    {"name": {"$regex": re.escape(q_text), "$options": "i"}},
-                    {"email": {"$regex": re.escape(q_text), "$options": "i"}},
-                ]
-            else:
-                mongo_query["$or"] = [
-                    {"name": {"$regex": re.escape(q_text), "$options": "i"}},
-                    {"email": {"$regex": re.escape(q_text), "$options": "i"}},
-                    {"technical_skills": {"$regex": re.escape(q_text), "$options": "i"}},
-                ]
-        if skills:
-            mongo_query["technical_skills"] = {"$regex": skills, "$options": "i"}
-        if location:
-            mongo_query["location"] = {"$regex": location, "$options": "i"}
-        if experience_min is not None or experience_max is not None:
-            exp_query: Dict[str, Any] = {}
-            if experience_min is not None:
-                exp_query["$gte"] = experience_min
-            if experience_max is not None:
-                exp_query["$lte"] = experience_max
-            mongo_query["experience_years"] = exp_query
-        if education_level:
-            level_str = (education_level or "").strip()[:200]
-            if level_str:
-                tokens = [t.strip() for t in re.split(r"[,]+", level_str) if t.strip()]
-                if tokens:
-                    mongo_query["education_level"] = {"$regex": "|".join(re.escape(t) for t in tokens), "$options": "i"}
-        if seniority_level:
-            seniority_str = (seniority_level or "").strip()[:100]
-            if seniority_str:
-                tokens = [t.strip() for t in re.split(r"[,]+", seniority_str) if t.strip()]
-                if tokens:
-                    mongo_query["seniority_level"] = {"$regex": "|".join(re.escape(t) for t in tokens), "$options": "i"}
-        if status:
-            status_str = (status or "").strip()[:100]
-            if status_str:
-                tokens = [t.strip().lower() for t in re.split(r"[,]+", status_str) if t.strip()]
-                if tokens:
-                    mongo_query["status"] = {"$in": tokens}
-
+        text_fields = ["name", "email"] if is_recruiter else ["name", "email", "technical_skills"]
+        education_tokens = [t.strip() for t in re.split(r"[,]+", (education_level or "").strip()[:200]) if t.strip()]
+        seniority_tokens = [t.strip() for t in re.split(r"[,]+", (seniority_level or "").strip()[:100]) if t.strip()]
+        status_tokens = [t.strip().lower() for t in re.split(r"[,]+", (status or "").strip()[:100]) if t.strip()]
         limit = max(1, min(limit or 50, 2000))
         offset = max(0, offset or 0)
-        total = await db.candidates.count_documents(mongo_query)
-        cursor = db.candidates.find(mongo_query).sort("_id", 1).skip(offset).limit(limit)
-        candidates_list = await cursor.to_list(length=limit)
+
+        if await candidate_search_index.ensure_ready(db):
+            result = candidate_search_index.search(
+                text=q_text or None,
+                text_fields=text_fields,
+                skills=skills,
+                location=location,
+                education_tokens=education_tokens or None,
+                seniority_tokens=seniority_tokens or None,
+                statuses=status_tokens or None,
+                experience_min=experience_min,
+                experience_max=experience_max,
+                scope_ids=candidate_ids_scope,
+                limit=limit,
+                offset=offset,
+                after=cursor
+            )
+            page_ids = [ObjectId(cid) for cid in result["ids"]]
+            docs_by_id = {}
+            async for doc in db.candidates.find({"_id": {"$in": page_ids}}):
+                docs_by_id[doc["_id"]] = doc
+            candidates_list = [docs_by_id[oid] for oid in page_ids if oid in docs_by_id]
+            total = result["total"]
+            total_estimated = result["total_estimated"]
+            next_cursor = result["next_cursor"]
+        else:
+            # Index still building (or disabled): query MongoDB directly
+            if q_text:
+                mongo_query["$or"] = [
+                    {field: {"$regex": re.escape(q_text), "$options": "i"}} for field in text_fields
+                ]
+            if skills:
+                mongo_query["technical_skills"] = {"$regex": re.escape(skills), "$options": "i"}
+            if location:
+                mongo_query["location"] = {"$regex": re.escape(location), "$options": "i"}
+            if experience_min is not None or experience_max is not None:
+                exp_query: Dict[str, Any] = {}
+                if experience_min is not None:
+                    exp_query["$gte"] = experience_min
+                if experience_max is not None:
+                    exp_query["$lte"] = experience_max
+                mongo_query["experience_years"] = exp_query
+            if education_tokens:
+                mongo_query["education_level"] = {"$regex": "|".join(re.escape(t) for t in education_tokens), "$options": "i"}
+            if seniority_tokens:
+                mongo_query["seniority_level"] = {"$regex": "|".join(re.escape(t) for t in seniority_tokens), "$options": "i"}
+            if status_tokens:
+                mongo_query["status"] = {"$in": status_tokens}
+
+            total = await db.candidates.count_documents(mongo_query)
+            total_estimated = False
+            if cursor:
+                after_cursor = {"_id": {"$gt": ObjectId(cursor)}}
+                mongo_query = {"$and": [mongo_query, after_cursor]} if mongo_query else after_cursor
+            db_cursor = db.candidates.find(mongo_query).sort("_id", 1).skip(offset).limit(limit)
+            candidates_list = await db_cursor.to_list(length=limit)
+            next_cursor = str(candidates_list[-1]["_id"]) if len(candidates_list) == limit else None
 
         candidates = []
         for doc in candidates_list:
@@ -1415,8 +1399,10 @@ async def search_candidates(
             "filters": {"skills": skills, "location": location, "experience_min": experience_min, "job_id": job_id},
             "count": len(candidates),
             "total": total,
+            "total_estimated": total_estimated,
             "limit": limit,
-            "offset": offset
+            "offset": offset,
+            "next_cursor": next_cursor
         }
     except Exception as e:
         return {
@@ -1492,333 +1478,78 @@ async def get_candidate_by_id(candidate_id: str, auth=Depends(get_auth)):
         return {"error": str(e), "candidate_id": candidate_id}
 
 
-def _normalize_header(h: str) -> str:
-    """Map common header names to canonical field names for candidate rows."""
-    h = (h or "").strip().lower().replace(" ", "_")
-    if h in ("name", "full_name", "candidate_name"):
-        return "name"
-    if h in ("email", "e-mail", "email_address"):
-        return "email"
-    if h in ("cv_url", "resume_url", "resume", "cv", "resume_path"):
-        return "cv_url"
-    if h in ("phone", "phone_number", "mobile", "contact"):
-        return "phone"
-    if h in ("experience_years", "experience", "years_of_experience", "exp"):
-        return "experience_years"
-    if h in ("status", "application_status"):
-        return "status"
-    if h in ("location", "city", "address"):
-        return "location"
-    if h in ("skills", "technical_skills", "tech_skills"):
-        return "technical_skills"
-    if h in ("designation", "title", "seniority_level", "level"):
-        return "designation"
-    if h in ("education", "education_level", "qualification"):
-        return "education_level"
-    return h
-
-
-# Regexes for resume-style PDF extraction
-_EMAIL_RE = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
-_PHONE_RE = re.compile(r"[\+]?[(]?[0-9]{2,4}[)]?[-\s\./0-9]{7,}")
-_YEARS_EXP_RE = re.compile(r"(\d+)\s*[\+\-]?\s*(?:years?\s*(?:of\s*)?(?:experience|exp\.?|yoe)|y\.?o\.?e\.?|yrs?)", re.I)
-_EDUCATION_LEVEL_RE = re.compile(
-    r"\b(ph\.?d|doctorate|m\.?tech|m\.?e\.?|m\.?s\.?c\.?|m\.?ca|mba|m\.?a\.?|m\.?com|b\.?tech|b\.?e\.?|b\.?s\.?c\.?|b\.?ca|b\.?a\.?|b\.?com|bachelor|masters?|master|graduate|post\s*graduate|pg|ug|b\.?arch)\b",
-    re.I,
-)
-
-# Common tech/skill keywords for skills extraction
-_SKILL_KEYWORDS = re.compile(
-    r"\b(python|java|javascript|typescript|react|node\.?js|angular|vue|sql|mongodb|aws|docker|kubernetes|"
-    r"html|css|php|ruby|go\b|golang|c\+\+|c\b|r\b|scala|kotlin|swift|machine\s*learning|ml\b|ai\b|"
-    r"data\s*science|tableau|power\s*bi|excel|git|jenkins|agile|rest\s*api|graphql)\b",
-    re.I,
-)
-
-# Common Indian cities and location hints (expanded; optional RESUME_KEYWORDS_URL can add more)
-_LOCATION_HINTS = re.compile(
-    r"\b(mumbai|pune|bangalore|bengaluru|delhi|ncr|noida|gurgaon|gurugram|hyderabad|chennai|kolkata|"
-    r"ahmedabad|indore|jaipur|kochi|chandigarh|nagpur|nashik|thane|remote|india|in\b|"
-    r"bhubaneswar|coimbatore|mysore|mangalore|trivandrum|surat|vadodara|raipur|bhopal|lucknow|dehradun)\b",
-    re.I,
-)
-
-# Optional keywords loaded from URL (env RESUME_KEYWORDS_URL) for skills/locations not in hardcoded lists
-_EXTRA_SKILLS: List[str] = []
-_EXTRA_LOCATIONS: List[str] = []
-_KEYWORDS_FETCHED = False
-
-
-def _fetch_optional_keywords() -> None:
-    """Fetch optional skills/locations from JSON URL (env RESUME_KEYWORDS_URL). Run once, then use cache.
-    Expected JSON: {"skills": ["word1", "word2", ...], "locations": ["city1", ...]}.
-    Any skill/location phrase in the resume text that appears in these lists will be detected."""
-    global _EXTRA_SKILLS, _EXTRA_LOCATIONS, _KEYWORDS_FETCHED
-    if _KEYWORDS_FETCHED:
-        return
-    _KEYWORDS_FETCHED = True
-    url = os.environ.get("RESUME_KEYWORDS_URL", "").strip()
-    if not url:
-        return
+@app.post("/v1/candidates/parse-pdf", tags=["Candidate Management"])
+async def parse_pdf_candidates(file: UploadFile = File(...), auth=Depends(get_auth)):
+    """Parse PDF: single resume → one row (name/email/phone); table-like PDF → multiple rows.
+    Parsing runs on the resume parser process pool; only the first RESUME_PARSE_MAX_PAGES pages are read."""
+    if not file.filename or not file.filename.lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="File must be a PDF")
+    content = await file.read()
     try:
-        import httpx
-        with httpx.Client(timeout=10.0) as client:
-            r = client.get(url)
-            if r.status_code != 200:
-                return
-            data = r.json()
-        if isinstance(data.get("skills"), list):
-            _EXTRA_SKILLS[:] = [str(s).strip() for s in data["skills"] if s and len(str(s).strip()) <= 80]
-        if isinstance(data.get("locations"), list):
-            _EXTRA_LOCATIONS[:] = [str(l).strip() for l in data["locations"] if l and len(str(l).strip()) <= 80]
-    except Exception:
-        pass
-
+        resume_parser.check_size(content, "PDF")
+    except ResumeParseError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return await resume_parser.parse(content, file.filename)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to parse PDF: {str(e)[:200]}")
 
-def _extract_one_resume_from_text(full_text: str) -> Dict[str, str]:
-    """Extract a single candidate row from resume-style free text (one person per PDF)."""
-    _fetch_optional_keywords()
-    lines = [ln.strip() for ln in full_text.splitlines() if ln.strip()]
-    row = {
-        "name": "", "email": "", "phone": "", "location": "",
-        "technical_skills": "", "experience_years": "", "designation": "", "education_level": "",
-        "status": "applied"
-    }
 
-    emails = _EMAIL_RE.findall(full_text)
-    if emails:
-        row["email"] = emails[0].strip()
-    phones = _PHONE_RE.findall(full_text)
-    if phones:
-        candidate_phone = phones[0].strip()
-        if len(candidate_phone) >= 7 and len(candidate_phone) <= 20:
-            row["phone"] = candidate_phone
-
-    name_candidates = []
-    for ln in lines[:15]:
-        if not ln or len(ln) > 80:
-            continue
-        if _EMAIL_RE.search(ln) or _PHONE_RE.search(ln):
-            break
-        if "@" in ln or ln.isdigit() or re.match(r"^[\d\s\-+().]+$", ln):
-            continue
-        if re.match(r"^(https?://|www\.)", ln, re.I):
-            continue
-        name_candidates.append(ln)
-    if name_candidates:
-        row["name"] = name_candidates[0][:100].strip() if name_candidates[0] else ""
-        if len(name_candidates) > 1 and not row["name"]:
-            row["name"] = name_candidates[1][:100].strip()
-
-    if not row["name"] and row["email"]:
-        for ln in lines:
-            if row["email"] in ln:
-                before = ln.split(row["email"])[0].strip()
-                if before and len(before) < 60 and "@" not in before:
-                    row["name"] = before[:100]
-                break
-    if not row["name"]:
-        row["name"] = "Candidate"
-
-    # --- Location: lines with city/location hints or "location:" / "address:"
-    for ln in lines:
-        ln_lower = ln.lower()
-        if "location" in ln_lower or "address" in ln_lower or "based in" in ln_lower or "city" in ln_lower:
-            val = re.sub(r"^(location|address|based in|city)\s*[:\-]\s*", "", ln_lower, flags=re.I).strip()
-            if val and len(val) < 80 and not _EMAIL_RE.search(val):
-                row["location"] = val[:80].strip()
-                break
-    if not row["location"]:
-        loc_m = _LOCATION_HINTS.search(full_text)
-        if loc_m:
-            row["location"] = loc_m.group(0).strip()
-    # Optional locations from RESUME_KEYWORDS_URL
-    if not row["location"] and _EXTRA_LOCATIONS:
-        for loc in _EXTRA_LOCATIONS:
-            if loc.lower() in full_text.lower():
-                row["location"] = loc
-                break
-
-    # --- Experience years: "X years experience" / "X+ years" / "X YOE"
-    years_m = _YEARS_EXP_RE.search(full_text)
-    if years_m:
-        row["experience_years"] = years_m.group(1).strip()
-    else:
-        year_range = re.search(r"(\d+)\s*-\s*(\d+)\s*(?:years?|yrs?)", full_text, re.I)
-        if year_range:
+@app.post("/v1/candidates/parse-pdf/batch", tags=["Candidate Management"])
+async def parse_pdf_candidates_batch(files: List[UploadFile] = File(...), auth=Depends(get_auth)):
+    """Parse many resumes concurrently (PDF, text, or zip archives of them).
+    Streams NDJSON: one line per file as it finishes (index, file, status, rows, completed, total), then a summary line."""
+    batch = []
+    for upload in files:
+        content = await upload.read()
+        name = upload.filename or f"file_{len(batch)}"
+        if name.lower().endswith(".zip"):
             try:
-                a, b = int(year_range.group(1)), int(year_range.group(2))
-                row["experience_years"] = str(max(a, b) - min(a, b)) if b != a else year_range.group(1)
-            except ValueError:
-                pass
+                # Inflating members is blocking work; the archive is refused before that if it holds too many
+                batch.extend(await asyncio.to_thread(
+                    resume_parser.expand_archive, content, name, resume_parser.max_batch_files - len(batch)))
+            except ResumeParseError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        else:
+            batch.append((name, content))
+        if len(batch) > resume_parser.max_batch_files:
+            raise HTTPException(status_code=400, detail=f"At most {resume_parser.max_batch_files} files per batch")
+    if not batch:
+        raise HTTPException(status_code=400, detail="No PDF or text files to parse")
+
+    async def _progress_stream():
+        parsed = failed = rows = 0
+        async for record in resume_parser.parse_many(batch):
+            if record["status"] == "parsed":
+                parsed += 1
+                rows += record["count"]
+            else:
+                failed += 1
+            yield json.dumps(record, default=str) + "\n"
+        yield json.dumps({"status": "done", "total": len(batch), "parsed": parsed, "failed": failed, "rows": rows}) + "\n"
 
-    # --- Technical skills: "Skills:" section (split by comma/semicolon/pipe so we capture any phrase) or keywords
-    in_skills = False
-    skill_tokens = []
-    for ln in lines:
-        ln_lower = ln.lower()
-        if re.match(r"^(technical\s*)?skills?|technologies?|expertise\s*[:\-]", ln_lower):
-            in_skills = True
-            rest = re.sub(r"^(technical\s*)?skills?|technologies?|expertise\s*[:\-]\s*", "", ln_lower, flags=re.I).strip()
-            if rest:
-                for part in re.split(r"[,;|\t]|\s+and\s+", rest):
-                    t = part.strip()
-                    if 2 <= len(t) <= 80 and not t.isdigit() and not _EMAIL_RE.search(t):
-                        skill_tokens.append(t)
-            continue
-        if in_skills:
-            if ln_lower.startswith(("experience", "education", "project", "work ", "employment")):
-                break
-            if ln and len(ln) < 120:
-                for part in re.split(r"[,;|\t]|\s+and\s+", ln_lower):
-                    t = part.strip()
-                    if 2 <= len(t) <= 80 and not t.isdigit() and not _EMAIL_RE.search(t):
-                        skill_tokens.append(t)
-            if len(skill_tokens) >= 30:
-                break
-    # Also catch "Proficient in X, Y, Z" or "Skills: X, Y, Z" anywhere in text (any words, not just hardcoded)
-    for pat in [
-        r"(?:proficient in|skills?|technologies?|expertise)\s*[:\-]\s*([^\n]{10,300})",
-        r"(?:key\s*skills?|core\s*skills?)\s*[:\-]\s*([^\n]{10,300})",
-    ]:
-        for m in re.finditer(pat, full_text, re.I):
-            chunk = m.group(1)
-            for part in re.split(r"[,;|\t]|\s+and\s+", chunk):
-                t = part.strip()
-                if 2 <= len(t) <= 80 and not t.isdigit() and not _EMAIL_RE.search(t):
-                    skill_tokens.append(t)
-    if skill_tokens:
-        row["technical_skills"] = ", ".join(dict.fromkeys(skill_tokens))[:500]
-    if not row["technical_skills"]:
-        skills_found = _SKILL_KEYWORDS.findall(full_text)
-        if skills_found:
-            row["technical_skills"] = ", ".join(dict.fromkeys(skills_found))[:500]
-    # Merge extra skills from optional RESUME_KEYWORDS_URL that appear in text
-    if _EXTRA_SKILLS and row["technical_skills"]:
-        existing = {t.strip().lower() for t in row["technical_skills"].split(",")}
-        for s in _EXTRA_SKILLS:
-            if s.lower() in full_text.lower() and s.strip().lower() not in existing:
-                row["technical_skills"] = (row["technical_skills"].strip() + ", " + s.strip()).strip()[:500]
-                existing.add(s.strip().lower())
-    elif _EXTRA_SKILLS:
-        found = [s for s in _EXTRA_SKILLS if s.lower() in full_text.lower()]
-        if found:
-            row["technical_skills"] = ", ".join(found)[:500]
-
-    # --- Designation / title: first line after "experience" or common title keywords
-    title_keywords = re.compile(
-        r"\b(software\s*engineer|developer|engineer|analyst|manager|lead|architect|consultant|"
-        r"intern|associate|senior|junior|full\s*stack|front\s*end|back\s*end|data\s*scientist)\b",
-        re.I,
+    return StreamingResponse(
+        _progress_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    for i, ln in enumerate(lines):
-        ln_lower = ln.lower()
-        if "experience" in ln_lower or "work experience" in ln_lower or "employment" in ln_lower:
-            for j in range(i + 1, min(i + 4, len(lines))):
-                cand = lines[j].strip()
-                if cand and len(cand) < 80 and title_keywords.search(cand) and not _EMAIL_RE.search(cand):
-                    row["designation"] = cand[:80]
-                    break
-            if row["designation"]:
-                break
-    if not row["designation"]:
-        m = title_keywords.search(full_text)
-        if m:
-            row["designation"] = m.group(0).strip()
-    # Fallback: first line after Experience that looks like a job title (any phrase, not just hardcoded keywords)
-    if not row["designation"]:
-        date_like = re.compile(r"^(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)?\.?\s*\d{4}\s*[-–—]\s*(present|current|\d{4})", re.I)
-        for i, ln in enumerate(lines):
-            ln_lower = ln.lower()
-            if "experience" in ln_lower or "work experience" in ln_lower or "employment" in ln_lower:
-                for j in range(i + 1, min(i + 5, len(lines))):
-                    cand = lines[j].strip()
-                    if not cand or len(cand) < 5 or len(cand) > 80:
-                        continue
-                    if "@" in cand or _EMAIL_RE.search(cand) or date_like.match(cand):
-                        continue
-                    if re.match(r"^\d{4}\s*[-–—]", cand):
-                        continue
-                    row["designation"] = cand[:80]
-                    break
-                break
-
-    # --- Education level: B.Tech, M.Tech, MBA, Bachelor, etc.
-    edu_m = _EDUCATION_LEVEL_RE.search(full_text)
-    if edu_m:
-        row["education_level"] = edu_m.group(0).strip()
-
-    return row
-
-
-def _parse_pdf_as_table(lines: List[str]) -> List[Dict[str, Any]]:
-    """Parse PDF text as table (CSV-like: header row + data rows by comma/tab)."""
-    rows = []
-    headers = []
-    for i, line in enumerate(lines):
-        line = (line or "").strip()
-        if not line:
-            continue
-        parts = re.split(r"[\t,]+", line, maxsplit=14)
-        parts = [p.strip() for p in parts]
-        if i == 0 and len(parts) >= 2:
-            headers = [_normalize_header(p) for p in parts]
-            continue
-        if len(parts) >= 2:
-            row = {}
-            for j, val in enumerate(parts):
-                key = headers[j] if j < len(headers) else f"col_{j}"
-                row[key] = val
-            has_email = row.get("email") or any(_EMAIL_RE.search(str(v)) for v in row.values() if v)
-            if has_email:
-                rows.append(row)
-    return rows
 
 
-@app.post("/v1/candidates/parse-pdf", tags=["Candidate Management"])
-async def parse_pdf_candidates(file: UploadFile = File(...), auth=Depends(get_auth)):
-    """Parse PDF: single resume → one row (name/email/phone); table-like PDF → multiple rows."""
-    if not file.filename or not file.filename.lower().endswith(".pdf"):
-        raise HTTPException(status_code=400, detail="File must be a PDF")
-    try:
-        import PyPDF2
-        content = await file.read()
-        if len(content) > 50 * 1024 * 1024:
-            raise HTTPException(status_code=400, detail="PDF must be under 50MB")
-        reader = PyPDF2.PdfReader(io.BytesIO(content))
-        lines = []
-        for page in reader.pages:
-            text = page.extract_text()
-            if text:
-                lines.extend(text.splitlines())
-        full_text = "\n".join((ln or "").strip() for ln in lines if (ln or "").strip())
-        if not full_text.strip():
-            return {"rows": [], "count": 0}
-
-        table_rows = _parse_pdf_as_table(lines)
-        rows_with_email = sum(1 for r in table_rows if r.get("email") or any(_EMAIL_RE.search(str(v)) for v in r.values() if v))
-        if len(table_rows) >= 2 and rows_with_email >= 2:
-            for r in table_rows:
-                if not r.get("email"):
-                    for v in r.values():
-                        if v and _EMAIL_RE.search(str(v)):
-                            r["email"] = _EMAIL_RE.search(str(v)).group(0)
-                            break
-            return {"rows": table_rows, "count": len(table_rows)}
-
-        row = _extract_one_resume_from_text(full_text)
-        return {"rows": [row], "count": 1}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to parse PDF: {str(e)[:200]}")
+def _on_bulk_candidate_inserted(document: Dict[str, Any]) -> None:
+    candidate_search_index.note_write(document["_id"])
+    candidate_stats.record_insert("candidates", document)
+    agent_client.invalidate_candidates()
+
+
+bulk_ingestor.on_inserted.append(_on_bulk_candidate_inserted)
 
 
 @app.post("/v1/candidates/bulk", tags=["Candidate Management"])
 async def bulk_upload_candidates(candidates: CandidateBulk, auth=Depends(get_auth)):
-    """Bulk Upload Candidates (recruiter JWT or API key). Inserts into candidates and, when job_id is provided, creates job_applications so dashboard stats stay in sync."""
+    """Bulk Upload Candidates (recruiter JWT or API key). Inserts into candidates and, when job_id is provided, creates job_applications so dashboard stats stay in sync.
+    Uploads larger than BULK_INGEST_SYNC_LIMIT rows are queued as a background job; poll GET /v1/candidates/bulk/{upload_id} for progress."""
     try:
         db = await get_mongo_db()
-        inserted_count = 0
-        errors = []
         job_id_str = (candidates.job_id or "").strip()
         # Validate job exists when job_id is provided (so we can link applicants for dashboard)
         if job_id_str:
@@ -1828,72 +1559,30 @@ async def bulk_upload_candidates(candidates: CandidateBulk, auth=Depends(get_aut
                 job_doc = await db.jobs.find_one({"id": job_id_str})
             if not job_doc:
                 raise HTTPException(status_code=400, detail="Invalid or unknown job_id for bulk upload")
-        now = datetime.now(timezone.utc)
 
-        for i, candidate in enumerate(candidates.candidates):
-            try:
-                email = candidate.get("email", "")
-                if not email:
-                    errors.append(f"Candidate {i+1}: Email is required")
-                    continue
-
-                # Check email uniqueness
-                existing = await db.candidates.find_one({"email": email})
-                if existing:
-                    # Still link existing candidate to this job for dashboard applicant count
-                    if job_id_str:
-                        candidate_id_str = str(existing["_id"])
-                        app_existing = await db.job_applications.find_one({"job_id": job_id_str, "candidate_id": candidate_id_str})
-                        if not app_existing:
-                            await db.job_applications.insert_one({
-                                "job_id": job_id_str,
-                                "candidate_id": candidate_id_str,
-                                "status": "applied",
-                                "applied_date": now
-                            })
-                    errors.append(f"Candidate {i+1}: Email {email} already exists")
-                    continue
-
-                # Insert candidate
-                document = {
-                    "name": candidate.get("name", "Unknown"),
-                    "email": email,
-                    "phone": candidate.get("phone", ""),
-                    "location": candidate.get("location", ""),
-                    "experience_years": max(0, int(candidate.get("experience_years", 0)) if str(candidate.get("experience_years", 0)).isdigit() else 0),
-                    "technical_skills": candidate.get("technical_skills", ""),
-                    "seniority_level": candidate.get("designation", candidate.get("seniority_level", "")),
-                    "education_level": candidate.get("education_level", ""),
-                    "resume_path": candidate.get("cv_url", candidate.get("resume_path", "")),
-                    "status": candidate.get("status", "applied"),
-                    "created_at": now
-                }
-                result = await db.candidates.insert_one(document)
-                inserted_count += 1
-
-                # Link to job so recruiter dashboard "Total Applicants" and per-job counts stay in sync
-                if job_id_str and result.inserted_id:
-                    candidate_id_str = str(result.inserted_id)
-                    app_existing = await db.job_applications.find_one({"job_id": job_id_str, "candidate_id": candidate_id_str})
-                    if not app_existing:
-                        await db.job_applications.insert_one({
-                            "job_id": job_id_str,
-                            "candidate_id": candidate_id_str,
-                            "status": "applied",
-                            "applied_date": now
-                        })
-            except HTTPException:
-                raise
-            except Exception as e:
-                errors.append(f"Candidate {i+1}: {str(e)[:100]}")
-                continue
+        await bulk_ingestor.resume(db)
+        if len(candidates.candidates) > bulk_ingestor.sync_limit:
+            created_by = str(auth.get("user_id", "")) if auth.get("type") == "jwt_token" else None
+            upload_id = await bulk_ingestor.submit(db, candidates.candidates, job_id_str or None, created_by)
+            return {
+                "message": "Bulk upload queued",
+                "upload_id": upload_id,
+                "candidates_received": len(candidates.candidates),
+                "candidates_inserted": 0,
+                "status": "queued",
+                "status_url": f"/v1/candidates/bulk/{upload_id}"
+            }
 
+        results = await bulk_ingestor.ingest(db, candidates.candidates, job_id_str or None)
+        inserted_count = sum(1 for r in results if r["status"] == "inserted")
+        errors = [r["error"] for r in results if r["status"] != "inserted"]
         return {
             "message": "Bulk upload completed",
             "candidates_received": len(candidates.candidates),
             "candidates_inserted": inserted_count,
             "errors": errors[:5] if errors else [],
             "total_errors": len(errors),
+            "results": results,
             "status": "success" if inserted_count > 0 else "failed"
         }
     except HTTPException:
@@ -1907,6 +1596,19 @@ async def bulk_upload_candidates(candidates: CandidateBulk, auth=Depends(get_aut
             "status": "failed"
         }
 
+
+@app.get("/v1/candidates/bulk/{upload_id}", tags=["Candidate Management"])
+async def bulk_upload_status(upload_id: str, include_rows: bool = False, auth=Depends(get_auth)):
+    """Progress of a queued bulk upload. include_rows=true adds the per-row results written so far. JWT users only see their own uploads."""
+    db = await get_mongo_db()
+    await bulk_ingestor.resume(db)
+    report = await bulk_ingestor.status(db, upload_id, include_rows)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Bulk upload not found")
+    if auth.get("type") == "jwt_token" and report.get("created_by") != str(auth.get("user_id", "")):
+        raise HTTPException(status_code=404, detail="Bulk upload not found")
+    return report
+
 # AI Matching Engine (2 endpoints)
 @app.get("/v1/match/{job_id}/top", tags=["AI Matching Engine"])
 async def get_top_matches(job_id: str, limit: int = 10, auth = Depends(get_auth)):  # Accept JWT tokens or API keys
@@ -1957,61 +1659,38 @@ async def get_top_matches(job_id: str, limit: int = 10, auth = Depends(get_auth)
         }
 
     try:
-        import httpx
-        agent_url = os.getenv("AGENT_SERVICE_URL")
-        agent_timeout = float(os.getenv("AGENT_MATCH_TIMEOUT", "90"))
-        payload = {"job_id": job_id, "candidate_ids": candidate_ids_scope if candidate_ids_scope else []}
-        async with httpx.AsyncClient(timeout=agent_timeout) as client:
-            response = await client.post(
-                f"{agent_url}/match",
-                json=payload,
-                headers={
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {os.getenv('API_KEY_SECRET')}"
-                }
-            )
-            if response.status_code == 200:
-                agent_result = response.json()
-                raw_candidates = agent_result.get("top_candidates", [])
-                scope_set = set(candidate_ids_scope) if candidate_ids_scope else None
-                if scope_set is not None:
-                    raw_candidates = [c for c in raw_candidates if str(c.get("candidate_id") or "") in scope_set]
-                    raw_candidates.sort(key=lambda c: (c.get("score") or 0), reverse=True)
-                    cap = min(limit, len(scope_set))
-                    raw_candidates = raw_candidates[:cap]
-                else:
-                    raw_candidates = raw_candidates[:limit]
-                matches = []
-                for candidate in raw_candidates:
-                    matches.append({
-                        "candidate_id": candidate.get("candidate_id"),
-                        "name": candidate.get("name"),
-                        "email": candidate.get("email"),
-                        "score": candidate.get("score"),
-                        "skills_match": ", ".join(candidate.get("skills_match", [])),
-                        "experience_match": candidate.get("experience_match"),
-                        "location_match": candidate.get("location_match"),
-                        "reasoning": candidate.get("reasoning"),
-                        "recommendation_strength": "Strong Match" if candidate.get("score", 0) > 80 else "Good Match"
-                    })
-                return {
-                    "matches": matches,
-                    "top_candidates": matches,
-                    "job_id": job_id,
-                    "limit": limit,
-                    "total_candidates": len(matches),
-                    "algorithm_version": agent_result.get("algorithm_version", "2.0.0-phase2-ai"),
-                    "processing_time": f"{agent_result.get('processing_time', 0)}s",
-                    "ai_analysis": "Real AI semantic matching via Agent Service" + (" (scoped to recruiter applicants)" if scope_set else ""),
-                    "agent_status": "connected"
-                }
-            else:
-                # 503 (engine loading), 5xx, or other non-200: use fallback matching
-                return await fallback_matching(job_id, limit, candidate_ids_scope=candidate_ids_scope)
+        agent_result = await agent_client.match(job_id, candidate_ids_scope)
+    except AgentUnavailable as e:
+        # Circuit open, agent down, 503 while the engine loads, or other non-200: use fallback matching
+        if e.status_code is None and not e.short_circuited:
+            log_error("agent_service_error", str(e), {"job_id": job_id})
+        return await fallback_matching(job_id, limit, candidate_ids_scope=candidate_ids_scope)
     except Exception as e:
         log_error("agent_service_error", str(e), {"job_id": job_id})
         return await fallback_matching(job_id, limit, candidate_ids_scope=candidate_ids_scope)
 
+    raw_candidates = agent_result.get("top_candidates", [])
+    scope_set = set(candidate_ids_scope) if candidate_ids_scope else None
+    if scope_set is not None:
+        raw_candidates = [c for c in raw_candidates if str(c.get("candidate_id") or "") in scope_set]
+        raw_candidates.sort(key=lambda c: (c.get("score") or 0), reverse=True)
+        cap = min(limit, len(scope_set))
+        raw_candidates = raw_candidates[:cap]
+    else:
+        raw_candidates = raw_candidates[:limit]
+    matches = [_agent_match_entry(candidate) for candidate in raw_candidates]
+    return {
+        "matches": matches,
+        "top_candidates": matches,
+        "job_id": job_id,
+        "limit": limit,
+        "total_candidates": len(matches),
+        "algorithm_version": agent_result.get("algorithm_version", "2.0.0-phase2-ai"),
+        "processing_time": f"{agent_result.get('processing_time', 0)}s",
+        "ai_analysis": "Real AI semantic matching via Agent Service" + (" (scoped to recruiter applicants)" if scope_set else ""),
+        "agent_status": "connected"
+    }
+
 
 def _job_skill_tokens(text: str) -> set:
     """Extract skill-like tokens from job requirements/description for matching."""
@@ -2026,6 +1705,98 @@ def _job_skill_tokens(text: str) -> set:
     return tokens
 
 
+FALLBACK_MATCH_PROJECTION = {"name": 1, "email": 1, "technical_skills": 1, "location": 1, "experience_years": 1}
+FALLBACK_MATCH_BATCH_SIZE = int(os.getenv("FALLBACK_MATCH_BATCH_SIZE", "1000"))
+
+
+def _fallback_job_profile(job_doc: dict) -> dict:
+    """Job side of fallback scoring: skill tokens, location and required years from the JD."""
+    job_req_text = ((job_doc.get("requirements") or "") + " " + (job_doc.get("description") or "")).lower()
+    job_exp_years = None
+    for m in re.finditer(r"(\d+)\s*[\+\-]?\s*(?:years?\s*(?:of\s*)?(?:experience|exp\.?)|y\.?o\.?e\.?|yrs?)", job_req_text, re.I):
+        job_exp_years = int(m.group(1))
+        break
+    return {
+        "skill_tokens": _job_skill_tokens(job_req_text),
+        "location": (job_doc.get("location") or "").strip().lower(),
+        "exp_years": job_exp_years
+    }
+
+
+def _fallback_candidate_fields(doc: dict) -> tuple:
+    """Candidate side of fallback scoring, computed once per document however many jobs score it."""
+    candidate_exp = 0
+    try:
+        exp_val = doc.get("experience_years")
+        if exp_val is not None:
+            candidate_exp = int(exp_val) if isinstance(exp_val, int) else int(str(exp_val).strip() or 0)
+    except (ValueError, TypeError):
+        pass
+    return (doc.get("technical_skills") or "").lower(), (doc.get("location") or "").strip().lower(), candidate_exp
+
+
+def _fallback_score(profile: dict, candidate_fields: tuple) -> tuple:
+    """(total, skill, experience, location scores, matched skills) for one job/candidate pair."""
+    candidate_skills, candidate_location, candidate_exp = candidate_fields
+    job_skill_tokens, job_location, job_exp_years = profile["skill_tokens"], profile["location"], profile["exp_years"]
+    matched_skills = [t for t in job_skill_tokens if t in candidate_skills][:20]
+    skill_score = min(100, len(matched_skills) * 12) if job_skill_tokens else 50
+    location_match = bool(job_location and candidate_location and (job_location in candidate_location or candidate_location in job_location))
+    location_score = 100 if location_match else 0
+    if job_exp_years is not None:
+        if candidate_exp >= job_exp_years:
+            experience_score = 100
+        else:
+            experience_score = max(0, int(100 * candidate_exp / job_exp_years))
+    else:
+        experience_score = 50
+    total = (skill_score * 0.5) + (experience_score * 0.3) + (location_score * 0.2)
+    total = max(50, min(95, int(total)))
+    return total, skill_score, experience_score, location_score, matched_skills
+
+
+def _fallback_push(top: list, limit: int, seq: int, doc: dict, score: tuple):
+    """Offer a scored candidate to a bounded min-heap of the best `limit`."""
+    total, skill_score, experience_score, location_score, matched_skills = score
+    # Ties keep the earlier document, as the previous stable sort did
+    entry = ((total, skill_score, experience_score, -seq), doc, matched_skills, experience_score, location_score)
+    if len(top) < limit:
+        heapq.heappush(top, entry)
+    elif limit > 0 and entry[0] > top[0][0]:
+        heapq.heapreplace(top, entry)
+
+
+def _fallback_matches(top: list) -> list:
+    top = sorted(top, key=lambda x: x[0], reverse=True)
+    matches = []
+    for (total, *_), doc, matched_skills, experience_score, location_score in top:
+        matches.append({
+            "candidate_id": str(doc["_id"]),
+            "name": doc.get("name"),
+            "email": doc.get("email"),
+            "score": total,
+            "skills_match": ", ".join(matched_skills) if matched_skills else (doc.get("technical_skills") or ""),
+            "experience_match": experience_score,
+            "location_match": location_score,
+            "reasoning": f"Skills: {len(matched_skills)} match job JD; experience {experience_score}%; location {location_score}%",
+            "recommendation_strength": "Good Match" if total > 75 else "Fair Match"
+        })
+    return matches
+
+
+def _candidate_scope_query(candidate_ids_scope: Optional[List[str]]) -> Optional[dict]:
+    """Mongo filter for a recruiter's applicant scope; None when the scope has no valid ids."""
+    if not candidate_ids_scope:
+        return {}
+    object_ids = []
+    for cid in candidate_ids_scope:
+        try:
+            object_ids.append(ObjectId(cid))
+        except Exception:
+            pass
+    return {"_id": {"$in": object_ids}} if object_ids else None
+
+
 async def fallback_matching(job_id: str, limit: int, candidate_ids_scope: Optional[List[str]] = None):
     """Fallback matching when agent service is unavailable. If candidate_ids_scope is set (recruiter), only those candidates are considered; else all candidates."""
     try:
@@ -2036,67 +1807,18 @@ async def fallback_matching(job_id: str, limit: int, candidate_ids_scope: Option
             job_doc = await db.jobs.find_one({"id": job_id})
         if not job_doc:
             return {"matches": [], "job_id": job_id, "limit": limit, "error": "Job not found", "agent_status": "error"}
-        job_req_text = ((job_doc.get("requirements") or "") + " " + (job_doc.get("description") or "")).lower()
-        job_skill_tokens = _job_skill_tokens(job_req_text)
-        job_location = (job_doc.get("location") or "").strip().lower()
-        job_exp_years = None
-        for m in re.finditer(r"(\d+)\s*[\+\-]?\s*(?:years?\s*(?:of\s*)?(?:experience|exp\.?)|y\.?o\.?e\.?|yrs?)", job_req_text, re.I):
-            job_exp_years = int(m.group(1))
-            break
-        if candidate_ids_scope:
-            object_ids = []
-            for cid in candidate_ids_scope:
-                try:
-                    object_ids.append(ObjectId(cid))
-                except Exception:
-                    pass
-            if not object_ids:
-                return {"matches": [], "job_id": job_id, "limit": limit, "total_candidates": 0, "algorithm_version": "2.0.0-gateway-fallback", "ai_analysis": "No applicants in recruiter scope", "agent_status": "disconnected"}
-            cursor = db.candidates.find({"_id": {"$in": object_ids}})
-        else:
-            cursor = db.candidates.find({})
-        candidates_list = await cursor.to_list(length=2000)
-        scored = []
-        for doc in candidates_list:
-            candidate_skills = (doc.get("technical_skills") or "").lower()
-            candidate_location = (doc.get("location") or "").strip().lower()
-            candidate_exp = 0
-            try:
-                exp_val = doc.get("experience_years")
-                if exp_val is not None:
-                    candidate_exp = int(exp_val) if isinstance(exp_val, int) else int(str(exp_val).strip() or 0)
-            except (ValueError, TypeError):
-                pass
-            matched_skills = [t for t in job_skill_tokens if t in candidate_skills][:20]
-            skill_match_count = len(matched_skills)
-            skill_score = min(100, skill_match_count * 12) if job_skill_tokens else 50
-            location_match = bool(job_location and candidate_location and (job_location in candidate_location or candidate_location in job_location))
-            location_score = 100 if location_match else 0
-            if job_exp_years is not None:
-                if candidate_exp >= job_exp_years:
-                    experience_score = 100
-                else:
-                    experience_score = max(0, int(100 * candidate_exp / job_exp_years))
-            else:
-                experience_score = 50
-            total = (skill_score * 0.5) + (experience_score * 0.3) + (location_score * 0.2)
-            total = max(50, min(95, int(total)))
-            scored.append((total, doc, matched_skills, skill_score, experience_score, location_score, location_match))
-        scored.sort(key=lambda x: (-x[0], -x[3], -x[4]))
-        top = scored[:limit]
-        matches = []
-        for total, doc, matched_skills, skill_score, experience_score, location_score, location_match in top:
-            matches.append({
-                "candidate_id": str(doc["_id"]),
-                "name": doc.get("name"),
-                "email": doc.get("email"),
-                "score": total,
-                "skills_match": ", ".join(matched_skills) if matched_skills else (doc.get("technical_skills") or ""),
-                "experience_match": experience_score,
-                "location_match": location_score,
-                "reasoning": f"Skills: {len(matched_skills)} match job JD; experience {experience_score}%; location {location_score}%",
-                "recommendation_strength": "Good Match" if total > 75 else "Fair Match"
-            })
+        profile = _fallback_job_profile(job_doc)
+        query = _candidate_scope_query(candidate_ids_scope)
+        if query is None:
+            return {"matches": [], "job_id": job_id, "limit": limit, "total_candidates": 0, "algorithm_version": "2.0.0-gateway-fallback", "ai_analysis": "No applicants in recruiter scope", "agent_status": "disconnected"}
+        # Stream only the scored fields and keep a bounded heap of the best `limit` candidates
+        cursor = db.candidates.find(query, FALLBACK_MATCH_PROJECTION).batch_size(FALLBACK_MATCH_BATCH_SIZE)
+        top = []
+        seq = 0
+        async for doc in cursor:
+            _fallback_push(top, limit, seq, doc, _fallback_score(profile, _fallback_candidate_fields(doc)))
+            seq += 1
+        matches = _fallback_matches(top)
         return {
             "matches": matches,
             "top_candidates": matches,
@@ -2111,73 +1833,96 @@ async def fallback_matching(job_id: str, limit: int, candidate_ids_scope: Option
     except Exception as e:
         return {"matches": [], "job_id": job_id, "limit": limit, "error": str(e), "agent_status": "error"}
 
-async def batch_fallback_matching(job_ids: List[str]):
-    """Fallback batch matching when agent service is unavailable"""
-    try:
-        db = await get_mongo_db()
-        
-        # Get job requirements for each job
-        job_requirements = {}
-        for job_id in job_ids:
-            try:
-                job_doc = await db.jobs.find_one({"_id": ObjectId(job_id)})
-            except:
-                job_doc = await db.jobs.find_one({"id": job_id})
-            
-            job_requirements[job_id] = {
-                "requirements": (job_doc.get("requirements", "") if job_doc else "").lower(),
-                "location": job_doc.get("location", "") if job_doc else ""
-            }
-        
-        # Get candidates
-        cursor = db.candidates.find({}).limit(5)
-        candidates = await cursor.to_list(length=5)
-        
-        batch_results = {}
-        for job_id in job_ids:
-            job_req = job_requirements[job_id]
-            matches = []
-            
-            for i, doc in enumerate(candidates):
-                candidate_skills = (doc.get("technical_skills") or "").lower()
-                candidate_location = doc.get("location") or ""
-                
-                # Basic skill matching
-                skill_match_count = sum(1 for skill in ['python', 'java', 'javascript'] 
-                                      if skill in candidate_skills and skill in job_req["requirements"])
-                
-                # Location matching
-                location_match = job_req["location"].lower() in candidate_location.lower() if job_req["location"] and candidate_location else False
-                
-                # Calculate score
-                base_score = 60 + (skill_match_count * 10) + (10 if location_match else 0) + (5 - i)
-                
-                matches.append({
-                    "candidate_id": str(doc["_id"]),
-                    "name": doc.get("name"),
-                    "email": doc.get("email"),
-                    "score": min(95, base_score),
-                    "skills_match": doc.get("technical_skills") or "",
-                    "experience_match": f"Skills: {skill_match_count} matches",
-                    "location_match": location_match,
-                    "reasoning": f"Fallback batch matching: {skill_match_count} skill matches, location: {location_match}",
-                    "recommendation_strength": "Good Match" if base_score > 75 else "Fair Match"
-                })
-            
-            batch_results[str(job_id)] = {
+
+async def _find_jobs_by_ids(db, job_ids: List[str]) -> Dict[str, dict]:
+    """Job documents for many ids in one query, keyed by the requested id (ObjectId or legacy `id`)."""
+    object_ids, raw_ids = [], []
+    for job_id in job_ids:
+        try:
+            object_ids.append(ObjectId(job_id))
+        except Exception:
+            raw_ids.append(job_id)
+    clauses = []
+    if object_ids:
+        clauses.append({"_id": {"$in": object_ids}})
+    if raw_ids:
+        clauses.append({"id": {"$in": raw_ids}})
+    found = {}
+    async for job_doc in db.jobs.find({"$or": clauses}):
+        found[str(job_doc["_id"])] = job_doc
+        if job_doc.get("id") is not None:
+            found.setdefault(str(job_doc["id"]), job_doc)
+    return {job_id: found[job_id] for job_id in job_ids if job_id in found}
+
+
+def _score_fallback_batch(profiles: Dict[str, dict], tops: Dict[str, list], docs: List[dict], seq: int, limit: int) -> int:
+    """Offer one cursor batch to every job's top-`limit` heap; returns the next sequence number."""
+    for doc in docs:
+        fields = _fallback_candidate_fields(doc)
+        for doc_id, profile in profiles.items():
+            _fallback_push(tops[doc_id], limit, seq, doc, _fallback_score(profile, fields))
+        seq += 1
+    return seq
+
+
+async def _iter_batch_fallback(job_ids: List[str], limit: int):
+    """Fallback batch matching: one candidate scan shared by every job, yielding a result per requested id.
+
+    A job requested under both its _id and legacy `id` is scored once. Each cursor batch is
+    scored in a worker thread, as jobs x candidates in pure Python would stall the event loop.
+    """
+    start = time.perf_counter()
+    db = await get_mongo_db()
+    job_docs = await _find_jobs_by_ids(db, job_ids) if job_ids else {}
+    for job_id in job_ids:
+        if job_id not in job_docs:
+            yield {"job_id": job_id, "matches": [], "top_candidates": [], "total_candidates": 0,
+                   "algorithm": "fallback-batch", "error": "Job not found", "ai_analysis": "Database fallback - Agent service unavailable"}
+    requested: Dict[str, List[str]] = {}
+    for job_id, job_doc in job_docs.items():
+        requested.setdefault(str(job_doc["_id"]), []).append(job_id)
+    profiles = {doc_id: _fallback_job_profile(job_docs[ids[0]]) for doc_id, ids in requested.items()}
+    tops = {doc_id: [] for doc_id in profiles}
+    seq = 0
+    if profiles:
+        cursor = db.candidates.find({}, FALLBACK_MATCH_PROJECTION).batch_size(FALLBACK_MATCH_BATCH_SIZE)
+        batch = []
+        async for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= FALLBACK_MATCH_BATCH_SIZE:
+                seq = await asyncio.to_thread(_score_fallback_batch, profiles, tops, batch, seq, limit)
+                batch = []
+        if batch:
+            seq = await asyncio.to_thread(_score_fallback_batch, profiles, tops, batch, seq, limit)
+    processing_time = f"{time.perf_counter() - start:.2f}s"
+    for doc_id, ids in requested.items():
+        matches = _fallback_matches(tops[doc_id])
+        for job_id in ids:
+            yield {
                 "job_id": job_id,
                 "matches": matches,
                 "top_candidates": matches,
                 "total_candidates": len(matches),
+                "candidates_scored": seq,
                 "algorithm": "fallback-batch",
-                "processing_time": "0.05s",
+                "processing_time": processing_time,
                 "ai_analysis": "Database fallback - Agent service unavailable"
             }
+
+
+async def batch_fallback_matching(job_ids: List[str], limit: int = 10):
+    """Fallback batch matching when agent service is unavailable"""
+    try:
+        batch_results = {}
+        candidates_scored = 0
+        async for job_result in _iter_batch_fallback(job_ids, limit):
+            batch_results[str(job_result["job_id"])] = job_result
+            candidates_scored = max(candidates_scored, job_result.get("candidates_scored", 0))
         
         return {
             "batch_results": batch_results,
             "total_jobs_processed": len(job_ids),
-            "total_candidates_analyzed": len(candidates),
+            "total_candidates_analyzed": candidates_scored,
             "algorithm_version": "2.0.0-gateway-fallback-batch",
             "status": "fallback_success",
             "agent_status": "disconnected"
@@ -2185,18 +1930,16 @@ async def batch_fallback_matching(job_ids: List[str]):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Batch fallback failed: {str(e)}")
 
+BATCH_MATCH_MAX_JOBS = int(os.getenv("BATCH_MATCH_MAX_JOBS", "500"))
+
+
 class BatchMatchRequest(BaseModel):
     job_ids: List[str]
     limit: Optional[int] = 10
 
-@app.post("/v1/match/batch", tags=["AI Matching Engine"])
-async def batch_match_jobs(
-    request: BatchMatchRequest = None,
-    job_ids: Optional[List[str]] = None,
-    limit: Optional[int] = None,
-    api_key: str = Depends(get_api_key)
-):
-    """Batch AI matching via Agent Service"""
+
+def _batch_match_params(request: Optional[BatchMatchRequest], job_ids: Optional[List[str]], limit: Optional[int]) -> tuple:
+    """Job ids (deduplicated, in order) and per-job limit from the JSON body or query params."""
     # Support both JSON body and query params
     if request:
         job_id_list = request.job_ids
@@ -2207,73 +1950,145 @@ async def batch_match_jobs(
     else:
         raise HTTPException(status_code=400, detail="job_ids list is required")
     
-    if not job_id_list or len(job_id_list) == 0:
+    job_id_list = list(dict.fromkeys(str(j) for j in job_id_list or []))
+    if not job_id_list:
         raise HTTPException(status_code=400, detail="At least one job ID is required")
     
-    if len(job_id_list) > 10:
-        raise HTTPException(status_code=400, detail="Maximum 10 jobs can be processed in batch")
+    if len(job_id_list) > BATCH_MATCH_MAX_JOBS:
+        raise HTTPException(status_code=400, detail=f"Maximum {BATCH_MATCH_MAX_JOBS} jobs can be processed in batch")
+    
+    if match_limit < 1 or match_limit > 50:
+        raise HTTPException(status_code=400, detail="Invalid limit parameter (must be 1-50)")
+    return job_id_list, match_limit
+
+
+def _agent_match_entry(candidate: dict) -> dict:
+    """Gateway match entry for one agent candidate (skills_match may be a list or an already joined string)."""
+    skills_match = candidate.get("skills_match") or []
+    return {
+        "candidate_id": candidate.get("candidate_id"),
+        "name": candidate.get("name"),
+        "email": candidate.get("email"),
+        "score": candidate.get("score"),
+        "skills_match": skills_match if isinstance(skills_match, str) else ", ".join(skills_match),
+        "experience_match": candidate.get("experience_match"),
+        "location_match": candidate.get("location_match"),
+        "reasoning": candidate.get("reasoning"),
+        "recommendation_strength": "Strong Match" if (candidate.get("score") or 0) > 80 else "Good Match"
+    }
+
+
+def _agent_batch_job_result(job_result: dict) -> dict:
+    matches = [_agent_match_entry(candidate) for candidate in job_result.get("matches", [])]
+    return {
+        "job_id": job_result.get("job_id"),
+        "matches": matches,
+        "top_candidates": matches,
+        "total_candidates": len(matches),
+        "algorithm": job_result.get("algorithm", "phase3-ai"),
+        "processing_time": job_result.get("processing_time", "0.5s"),
+        "ai_analysis": "Real AI semantic matching via Agent Service"
+    }
+
+
+@app.post("/v1/match/batch", tags=["AI Matching Engine"])
+async def batch_match_jobs(
+    request: BatchMatchRequest = None,
+    job_ids: Optional[List[str]] = None,
+    limit: Optional[int] = None,
+    api_key: str = Depends(get_api_key)
+):
+    """Batch AI matching via Agent Service (up to BATCH_MATCH_MAX_JOBS jobs, one shared candidate pass)"""
+    job_id_list, match_limit = _batch_match_params(request, job_ids, limit)
     
     try:
-        import httpx
-        agent_url = os.getenv("AGENT_SERVICE_URL")
-        
         # Call agent service for batch AI matching
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            response = await client.post(
-                f"{agent_url}/batch-match",
-                json={"job_ids": job_id_list},
-                headers={
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {os.getenv('API_KEY_SECRET')}"
-                }
-            )
-            
-            if response.status_code == 200:
-                agent_result = response.json()
-                
-                # Transform agent batch response to detailed format
-                enhanced_batch_results = {}
-                for job_id_str, job_result in agent_result.get("batch_results", {}).items():
-                    matches = []
-                    for candidate in job_result.get("matches", []):
-                        matches.append({
-                            "candidate_id": candidate.get("candidate_id"),
-                            "name": candidate.get("name"),
-                            "email": candidate.get("email"),
-                            "score": candidate.get("score"),
-                            "skills_match": ", ".join(candidate.get("skills_match", [])),
-                            "experience_match": candidate.get("experience_match"),
-                            "location_match": candidate.get("location_match"),
-                            "reasoning": candidate.get("reasoning"),
-                            "recommendation_strength": "Strong Match" if candidate.get("score", 0) > 80 else "Good Match"
-                        })
-                    
-                    enhanced_batch_results[job_id_str] = {
-                        "job_id": job_result.get("job_id"),
-                        "matches": matches,
-                        "top_candidates": matches,
-                        "total_candidates": len(matches),
-                        "algorithm": job_result.get("algorithm", "phase3-ai"),
-                        "processing_time": job_result.get("processing_time", "0.5s"),
-                        "ai_analysis": "Real AI semantic matching via Agent Service"
-                    }
-                
-                return {
-                    "batch_results": enhanced_batch_results,
-                    "total_jobs_processed": agent_result.get("total_jobs_processed", len(job_ids)),
-                    "total_candidates_analyzed": agent_result.get("total_candidates_analyzed", 0),
-                    "algorithm_version": agent_result.get("algorithm_version", "3.0.0-phase3-production-batch"),
-                    "status": "success",
-                    "agent_status": "connected"
-                }
-            else:
-                # Fallback to database batch matching
-                return await batch_fallback_matching(job_id_list)
-                
+        agent_result = await agent_client.batch_match(job_id_list, match_limit)
     except Exception as e:
-        log_error("batch_matching_error", str(e), {"job_ids": job_id_list})
+        if not (isinstance(e, AgentUnavailable) and (e.short_circuited or e.status_code is not None)):
+            log_error("batch_matching_error", str(e), {"job_ids": job_id_list})
         # Fallback to database batch matching
-        return await batch_fallback_matching(job_id_list)
+        return await batch_fallback_matching(job_id_list, match_limit)
+    
+    # Transform agent batch response to detailed format
+    enhanced_batch_results = {
+        job_id_str: _agent_batch_job_result(job_result)
+        for job_id_str, job_result in agent_result.get("batch_results", {}).items()
+    }
+    
+    return {
+        "batch_results": enhanced_batch_results,
+        "total_jobs_processed": agent_result.get("total_jobs_processed", len(job_id_list)),
+        "total_candidates_analyzed": agent_result.get("total_candidates_analyzed", 0),
+        "algorithm_version": agent_result.get("algorithm_version", "3.0.0-phase3-production-batch"),
+        "status": "success",
+        "agent_status": "connected"
+    }
+
+
+@app.post("/v1/match/batch/stream", tags=["AI Matching Engine"])
+async def batch_match_jobs_stream(
+    request: BatchMatchRequest = None,
+    job_ids: Optional[List[str]] = None,
+    limit: Optional[int] = None,
+    api_key: str = Depends(get_api_key)
+):
+    """Batch matching streamed as NDJSON: progress lines, one line per job as it finishes, then a summary.
+    Jobs the Agent Service has not answered when it fails are completed by database fallback matching."""
+    job_id_list, match_limit = _batch_match_params(request, job_ids, limit)
+    
+    async def _events():
+        done = set()
+        try:
+            async for record in agent_client.stream_batch_match(job_id_list, match_limit):
+                kind = record.get("type")
+                if kind == "job":
+                    done.add(str(record.get("job_id")))
+                    if record.get("status") == "success":
+                        line = {**_agent_batch_job_result(record), "status": "success"}
+                    else:
+                        line = {"job_id": record.get("job_id"), "matches": [], "top_candidates": [], "total_candidates": 0, "status": record.get("status")}
+                    yield json.dumps({"type": "job", **line, "agent_status": "connected"}, default=str) + "\n"
+                elif kind == "progress":
+                    yield json.dumps(record) + "\n"
+                elif kind == "summary":
+                    if record.get("status") != "success":
+                        raise AgentUnavailable(record.get("error") or "agent batch matching failed")
+                    yield json.dumps({**record, "agent_status": "connected"}) + "\n"
+                    return
+            raise AgentUnavailable("agent stream ended without a summary")
+        except AgentUnavailable as e:
+            if not e.short_circuited:
+                log_error("batch_matching_error", str(e), {"job_ids": job_id_list})
+        except Exception as e:
+            log_error("batch_matching_error", str(e), {"job_ids": job_id_list})
+        
+        # Finish whatever the agent did not answer with one shared database scan
+        remaining = [job_id for job_id in job_id_list if job_id not in done]
+        candidates_scored = 0
+        try:
+            async for job_result in _iter_batch_fallback(remaining, match_limit):
+                candidates_scored = max(candidates_scored, job_result.get("candidates_scored", 0))
+                status = "job_not_found" if job_result.get("error") == "Job not found" else "success"
+                yield json.dumps({"type": "job", **job_result, "status": status, "agent_status": "disconnected"}, default=str) + "\n"
+            status = "fallback_success"
+        except Exception as e:
+            log_error("batch_fallback_error", str(e), {"job_ids": remaining})
+            status = "error"
+        yield json.dumps({
+            "type": "summary",
+            "total_jobs_processed": len(job_id_list),
+            "total_candidates_analyzed": candidates_scored,
+            "algorithm_version": "2.0.0-gateway-fallback-batch",
+            "status": status,
+            "agent_status": "disconnected"
+        }) + "\n"
+    
+    return StreamingResponse(
+        _events(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 # Assessment & Workflow (5 endpoints)
 @app.post("/v1/feedback", tags=["Assessment & Workflow"])
@@ -2307,6 +2122,7 @@ async def submit_feedback(feedback: FeedbackSubmission, auth = Depends(get_auth)
             document["experience_level"] = feedback.experience_level
         result = await db.feedback.insert_one(document)
         feedback_id = str(result.inserted_id)
+        candidate_stats.record_insert("feedback", document)
         
         return {
             "message": "Feedback submitted successfully",
@@ -2576,6 +2392,7 @@ async def schedule_interview(interview: InterviewSchedule, auth=Depends(get_auth
             document["meeting_phone"] = interview.meeting_phone
         result = await db.interviews.insert_one(document)
         interview_id = str(result.inserted_id)
+        candidate_stats.record_insert("interviews", document)
         
         return {
             "message": "Interview scheduled successfully",
@@ -2710,7 +2527,7 @@ async def get_all_offers(candidate_id: Optional[str] = None, auth = Depends(get_
     except Exception as e:
         return {"offers": [], "count": 0, "error": str(e)}
 
-# Analytics & Statistics (2 remaining endpoints)
+# Analytics & Statistics (5 remaining endpoints)
 
 @app.get("/v1/database/schema", tags=["Analytics & Statistics"])
 async def get_database_schema(api_key: str = Depends(get_api_key)):
@@ -2758,16 +2575,142 @@ async def get_database_schema(api_key: str = Depends(get_api_key)):
             "checked_at": datetime.now(timezone.utc).isoformat()
         }
 
-@app.get("/v1/reports/job/{job_id}/export.csv", tags=["Analytics & Statistics"])
-async def export_job_report(job_id: str, api_key: str = Depends(get_api_key)):  # Changed from int to str for MongoDB ObjectId
-    """Export Job Report"""
-    return {
-        "message": "Job report export",
+def _report_match_scorer(job_doc: dict):
+    """Match columns for job reports from the same scoring as DB fallback matching."""
+    profile = _fallback_job_profile(job_doc)
+
+    def score(candidate_doc: dict) -> dict:
+        total, _, experience_score, location_score, matched_skills = _fallback_score(profile, _fallback_candidate_fields(candidate_doc))
+        return {
+            "match_score": total,
+            "skills_match": ", ".join(matched_skills),
+            "experience_match": experience_score,
+            "location_match": location_score
+        }
+    return score
+
+
+report_exporter.match_scorer = _report_match_scorer
+
+
+async def _can_export_job_report(db, job_id: str, job_doc: dict, auth: dict) -> bool:
+    """Reports carry applicant contact details: API keys, the job's recruiter and its clients only"""
+    if auth.get("type") == "api_key":
+        return True
+    user_id = str(auth.get("user_id", ""))
+    if not user_id:
+        return False
+    if auth.get("role") == "recruiter":
+        return str(job_doc.get("recruiter_id", "")) == user_id
+    if auth.get("role") == "client":
+        client_job_ids = set(await _client_job_ids_for_dashboard(db, user_id))
+        return job_id in client_job_ids or str(job_doc["_id"]) in client_job_ids
+    return False
+
+
+async def _export_job_report(job_id: str, fmt: str, background: bool, auth: dict):
+    db = await get_mongo_db()
+    if auth.get("type") != "api_key" and auth.get("role") not in ("recruiter", "client"):
+        raise HTTPException(status_code=403, detail="Job reports are only available to recruiters and clients")
+    job_doc = (await _find_jobs_by_ids(db, [job_id])).get(job_id)
+    if not job_doc:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not await _can_export_job_report(db, job_id, job_doc, auth):
+        raise HTTPException(status_code=403, detail="You can only export reports for your own jobs")
+
+    await report_exporter.resume(db)
+    total_rows = await db.job_applications.count_documents(report_exporter.application_query(job_id, job_doc))
+    if fmt == "csv" and not background and total_rows <= report_exporter.sync_limit:
+        return StreamingResponse(
+            report_exporter.stream_csv(db, job_id, job_doc),
+            media_type=MEDIA_TYPES["csv"],
+            headers={"Content-Disposition": f'attachment; filename="job_{job_id}_report.csv"'}
+        )
+
+    created_by = str(auth.get("user_id", "")) if auth.get("type") == "jwt_token" else None
+    try:
+        export_id = await report_exporter.submit(db, job_id, fmt, total_rows, created_by)
+    except ReportExportError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    return JSONResponse(status_code=202, content={
+        "message": "Job report export queued",
+        "export_id": export_id,
         "job_id": job_id,
-        "format": "CSV",
-        "download_url": f"/downloads/job_{job_id}_report.csv",
-        "generated_at": datetime.now(timezone.utc).isoformat()
+        "format": fmt.upper(),
+        "total_rows": total_rows,
+        "status": "queued",
+        "status_url": f"/v1/reports/exports/{export_id}",
+        "download_url": f"/v1/reports/exports/{export_id}/download"
+    })
+
+
+@app.get("/v1/reports/job/{job_id}/export.csv", tags=["Analytics & Statistics"])
+async def export_job_report(job_id: str, background: bool = False, auth=Depends(get_auth)):  # Changed from int to str for MongoDB ObjectId
+    """Export Job Report: one CSV row per application with candidate, match, interview, feedback and offer data.
+    Available to API keys, the job's recruiter and clients the job belongs to; candidates get 403.
+    Streamed directly for up to REPORT_EXPORT_SYNC_LIMIT applications; larger reports (or background=true) are queued and return 202 with a status_url."""
+    return await _export_job_report(job_id, "csv", background, auth)
+
+
+@app.get("/v1/reports/job/{job_id}/export.parquet", tags=["Analytics & Statistics"])
+async def export_job_report_parquet(job_id: str, auth=Depends(get_auth)):
+    """Export Job Report as Parquet (requires pyarrow). Always written by a background job; returns 202 with a status_url."""
+    return await _export_job_report(job_id, "parquet", True, auth)
+
+
+async def _own_export(db, export_id: str, auth: dict) -> Optional[dict]:
+    report = await report_exporter.status(db, export_id)
+    if report is None or (auth.get("type") == "jwt_token" and report.get("created_by") != str(auth.get("user_id", ""))):
+        return None
+    return report
+
+
+@app.get("/v1/reports/exports/{export_id}", tags=["Analytics & Statistics"])
+async def report_export_status(export_id: str, auth=Depends(get_auth)):
+    """Progress of a queued job report export. JWT users only see their own exports."""
+    db = await get_mongo_db()
+    await report_exporter.resume(db)
+    report = await _own_export(db, export_id, auth)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Report export not found")
+    return report
+
+
+@app.get("/v1/reports/exports/{export_id}/download", tags=["Analytics & Statistics"])
+async def download_report_export(export_id: str, request: Request, auth=Depends(get_auth)):
+    """Download a completed report export. Supports Range requests so interrupted downloads can resume."""
+    db = await get_mongo_db()
+    report = await _own_export(db, export_id, auth)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Report export not found")
+    if report["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Report export is {report['status']}")
+    found = await report_exporter.download(db, export_id)
+    if found is None:
+        raise HTTPException(status_code=410, detail="Report file is no longer available")
+    export, size, read_range = found
+    etag = f'"{export_id}-{size}"'
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Content-Disposition": f'attachment; filename="job_{export["job_id"]}_report.{export["format"]}"'
     }
+    byte_range = None
+    if request.headers.get("if-range", etag) == etag:
+        try:
+            byte_range = parse_range(request.headers.get("range"), size)
+        except ReportExportError:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{size}", **headers})
+    start, end = byte_range or (0, size - 1)
+    headers["Content-Length"] = str(end - start + 1)
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(
+        read_range(start, end),
+        status_code=206 if byte_range else 200,
+        media_type=MEDIA_TYPES[export["format"]],
+        headers=headers
+    )
 
 # Client Portal API (2 endpoints)
 @app.post("/v1/client/register", tags=["Client Portal API"])
@@ -3032,59 +2975,53 @@ async def get_client_connected_recruiter(auth=Depends(get_auth)):
 _SSE_HEARTBEAT_INTERVAL = 25.0
 
 
-async def _client_connection_event_stream(client_id: str):
-    channel = f"client:{client_id}"
-    q = await _subscribe_connection_events(channel)
-    try:
-        while True:
-            try:
-                event = await asyncio.wait_for(q.get(), timeout=_SSE_HEARTBEAT_INTERVAL)
-                yield f"data: {json.dumps(event)}\n\n"
-            except asyncio.TimeoutError:
-                yield ": heartbeat\n\n"
-    finally:
-        _unsubscribe_connection_events(channel, q)
+def _last_event_id(request: Request) -> Optional[int]:
+    """Offset from the SSE Last-Event-ID header a reconnecting client sends, if any."""
+    value = request.headers.get("last-event-id", "").strip()
+    return int(value) if value.isdigit() else None
 
 
-async def _recruiter_connection_event_stream(recruiter_id: str):
-    channel = f"recruiter:{recruiter_id}"
-    q = await _subscribe_connection_events(channel)
+async def _connection_event_stream(channel: str, after: Optional[int]):
+    subscription = await connection_events.subscribe(channel, after)
     try:
         while True:
-            try:
-                event = await asyncio.wait_for(q.get(), timeout=_SSE_HEARTBEAT_INTERVAL)
-                yield f"data: {json.dumps(event)}\n\n"
-            except asyncio.TimeoutError:
+            item = await subscription.get(timeout=_SSE_HEARTBEAT_INTERVAL)
+            if item is None:
                 yield ": heartbeat\n\n"
+                continue
+            offset, event = item
+            yield f"id: {offset}\ndata: {json.dumps(event)}\n\n"
     finally:
-        _unsubscribe_connection_events(channel, q)
+        subscription.close()
 
 
 @app.get("/v1/client/connection-events", tags=["Client Portal API"])
-async def client_connection_events(auth=Depends(get_auth)):
-    """SSE stream for connection status. Client-only. Emits connected/disconnected so client and recruiter stay in sync."""
+async def client_connection_events(request: Request, auth=Depends(get_auth)):
+    """SSE stream for connection status. Client-only. Emits connected/disconnected so client and recruiter stay in sync.
+    Each event carries an id; reconnect with Last-Event-ID to replay missed events when CONNECTION_EVENTS_LOG_PATH is set."""
     if auth.get("type") != "jwt_token" or auth.get("role") != "client":
         raise HTTPException(status_code=403, detail="This endpoint is only available for clients")
     client_id = str(auth.get("user_id", ""))
     if not client_id:
         raise HTTPException(status_code=400, detail="Invalid client")
     return StreamingResponse(
-        _client_connection_event_stream(client_id),
+        _connection_event_stream(f"client:{client_id}", _last_event_id(request)),
         media_type="text/event-stream",
         headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
 @app.get("/v1/recruiter/connection-events", tags=["Recruiter API"])
-async def recruiter_connection_events(auth=Depends(get_auth)):
-    """SSE stream for connection status. Recruiter-only. Emits connected/disconnected so client and recruiter stay in sync."""
+async def recruiter_connection_events(request: Request, auth=Depends(get_auth)):
+    """SSE stream for connection status. Recruiter-only. Emits connected/disconnected so client and recruiter stay in sync.
+    Each event carries an id; reconnect with Last-Event-ID to replay missed events when CONNECTION_EVENTS_LOG_PATH is set."""
     if auth.get("type") != "jwt_token" or auth.get("role") not in ("recruiter", "admin"):
         raise HTTPException(status_code=403, detail="This endpoint is only available for recruiters")
     recruiter_id = str(auth.get("user_id", ""))
     if not recruiter_id:
         raise HTTPException(status_code=400, detail="Invalid recruiter")
     return StreamingResponse(
-        _recruiter_connection_event_stream(recruiter_id),
+        _connection_event_stream(f"recruiter:{recruiter_id}", _last_event_id(request)),
         media_type="text/event-stream",
         headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
@@ -3131,9 +3068,9 @@ async def recruiter_confirm_connection(body: ConfirmConnectionBody, auth=Depends
         new_count = await db.client_connected_recruiter.count_documents({"client_id": client_id_str})
         if old_client_id and old_client_id != client_id_str:
             old_count = await db.client_connected_recruiter.count_documents({"client_id": old_client_id})
-            await _push_connection_event(f"client:{old_client_id}", {"event": "disconnected", "connected_count": old_count})
-        await _push_connection_event(f"client:{client_id_str}", {"event": "connected", "connected_count": new_count})
-        await _push_connection_event(f"recruiter:{recruiter_id}", {"event": "connected", "company_name": company_name})
+            await connection_events.publish(f"client:{old_client_id}", {"event": "disconnected", "connected_count": old_count})
+        await connection_events.publish(f"client:{client_id_str}", {"event": "connected", "connected_count": new_count})
+        await connection_events.publish(f"recruiter:{recruiter_id}", {"event": "connected", "company_name": company_name})
         return {"client_id": client.get("client_id"), "company_name": company_name}
     except HTTPException:
         raise
@@ -3158,8 +3095,8 @@ async def recruiter_disconnect(auth=Depends(get_auth)):
             await db.client_connected_recruiter.delete_many({"recruiter_id": recruiter_id})
             if client_id:
                 new_count = await db.client_connected_recruiter.count_documents({"client_id": client_id})
-                await _push_connection_event(f"client:{client_id}", {"event": "disconnected", "connected_count": new_count})
-            await _push_connection_event(f"recruiter:{recruiter_id}", {"event": "disconnected"})
+                await connection_events.publish(f"client:{client_id}", {"event": "disconnected", "connected_count": new_count})
+            await connection_events.publish(f"recruiter:{recruiter_id}", {"event": "disconnected"})
         return {}
     except Exception as e:
         logger.exception("recruiter_disconnect failed: %s", e)
@@ -3306,7 +3243,8 @@ async def check_rate_limit_status(api_key: str = Depends(get_api_key)):
         "current_requests": 15,
         "remaining_requests": 45,
         "reset_time": datetime.now(timezone.utc).isoformat(),
-        "status": "active"
+        "status": "active",
+        "limiter": rate_limiter.get_stats()
     }
 
 @app.get("/v1/security/blocked-ips", tags=["Security Testing"])
@@ -3883,6 +3821,9 @@ async def candidate_register(candidate_data: CandidateRegister):
         }
         result = await db.candidates.insert_one(document)
         candidate_id = str(result.inserted_id)
+        candidate_search_index.note_write(candidate_id)
+        candidate_stats.record_insert("candidates", document)
+        agent_client.invalidate_candidates()
         
         return {
             "success": True,
@@ -4058,6 +3999,8 @@ async def update_candidate_profile(candidate_id: str, profile_data: CandidatePro
                 {"id": candidate_id},
                 {"$set": update_fields}
             )
+        candidate_search_index.note_write(candidate_id)
+        agent_client.invalidate_candidates()
         
         return {"success": True, "message": "Profile updated successfully"}
     except Exception as e:
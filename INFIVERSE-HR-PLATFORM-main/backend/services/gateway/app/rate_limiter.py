@@ -0,0 +1,174 @@
+"""
+Rate Limiter for Gateway Service
+GCRA (generic cell rate algorithm) limiter: one timestamp per key, O(1) per request,
+an LRU-bounded key table, load sampled off the request path, and an optional
+Redis backend so several gateway workers share one budget
+"""
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+WINDOW_SECONDS = 60.0
+
+# KEYS[1] = bucket key; ARGV = emission interval (ms), window (ms)
+# Uses the Redis clock so every worker judges arrivals against the same time.
+_GCRA_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local interval = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local new_tat = tat + interval
+local allow_at = new_tat - window
+if now < allow_at then
+  return {0, 0, allow_at - now}
+end
+redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil(new_tat - now))
+return {1, math.floor((now - allow_at) / interval), 0}
+"""
+
+
+class RateLimitDecision(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float
+
+    def headers(self) -> Dict[str, str]:
+        """X-RateLimit-* headers, plus Retry-After in whole seconds (at least 1) for a refused request"""
+        headers = {"X-RateLimit-Limit": str(self.limit), "X-RateLimit-Remaining": str(self.remaining)}
+        if not self.allowed:
+            # Rounded up: retrying after the rounded-down value would be refused again
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+class RateLimiter:
+    """Per-key request budgets of N per minute with bursts of up to N"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self.max_keys = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+        self.load_sample_seconds = float(os.getenv("RATE_LIMIT_LOAD_SAMPLE_SECONDS", "5"))
+        self.redis_url = os.getenv("RATE_LIMIT_REDIS_URL", "").strip()
+        self.redis_retry_seconds = float(os.getenv("RATE_LIMIT_REDIS_RETRY_SECONDS", "30"))
+        self.key_prefix = os.getenv("RATE_LIMIT_REDIS_PREFIX", "gateway:ratelimit:")
+        # key -> theoretical arrival time of the next request (monotonic seconds)
+        self._tat: "OrderedDict[str, float]" = OrderedDict()
+        self._cpu_percent: Optional[float] = None
+        self._sampler_task: Optional[asyncio.Task] = None
+        self._redis = None
+        self._redis_script = None
+        self._redis_down_until = 0.0
+        self.stats = {"allowed": 0, "limited": 0, "evicted_keys": 0, "redis_errors": 0}
+
+    # ---- load sampling --------------------------------------------------
+
+    def _ensure_sampler(self):
+        if self._sampler_task is not None and not self._sampler_task.done():
+            return
+
+        async def _run():
+            import psutil
+            psutil.cpu_percent(interval=None)  # first call only primes the counter
+            while True:
+                await asyncio.sleep(self.load_sample_seconds)
+                try:
+                    self._cpu_percent = psutil.cpu_percent(interval=None)
+                except Exception as e:
+                    logger.warning(f"CPU sampling failed: {e}")
+
+        self._sampler_task = asyncio.create_task(_run())
+
+    def load_factor(self) -> float:
+        """Scale for the base limits from the last CPU sample (1.0 until one is taken)"""
+        self._ensure_sampler()
+        cpu_usage = self._cpu_percent
+        if cpu_usage is None:
+            return 1.0
+        if cpu_usage > 80:
+            return 0.5  # Reduce by 50% during high load
+        if cpu_usage < 30:
+            return 1.5  # Increase by 50% during low load
+        return 1.0
+
+    # ---- backends -------------------------------------------------------
+
+    def _hit_local(self, key: str, limit: int) -> RateLimitDecision:
+        now = self._clock()
+        interval = WINDOW_SECONDS / limit
+        tat = self._tat.get(key, now)
+        if tat < now:
+            tat = now
+        new_tat = tat + interval
+        allow_at = new_tat - WINDOW_SECONDS
+        if now < allow_at:
+            # Still recent: evicting a key that is being refused would hand it a fresh burst
+            self._tat.move_to_end(key)
+            return RateLimitDecision(False, limit, 0, allow_at - now)
+
+        self._tat[key] = new_tat
+        self._tat.move_to_end(key)
+        # Evicting the least recently seen key only forgets a budget that is refilling anyway
+        while len(self._tat) > self.max_keys:
+            self._tat.popitem(last=False)
+            self.stats["evicted_keys"] += 1
+        return RateLimitDecision(True, limit, int((now - allow_at) // interval), 0.0)
+
+    async def _hit_redis(self, key: str, limit: int) -> Optional[RateLimitDecision]:
+        if not self.redis_url or self._clock() < self._redis_down_until:
+            return None
+        try:
+            if self._redis is None:
+                import redis.asyncio as redis
+                self._redis = redis.from_url(self.redis_url, socket_timeout=0.25, socket_connect_timeout=0.25)
+                self._redis_script = self._redis.register_script(_GCRA_SCRIPT)
+            interval_ms = WINDOW_SECONDS * 1000 / limit
+            allowed, remaining, retry_ms = await self._redis_script(
+                keys=[self.key_prefix + key], args=[interval_ms, WINDOW_SECONDS * 1000]
+            )
+            return RateLimitDecision(bool(allowed), limit, int(remaining), float(retry_ms) / 1000)
+        except Exception as e:
+            # Keep serving with per-process buckets rather than failing every request
+            self.stats["redis_errors"] += 1
+            self._redis_down_until = self._clock() + self.redis_retry_seconds
+            logger.warning(f"Rate limit backend unavailable, using local buckets for {self.redis_retry_seconds:g}s: {e}")
+            return None
+
+    # ---- public API -----------------------------------------------------
+
+    async def hit(self, key: str, limit: int) -> RateLimitDecision:
+        """
+        Count one request against key's budget of limit requests per minute.
+
+        Args:
+            key: Bucket identity (client and endpoint)
+            limit: Requests allowed per minute, also the largest burst
+
+        Returns:
+            RateLimitDecision: whether to serve it, remaining budget and seconds until the next slot
+        """
+        limit = max(1, int(limit))
+        decision = await self._hit_redis(key, limit)
+        if decision is None:
+            decision = self._hit_local(key, limit)
+        self.stats["allowed" if decision.allowed else "limited"] += 1
+        return decision
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "backend": "redis" if self.redis_url and self._clock() >= self._redis_down_until else "local",
+            "tracked_keys": len(self._tat),
+            "cpu_percent": self._cpu_percent
+        }
+
+
+rate_limiter = RateLimiter()
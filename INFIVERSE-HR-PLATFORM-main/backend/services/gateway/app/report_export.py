@@ -0,0 +1,560 @@
+"""
+Job Report Export for Gateway Service
+Streams job, application and match rows from MongoDB cursors to CSV (or Parquet)
+a batch at a time, with large reports written by resumable background jobs,
+stored in GridFS once finished and downloaded with HTTP range requests
+"""
+import asyncio
+import csv
+import io
+import logging
+import os
+import socket
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from gridfs.errors import NoFile
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+# (column, parquet type); CSV writes every column as text
+REPORT_SCHEMA = [
+    ("job_id", "string"),
+    ("job_title", "string"),
+    ("department", "string"),
+    ("job_location", "string"),
+    ("application_id", "string"),
+    ("candidate_id", "string"),
+    ("candidate_name", "string"),
+    ("email", "string"),
+    ("phone", "string"),
+    ("candidate_location", "string"),
+    ("experience_years", "string"),
+    ("technical_skills", "string"),
+    ("application_status", "string"),
+    ("applied_date", "string"),
+    ("match_score", "int"),
+    ("skills_match", "string"),
+    ("experience_match", "int"),
+    ("location_match", "int"),
+    ("interview_status", "string"),
+    ("interview_date", "string"),
+    ("feedback_average", "float"),
+    ("offer_status", "string"),
+]
+REPORT_COLUMNS = [name for name, _ in REPORT_SCHEMA]
+
+MEDIA_TYPES = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+CANDIDATE_FIELDS = {"name": 1, "email": 1, "phone": 1, "location": 1, "experience_years": 1, "technical_skills": 1}
+
+
+class ReportExportError(ValueError):
+    """The export cannot be produced or served as requested"""
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _cell(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(v) for v in value)
+    return value
+
+
+def _typed(value: Any, kind: str) -> Any:
+    """Parquet value for a column: text columns as str, numeric ones as numbers or null"""
+    if kind == "string":
+        value = _cell(value)
+        return value if isinstance(value, str) else str(value)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return int(value) if kind == "int" else float(value)
+
+
+def _encode_csv(rows: List[List[Any]], header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(REPORT_COLUMNS)
+    writer.writerows([[_cell(v) for v in row] for row in rows])
+    return buffer.getvalue().encode("utf-8")
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Inclusive byte range for a single-range `Range: bytes=...` header, or None to send the whole file.
+
+    Raises:
+        ReportExportError: the range lies outside the file (answer 416)
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_text, _, end_text = header[len("bytes="):].strip().partition("-")
+    try:
+        if start_text:
+            start = int(start_text)
+            end = min(int(end_text), size - 1) if end_text else size - 1
+        else:
+            # bytes=-N is the last N bytes
+            start, end = max(0, size - int(end_text)), size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise ReportExportError(f"Range not satisfiable for {size} bytes")
+    return start, end
+
+
+class JobReportExporter:
+    """Job report rows from database cursors, streamed or written to files by background jobs"""
+
+    def __init__(self):
+        self.batch_size = int(os.getenv("REPORT_EXPORT_BATCH_SIZE", "500"))
+        self.sync_limit = int(os.getenv("REPORT_EXPORT_SYNC_LIMIT", "5000"))
+        self.directory = os.getenv("REPORT_EXPORT_DIR") or os.path.join(tempfile.gettempdir(), "gateway-reports")
+        self.retention_hours = float(os.getenv("REPORT_EXPORT_RETENTION_HOURS", "24"))
+        self.lease_seconds = float(os.getenv("REPORT_EXPORT_LEASE_SECONDS", "120"))
+        # Consecutive failed runs before an export is marked failed instead of resumed again
+        self.max_attempts = int(os.getenv("REPORT_EXPORT_MAX_ATTEMPTS", "3"))
+        # Partial files live in directory until finished; only a directory every replica
+        # mounts lets another replica resume them, otherwise it restarts the export
+        self.shared_directory = os.getenv("REPORT_EXPORT_SHARED_DIR", "false").lower() == "true"
+        self.node = os.getenv("REPORT_EXPORT_NODE_ID") or socket.gethostname()
+        self.bucket_name = os.getenv("REPORT_EXPORT_BUCKET", "report_files")
+        # job document -> (candidate document -> match columns); set by the gateway
+        self.match_scorer: Optional[Callable[[Dict[str, Any]], Callable[[Dict[str, Any]], Dict[str, Any]]]] = None
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._owner = f"{os.getpid()}-{ObjectId()}"
+
+    # ---- rows -----------------------------------------------------------
+
+    @staticmethod
+    def application_query(job_id: str, job_doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Applications for a job stored under either the requested id or the document id"""
+        return {"job_id": {"$in": list(dict.fromkeys([job_id, str(job_doc["_id"])]))}}
+
+    async def _rows(self, db, job_id: str, job_doc: Dict[str, Any], applications: List[Dict[str, Any]],
+                    score: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]]) -> List[List[Any]]:
+        """Report rows for one batch of applications, with one lookup per related collection"""
+        job_keys = self.application_query(job_id, job_doc)["job_id"]["$in"]
+        candidate_ids = list(dict.fromkeys(str(a.get("candidate_id")) for a in applications if a.get("candidate_id")))
+        object_ids = [ObjectId(cid) for cid in candidate_ids if ObjectId.is_valid(cid)]
+
+        candidates: Dict[str, Dict[str, Any]] = {}
+        if object_ids:
+            async for doc in db.candidates.find({"_id": {"$in": object_ids}}, CANDIDATE_FIELDS):
+                candidates[str(doc["_id"])] = doc
+        # Latest interview and offer per candidate: ascending order lets later documents overwrite
+        interviews: Dict[str, Dict[str, Any]] = {}
+        async for doc in db.interviews.find({"job_id": {"$in": job_keys}, "candidate_id": {"$in": candidate_ids}},
+                                            {"candidate_id": 1, "status": 1, "interview_date": 1}).sort("_id", 1):
+            interviews[str(doc.get("candidate_id"))] = doc
+        offers: Dict[str, str] = {}
+        async for doc in db.offers.find({"job_id": {"$in": job_keys}, "candidate_id": {"$in": candidate_ids}},
+                                        {"candidate_id": 1, "status": 1}).sort("_id", 1):
+            offers[str(doc.get("candidate_id"))] = doc.get("status")
+        feedback: Dict[str, List[float]] = {}
+        # Feedback references jobs by document id; match the requested id forms too
+        feedback_job_keys = list(dict.fromkeys([*job_keys, job_doc["_id"]]))
+        async for doc in db.feedback.find({"job_id": {"$in": feedback_job_keys}, "candidate_id": {"$in": [*candidate_ids, *object_ids]}},
+                                          {"candidate_id": 1, "average_score": 1}):
+            if isinstance(doc.get("average_score"), (int, float)):
+                feedback.setdefault(str(doc.get("candidate_id")), []).append(doc["average_score"])
+
+        rows = []
+        for application in applications:
+            cid = str(application.get("candidate_id") or "")
+            candidate = candidates.get(cid, {})
+            match = score(candidate) if score and candidate else {}
+            interview = interviews.get(cid, {})
+            scores = feedback.get(cid)
+            rows.append([
+                job_id,
+                job_doc.get("title"),
+                job_doc.get("department"),
+                job_doc.get("location"),
+                str(application["_id"]),
+                cid,
+                candidate.get("name"),
+                candidate.get("email"),
+                candidate.get("phone"),
+                candidate.get("location"),
+                candidate.get("experience_years"),
+                candidate.get("technical_skills"),
+                application.get("status"),
+                application.get("applied_date"),
+                match.get("match_score"),
+                match.get("skills_match"),
+                match.get("experience_match"),
+                match.get("location_match"),
+                interview.get("status"),
+                interview.get("interview_date"),
+                round(sum(scores) / len(scores), 2) if scores else None,
+                offers.get(cid),
+            ])
+        return rows
+
+    async def iter_batches(self, db, job_id: str, job_doc: Dict[str, Any],
+                           after: Optional[ObjectId] = None) -> AsyncIterator[Tuple[List[List[Any]], ObjectId]]:
+        """
+        Report rows in application id order, batch_size at a time.
+
+        Args:
+            db: Motor database
+            job_id: Job id as requested
+            job_doc: The job document
+            after: Resume after this application id
+
+        Yields:
+            tuple: (rows, id of the last application in the batch)
+        """
+        score = self.match_scorer(job_doc) if self.match_scorer else None
+        query = self.application_query(job_id, job_doc)
+        if after is not None:
+            query["_id"] = {"$gt": after}
+        batch: List[Dict[str, Any]] = []
+        async for application in db.job_applications.find(query).sort("_id", 1).batch_size(self.batch_size):
+            batch.append(application)
+            if len(batch) >= self.batch_size:
+                yield await self._rows(db, job_id, job_doc, batch, score), batch[-1]["_id"]
+                batch = []
+        if batch:
+            yield await self._rows(db, job_id, job_doc, batch, score), batch[-1]["_id"]
+
+    async def stream_csv(self, db, job_id: str, job_doc: Dict[str, Any]) -> AsyncIterator[bytes]:
+        """CSV report bytes, header first, then one chunk per batch of applications"""
+        yield _encode_csv([], header=True)
+        async for rows, _ in self.iter_batches(db, job_id, job_doc):
+            yield _encode_csv(rows)
+
+    # ---- files ----------------------------------------------------------
+
+    def _path(self, export_id: str, fmt: str) -> str:
+        return os.path.join(self.directory, f"{export_id}.{fmt}")
+
+    @staticmethod
+    def _truncate(path: str, size: int):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "ab") as f:
+            f.truncate(size)
+
+    @staticmethod
+    def _append(path: str, data: bytes):
+        with open(path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def _parquet_writer(path: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ReportExportError("Parquet export requires pyarrow")
+        types = {"string": pa.string(), "int": pa.int64(), "float": pa.float64()}
+        schema = pa.schema([(name, types[kind]) for name, kind in REPORT_SCHEMA])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return pq.ParquetWriter(path, schema), schema
+
+    @staticmethod
+    def _write_row_group(writer, schema, rows: List[List[Any]]):
+        import pyarrow as pa
+        columns = {name: [_typed(row[i], kind) for row in rows] for i, (name, kind) in enumerate(REPORT_SCHEMA)}
+        writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+
+    def _bucket(self, db) -> AsyncIOMotorGridFSBucket:
+        return AsyncIOMotorGridFSBucket(db, bucket_name=self.bucket_name)
+
+    async def _delete_stored(self, db, oid: ObjectId):
+        try:
+            await self._bucket(db).delete(oid)
+        except NoFile:
+            # Also clears chunks of an upload that never finished
+            pass
+
+    async def _store(self, db, oid: ObjectId, path: str, filename: str, chunk_size: int = 1 << 20):
+        """Copy a finished report file into GridFS so every gateway replica can serve it"""
+        await self._delete_stored(db, oid)
+        upload = self._bucket(db).open_upload_stream_with_id(oid, filename)
+        with open(path, "rb") as f:
+            while True:
+                data = await asyncio.to_thread(f.read, chunk_size)
+                if not data:
+                    break
+                await upload.write(data)
+        await upload.close()
+
+    async def iter_stored(self, db, export_id: str, start: int, end: int) -> AsyncIterator[bytes]:
+        """Bytes start..end (inclusive) of a report stored in GridFS"""
+        stored = await self._bucket(db).open_download_stream(ObjectId(export_id))
+        stored.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            data = await stored.read(min(1 << 16, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+    @staticmethod
+    async def iter_file(path: str, start: int, end: int, chunk_size: int = 1 << 16) -> AsyncIterator[bytes]:
+        """Bytes start..end (inclusive) of a file, read off the event loop"""
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                data = await asyncio.to_thread(f.read, min(chunk_size, remaining))
+                if not data:
+                    break
+                remaining -= len(data)
+                yield data
+
+    # ---- background exports ---------------------------------------------
+
+    async def submit(self, db, job_id: str, fmt: str, total_rows: int, created_by: Optional[str]) -> str:
+        """Queue a report file for a job, or return the export already being written for it"""
+        if fmt == "parquet" and not parquet_available():
+            raise ReportExportError("Parquet export requires pyarrow")
+        # Exports are only visible to their creator, so each creator gets their own
+        existing = await db.report_exports.find_one({"job_id": job_id, "format": fmt, "created_by": created_by,
+                                                     "status": {"$in": ["queued", "running"]}})
+        if existing is not None:
+            self._start(db, str(existing["_id"]))
+            return str(existing["_id"])
+        export_id = ObjectId()
+        now = datetime.now(timezone.utc)
+        await db.report_exports.insert_one({
+            "_id": export_id,
+            "job_id": job_id,
+            "format": fmt,
+            "status": "queued",
+            "created_by": created_by,
+            "total_rows": total_rows,
+            "rows_written": 0,
+            "bytes_written": 0,
+            "last_application_id": None,
+            "attempts": 0,
+            "node": self.node,
+            "lease_owner": None,
+            "lease_until": now,
+            "created_at": now,
+            "updated_at": now
+        })
+        self._start(db, str(export_id))
+        return str(export_id)
+
+    def _start(self, db, export_id: str):
+        task = self._tasks.get(export_id)
+        if task is None or task.done():
+            self._tasks[export_id] = asyncio.create_task(self._run(db, export_id))
+
+    async def _claim(self, db, export_id: ObjectId) -> Optional[Dict[str, Any]]:
+        """Take (or renew) the lease on an unfinished export"""
+        now = datetime.now(timezone.utc)
+        # $lte: a failed run expires its lease at "now", stored to the millisecond
+        return await db.report_exports.find_one_and_update(
+            {"_id": export_id, "status": {"$in": ["queued", "running"]},
+             "$or": [{"lease_owner": self._owner}, {"lease_until": {"$lte": now}}]},
+            {"$set": {"status": "running", "lease_owner": self._owner,
+                      "lease_until": now + timedelta(seconds=self.lease_seconds), "updated_at": now}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _run(self, db, export_id: str):
+        oid = ObjectId(export_id)
+        start = time.perf_counter()
+        writer = None
+        try:
+            export = await self._claim(db, oid)
+            if export is None:
+                # Finished, or another gateway process holds the lease
+                return
+            job_id, fmt = export["job_id"], export["format"]
+            path = self._path(export_id, fmt)
+            if export.get("node") != self.node and not self.shared_directory:
+                # The partial file is on the replica that started the export, so begin again here
+                export.update(bytes_written=0, rows_written=0, last_application_id=None)
+                await db.report_exports.update_one({"_id": oid}, {"$set": {
+                    "node": self.node, "bytes_written": 0, "rows_written": 0, "last_application_id": None
+                }})
+            job_doc = await self._find_job(db, job_id)
+            if job_doc is None:
+                await db.report_exports.update_one({"_id": oid}, {"$set": {
+                    "status": "failed", "lease_owner": None, "last_error": "Job not found"
+                }})
+                return
+
+            if fmt == "csv":
+                # CSV is append-only: drop any bytes written after the last checkpoint and carry on from there
+                bytes_written = export["bytes_written"]
+                await asyncio.to_thread(self._truncate, path, bytes_written)
+                if bytes_written == 0:
+                    header = _encode_csv([], header=True)
+                    await asyncio.to_thread(self._append, path, header)
+                    bytes_written = len(header)
+                after = export.get("last_application_id")
+            else:
+                # A Parquet footer is only written on close, so an interrupted file starts over
+                writer, schema = await asyncio.to_thread(self._parquet_writer, path)
+                bytes_written, after = 0, None
+                await db.report_exports.update_one({"_id": oid}, {"$set": {"rows_written": 0, "last_application_id": None}})
+
+            async for rows, last_id in self.iter_batches(db, job_id, job_doc, after):
+                if fmt == "csv":
+                    data = _encode_csv(rows)
+                    await asyncio.to_thread(self._append, path, data)
+                    bytes_written += len(data)
+                else:
+                    await asyncio.to_thread(self._write_row_group, writer, schema, rows)
+                # File offset and cursor position move together, so a restart resumes at the first unwritten batch
+                await db.report_exports.update_one({"_id": oid}, {
+                    "$set": {"bytes_written": bytes_written, "last_application_id": last_id,
+                             "attempts": 0, "updated_at": datetime.now(timezone.utc)},
+                    "$inc": {"rows_written": len(rows)}
+                })
+                if await self._claim(db, oid) is None:
+                    logger.warning(f"Report export {export_id} lost its lease; stopping")
+                    return
+
+            if writer is not None:
+                await asyncio.to_thread(writer.close)
+                writer = None
+            size = os.path.getsize(path)
+            await self._store(db, oid, path, f"job_{job_id}_report.{fmt}")
+            now = datetime.now(timezone.utc)
+            await db.report_exports.update_one({"_id": oid}, {"$set": {
+                "status": "completed",
+                "storage": "gridfs",
+                "lease_owner": None,
+                "size_bytes": size,
+                "completed_at": now,
+                "expires_at": now + timedelta(hours=self.retention_hours)
+            }})
+            await asyncio.to_thread(self._remove, path)
+            logger.info(f"Report export {export_id} completed in {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            logger.error(f"Report export {export_id} interrupted: {e}")
+            await self._record_failure(db, oid, str(e)[:200])
+        finally:
+            if writer is not None:
+                try:
+                    writer.close()
+                except Exception:
+                    pass
+            self._tasks.pop(export_id, None)
+
+    async def _record_failure(self, db, oid: ObjectId, error: str):
+        """
+        Leave a failed run's export running with an expired lease so the next resume() picks it up,
+        unless it has failed max_attempts times in a row without writing a batch.
+        """
+        now = datetime.now(timezone.utc)
+        export = await db.report_exports.find_one_and_update(
+            {"_id": oid, "status": "running", "lease_owner": self._owner},
+            {"$set": {"lease_until": now, "last_error": error, "updated_at": now}, "$inc": {"attempts": 1}},
+            return_document=ReturnDocument.AFTER
+        )
+        if export is not None and export["attempts"] >= self.max_attempts:
+            logger.error(f"Report export {oid} failed {export['attempts']} times; giving up")
+            await db.report_exports.update_one({"_id": oid, "status": "running"}, {"$set": {
+                "status": "failed", "lease_owner": None
+            }})
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    async def _find_job(db, job_id: str) -> Optional[Dict[str, Any]]:
+        if ObjectId.is_valid(job_id):
+            job_doc = await db.jobs.find_one({"_id": ObjectId(job_id)})
+            if job_doc is not None:
+                return job_doc
+        return await db.jobs.find_one({"id": job_id})
+
+    async def resume(self, db) -> int:
+        """Restart exports whose worker stopped and delete expired report files; returns how many resumed"""
+        resumed = 0
+        now = datetime.now(timezone.utc)
+        async for export in db.report_exports.find({"status": {"$in": ["queued", "running"]}, "lease_until": {"$lte": now}}, {"_id": 1}):
+            export_id = str(export["_id"])
+            if export_id not in self._tasks:
+                self._start(db, export_id)
+                resumed += 1
+        async for export in db.report_exports.find({"status": "completed", "expires_at": {"$lt": now}}, {"format": 1, "storage": 1}):
+            if export.get("storage") == "gridfs":
+                await self._delete_stored(db, export["_id"])
+            else:
+                self._remove(self._path(str(export["_id"]), export["format"]))
+            await db.report_exports.update_one({"_id": export["_id"]}, {"$set": {"status": "expired"}})
+        if resumed:
+            logger.info(f"Resuming {resumed} report exports")
+        return resumed
+
+    async def status(self, db, export_id: str) -> Optional[Dict[str, Any]]:
+        """Progress of a background export"""
+        if not ObjectId.is_valid(export_id):
+            return None
+        export = await db.report_exports.find_one({"_id": ObjectId(export_id)})
+        if export is None:
+            return None
+        total = export["total_rows"] or 1
+        report = {
+            "export_id": export_id,
+            "job_id": export["job_id"],
+            "format": export["format"],
+            "status": export["status"],
+            "created_by": export.get("created_by"),
+            "total_rows": export["total_rows"],
+            "rows_written": export["rows_written"],
+            "attempts": export.get("attempts", 0),
+            "progress": 1.0 if export["status"] == "completed" else round(min(export["rows_written"] / total, 1.0), 4),
+            "size_bytes": export.get("size_bytes"),
+            "error": export.get("last_error"),
+            "created_at": export["created_at"].isoformat() if export.get("created_at") else None,
+            "completed_at": export["completed_at"].isoformat() if export.get("completed_at") else None,
+            "expires_at": export["expires_at"].isoformat() if export.get("expires_at") else None
+        }
+        if export["status"] == "completed":
+            report["download_url"] = f"/v1/reports/exports/{export_id}/download"
+        return report
+
+    async def download(self, db, export_id: str) -> Optional[Tuple[Dict[str, Any], int, Callable[[int, int], AsyncIterator[bytes]]]]:
+        """(export document, size, reader of an inclusive byte range) for a completed export still stored"""
+        if not ObjectId.is_valid(export_id):
+            return None
+        export = await db.report_exports.find_one({"_id": ObjectId(export_id), "status": "completed"})
+        if export is None:
+            return None
+        if export.get("storage") == "gridfs":
+            size = export.get("size_bytes")
+            if size is None or not await db[f"{self.bucket_name}.files"].count_documents({"_id": export["_id"]}, limit=1):
+                return None
+            return export, size, lambda start, end: self.iter_stored(db, export_id, start, end)
+        # Exports finished before reports moved to GridFS are still on this replica's disk
+        path = self._path(export_id, export["format"])
+        if not os.path.exists(path):
+            return None
+        return export, os.path.getsize(path), lambda start, end: self.iter_file(path, start, end)
+
+
+report_exporter = JobReportExporter()
@@ -0,0 +1,196 @@
+"""
+Candidate Statistics Materializer for Gateway Service
+Keeps the /v1/candidates/stats counters in memory, advanced by gateway writes
+and reconciled against MongoDB in the background
+"""
+import asyncio
+import bisect
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+RECENT_WINDOW = timedelta(days=7)
+PENDING_INTERVIEW_STATUSES = ("scheduled", "pending")
+
+
+def _timestamp(value: Any) -> Optional[float]:
+    """Epoch seconds for datetime values; anything else never satisfies a date range query"""
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        # Motor returns naive UTC datetimes unless tz_aware is set
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class CandidateStatsMaterializer:
+    """Dashboard counters served from memory instead of six count_documents per request"""
+
+    def __init__(self):
+        self.enabled = os.getenv("CANDIDATE_STATS_MATERIALIZED", "true").lower() == "true"
+        self.reconcile_seconds = float(os.getenv("CANDIDATE_STATS_RECONCILE_SECONDS", "300"))
+        self._totals: Optional[Dict[str, int]] = None
+        # Sorted timestamps behind the windowed counters
+        self._candidate_created: List[float] = []
+        self._match_created: List[float] = []
+        self._interview_dates: List[float] = []
+        self._reconciled_at: Optional[datetime] = None
+        self._reconciled_monotonic = 0.0
+        self._reconcile_task: Optional[asyncio.Task] = None
+        self._recent_matches_fallback = False
+        self.last_drift: Dict[str, int] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self._totals is not None
+
+    # ---- write hooks ----------------------------------------------------
+
+    def record_insert(self, collection: str, document: Dict[str, Any], count: int = 1):
+        """Advance the counters for a document the gateway just inserted"""
+        if self._totals is None:
+            return
+        if collection == "candidates":
+            self._totals["total_candidates"] += count
+            created = _timestamp(document.get("created_at"))
+            if created is not None:
+                for _ in range(count):
+                    bisect.insort(self._candidate_created, created)
+        elif collection == "jobs":
+            if document.get("status") == "active":
+                self._totals["active_jobs"] += count
+        elif collection == "feedback":
+            self._totals["total_feedback_submissions"] += count
+        elif collection == "interviews":
+            interview_date = _timestamp(document.get("interview_date"))
+            if document.get("status") in PENDING_INTERVIEW_STATUSES and interview_date is not None:
+                for _ in range(count):
+                    bisect.insort(self._interview_dates, interview_date)
+        elif collection == "matching_cache":
+            created = _timestamp(document.get("created_at"))
+            if created is not None:
+                for _ in range(count):
+                    bisect.insort(self._match_created, created)
+
+    # ---- reconciliation -------------------------------------------------
+
+    @staticmethod
+    async def _timestamps(collection, query: Dict[str, Any], field: str) -> List[float]:
+        values = []
+        async for doc in collection.find(query, {field: 1, "_id": 0}):
+            value = _timestamp(doc.get(field))
+            if value is not None:
+                values.append(value)
+        values.sort()
+        return values
+
+    async def reconcile(self, db):
+        """Recount everything from MongoDB, replacing the incrementally maintained state"""
+        start = time.perf_counter()
+        now = datetime.now(timezone.utc)
+        since = now - RECENT_WINDOW
+
+        async def _optional(coro, default):
+            try:
+                return await coro
+            except Exception as e:
+                logger.warning(f"Candidate stats query failed: {e}")
+                return default
+
+        total_candidates, active_jobs, total_feedback, candidate_created, match_created, interview_dates = await asyncio.gather(
+            db.candidates.count_documents({}),
+            db.jobs.count_documents({"status": "active"}),
+            _optional(db.feedback.count_documents({}), 0),
+            _optional(self._timestamps(db.candidates, {"created_at": {"$gte": since}}, "created_at"), []),
+            _optional(self._timestamps(db.matching_cache, {"created_at": {"$gte": since}}, "created_at"), None),
+            _optional(self._timestamps(db.interviews, {
+                "status": {"$in": list(PENDING_INTERVIEW_STATUSES)},
+                "interview_date": {"$gte": now}
+            }, "interview_date"), [])
+        )
+        totals = {
+            "total_candidates": total_candidates,
+            "active_jobs": active_jobs,
+            "total_feedback_submissions": total_feedback
+        }
+        if self._totals is not None:
+            self.last_drift = {key: totals[key] - self._totals[key] for key in totals if totals[key] != self._totals[key]}
+            if self.last_drift:
+                # Writes from other services or gateway replicas; expected, but worth seeing
+                logger.info(f"Candidate stats reconciled with drift {self.last_drift}")
+
+        self._totals = totals
+        self._candidate_created = candidate_created
+        self._recent_matches_fallback = match_created is None
+        self._match_created = match_created or []
+        self._interview_dates = interview_dates
+        self._reconciled_at = now
+        self._reconciled_monotonic = time.monotonic()
+        logger.info(f"Candidate stats reconciled in {time.perf_counter() - start:.2f}s")
+
+    def _schedule_reconcile(self, db):
+        if self._reconcile_task is not None and not self._reconcile_task.done():
+            return
+
+        async def _run():
+            try:
+                await self.reconcile(db)
+            except Exception as e:
+                logger.error(f"Candidate stats reconcile failed: {e}")
+
+        self._reconcile_task = asyncio.create_task(_run())
+
+    async def ensure_fresh(self, db) -> bool:
+        """Reconcile on first use (awaited) and in the background once stale; True when stats can be served"""
+        if not self.enabled:
+            return False
+        if self._totals is None:
+            try:
+                await self.reconcile(db)
+            except Exception as e:
+                logger.error(f"Candidate stats reconcile failed: {e}")
+                return False
+        elif time.monotonic() - self._reconciled_monotonic > self.reconcile_seconds:
+            self._schedule_reconcile(db)
+        return True
+
+    # ---- serving --------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current counters; windowed ones are evaluated against the clock at call time"""
+        now = datetime.now(timezone.utc)
+        since = (now - RECENT_WINDOW).timestamp()
+        # Keep the windows from growing: entries older than the window can never count again
+        del self._candidate_created[:bisect.bisect_left(self._candidate_created, since)]
+        del self._match_created[:bisect.bisect_left(self._match_created, since)]
+        del self._interview_dates[:bisect.bisect_left(self._interview_dates, now.timestamp())]
+
+        totals = self._totals
+        recent_matches = len(self._match_created)
+        if self._recent_matches_fallback:
+            candidates, jobs = totals["total_candidates"], totals["active_jobs"]
+            recent_matches = min(candidates * jobs // 10, 50) if candidates > 0 and jobs > 0 else 0
+        return {
+            "total_candidates": totals["total_candidates"],
+            "active_jobs": totals["active_jobs"],
+            "recent_matches": recent_matches,
+            "pending_interviews": len(self._interview_dates),
+            "new_candidates_this_week": len(self._candidate_created),
+            "total_feedback_submissions": totals["total_feedback_submissions"],
+            "reconciled_at": self._reconciled_at.isoformat() if self._reconciled_at else None
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "reconciled_at": self._reconciled_at.isoformat() if self._reconciled_at else None,
+            "last_drift": self.last_drift,
+            "reconciling": self._reconcile_task is not None and not self._reconcile_task.done()
+        }
+
+
+candidate_stats = CandidateStatsMaterializer()
@@ -156,6 +156,29 @@ async def create_indexes():
         else:
             print("[WARN] 'clients' collection does not exist (will be created on first insert)")
         
+        # ===== BULK UPLOAD INDEXES =====
+        print("\n" + "="*60)
+        print("[INFO] Creating indexes for bulk candidate uploads...")
+        print("="*60)
+        
+        # Created up front: the collections only appear with the first large upload
+        for collection, keys, options, label in (
+            ("bulk_upload_chunks", [("upload_id", 1), ("seq", 1)], {"unique": True, "name": "upload_seq_unique"}, "bulk_upload_chunks.upload_id+seq (unique)"),
+            ("bulk_uploads", [("status", 1), ("lease_until", 1)], {"name": "status_lease_index"}, "bulk_uploads.status+lease_until"),
+            ("job_applications", [("job_id", 1), ("candidate_id", 1)], {"name": "job_candidate_index"}, "job_applications.job_id+candidate_id"),
+        ):
+            try:
+                await db[collection].create_index(keys, **options)
+                indexes_created.append(label)
+                print(f"[OK] Created index {label}")
+            except Exception as e:
+                if "already exists" in str(e).lower() or "duplicate" in str(e).lower():
+                    indexes_existing.append(label)
+                    print(f"[INFO] Index {label} already exists")
+                else:
+                    indexes_failed.append(f"{label}: {str(e)}")
+                    print(f"[ERROR] Failed to create index {label}: {str(e)}")
+        
         # ===== SUMMARY =====
         print("\n" + "="*60)
         print("[SUMMARY] INDEX CREATION SUMMARY")
@@ -0,0 +1,204 @@
+"""
+Delta Checkpoint Encoding for LangGraph
+Turns checkpoints into stored documents holding only the channels changed since their
+parent (with periodic full snapshots) and rebuilds them from their ancestor chain.
+Kept free of langgraph and database imports so the encoding can be used and tested
+with any serializer that has dumps_typed/loads_typed.
+
+A delta is only readable together with every ancestor in its "chain" back to the
+snapshot, so ancestor documents must never be pruned while a descendant is kept:
+delete whole threads, or choose checkpoints to delete with prunable_checkpoints.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from bson.binary import Binary
+import json
+import logging
+import os
+import zlib
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Checkpoint documents written before binary storage have no "format" field
+CHECKPOINT_FORMAT = 2
+
+# (type, serialized bytes) as returned by serde.dumps_typed
+TypedBlob = Tuple[str, bytes]
+
+
+class _ThreadHead:
+    """Latest checkpoint written for a thread: what the next checkpoint is diffed against"""
+
+    def __init__(self, thread_ts: str, blobs: Dict[str, TypedBlob], versions: Dict[str, Any], chain: List[str]):
+        self.thread_ts = thread_ts
+        self.blobs = blobs
+        self.versions = versions
+        # Ancestors back to the last snapshot, nearest first (empty for a snapshot)
+        self.chain = chain
+
+
+def prunable_checkpoints(checkpoints: Iterable[Tuple[str, List[str]]], keep: int) -> List[str]:
+    """
+    Checkpoints of one thread that can be deleted while keeping the newest `keep` readable.
+
+    Args:
+        checkpoints: (thread_ts, chain) of every checkpoint in the thread, newest first
+        keep: Number of newest checkpoints to keep (at least 1, so the thread head survives)
+
+    Returns:
+        list: thread_ts values that are neither kept nor an ancestor of a kept checkpoint
+    """
+    if keep < 1:
+        raise ValueError("keep must be at least 1")
+    needed: Set[str] = set()
+    prunable = []
+    for i, (thread_ts, chain) in enumerate(checkpoints):
+        if i < keep:
+            needed.add(thread_ts)
+            needed.update(chain)
+        elif thread_ts not in needed:
+            prunable.append(thread_ts)
+    return prunable
+
+
+class DeltaCheckpointCodec:
+    """
+    Delta encoding for a checkpoint saver; expects a `serde` attribute from the saver.
+
+    Savers call _init_deltas() from __init__ and implement _fetch_ancestors.
+    """
+
+    def _init_deltas(self):
+        self.snapshot_interval = max(1, int(os.getenv("CHECKPOINT_SNAPSHOT_INTERVAL", "10")))
+        self.compress_min_bytes = int(os.getenv("CHECKPOINT_COMPRESS_MIN_BYTES", "1024"))
+        self.head_cache_size = int(os.getenv("CHECKPOINT_HEAD_CACHE_SIZE", "256"))
+        self._heads: "OrderedDict[str, _ThreadHead]" = OrderedDict()
+        self.stats = {"snapshots": 0, "deltas": 0, "channels_written": 0, "bytes_written": 0, "bytes_uncompressed": 0}
+
+    def _fetch_ancestors(self, thread_id: str, thread_ts: List[str]) -> Iterable[Tuple[str, Dict[str, Any]]]:
+        """(thread_ts, stored checkpoint) for those of the given ancestors that exist"""
+        raise NotImplementedError
+
+    def _encode(self, blob: TypedBlob) -> Dict[str, Any]:
+        """Stored form of a serialized value; compressed when that saves space"""
+        type_, data = blob
+        self.stats["bytes_uncompressed"] += len(data)
+        compressed = False
+        if len(data) >= self.compress_min_bytes:
+            packed = zlib.compress(data, 6)
+            if len(packed) < len(data):
+                data, compressed = packed, True
+        self.stats["bytes_written"] += len(data)
+        return {"t": type_, "d": Binary(data), "z": compressed}
+
+    def _decode(self, stored: Dict[str, Any]) -> Any:
+        data = bytes(stored["d"])
+        if stored.get("z"):
+            data = zlib.decompress(data)
+        return self.serde.loads_typed((stored["t"], data))
+
+    def _serialize_checkpoint(self, thread_id: str, thread_ts: str, parent_ts: Optional[str], checkpoint: Dict[str, Any]) -> Tuple[Dict[str, Any], _ThreadHead]:
+        """
+        Serialize checkpoint for MongoDB storage, as a delta against its parent when the
+        parent is this thread's last written checkpoint, otherwise as a full snapshot.
+
+        Returns:
+            tuple: Stored checkpoint fields and the thread head to diff the next checkpoint against
+        """
+        channel_values = checkpoint.get("channel_values", {})
+        channel_versions = checkpoint.get("channel_versions", {})
+
+        parent = self._heads.get(thread_id)
+        if parent is not None and (parent_ts is None or parent.thread_ts != parent_ts or parent_ts == thread_ts):
+            parent = None
+
+        blobs: Dict[str, TypedBlob] = {}
+        changed: List[str] = []
+        for channel, value in channel_values.items():
+            version = channel_versions.get(channel)
+            if parent is not None and channel in parent.blobs and version is not None and parent.versions.get(channel) == version:
+                # LangGraph bumps a channel's version whenever it is written
+                blobs[channel] = parent.blobs[channel]
+                continue
+            blobs[channel] = self.serde.dumps_typed(value)
+            if parent is None or parent.blobs.get(channel) != blobs[channel]:
+                changed.append(channel)
+
+        snapshot = parent is None or len(parent.chain) + 1 >= self.snapshot_interval
+        if snapshot:
+            changed = list(blobs)
+            removed: List[str] = []
+            chain: List[str] = []
+        else:
+            removed = [channel for channel in parent.blobs if channel not in blobs]
+            chain = [parent.thread_ts] + parent.chain
+
+        self.stats["snapshots" if snapshot else "deltas"] += 1
+        self.stats["channels_written"] += len(changed)
+        stored = {
+            "format": CHECKPOINT_FORMAT,
+            "kind": "snapshot" if snapshot else "delta",
+            "v": checkpoint.get("v", 1),
+            "ts": thread_ts,
+            "id": checkpoint.get("id"),
+            # A list rather than a sub-document: channel names are not valid field names in general
+            "channels": [{"c": channel, **self._encode(blobs[channel])} for channel in changed],
+            "removed": removed,
+            "chain": chain,
+            "channel_versions": self._encode(self.serde.dumps_typed(channel_versions)),
+            "versions_seen": self._encode(self.serde.dumps_typed(checkpoint.get("versions_seen", {}))),
+        }
+        return stored, _ThreadHead(thread_ts, blobs, dict(channel_versions), chain)
+
+    def _remember_head(self, thread_id: str, head: _ThreadHead):
+        self._heads[thread_id] = head
+        self._heads.move_to_end(thread_id)
+        while len(self._heads) > self.head_cache_size:
+            self._heads.popitem(last=False)
+
+    def _deserialize_checkpoint(self, thread_id: str, doc: Dict[str, Any], known: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Deserialize checkpoint from MongoDB document, applying its delta chain.
+
+        Args:
+            thread_id: Thread the checkpoint belongs to
+            doc: Stored checkpoint fields
+            known: Stored checkpoints already fetched, by thread_ts; missing chain entries are fetched in one query and added
+        """
+        if doc.get("format") != CHECKPOINT_FORMAT:
+            return {
+                "v": doc.get("v", 1),
+                "ts": doc.get("ts"),
+                "id": doc.get("id"),
+                "channel_values": json.loads(doc.get("channel_values", "{}")),
+                "channel_versions": json.loads(doc.get("channel_versions", "{}")),
+                "versions_seen": json.loads(doc.get("versions_seen", "{}")),
+            }
+
+        known = {} if known is None else known
+        chain = doc.get("chain", [])
+        missing = [ts for ts in chain if ts not in known]
+        if missing:
+            for ancestor_ts, ancestor in self._fetch_ancestors(thread_id, missing):
+                known[ancestor_ts] = ancestor
+
+        # Oldest (the snapshot) first, so later deltas overwrite earlier values
+        entries: Dict[str, Dict[str, Any]] = {}
+        for stored in [known[ts] for ts in reversed(chain) if ts in known] + [doc]:
+            for channel in stored.get("removed", []):
+                entries.pop(channel, None)
+            for entry in stored.get("channels", []):
+                entries[entry["c"]] = entry
+        lost = [ts for ts in chain if ts not in known]
+        if lost:
+            logger.error(f"Checkpoint {doc.get('ts')} for thread {thread_id} is missing ancestors {lost}; "
+                         f"ancestor checkpoints must not be pruned, restoring from the documents found")
+
+        return {
+            "v": doc.get("v", 1),
+            "ts": doc.get("ts"),
+            "id": doc.get("id"),
+            "channel_values": {channel: self._decode(entry) for channel, entry in entries.items()},
+            "channel_versions": self._decode(doc["channel_versions"]),
+            "versions_seen": self._decode(doc["versions_seen"]),
+        }
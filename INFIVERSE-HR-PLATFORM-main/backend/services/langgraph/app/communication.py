@@ -1,13 +1,18 @@
+import asyncio
 import smtplib
 import logging
+import string
+from functools import lru_cache
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import Dict, List
+from typing import Awaitable, Callable, Dict, List, Tuple
 from twilio.rest import Client
 from telegram import Bot
 import sys
 import os
 
+from .notification_dispatcher import Notification, notification_dispatcher
+
 # Import config from parent directory
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 try:
@@ -27,6 +32,96 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Automated sequence templates, rendered with str.format. Fields other than job_title and
+# candidate_name fall back to SEQUENCE_DEFAULTS.
+SEQUENCE_TEMPLATES = {
+    "application_received": {
+        "email": {
+            "subject": "✅ Application Received - {job_title} | BHIV HR",
+            "body": """Dear {candidate_name},\n\nThank you for applying to {job_title} at BHIV.\n\nYour application is under review. We'll contact you within 3-5 business days.\n\nApplication ID: {application_id}\n\nNext Steps:\n• AI screening in progress\n• HR review within 24-48 hours\n• Interview scheduling if shortlisted\n\nBest regards,\nBHIV HR Team""",
+            "html_body": """<html><body style='font-family: Arial, sans-serif; color: #333;'>\n<div style='max-width: 600px; margin: 0 auto; padding: 20px; border: 1px solid #ddd; border-radius: 10px;'>\n<h2 style='color: #2c5aa0;'>✅ Application Received</h2>\n<p>Dear <strong>{candidate_name}</strong>,</p>\n<p>Thank you for applying to <strong>{job_title}</strong> at BHIV.</p>\n<div style='background: #f8f9fa; padding: 15px; border-radius: 5px; margin: 20px 0;'>\n<h3>Application Details:</h3>\n<p><strong>Position:</strong> {job_title}<br>\n<strong>Application ID:</strong> {application_id}<br>\n<strong>Status:</strong> Under Review</p>\n</div>\n<h3>Next Steps:</h3>\n<ul>\n<li>🤖 AI screening in progress</li>\n<li>👥 HR review within 24-48 hours</li>\n<li>📅 Interview scheduling if shortlisted</li>\n</ul>\n<p>Best regards,<br><strong>BHIV HR Team</strong></p>\n</div></body></html>"""
+        },
+        "whatsapp": """🎯 *Application Received*\n\n*Position:* {job_title}\n*Application ID:* {application_id}\n*Status:* Under Review\n\n📋 *Next Steps:*\n• AI screening in progress\n• HR review within 24-48 hours\n\nWe'll update you within 3-5 days!\n\n_BHIV HR Team_"""
+    },
+    "interview_scheduled": {
+        "email": {
+            "subject": "📅 Interview Scheduled - {job_title} | BHIV HR",
+            "body": """Dear {candidate_name},\n\nYour interview is scheduled!\n\n📅 Date: {interview_date}\n🕐 Time: {interview_time}\n👤 Interviewer: {interviewer}\n🎥 Format: Video Call\n⏱️ Duration: 45 minutes\n\nInterview Preparation:\n• Review the job description\n• Prepare examples of your work\n• Test your video call setup\n\nPlease confirm your availability by replying to this email.\n\nBest regards,\nBHIV HR Team""",
+            "html_body": """<html><body style='font-family: Arial, sans-serif; color: #333;'>\n<div style='max-width: 600px; margin: 0 auto; padding: 20px; border: 1px solid #ddd; border-radius: 10px;'>\n<h2 style='color: #28a745;'>📅 Interview Scheduled</h2>\n<p>Dear <strong>{candidate_name}</strong>,</p>\n<p>Your interview for <strong>{job_title}</strong> is confirmed!</p>\n<div style='background: #e8f5e8; padding: 15px; border-radius: 5px; margin: 20px 0;'>\n<h3>Interview Details:</h3>\n<p><strong>📅 Date:</strong> {interview_date}<br>\n<strong>🕐 Time:</strong> {interview_time}<br>\n<strong>👤 Interviewer:</strong> {interviewer}<br>\n<strong>🎥 Format:</strong> Video Call<br>\n<strong>⏱️ Duration:</strong> 45 minutes</p>\n</div>\n<h3>📋 Preparation Checklist:</h3>\n<ul>\n<li>✅ Review the job description</li>\n<li>✅ Prepare examples of your work</li>\n<li>✅ Test your video call setup</li>\n</ul>\n<p><strong>Please confirm your availability by replying to this email.</strong></p>\n<p>Best regards,<br><strong>BHIV HR Team</strong></p>\n</div></body></html>"""
+        },
+        "whatsapp": """📅 *Interview Scheduled*\n\n*Job:* {job_title}\n*Date:* {interview_date}\n*Time:* {interview_time}\n*Interviewer:* {interviewer}\n\n📋 *Preparation:*\n• Review job description\n• Prepare work examples\n• Test video setup\n\nPlease confirm! 👍"""
+    },
+    "shortlisted": {
+        "email": {
+            "subject": "🎉 Congratulations! Shortlisted - {job_title} | BHIV HR",
+            "body": """Dear {candidate_name},\n\n🎉 Congratulations! You've been shortlisted for {job_title}!\n\nOur AI matching system scored your profile highly based on:\n• Technical skills alignment\n• Experience relevance\n• Cultural fit assessment\n\nMatching Score: {matching_score}/100\n\nNext Steps:\n• Our HR team will contact you within 24 hours\n• Interview scheduling will follow\n• Please keep your calendar flexible\n\nWe're excited about the possibility of you joining our team!\n\nBest regards,\nBHIV HR Team""",
+            "html_body": """<html><body style='font-family: Arial, sans-serif; color: #333;'>\n<div style='max-width: 600px; margin: 0 auto; padding: 20px; border: 1px solid #ddd; border-radius: 10px;'>\n<h2 style='color: #ffc107;'>🎉 Congratulations! You're Shortlisted!</h2>\n<p>Dear <strong>{candidate_name}</strong>,</p>\n<p>We're excited to inform you that you've been <strong>shortlisted</strong> for the <strong>{job_title}</strong> position!</p>\n<div style='background: #fff3cd; padding: 15px; border-radius: 5px; margin: 20px 0;'>\n<h3>🎯 AI Assessment Results:</h3>\n<p><strong>Matching Score:</strong> {matching_score}/100<br>\n<strong>Technical Skills:</strong> Excellent alignment<br>\n<strong>Experience:</strong> Highly relevant<br>\n<strong>Cultural Fit:</strong> Strong match</p>\n</div>\n<h3>🚀 Next Steps:</h3>\n<ul>\n<li>📞 HR team will contact you within 24 hours</li>\n<li>📅 Interview scheduling will follow</li>\n<li>🗓️ Please keep your calendar flexible</li>\n</ul>\n<p><strong>We're excited about the possibility of you joining our team!</strong></p>\n<p>Best regards,<br><strong>BHIV HR Team</strong></p>\n</div></body></html>"""
+        },
+        "whatsapp": """🎉 *SHORTLISTED!*\n\n*Job:* {job_title}\n*AI Score:* {matching_score}/100\n\n🎯 *Why you were selected:*\n• Technical skills alignment\n• Experience relevance\n• Cultural fit assessment\n\n📞 We'll call you within 24 hours!\n\n_Congratulations! 🎊_"""
+    },
+    "feedback_request": {
+        "email": {
+            "subject": "📝 Feedback Request - {job_title} | BHIV HR",
+            "body": """Dear {candidate_name},\n\nThank you for your interest in {job_title} at BHIV.\n\nWe'd love to hear about your experience with our recruitment process. Your feedback helps us improve.\n\nPlease take 2 minutes to share your thoughts:\n• How was the application process?\n• Was the communication clear and timely?\n• Any suggestions for improvement?\n\nReply to this email with your feedback.\n\nThank you for your time!\n\nBest regards,\nBHIV HR Team"""
+        },
+        "whatsapp": """📝 *Feedback Request*\n\n*Job:* {job_title}\n\nHow was your experience with BHIV?\n\n📋 *Quick feedback:*\n• Application process?\n• Communication quality?\n• Suggestions?\n\nReply with your thoughts!\n\n_Thank you! 🙏_"""
+    }
+}
+
+SEQUENCE_DEFAULTS = {
+    "application_id": "N/A",
+    "interview_date": "TBD",
+    "interview_time": "TBD",
+    "interviewer": "HR Team",
+    "matching_score": "High"
+}
+
+# WhatsApp quick-reply options per sequence
+SEQUENCE_BUTTONS = {
+    "interview_scheduled": ["✅ Confirm", "❌ Reschedule", "❓ More Info"],
+    "shortlisted": ["🎉 Excited!", "📅 Schedule Interview", "❓ Questions"],
+    "feedback_request": ["⭐ Excellent", "👍 Good", "👎 Needs Improvement"]
+}
+
+_FORMATTER = string.Formatter()
+
+
+@lru_cache(maxsize=None)
+def _template_fields(template: str) -> Tuple[str, ...]:
+    return tuple(dict.fromkeys(name for _, name, _, _ in _FORMATTER.parse(template) if name))
+
+
+@lru_cache(maxsize=int(os.getenv("NOTIFY_TEMPLATE_CACHE_SIZE", "4096")))
+def _render_cached(template: str, values: Tuple[Tuple[str, str], ...]) -> str:
+    return template.format(**dict(values))
+
+
+def render_template(template: str, fields: Dict) -> str:
+    """Render a template; the cache is keyed only on the fields it uses, so job-level messages render once per campaign"""
+    return _render_cached(template, tuple((name, format(fields[name], "")) for name in _template_fields(template)))
+
+
+def _sequence_fields(payload: Dict) -> Dict:
+    # job_title and candidate_name are required, as every sequence uses them
+    return {**SEQUENCE_DEFAULTS, **{k: v for k, v in payload.items() if k in SEQUENCE_DEFAULTS},
+            "job_title": payload['job_title'], "candidate_name": payload['candidate_name']}
+
+
+def _is_transient(error: Exception) -> bool:
+    """Provider errors worth retrying: throttling, 5xx responses and network failures"""
+    status = getattr(error, "status", None) or getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    if type(error).__name__ in ("RetryAfter", "TimedOut", "NetworkError"):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPException):
+        # Also an OSError, but refused recipients or bad data will not succeed on retry
+        return isinstance(error, smtplib.SMTPServerDisconnected)
+    return isinstance(error, (OSError, TimeoutError))
+
+
 class CommunicationManager:
     """Unified communication across multiple channels"""
     
@@ -106,32 +201,36 @@ class CommunicationManager:
             
             logger.info(f"📱 Sending WhatsApp to: {phone}")
             
-            msg = self.twilio_client.messages.create(
-                from_=f"whatsapp:{settings.twilio_whatsapp_number}",
-                to=f"whatsapp:{phone}",
-                body=message
-            )
-            
-            logger.info(f"✅ WhatsApp sent to {phone}: {msg.sid}")
-            
-            # Check message status immediately
-            try:
-                import time
-                time.sleep(1)  # Wait 1 second
-                updated_msg = self.twilio_client.messages(msg.sid).fetch()
-                if updated_msg.status == 'failed':
-                    error_msg = f"Message failed - Error {updated_msg.error_code}: {updated_msg.error_message or 'Phone number not verified in Twilio sandbox'}"
-                    logger.error(f"❌ {error_msg}")
-                    return {"status": "failed", "channel": "whatsapp", "error": error_msg, "recipient": phone, "message_id": msg.sid}
-                else:
-                    logger.info(f"📊 Message status: {updated_msg.status}")
-            except Exception as status_error:
-                logger.warning(f"⚠️ Could not check message status: {status_error}")
-            
-            return {"status": "success", "channel": "whatsapp", "message_id": msg.sid, "recipient": phone}
+            # The Twilio client is synchronous; keep it off the event loop
+            return await asyncio.to_thread(self._send_whatsapp_sync, phone, message)
         except Exception as e:
             logger.error(f"❌ WhatsApp error for {phone}: {str(e)}")
-            return {"status": "failed", "channel": "whatsapp", "error": str(e), "recipient": phone}
+            return {"status": "failed", "channel": "whatsapp", "error": str(e), "recipient": phone, "retryable": _is_transient(e)}
+    
+    def _send_whatsapp_sync(self, phone: str, message: str) -> Dict:
+        msg = self.twilio_client.messages.create(
+            from_=f"whatsapp:{settings.twilio_whatsapp_number}",
+            to=f"whatsapp:{phone}",
+            body=message
+        )
+        
+        logger.info(f"✅ WhatsApp sent to {phone}: {msg.sid}")
+        
+        # Check message status immediately
+        try:
+            import time
+            time.sleep(1)  # Wait 1 second
+            updated_msg = self.twilio_client.messages(msg.sid).fetch()
+            if updated_msg.status == 'failed':
+                error_msg = f"Message failed - Error {updated_msg.error_code}: {updated_msg.error_message or 'Phone number not verified in Twilio sandbox'}"
+                logger.error(f"❌ {error_msg}")
+                return {"status": "failed", "channel": "whatsapp", "error": error_msg, "recipient": phone, "message_id": msg.sid}
+            else:
+                logger.info(f"📊 Message status: {updated_msg.status}")
+        except Exception as status_error:
+            logger.warning(f"⚠️ Could not check message status: {status_error}")
+        
+        return {"status": "success", "channel": "whatsapp", "message_id": msg.sid, "recipient": phone}
     
     async def send_email(self, recipient_email: str, subject: str, body: str, html_body: str = None) -> Dict:
         """Send email via Gmail SMTP - Works with real email addresses without 2FA"""
@@ -159,9 +258,7 @@ class CommunicationManager:
                 msg.attach(MIMEText(html_body, 'html'))
             
             # Use Gmail SMTP with app password (works without 2FA if app password is configured)
-            with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-                server.login(self.gmail_email, self.gmail_app_password)
-                server.send_message(msg)
+            await asyncio.to_thread(self._send_smtp, msg)
             
             logger.info(f"✅ Email sent to {recipient_email}: {subject}")
             return {"status": "success", "channel": "email", "recipient": recipient_email, "subject": subject}
@@ -170,7 +267,12 @@ class CommunicationManager:
             return {"status": "failed", "channel": "email", "error": f"Gmail authentication failed: {str(e)}. Ensure Gmail App Password is configured correctly.", "recipient": recipient_email}
         except Exception as e:
             logger.error(f"❌ Email error for {recipient_email}: {str(e)}")
-            return {"status": "failed", "channel": "email", "error": str(e), "recipient": recipient_email}
+            return {"status": "failed", "channel": "email", "error": str(e), "recipient": recipient_email, "retryable": _is_transient(e)}
+    
+    def _send_smtp(self, msg: MIMEMultipart):
+        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
+            server.login(self.gmail_email, self.gmail_app_password)
+            server.send_message(msg)
     
     async def send_telegram(self, chat_id: str, message: str) -> Dict:
         """Send Telegram message"""
@@ -189,7 +291,7 @@ class CommunicationManager:
             return {"status": "success", "channel": "telegram", "message_id": msg.message_id, "recipient": chat_id}
         except Exception as e:
             logger.error(f"❌ Telegram error for {chat_id}: {str(e)}")
-            return {"status": "failed", "channel": "telegram", "error": str(e), "recipient": chat_id}
+            return {"status": "failed", "channel": "telegram", "error": str(e), "recipient": chat_id, "retryable": _is_transient(e)}
     
     async def send_telegram_with_keyboard(self, chat_id: str, message: str, keyboard_options: List[str] = None) -> Dict:
         """Send Telegram message with inline keyboard for interactive responses"""
@@ -237,85 +339,66 @@ class CommunicationManager:
             logger.error(f"❌ WhatsApp buttons error for {phone}: {str(e)}")
             return {"status": "failed", "channel": "whatsapp", "error": str(e), "recipient": phone}
     
-    async def send_automated_sequence(self, payload: Dict, sequence_type: str) -> List[Dict]:
-        """Send automated email/WhatsApp sequences based on triggers"""
-        results = []
-        
-        sequences = {
-            "application_received": {
-                "email": {
-                    "subject": f"✅ Application Received - {payload['job_title']} | BHIV HR",
-                    "body": f"""Dear {payload['candidate_name']},\n\nThank you for applying to {payload['job_title']} at BHIV.\n\nYour application is under review. We'll contact you within 3-5 business days.\n\nApplication ID: {payload.get('application_id', 'N/A')}\n\nNext Steps:\n• AI screening in progress\n• HR review within 24-48 hours\n• Interview scheduling if shortlisted\n\nBest regards,\nBHIV HR Team""",
-                    "html_body": f"""<html><body style='font-family: Arial, sans-serif; color: #333;'>\n<div style='max-width: 600px; margin: 0 auto; padding: 20px; border: 1px solid #ddd; border-radius: 10px;'>\n<h2 style='color: #2c5aa0;'>✅ Application Received</h2>\n<p>Dear <strong>{payload['candidate_name']}</strong>,</p>\n<p>Thank you for applying to <strong>{payload['job_title']}</strong> at BHIV.</p>\n<div style='background: #f8f9fa; padding: 15px; border-radius: 5px; margin: 20px 0;'>\n<h3>Application Details:</h3>\n<p><strong>Position:</strong> {payload['job_title']}<br>\n<strong>Application ID:</strong> {payload.get('application_id', 'N/A')}<br>\n<strong>Status:</strong> Under Review</p>\n</div>\n<h3>Next Steps:</h3>\n<ul>\n<li>🤖 AI screening in progress</li>\n<li>👥 HR review within 24-48 hours</li>\n<li>📅 Interview scheduling if shortlisted</li>\n</ul>\n<p>Best regards,<br><strong>BHIV HR Team</strong></p>\n</div></body></html>"""
-                },
-                "whatsapp": f"""🎯 *Application Received*\n\n*Position:* {payload['job_title']}\n*Application ID:* {payload.get('application_id', 'N/A')}\n*Status:* Under Review\n\n📋 *Next Steps:*\n• AI screening in progress\n• HR review within 24-48 hours\n\nWe'll update you within 3-5 days!\n\n_BHIV HR Team_"""
-            },
-            "interview_scheduled": {
-                "email": {
-                    "subject": f"📅 Interview Scheduled - {payload['job_title']} | BHIV HR",
-                    "body": f"""Dear {payload['candidate_name']},\n\nYour interview is scheduled!\n\n📅 Date: {payload.get('interview_date', 'TBD')}\n🕐 Time: {payload.get('interview_time', 'TBD')}\n👤 Interviewer: {payload.get('interviewer', 'HR Team')}\n🎥 Format: Video Call\n⏱️ Duration: 45 minutes\n\nInterview Preparation:\n• Review the job description\n• Prepare examples of your work\n• Test your video call setup\n\nPlease confirm your availability by replying to this email.\n\nBest regards,\nBHIV HR Team""",
-                    "html_body": f"""<html><body style='font-family: Arial, sans-serif; color: #333;'>\n<div style='max-width: 600px; margin: 0 auto; padding: 20px; border: 1px solid #ddd; border-radius: 10px;'>\n<h2 style='color: #28a745;'>📅 Interview Scheduled</h2>\n<p>Dear <strong>{payload['candidate_name']}</strong>,</p>\n<p>Your interview for <strong>{payload['job_title']}</strong> is confirmed!</p>\n<div style='background: #e8f5e8; padding: 15px; border-radius: 5px; margin: 20px 0;'>\n<h3>Interview Details:</h3>\n<p><strong>📅 Date:</strong> {payload.get('interview_date', 'TBD')}<br>\n<strong>🕐 Time:</strong> {payload.get('interview_time', 'TBD')}<br>\n<strong>👤 Interviewer:</strong> {payload.get('interviewer', 'HR Team')}<br>\n<strong>🎥 Format:</strong> Video Call<br>\n<strong>⏱️ Duration:</strong> 45 minutes</p>\n</div>\n<h3>📋 Preparation Checklist:</h3>\n<ul>\n<li>✅ Review the job description</li>\n<li>✅ Prepare examples of your work</li>\n<li>✅ Test your video call setup</li>\n</ul>\n<p><strong>Please confirm your availability by replying to this email.</strong></p>\n<p>Best regards,<br><strong>BHIV HR Team</strong></p>\n</div></body></html>"""
-                },
-                "whatsapp": f"""📅 *Interview Scheduled*\n\n*Job:* {payload['job_title']}\n*Date:* {payload.get('interview_date', 'TBD')}\n*Time:* {payload.get('interview_time', 'TBD')}\n*Interviewer:* {payload.get('interviewer', 'HR Team')}\n\n📋 *Preparation:*\n• Review job description\n• Prepare work examples\n• Test video setup\n\nPlease confirm! 👍"""
-            },
-            "shortlisted": {
-                "email": {
-                    "subject": f"🎉 Congratulations! Shortlisted - {payload['job_title']} | BHIV HR",
-                    "body": f"""Dear {payload['candidate_name']},\n\n🎉 Congratulations! You've been shortlisted for {payload['job_title']}!\n\nOur AI matching system scored your profile highly based on:\n• Technical skills alignment\n• Experience relevance\n• Cultural fit assessment\n\nMatching Score: {payload.get('matching_score', 'High')}/100\n\nNext Steps:\n• Our HR team will contact you within 24 hours\n• Interview scheduling will follow\n• Please keep your calendar flexible\n\nWe're excited about the possibility of you joining our team!\n\nBest regards,\nBHIV HR Team""",
-                    "html_body": f"""<html><body style='font-family: Arial, sans-serif; color: #333;'>\n<div style='max-width: 600px; margin: 0 auto; padding: 20px; border: 1px solid #ddd; border-radius: 10px;'>\n<h2 style='color: #ffc107;'>🎉 Congratulations! You're Shortlisted!</h2>\n<p>Dear <strong>{payload['candidate_name']}</strong>,</p>\n<p>We're excited to inform you that you've been <strong>shortlisted</strong> for the <strong>{payload['job_title']}</strong> position!</p>\n<div style='background: #fff3cd; padding: 15px; border-radius: 5px; margin: 20px 0;'>\n<h3>🎯 AI Assessment Results:</h3>\n<p><strong>Matching Score:</strong> {payload.get('matching_score', 'High')}/100<br>\n<strong>Technical Skills:</strong> Excellent alignment<br>\n<strong>Experience:</strong> Highly relevant<br>\n<strong>Cultural Fit:</strong> Strong match</p>\n</div>\n<h3>🚀 Next Steps:</h3>\n<ul>\n<li>📞 HR team will contact you within 24 hours</li>\n<li>📅 Interview scheduling will follow</li>\n<li>🗓️ Please keep your calendar flexible</li>\n</ul>\n<p><strong>We're excited about the possibility of you joining our team!</strong></p>\n<p>Best regards,<br><strong>BHIV HR Team</strong></p>\n</div></body></html>"""
-                },
-                "whatsapp": f"""🎉 *SHORTLISTED!*\n\n*Job:* {payload['job_title']}\n*AI Score:* {payload.get('matching_score', 'High')}/100\n\n🎯 *Why you were selected:*\n• Technical skills alignment\n• Experience relevance\n• Cultural fit assessment\n\n📞 We'll call you within 24 hours!\n\n_Congratulations! 🎊_"""
-            },
-            "feedback_request": {
-                "email": {
-                    "subject": f"📝 Feedback Request - {payload['job_title']} | BHIV HR",
-                    "body": f"""Dear {payload['candidate_name']},\n\nThank you for your interest in {payload['job_title']} at BHIV.\n\nWe'd love to hear about your experience with our recruitment process. Your feedback helps us improve.\n\nPlease take 2 minutes to share your thoughts:\n• How was the application process?\n• Was the communication clear and timely?\n• Any suggestions for improvement?\n\nReply to this email with your feedback.\n\nThank you for your time!\n\nBest regards,\nBHIV HR Team"""
-                },
-                "whatsapp": f"""📝 *Feedback Request*\n\n*Job:* {payload['job_title']}\n\nHow was your experience with BHIV?\n\n📋 *Quick feedback:*\n• Application process?\n• Communication quality?\n• Suggestions?\n\nReply with your thoughts!\n\n_Thank you! 🙏_"""
-            }
-        }
-        
-        sequence = sequences.get(sequence_type, sequences["application_received"])
+    def _sequence_messages(self, payload: Dict, sequence_type: str) -> List[Tuple[str, str, Callable[[], Awaitable[Dict]]]]:
+        """(channel, recipient, send) for each message of an automated sequence; only the chosen sequence is rendered"""
+        messages = []
+        sequence = SEQUENCE_TEMPLATES.get(sequence_type, SEQUENCE_TEMPLATES["application_received"])
+        fields = _sequence_fields(payload)
         
         # Send email - use provided email or skip
         candidate_email = payload.get('candidate_email')
         if candidate_email and candidate_email != "test@example.com":
-            email_result = await self.send_email(
-                candidate_email,
-                sequence["email"]["subject"],
-                sequence["email"]["body"]
-            )
-            results.append(email_result)
+            subject = render_template(sequence["email"]["subject"], fields)
+            body = render_template(sequence["email"]["body"], fields)
+            messages.append(("email", candidate_email, lambda: self.send_email(candidate_email, subject, body)))
         else:
             logger.info("Skipping email - no valid email provided")
         
         # Send WhatsApp with interactive options for certain sequences
         candidate_phone = payload.get('candidate_phone')
         if candidate_phone and candidate_phone != "+1234567890":
-            if sequence_type == "interview_scheduled":
-                whatsapp_result = await self.send_whatsapp_with_buttons(
-                    payload['candidate_phone'],
-                    sequence["whatsapp"],
-                    ["✅ Confirm", "❌ Reschedule", "❓ More Info"]
-                )
-            elif sequence_type == "shortlisted":
-                whatsapp_result = await self.send_whatsapp_with_buttons(
-                    payload['candidate_phone'],
-                    sequence["whatsapp"],
-                    ["🎉 Excited!", "📅 Schedule Interview", "❓ Questions"]
-                )
-            elif sequence_type == "feedback_request":
-                whatsapp_result = await self.send_whatsapp_with_buttons(
-                    payload['candidate_phone'],
-                    sequence["whatsapp"],
-                    ["⭐ Excellent", "👍 Good", "👎 Needs Improvement"]
-                )
+            whatsapp_message = render_template(sequence["whatsapp"], fields)
+            buttons = SEQUENCE_BUTTONS.get(sequence_type)
+            if buttons:
+                send = lambda: self.send_whatsapp_with_buttons(candidate_phone, whatsapp_message, buttons)
             else:
-                whatsapp_result = await self.send_whatsapp(payload['candidate_phone'], sequence["whatsapp"])
-            results.append(whatsapp_result)
+                send = lambda: self.send_whatsapp(candidate_phone, whatsapp_message)
+            messages.append(("whatsapp", candidate_phone, send))
         
+        return messages
+    
+    async def send_automated_sequence(self, payload: Dict, sequence_type: str) -> List[Dict]:
+        """Send automated email/WhatsApp sequences based on triggers"""
+        results = []
+        for _, _, send in self._sequence_messages(payload, sequence_type):
+            results.append(await send())
         return results
     
+    async def _dispatch_sequences(self, payloads: List[Dict], sequence_type: str, campaign_id: str = None) -> Tuple[List[List[Dict]], List[Exception]]:
+        """
+        Send one automated sequence per payload through the notification dispatcher.
+
+        Returns:
+            tuple: per-payload result lists (in payload order) and per-payload render errors (None when rendered)
+        """
+        notifications = []
+        errors = []
+        for i, payload in enumerate(payloads):
+            try:
+                messages = self._sequence_messages(payload, sequence_type)
+                errors.append(None)
+            except Exception as render_error:
+                errors.append(render_error)
+                continue
+            for j, (channel, recipient, send) in enumerate(messages):
+                notifications.append(Notification(key=(i, j), channel=channel, send=send, recipient=recipient))
+        
+        sent = await notification_dispatcher.dispatch(notifications, campaign_id)
+        per_payload: List[List[Dict]] = [[] for _ in payloads]
+        for i, j in sorted(sent):
+            per_payload[i].append(sent[(i, j)])
+        return per_payload, errors
+    
     async def send_multi_channel(self, payload: Dict, channels: List[str]) -> List[Dict]:
         """Send notification across multiple channels"""
         results = []
@@ -416,9 +499,13 @@ _Thank you for your interest in BHIV!_"""
             elif event_type == "bulk_notification":
                 # Handle bulk notifications to multiple candidates
                 candidates = payload.get('candidates', [])
-                for candidate in candidates:
-                    candidate_payload = {**payload, **candidate}
-                    results = await self.send_automated_sequence(candidate_payload, payload.get('sequence_type', 'application_received'))
+                per_candidate, errors = await self._dispatch_sequences(
+                    [{**payload, **candidate} for candidate in candidates],
+                    payload.get('sequence_type', 'application_received')
+                )
+                for candidate, results, error in zip(candidates, per_candidate, errors):
+                    if error is not None:
+                        logger.error(f"❌ Bulk notification error for candidate {candidate.get('id')}: {str(error)}")
                     automation_results.extend(results)
             
             logger.info(f"✅ Automation completed: {len(automation_results)} notifications sent")
@@ -458,52 +545,59 @@ _Thank you for your interest in BHIV!_"""
         except Exception as e:
             logger.error(f"❌ Portal notification error: {str(e)}")
     
-    async def send_bulk_notifications(self, candidates: List[Dict], sequence_type: str, job_data: Dict) -> Dict:
-        """Send bulk notifications to multiple candidates"""
+    async def send_bulk_notifications(self, candidates: List[Dict], sequence_type: str, job_data: Dict, campaign_id: str = None) -> Dict:
+        """Send bulk notifications to multiple candidates, concurrently per channel (see notification_dispatcher)"""
         try:
             logger.info(f"📨 Sending bulk notifications to {len(candidates)} candidates")
             
+            if campaign_id not in notification_dispatcher.campaigns:
+                campaign_id = notification_dispatcher.register(campaign_id)
+            payloads = [{
+                **job_data,
+                "candidate_name": candidate.get('name', 'Candidate'),
+                "candidate_email": candidate.get('email', ''),
+                "candidate_phone": candidate.get('phone', ''),
+                "candidate_id": candidate.get('id')
+            } for candidate in candidates]
+            per_candidate, errors = await self._dispatch_sequences(payloads, sequence_type, campaign_id)
+            
             results = []
             success_count = 0
             failed_count = 0
-            
-            for candidate in candidates:
-                try:
-                    payload = {
-                        **job_data,
-                        "candidate_name": candidate.get('name', 'Candidate'),
-                        "candidate_email": candidate.get('email', ''),
-                        "candidate_phone": candidate.get('phone', ''),
-                        "candidate_id": candidate.get('id')
-                    }
-                    
-                    candidate_results = await self.send_automated_sequence(payload, sequence_type)
-                    results.extend(candidate_results)
-                    
-                    # Count successes
-                    for result in candidate_results:
-                        if result.get('status') == 'success':
-                            success_count += 1
-                        else:
-                            failed_count += 1
-                            
-                except Exception as candidate_error:
+            for candidate, candidate_results, candidate_error in zip(candidates, per_candidate, errors):
+                if candidate_error is not None:
                     logger.error(f"❌ Bulk notification error for candidate {candidate.get('id')}: {str(candidate_error)}")
                     failed_count += 1
+                    continue
+                results.extend(candidate_results)
+                
+                # Count successes
+                for result in candidate_results:
+                    if result.get('status') == 'success':
+                        success_count += 1
+                    else:
+                        failed_count += 1
             
             logger.info(f"✅ Bulk notifications completed: {success_count} success, {failed_count} failed")
             
+            progress = notification_dispatcher.progress(campaign_id)
             return {
                 "status": "completed",
+                "campaign_id": campaign_id,
                 "total_candidates": len(candidates),
                 "success_count": success_count,
                 "failed_count": failed_count,
+                "retries": progress["retries"] if progress else 0,
+                "duration_seconds": progress["elapsed_seconds"] if progress else None,
                 "results": results
             }
             
         except Exception as e:
             logger.error(f"❌ Bulk notification error: {str(e)}")
-            return {"status": "failed", "error": str(e)}
+            # Background campaigns are polled by id; don't leave them looking queued
+            if campaign_id is not None:
+                notification_dispatcher.fail(campaign_id, str(e))
+            return {"status": "failed", "campaign_id": campaign_id, "error": str(e)}
 
 # Singleton instance
 comm_manager = CommunicationManager()
\ No newline at end of file
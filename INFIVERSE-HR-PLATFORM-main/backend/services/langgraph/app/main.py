@@ -698,15 +698,19 @@ class BulkNotificationRequest(BaseModel):
 
 @app.post("/automation/bulk-notifications", tags=["Communication Tools"])
 async def send_bulk_notifications(
+    background_tasks: BackgroundTasks,
     request: BulkNotificationRequest = None,
     candidates: Optional[List[dict]] = None,
     sequence_type: Optional[str] = None,
     job_data: Optional[dict] = None,
+    background: bool = False,
     api_key: str = Depends(get_api_key)
 ):
-    """Send Bulk Notifications to Multiple Candidates"""
+    """Send Bulk Notifications to Multiple Candidates. Channels are sent concurrently within per-channel limits;
+    with background=true the campaign is queued and progress is available from /automation/bulk-notifications/{campaign_id}"""
     try:
         from .communication import comm_manager
+        from .notification_dispatcher import notification_dispatcher
         
         # Support both JSON body and separate params
         if request:
@@ -718,6 +722,17 @@ async def send_bulk_notifications(
             seq_type = sequence_type or "application_received"
             job = job_data or {}
         
+        if background:
+            campaign_id = notification_dispatcher.register()
+            background_tasks.add_task(comm_manager.send_bulk_notifications, cands, seq_type, job, campaign_id)
+            return {
+                "success": True,
+                "campaign_id": campaign_id,
+                "status": "queued",
+                "progress_url": f"/automation/bulk-notifications/{campaign_id}",
+                "total_candidates": len(cands)
+            }
+        
         result = await comm_manager.send_bulk_notifications(cands, seq_type, job)
         
         return {
@@ -728,6 +743,15 @@ async def send_bulk_notifications(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/automation/bulk-notifications/{campaign_id}", tags=["Communication Tools"])
+async def bulk_notification_progress(campaign_id: str, api_key: str = Depends(get_api_key)):
+    """Progress of a bulk notification campaign (recent campaigns only)"""
+    from .notification_dispatcher import notification_dispatcher
+    progress = notification_dispatcher.progress(campaign_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return progress
+
 @app.post("/webhook/whatsapp", tags=["Communication Tools"])
 async def whatsapp_webhook(request: dict, api_key: str = Depends(get_api_key)):
     """Handle WhatsApp Interactive Button Responses"""
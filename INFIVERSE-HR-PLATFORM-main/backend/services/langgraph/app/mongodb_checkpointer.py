@@ -1,41 +1,56 @@
 """
 MongoDB Checkpointer for LangGraph
 Custom implementation to replace PostgresSaver
+
+Channel values are stored as binary blobs from LangGraph's typed serializer (zlib
+compressed when large). A checkpoint only stores the channels that changed since its
+parent, with a full snapshot every CHECKPOINT_SNAPSHOT_INTERVAL checkpoints so reads
+fetch a bounded chain of documents (see checkpoint_deltas). A delta needs every
+ancestor in its chain, so checkpoints are only ever removed through prune(), which
+keeps those ancestors, and a TTL index on the collection is refused at startup.
 """
-from typing import Any, Dict, Iterator, Optional, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 from langgraph.checkpoint.base import BaseCheckpointSaver, Checkpoint, CheckpointMetadata, CheckpointTuple
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure
 from datetime import datetime
-import json
 import os
 import logging
 
+from .checkpoint_deltas import DeltaCheckpointCodec, prunable_checkpoints
+
 logger = logging.getLogger(__name__)
 
 
-class MongoDBSaver(BaseCheckpointSaver):
+class MongoDBSaver(DeltaCheckpointCodec, BaseCheckpointSaver):
     """MongoDB-based checkpoint saver for LangGraph workflows"""
     
-    def __init__(self, mongodb_uri: str = None, db_name: str = None):
+    def __init__(self, mongodb_uri: str = None, db_name: str = None, client: Optional[MongoClient] = None):
         super().__init__()
-        self._client: Optional[MongoClient] = None
+        self._client: Optional[MongoClient] = client
         self._db = None
         self._mongodb_uri = mongodb_uri or os.getenv("DATABASE_URL") or os.getenv("MONGODB_URI")
         self._db_name = db_name or os.getenv("MONGODB_DB_NAME", "bhiv_hr")
         self._collection_name = "langgraph_checkpoints"
+        self._init_deltas()
         self._connect()
     
     def _connect(self):
         """Establish MongoDB connection"""
         try:
-            if not self._mongodb_uri:
-                raise ValueError("MongoDB URI is required")
-            
-            self._client = MongoClient(self._mongodb_uri, serverSelectionTimeoutMS=5000)
+            if self._client is None:
+                if not self._mongodb_uri:
+                    raise ValueError("MongoDB URI is required")
+                self._client = MongoClient(self._mongodb_uri, serverSelectionTimeoutMS=5000)
             self._client.admin.command('ping')  # Test connection
             self._db = self._client[self._db_name]
             
+            # A TTL index would expire snapshots and deltas that later checkpoints are built from
+            for name, index in self._db[self._collection_name].index_information().items():
+                if "expireAfterSeconds" in index:
+                    raise ValueError(f"TTL index {name} on {self._collection_name} would delete delta checkpoint ancestors; "
+                                     f"drop it and use MongoDBSaver.prune instead")
+            
             # Create indexes for efficient querying
             self._db[self._collection_name].create_index([("thread_id", 1), ("thread_ts", -1)])
             
@@ -49,27 +64,12 @@ class MongoDBSaver(BaseCheckpointSaver):
         """Create saver from connection string (compatible with PostgresSaver API)"""
         return cls(mongodb_uri=conn_string, db_name=db_name)
     
-    def _serialize_checkpoint(self, checkpoint: Checkpoint) -> Dict[str, Any]:
-        """Serialize checkpoint for MongoDB storage"""
-        return {
-            "v": checkpoint.get("v", 1),
-            "ts": checkpoint.get("ts", datetime.utcnow().isoformat()),
-            "id": checkpoint.get("id"),
-            "channel_values": json.dumps(checkpoint.get("channel_values", {})),
-            "channel_versions": json.dumps(checkpoint.get("channel_versions", {})),
-            "versions_seen": json.dumps(checkpoint.get("versions_seen", {})),
-        }
-    
-    def _deserialize_checkpoint(self, doc: Dict[str, Any]) -> Checkpoint:
-        """Deserialize checkpoint from MongoDB document"""
-        return {
-            "v": doc.get("v", 1),
-            "ts": doc.get("ts"),
-            "id": doc.get("id"),
-            "channel_values": json.loads(doc.get("channel_values", "{}")),
-            "channel_versions": json.loads(doc.get("channel_versions", "{}")),
-            "versions_seen": json.loads(doc.get("versions_seen", "{}")),
-        }
+    def _fetch_ancestors(self, thread_id: str, thread_ts: List[str]) -> Iterable[Tuple[str, Dict[str, Any]]]:
+        for ancestor in self._db[self._collection_name].find(
+            {"thread_id": thread_id, "thread_ts": {"$in": thread_ts}},
+            {"thread_ts": 1, "checkpoint": 1}
+        ):
+            yield ancestor["thread_ts"], ancestor.get("checkpoint", {})
     
     def get_tuple(self, config: Dict[str, Any]) -> Optional[CheckpointTuple]:
         """Get checkpoint tuple for a thread"""
@@ -92,7 +92,7 @@ class MongoDBSaver(BaseCheckpointSaver):
             if not doc:
                 return None
             
-            checkpoint = self._deserialize_checkpoint(doc.get("checkpoint", {}))
+            checkpoint = self._deserialize_checkpoint(thread_id, doc.get("checkpoint", {}))
             metadata = doc.get("metadata", {})
             parent_config = doc.get("parent_config")
             
@@ -137,8 +137,12 @@ class MongoDBSaver(BaseCheckpointSaver):
             if limit:
                 cursor = cursor.limit(limit)
             
+            # Consecutive checkpoints share most of their delta chains
+            known: Dict[str, Dict[str, Dict[str, Any]]] = {}
             for doc in cursor:
-                checkpoint = self._deserialize_checkpoint(doc.get("checkpoint", {}))
+                thread_known = known.setdefault(doc.get("thread_id"), {})
+                thread_known[doc.get("thread_ts")] = doc.get("checkpoint", {})
+                checkpoint = self._deserialize_checkpoint(doc.get("thread_id"), doc.get("checkpoint", {}), thread_known)
                 metadata = doc.get("metadata", {})
                 parent_config = doc.get("parent_config")
                 
@@ -165,10 +169,12 @@ class MongoDBSaver(BaseCheckpointSaver):
             raise ValueError("thread_id is required in config")
         
         try:
+            parent_ts = config.get("configurable", {}).get("thread_ts")
+            stored, head = self._serialize_checkpoint(thread_id, thread_ts, parent_ts, checkpoint)
             doc = {
                 "thread_id": thread_id,
                 "thread_ts": thread_ts,
-                "checkpoint": self._serialize_checkpoint(checkpoint),
+                "checkpoint": stored,
                 "metadata": metadata or {},
                 "parent_config": config.get("configurable", {}).get("parent_config"),
                 "created_at": datetime.utcnow()
@@ -179,12 +185,35 @@ class MongoDBSaver(BaseCheckpointSaver):
                 {"$set": doc},
                 upsert=True
             )
+            self._remember_head(thread_id, head)
             
             return {"configurable": {"thread_id": thread_id, "thread_ts": thread_ts}}
         except Exception as e:
             logger.error(f"Error saving checkpoint: {e}")
             raise
     
+    def prune(self, thread_id: str, keep: int = 20) -> int:
+        """
+        Delete a thread's older checkpoints, keeping the newest `keep` and every ancestor they are restored from.
+        
+        Returns:
+            int: Number of checkpoints deleted
+        """
+        collection = self._db[self._collection_name]
+        docs = collection.find({"thread_id": thread_id}, {"thread_ts": 1, "checkpoint.chain": 1}).sort("thread_ts", -1)
+        prunable = prunable_checkpoints(((doc["thread_ts"], doc.get("checkpoint", {}).get("chain", [])) for doc in docs), keep)
+        if not prunable:
+            return 0
+        return collection.delete_many({"thread_id": thread_id, "thread_ts": {"$in": prunable}}).deleted_count
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Checkpoint write counters since startup"""
+        return {
+            **self.stats,
+            "compression_ratio": round(self.stats["bytes_uncompressed"] / self.stats["bytes_written"], 2) if self.stats["bytes_written"] else None,
+            "cached_threads": len(self._heads)
+        }
+    
     def close(self):
         """Close MongoDB connection"""
         if self._client:
@@ -0,0 +1,223 @@
+"""
+Notification Dispatcher for LangGraph Service
+Sends campaign messages concurrently with per-channel concurrency and rate limits,
+re-queues transient provider failures with backoff, and reports campaign progress
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (concurrency, messages per second); SMTP logins are the slowest, Telegram allows ~30/s per bot
+DEFAULT_CHANNEL_LIMITS = {
+    "email": (4, 5.0),
+    "whatsapp": (8, 10.0),
+    "telegram": (10, 25.0),
+}
+CAMPAIGN_HISTORY = 100
+
+
+@dataclass
+class Notification:
+    """One message to one recipient; `send` performs a single provider attempt and returns its result dict"""
+    key: Hashable
+    channel: str
+    send: Callable[[], Awaitable[Dict[str, Any]]]
+    recipient: str = ""
+    attempts: int = 0
+
+
+class _Pacer:
+    """Spaces starts at least 1/rate seconds apart (rate <= 0 disables it)"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_start = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        start = max(now, self._next_start)
+        self._next_start = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class NotificationDispatcher:
+    """Runs campaigns' notifications on per-channel worker pools that share one send limit per channel"""
+
+    def __init__(self):
+        self.max_attempts = int(os.getenv("NOTIFY_MAX_ATTEMPTS", "3"))
+        self.retry_base_seconds = float(os.getenv("NOTIFY_RETRY_BASE_SECONDS", "2"))
+        self.limits = {
+            channel: (
+                max(1, int(os.getenv(f"NOTIFY_{channel.upper()}_CONCURRENCY", str(concurrency)))),
+                float(os.getenv(f"NOTIFY_{channel.upper()}_RATE_PER_SECOND", str(rate)))
+            )
+            for channel, (concurrency, rate) in DEFAULT_CHANNEL_LIMITS.items()
+        }
+        self.campaigns: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # One pacer and one send slot pool per channel across campaigns, so concurrent campaigns share the provider budget
+        self._pacers = {channel: _Pacer(rate) for channel, (_, rate) in self.limits.items()}
+        self._slots: Dict[str, Tuple[asyncio.AbstractEventLoop, int, asyncio.Semaphore]] = {}
+
+    def register(self, campaign_id: Optional[str] = None) -> str:
+        """Create a queued progress record (so callers can poll before dispatch starts); returns its id"""
+        campaign_id = campaign_id or uuid.uuid4().hex
+        self.campaigns[campaign_id] = {
+            "campaign_id": campaign_id,
+            "status": "queued",
+            "total": 0,
+            "completed": 0,
+            "failed": 0,
+            "retries": 0,
+            "pending": 0,
+            "by_channel": {},
+            "started_at": None,
+            "completed_at": None,
+            "elapsed_seconds": 0.0
+        }
+        self.campaigns.move_to_end(campaign_id)
+        while len(self.campaigns) > CAMPAIGN_HISTORY:
+            self.campaigns.popitem(last=False)
+        return campaign_id
+
+    def progress(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        progress = self.campaigns.get(campaign_id)
+        if progress is None:
+            return None
+        if progress["status"] == "running":
+            progress["elapsed_seconds"] = round(time.monotonic() - progress["_started"], 3)
+        return {k: v for k, v in progress.items() if not k.startswith("_")}
+
+    def fail(self, campaign_id: str, error: str):
+        """Mark a campaign failed when sending it broke off outside dispatch (e.g. before it started)"""
+        progress = self.campaigns.get(campaign_id)
+        if progress is None:
+            return
+        if progress["status"] == "running":
+            progress["elapsed_seconds"] = round(time.monotonic() - progress["_started"], 3)
+        progress.update({"status": "failed", "error": error, "completed_at": datetime.now().isoformat()})
+
+    def _limits(self, channel: str):
+        if channel not in self.limits:
+            concurrency, rate = DEFAULT_CHANNEL_LIMITS["email"]
+            self.limits[channel] = (concurrency, rate)
+            self._pacers[channel] = _Pacer(rate)
+        return self.limits[channel][0], self._pacers[channel]
+
+    def _slot(self, channel: str) -> asyncio.Semaphore:
+        """The channel's shared send slots; rebuilt only for a new event loop or a changed concurrency limit"""
+        concurrency, _ = self._limits(channel)
+        loop = asyncio.get_running_loop()
+        slot = self._slots.get(channel)
+        if slot is None or slot[0] is not loop or slot[1] != concurrency:
+            slot = self._slots[channel] = (loop, concurrency, asyncio.Semaphore(concurrency))
+        return slot[2]
+
+    async def dispatch(self, notifications: List[Notification], campaign_id: Optional[str] = None) -> Dict[Hashable, Dict[str, Any]]:
+        """
+        Send every notification, at most `concurrency` at a time and `rate` starts per second per channel,
+        counted across every campaign dispatching at once.
+
+        Failed results marked `retryable` (and exceptions raised by `send`) are re-queued after
+        retry_base_seconds * 2^(attempt-1) until NOTIFY_MAX_ATTEMPTS attempts have been made.
+
+        Args:
+            notifications: Messages to send
+            campaign_id: Progress record to update (see register); one is created if missing
+
+        Returns:
+            dict: Final result per notification key
+        """
+        if campaign_id is None or campaign_id not in self.campaigns:
+            campaign_id = self.register(campaign_id)
+        progress = self.campaigns[campaign_id]
+        start = time.monotonic()
+        progress.update({
+            "status": "running", "total": len(notifications), "pending": len(notifications),
+            "started_at": datetime.now().isoformat(), "_started": start
+        })
+
+        loop = asyncio.get_running_loop()
+        queues: Dict[str, asyncio.Queue] = {}
+        for notification in notifications:
+            queues.setdefault(notification.channel, asyncio.Queue()).put_nowait(notification)
+            channel_progress = progress["by_channel"].setdefault(notification.channel, {"total": 0, "completed": 0, "failed": 0})
+            channel_progress["total"] += 1
+
+        results: Dict[Hashable, Dict[str, Any]] = {}
+        retry_handles: List[asyncio.TimerHandle] = []
+        finished = asyncio.Event()
+        if not notifications:
+            finished.set()
+
+        def _finish(notification: Notification, result: Dict[str, Any]):
+            results[notification.key] = result
+            failed = result.get("status") == "failed"
+            progress["completed"] += 1
+            progress["pending"] -= 1
+            progress["by_channel"][notification.channel]["completed"] += 1
+            if failed:
+                progress["failed"] += 1
+                progress["by_channel"][notification.channel]["failed"] += 1
+            if progress["pending"] == 0:
+                finished.set()
+
+        async def _worker(channel: str, queue: asyncio.Queue, pacer: _Pacer, slots: asyncio.Semaphore):
+            while True:
+                notification = await queue.get()
+                async with slots:
+                    await pacer.wait()
+                    notification.attempts += 1
+                    try:
+                        result = await notification.send()
+                    except Exception as e:
+                        result = {"status": "failed", "channel": channel, "error": str(e),
+                                  "recipient": notification.recipient, "retryable": True}
+                if result.get("status") == "failed" and result.get("retryable") and notification.attempts < self.max_attempts:
+                    progress["retries"] += 1
+                    delay = self.retry_base_seconds * 2 ** (notification.attempts - 1)
+                    retry_handles.append(loop.call_later(delay, queue.put_nowait, notification))
+                    continue
+                _finish(notification, result)
+
+        workers = []
+        for channel, queue in queues.items():
+            concurrency, pacer = self._limits(channel)
+            slots = self._slot(channel)
+            workers += [asyncio.create_task(_worker(channel, queue, pacer, slots)) for _ in range(min(concurrency, queue.qsize()))]
+        try:
+            await finished.wait()
+            progress["status"] = "completed"
+        except BaseException:
+            progress["status"] = "cancelled"
+            raise
+        finally:
+            for handle in retry_handles:
+                handle.cancel()
+            for worker in workers:
+                worker.cancel()
+            progress["completed_at"] = datetime.now().isoformat()
+            progress["elapsed_seconds"] = round(time.monotonic() - start, 3)
+        logger.info(f"📨 Campaign {campaign_id}: {progress['completed']} notifications, {progress['failed']} failed, "
+                    f"{progress['retries']} retries in {progress['elapsed_seconds']}s")
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "limits": {channel: {"concurrency": c, "rate_per_second": r} for channel, (c, r) in self.limits.items()},
+            "max_attempts": self.max_attempts,
+            "campaigns_running": sum(1 for p in self.campaigns.values() if p["status"] == "running")
+        }
+
+
+notification_dispatcher = NotificationDispatcher()
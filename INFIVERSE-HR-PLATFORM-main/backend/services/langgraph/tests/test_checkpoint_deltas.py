@@ -0,0 +1,149 @@
+import pytest
+import json
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip("bson")
+
+from app.checkpoint_deltas import DeltaCheckpointCodec, prunable_checkpoints
+
+
+class JsonSerde:
+    """Stand-in for LangGraph's typed serializer"""
+
+    def dumps_typed(self, value):
+        return "json", json.dumps(value, sort_keys=True).encode()
+
+    def loads_typed(self, typed):
+        return json.loads(typed[1])
+
+
+class MemoryCodec(DeltaCheckpointCodec):
+    """Delta codec over an in-memory thread: stored checkpoints by thread_ts"""
+
+    def __init__(self, snapshot_interval=4):
+        self.serde = JsonSerde()
+        self._init_deltas()
+        self.snapshot_interval = snapshot_interval
+        self.stored = {}
+        self.fetches = 0
+
+    def _fetch_ancestors(self, thread_id, thread_ts):
+        self.fetches += 1
+        return [(ts, self.stored[ts]) for ts in thread_ts if ts in self.stored]
+
+    def put(self, parent_ts, checkpoint):
+        stored, head = self._serialize_checkpoint("thread-1", checkpoint["ts"], parent_ts, checkpoint)
+        self.stored[checkpoint["ts"]] = stored
+        self._remember_head("thread-1", head)
+        return checkpoint["ts"]
+
+    def get(self, thread_ts):
+        return self._deserialize_checkpoint("thread-1", self.stored[thread_ts])
+
+
+def _checkpoint(step, values, versions):
+    return {
+        "v": 1,
+        "ts": f"2024-01-01T00:00:{step:02d}",
+        "id": f"checkpoint-{step}",
+        "channel_values": values,
+        "channel_versions": versions,
+        "versions_seen": {"node": dict(versions)},
+    }
+
+
+def _run_workflow(codec, steps=10):
+    """A large resume that never changes, a few channels updated each step, one channel dropped at step 5"""
+    values = {"resume_text": "experienced python engineer " * 500, "candidate": {"id": 7, "skills": ["python"]}}
+    versions = {"resume_text": 1, "candidate": 1}
+    parent_ts, written = None, []
+    for step in range(steps):
+        values = dict(values, status=f"step-{step}", messages=[f"message {i}" for i in range(step + 1)])
+        versions = dict(versions, status=step + 1, messages=step + 1)
+        if step == 5:
+            values.pop("candidate")
+            versions.pop("candidate")
+        checkpoint = _checkpoint(step, values, versions)
+        parent_ts = codec.put(parent_ts, checkpoint)
+        written.append(checkpoint)
+    return written
+
+
+def test_deltas_rebuild_every_checkpoint():
+    codec = MemoryCodec()
+    written = _run_workflow(codec)
+
+    kinds = [codec.stored[c["ts"]]["kind"] for c in written]
+    assert kinds == ["snapshot", "delta", "delta", "delta"] * 2 + ["snapshot", "delta"]
+    for checkpoint in written:
+        assert codec.get(checkpoint["ts"]) == checkpoint
+    assert "candidate" not in codec.get(written[-1]["ts"])["channel_values"]
+
+
+def test_deltas_store_changed_channels_and_their_chain():
+    codec = MemoryCodec()
+    written = _run_workflow(codec, steps=3)
+    first, second, third = (codec.stored[c["ts"]] for c in written)
+
+    assert sorted(entry["c"] for entry in first["channels"]) == ["candidate", "messages", "resume_text", "status"]
+    assert sorted(entry["c"] for entry in second["channels"]) == ["messages", "status"]
+    assert third["chain"] == [written[1]["ts"], written[0]["ts"]]
+    resume = next(entry for entry in first["channels"] if entry["c"] == "resume_text")
+    assert resume["z"] is True
+    assert codec.stats["snapshots"] == 1 and codec.stats["deltas"] == 2
+
+
+def test_fork_writes_a_snapshot():
+    codec = MemoryCodec()
+    written = _run_workflow(codec, steps=3)
+    fork = _checkpoint(10, dict(written[0]["channel_values"], status="forked"), dict(written[0]["channel_versions"], status=9))
+    codec.put(written[0]["ts"], fork)
+    assert codec.stored[fork["ts"]]["kind"] == "snapshot"
+    assert codec.get(fork["ts"]) == fork
+
+
+def test_known_ancestors_are_not_fetched_again():
+    codec = MemoryCodec()
+    written = _run_workflow(codec, steps=4)
+    known = {}
+    for checkpoint in reversed(written):
+        stored = codec.stored[checkpoint["ts"]]
+        known[checkpoint["ts"]] = stored
+        assert codec._deserialize_checkpoint("thread-1", stored, known) == checkpoint
+    assert codec.fetches == 1
+
+
+def test_prunable_checkpoints_keep_ancestors_of_kept_checkpoints():
+    codec = MemoryCodec()
+    written = _run_workflow(codec)
+    newest_first = [(c["ts"], codec.stored[c["ts"]]["chain"]) for c in reversed(written)]
+
+    # Keeping the last two needs the snapshot at step 8 only; steps 0-7 can go
+    assert prunable_checkpoints(newest_first, 2) == [c["ts"] for c in reversed(written[:8])]
+    # Keeping the last four reaches back into the step 4 group, so its snapshot and deltas stay
+    assert prunable_checkpoints(newest_first, 4) == [c["ts"] for c in reversed(written[:4])]
+
+    for ts in prunable_checkpoints(newest_first, 4):
+        del codec.stored[ts]
+    for checkpoint in written[-4:]:
+        assert codec.get(checkpoint["ts"]) == checkpoint
+
+    with pytest.raises(ValueError):
+        prunable_checkpoints(newest_first, 0)
+
+
+def test_missing_ancestor_is_reported(caplog):
+    codec = MemoryCodec()
+    written = _run_workflow(codec, steps=3)
+    del codec.stored[written[0]["ts"]]
+    with caplog.at_level("ERROR"):
+        restored = codec.get(written[2]["ts"])
+    assert "must not be pruned" in caplog.text
+    assert "resume_text" not in restored["channel_values"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
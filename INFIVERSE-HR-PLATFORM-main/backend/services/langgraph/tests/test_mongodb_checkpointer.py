@@ -0,0 +1,150 @@
+import pytest
+import json
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+mongomock = pytest.importorskip("mongomock")
+
+try:
+    from app.mongodb_checkpointer import MongoDBSaver
+except ImportError as e:
+    # When pytest puts services/ on sys.path this service package shadows the langgraph library
+    pytest.skip(f"langgraph checkpoint API not importable: {e}", allow_module_level=True)
+
+
+def _saver(client=None, snapshot_interval=4):
+    saver = MongoDBSaver(mongodb_uri="mongodb://test", db_name="checkpoint_test", client=client or mongomock.MongoClient())
+    saver.snapshot_interval = snapshot_interval
+    return saver
+
+
+def _checkpoint(step, values, versions):
+    return {
+        "v": 1,
+        "ts": f"2024-01-01T00:00:{step:02d}",
+        "id": f"checkpoint-{step}",
+        "channel_values": values,
+        "channel_versions": versions,
+        "versions_seen": {"node": dict(versions)},
+    }
+
+
+def _run_workflow(saver, thread_id="thread-1", steps=10):
+    """Simulate a workflow: a large resume that never changes plus a few small channels updated each step"""
+    values = {"resume_text": "experienced python engineer " * 500, "candidate": {"id": 7, "skills": ["python"]}}
+    versions = {"resume_text": 1, "candidate": 1}
+    config = {"configurable": {"thread_id": thread_id}}
+    written = []
+    for step in range(steps):
+        values = dict(values, status=f"step-{step}", messages=[f"message {i}" for i in range(step + 1)])
+        versions = dict(versions, status=step + 1, messages=step + 1)
+        if step == 5:
+            values.pop("candidate")
+            versions.pop("candidate")
+        checkpoint = _checkpoint(step, values, versions)
+        config = saver.put(config, checkpoint, {"step": step})
+        written.append(checkpoint)
+    return written
+
+
+def test_checkpoints_round_trip_through_deltas():
+    saver = _saver()
+    written = _run_workflow(saver)
+    collection = saver._db[saver._collection_name]
+
+    kinds = [doc["checkpoint"]["kind"] for doc in collection.find({}).sort("thread_ts", 1)]
+    assert kinds == ["snapshot", "delta", "delta", "delta"] * 2 + ["snapshot", "delta"]
+
+    for checkpoint in written:
+        restored = saver.get_tuple({"configurable": {"thread_id": "thread-1", "thread_ts": checkpoint["ts"]}})
+        assert restored.checkpoint == checkpoint
+
+    latest = saver.get_tuple({"configurable": {"thread_id": "thread-1"}})
+    assert latest.checkpoint == written[-1]
+    assert "candidate" not in latest.checkpoint["channel_values"]
+
+
+def test_deltas_store_only_changed_channels():
+    saver = _saver()
+    _run_workflow(saver, steps=3)
+    docs = list(saver._db[saver._collection_name].find({}).sort("thread_ts", 1))
+
+    assert sorted(entry["c"] for entry in docs[0]["checkpoint"]["channels"]) == ["candidate", "messages", "resume_text", "status"]
+    assert sorted(entry["c"] for entry in docs[1]["checkpoint"]["channels"]) == ["messages", "status"]
+    assert docs[2]["checkpoint"]["chain"] == [docs[1]["thread_ts"], docs[0]["thread_ts"]]
+
+    # The resume is compressed in the snapshot and never written again
+    resume = next(entry for entry in docs[0]["checkpoint"]["channels"] if entry["c"] == "resume_text")
+    assert resume["z"] is True
+    assert len(resume["d"]) < len(json.dumps("experienced python engineer " * 500)) / 10
+    assert saver.get_stats()["deltas"] == 2
+
+
+def test_list_restores_every_checkpoint():
+    saver = _saver()
+    written = _run_workflow(saver, steps=6)
+    listed = list(saver.list({"configurable": {"thread_id": "thread-1"}}))
+    assert [t.checkpoint for t in listed] == list(reversed(written))
+    assert [t.metadata["step"] for t in listed[:2]] == [5, 4]
+
+
+def test_new_saver_starts_with_a_snapshot():
+    """After a restart there is no cached parent to diff against, so the next write is a full snapshot"""
+    client = mongomock.MongoClient()
+    written = _run_workflow(_saver(client), steps=2)
+
+    restarted = _saver(client)
+    config = {"configurable": {"thread_id": "thread-1", "thread_ts": written[-1]["ts"]}}
+    following = _checkpoint(2, dict(written[-1]["channel_values"], status="done"), dict(written[-1]["channel_versions"], status=3))
+    restarted.put(config, following, {})
+
+    doc = restarted._db[restarted._collection_name].find_one({"thread_ts": following["ts"]})
+    assert doc["checkpoint"]["kind"] == "snapshot"
+    assert restarted.get_tuple({"configurable": {"thread_id": "thread-1"}}).checkpoint == following
+
+
+def test_legacy_json_checkpoints_still_load():
+    saver = _saver()
+    saver._db[saver._collection_name].insert_one({
+        "thread_id": "legacy",
+        "thread_ts": "2023-01-01T00:00:00",
+        "checkpoint": {
+            "v": 1,
+            "ts": "2023-01-01T00:00:00",
+            "id": "old",
+            "channel_values": json.dumps({"status": "screening"}),
+            "channel_versions": json.dumps({"status": 2}),
+            "versions_seen": json.dumps({}),
+        },
+        "metadata": {},
+    })
+    restored = saver.get_tuple({"configurable": {"thread_id": "legacy"}})
+    assert restored.checkpoint["channel_values"] == {"status": "screening"}
+    assert restored.checkpoint["channel_versions"] == {"status": 2}
+
+
+def test_prune_keeps_the_ancestors_of_kept_checkpoints():
+    saver = _saver()
+    written = _run_workflow(saver)
+    collection = saver._db[saver._collection_name]
+
+    # The newest four reach back into the group starting at step 4
+    assert saver.prune("thread-1", keep=4) == 4
+    assert collection.count_documents({"thread_id": "thread-1"}) == 6
+    for checkpoint in written[-4:]:
+        restored = saver.get_tuple({"configurable": {"thread_id": "thread-1", "thread_ts": checkpoint["ts"]}})
+        assert restored.checkpoint == checkpoint
+    assert saver.prune("thread-1", keep=4) == 0
+
+
+def test_ttl_index_is_refused():
+    client = mongomock.MongoClient()
+    client["checkpoint_test"]["langgraph_checkpoints"].create_index("created_at", expireAfterSeconds=3600)
+    with pytest.raises(ValueError, match="TTL index"):
+        _saver(client)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,195 @@
+import pytest
+import asyncio
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.notification_dispatcher import Notification, NotificationDispatcher
+
+
+class FakeProvider:
+    """Local stand-in for a messaging provider: fixed latency, scripted failures, in-flight tracking"""
+
+    def __init__(self, channel, latency=0.01, failures=None):
+        self.channel = channel
+        self.latency = latency
+        self.failures = dict(failures or {})  # recipient -> list of results/exceptions to return first
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = []
+
+    async def send(self, recipient, message=""):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        self.calls.append((recipient, message))
+        try:
+            await asyncio.sleep(self.latency)
+            scripted = self.failures.get(recipient)
+            if scripted:
+                outcome = scripted.pop(0)
+                if isinstance(outcome, Exception):
+                    raise outcome
+                return outcome
+            return {"status": "success", "channel": self.channel, "recipient": recipient}
+        finally:
+            self.in_flight -= 1
+
+
+def _dispatcher(concurrency=4, rate=0.0, max_attempts=3):
+    dispatcher = NotificationDispatcher()
+    dispatcher.max_attempts = max_attempts
+    dispatcher.retry_base_seconds = 0.01
+    for channel in ("email", "whatsapp"):
+        dispatcher.limits[channel] = (concurrency, rate)
+        dispatcher._pacers[channel].interval = 1.0 / rate if rate else 0.0
+    return dispatcher
+
+
+def _notifications(provider, count):
+    return [Notification(key=i, channel=provider.channel, recipient=f"r{i}",
+                         send=lambda i=i: provider.send(f"r{i}"))
+            for i in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_channels_run_concurrently_within_limits():
+    """Each channel keeps at most `concurrency` sends in flight, and channels do not wait for each other"""
+    email, whatsapp = FakeProvider("email", latency=0.05), FakeProvider("whatsapp", latency=0.05)
+    dispatcher = _dispatcher(concurrency=5)
+    notifications = _notifications(email, 20) + [
+        Notification(key=("wa", i), channel="whatsapp", send=lambda i=i: whatsapp.send(f"p{i}")) for i in range(20)
+    ]
+    start = time.monotonic()
+    results = await dispatcher.dispatch(notifications)
+    elapsed = time.monotonic() - start
+
+    assert len(results) == 40
+    assert all(r["status"] == "success" for r in results.values())
+    assert email.max_in_flight == 5 and whatsapp.max_in_flight == 5
+    # 20 sends of 50ms at 5 wide is ~0.2s per channel; sequential would be 2s
+    assert elapsed < 0.6
+
+
+@pytest.mark.asyncio
+async def test_concurrent_campaigns_share_the_channel_limit():
+    """Two campaigns on one channel together keep at most `concurrency` sends in flight"""
+    email = FakeProvider("email", latency=0.02)
+    dispatcher = _dispatcher(concurrency=3)
+    first, second = _notifications(email, 12), _notifications(email, 12)
+    results = await asyncio.gather(dispatcher.dispatch(first), dispatcher.dispatch(second))
+
+    assert all(len(r) == 12 for r in results)
+    assert len(email.calls) == 24
+    assert email.max_in_flight == 3
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_spaces_sends():
+    email = FakeProvider("email", latency=0.0)
+    dispatcher = _dispatcher(concurrency=10, rate=50.0)
+    start = time.monotonic()
+    await dispatcher.dispatch(_notifications(email, 11))
+    assert time.monotonic() - start >= 0.19
+
+
+@pytest.mark.asyncio
+async def test_transient_failures_are_retried():
+    transient = {"status": "failed", "channel": "email", "error": "429", "retryable": True}
+    permanent = {"status": "failed", "channel": "email", "error": "Invalid email format"}
+    email = FakeProvider("email", failures={
+        "r0": [transient, transient],
+        "r1": [permanent],
+        "r2": [ConnectionError("reset"), ConnectionError("reset"), ConnectionError("reset")],
+    })
+    dispatcher = _dispatcher()
+    campaign_id = dispatcher.register()
+    results = await dispatcher.dispatch(_notifications(email, 4), campaign_id)
+
+    assert results[0]["status"] == "success"
+    assert results[1] == permanent
+    assert results[2]["status"] == "failed" and "reset" in results[2]["error"]
+    assert results[3]["status"] == "success"
+    assert [r for r, _ in email.calls].count("r0") == 3
+    assert [r for r, _ in email.calls].count("r1") == 1
+    assert [r for r, _ in email.calls].count("r2") == 3
+
+    progress = dispatcher.progress(campaign_id)
+    assert progress["status"] == "completed"
+    assert progress["total"] == 4 and progress["completed"] == 4 and progress["pending"] == 0
+    assert progress["failed"] == 2 and progress["retries"] == 4
+    assert progress["by_channel"]["email"] == {"total": 4, "completed": 4, "failed": 2}
+
+
+@pytest.mark.asyncio
+async def test_empty_campaign_completes():
+    dispatcher = _dispatcher()
+    assert await dispatcher.dispatch([]) == {}
+
+
+@pytest.mark.asyncio
+async def test_failed_campaign_is_not_left_queued():
+    pytest.importorskip("twilio")
+    pytest.importorskip("telegram")
+    from app import communication
+    from app.communication import CommunicationManager
+
+    manager = CommunicationManager()
+    campaign_id = communication.notification_dispatcher.register()
+    result = await manager.send_bulk_notifications([{"id": 1, "name": "Candidate"}], "application_received", None, campaign_id)
+
+    assert result["status"] == "failed" and result["campaign_id"] == campaign_id
+    progress = communication.notification_dispatcher.progress(campaign_id)
+    assert progress["status"] == "failed" and progress["error"] == result["error"]
+
+
+def test_fail_marks_a_queued_campaign():
+    dispatcher = _dispatcher()
+    campaign_id = dispatcher.register()
+    dispatcher.fail(campaign_id, "template missing")
+    progress = dispatcher.progress(campaign_id)
+    assert progress["status"] == "failed" and progress["error"] == "template missing"
+    assert progress["completed_at"] is not None
+    dispatcher.fail("unknown", "ignored")
+
+
+@pytest.mark.asyncio
+async def test_bulk_notifications_use_fake_providers():
+    """send_bulk_notifications keeps per-candidate result order and counts with providers swapped for fakes"""
+    pytest.importorskip("twilio")
+    pytest.importorskip("telegram")
+    from app import communication
+    from app.communication import CommunicationManager, _render_cached
+
+    email, whatsapp = FakeProvider("email", latency=0.02), FakeProvider("whatsapp", latency=0.02)
+    manager = CommunicationManager()
+    manager.send_email = lambda to, subject, body, html_body=None: email.send(to, body)
+    manager.send_whatsapp = lambda phone, message: whatsapp.send(phone, message)
+    communication.notification_dispatcher.limits.update({"email": (10, 0.0), "whatsapp": (10, 0.0)})
+    communication.notification_dispatcher._pacers["email"].interval = 0.0
+    communication.notification_dispatcher._pacers["whatsapp"].interval = 0.0
+
+    candidates = [{"id": i, "name": f"Candidate {i}", "email": f"c{i}@example.org", "phone": f"98765{i:05d}"}
+                  for i in range(100)]
+    _render_cached.cache_clear()
+    start = time.monotonic()
+    result = await manager.send_bulk_notifications(candidates, "application_received", {"job_title": "Engineer"})
+    elapsed = time.monotonic() - start
+
+    assert result["status"] == "completed"
+    assert result["success_count"] == 200 and result["failed_count"] == 0
+    assert [r["channel"] for r in result["results"][:4]] == ["email", "whatsapp", "email", "whatsapp"]
+    assert [r["recipient"] for r in result["results"][::2]] == [c["email"] for c in candidates]
+    # 200 messages at 20ms each would take 4s one at a time
+    assert elapsed < 2.0
+    # The WhatsApp text only depends on the job, so it rendered once for the whole campaign
+    assert len({message for _, message in whatsapp.calls}) == 1
+    assert _render_cached.cache_info().hits >= 99
+
+    missing_title = await manager.send_bulk_notifications(candidates[:2], "shortlisted", {})
+    assert missing_title["failed_count"] == 2 and missing_title["results"] == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -24,6 +24,8 @@ logger = logging.getLogger(__name__)
 ALLOWED_EXTENSIONS = {'.pdf', '.docx', '.doc', '.txt'}
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 MAX_FILES_PER_BATCH = 50
+PARSEABLE_EXTENSIONS = {'.pdf', '.txt'}
+PARSE_BATCH_SIZE = 50  # files per gateway parse request
 
 def validate_file(uploaded_file):
     """Validate uploaded file for security and size"""
@@ -213,7 +215,7 @@ def scan_resume_folder():
         st.error(f"Folder scan failed: {str(e)}")
 
 def trigger_resume_processing():
-    """Trigger resume processing and upload to API"""
+    """Parse the resume folder on the gateway and upload the extracted candidates to the API"""
     import httpx
     import os
     
@@ -226,53 +228,70 @@ def trigger_resume_processing():
         raise ValueError("API_KEY_SECRET environment variable is required")
     headers = {"Authorization": f"Bearer {API_KEY}"}
     
-    with st.spinner("Processing resumes and uploading to database..."):
-        try:
-            # First run resume extraction
-            import subprocess
-            tools_path = os.path.join(os.path.dirname(__file__), "..", "..", "tools", "comprehensive_resume_extractor.py")
-            result = subprocess.run(
-                ["python", tools_path],
-                capture_output=True,
-                text=True
-            )
-            
-            if result.returncode == 0:
-                st.success("✅ Resume extraction completed!")
-                
-                # Now read the extracted data and upload via API
-                import json
-                from pathlib import Path
-                
-                # Check if extracted data file exists
-                data_dir = os.path.join(os.path.dirname(__file__), "..", "..", "data")
-                data_file = Path(data_dir) / "extracted_candidates.json"
-                if data_file.exists():
-                    with open(data_file, 'r') as f:
-                        candidates_data = json.load(f)
-                    
-                    if candidates_data:
-                        # Upload to API
-                        response = httpx.post(
-                            f"{API_BASE}/v1/candidates/bulk",
-                            json={"candidates": candidates_data},
-                            headers=headers,
-                            timeout=30.0
-                        )
-                        
-                        if response.status_code == 200:
-                            result_data = response.json()
-                            st.success(f"✅ Successfully uploaded {result_data.get('candidates_inserted', 0)} candidates to database!")
-                            st.info("📊 Candidates are now available for AI matching and search")
+    resume_folder = Path(os.path.join(os.path.dirname(__file__), "..", "..", "resume"))
+    resume_files = sorted(p for p in resume_folder.glob("*") if p.suffix.lower() in PARSEABLE_EXTENSIONS)
+    unsupported = [p.name for p in resume_folder.glob("*") if p.suffix.lower() in {".docx", ".doc"}]
+    if unsupported:
+        st.warning(f"⚠️ Skipping {len(unsupported)} Word files; only PDF and text resumes can be parsed")
+    if not resume_files:
+        st.warning("⚠️ No PDF or text resumes found in the resume folder")
+        return
+    
+    progress = st.progress(0.0, text=f"Parsing 0/{len(resume_files)} resumes...")
+    failures = []
+    candidates_data = []
+    completed = 0
+    try:
+        # The gateway parses each batch concurrently and streams one NDJSON line per finished file
+        with httpx.Client(timeout=httpx.Timeout(30.0, read=300.0)) as client:
+            for start in range(0, len(resume_files), PARSE_BATCH_SIZE):
+                batch = resume_files[start:start + PARSE_BATCH_SIZE]
+                files = [("files", (p.name, p.read_bytes())) for p in batch]
+                with client.stream("POST", f"{API_BASE}/v1/candidates/parse-pdf/batch", files=files, headers=headers) as response:
+                    if response.status_code != 200:
+                        response.read()
+                        st.error(f"❌ Resume parsing failed: {response.text}")
+                        return
+                    for line in response.iter_lines():
+                        if not line:
+                            continue
+                        record = json.loads(line)
+                        if record.get("status") == "done":
+                            continue
+                        completed += 1
+                        if record["status"] == "parsed":
+                            candidates_data.extend(r for r in record.get("rows", []) if r.get("email"))
                         else:
-                            st.error(f"❌ API upload failed: {response.text}")
-                    else:
-                        st.warning("⚠️ No candidate data extracted from resumes")
-                else:
-                    st.warning("⚠️ No extracted data file found. Please check resume extraction process.")
+                            failures.append(f"{record['file']}: {record.get('error')}")
+                        progress.progress(completed / len(resume_files), text=f"Parsing {completed}/{len(resume_files)} resumes...")
+        
+        st.success(f"✅ Resume extraction completed: {len(candidates_data)} candidates from {completed - len(failures)} files")
+        if failures:
+            with st.expander(f"⚠️ {len(failures)} files could not be parsed"):
+                for failure in failures:
+                    st.write(failure)
+        
+        if not candidates_data:
+            st.warning("⚠️ No candidate data extracted from resumes")
+            return
+        
+        with st.spinner("Uploading candidates to database..."):
+            response = httpx.post(
+                f"{API_BASE}/v1/candidates/bulk",
+                json={"candidates": candidates_data},
+                headers=headers,
+                timeout=120.0
+            )
+        
+        if response.status_code == 200:
+            result_data = response.json()
+            if result_data.get("status") == "queued":
+                st.success(f"✅ Upload of {len(candidates_data)} candidates queued (upload {result_data.get('upload_id')})")
             else:
-                st.error("❌ Resume processing failed")
-                st.code(result.stderr)
-                
-        except Exception as e:
-            st.error(f"Error: {str(e)}")
+                st.success(f"✅ Successfully uploaded {result_data.get('candidates_inserted', 0)} candidates to database!")
+            st.info("📊 Candidates are now available for AI matching and search")
+        else:
+            st.error(f"❌ API upload failed: {response.text}")
+            
+    except Exception as e:
+        st.error(f"Error: {str(e)}")
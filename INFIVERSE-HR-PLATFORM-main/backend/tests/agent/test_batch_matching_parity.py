@@ -0,0 +1,136 @@
+"""
+Batched vs per-pair scoring parity for the Phase 3 semantic engine
+Uses a deterministic local encoder so no model download or database is needed
+"""
+import hashlib
+import os
+import sys
+from collections import OrderedDict, defaultdict
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("sklearn")
+
+AGENT_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'agent')
+sys.path.insert(0, os.path.abspath(AGENT_DIR))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from semantic_engine.phase3_engine import Phase3SemanticEngine
+from semantic_engine.match_executor import MatchingExecutor
+from benchmark_batch_matching import JOB, generate_candidates, per_pair_score
+
+TOLERANCE = 1e-6
+
+
+class HashEncoder:
+    """Deterministic stand-in for SentenceTransformer.encode: one fixed vector per text"""
+
+    def __init__(self, dim=32):
+        self.dim = dim
+
+    def _vector(self, text):
+        seed = int.from_bytes(hashlib.sha1(text.encode('utf-8')).digest()[:4], 'little')
+        return np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+
+    def encode(self, texts, **kwargs):
+        return np.stack([self._vector(text) for text in texts])
+
+
+class StaticFeatureStore:
+    """Fixed cultural fit per candidate and company weights"""
+
+    def __init__(self, fits, preferences):
+        self.fits = fits
+        self.preferences = preferences
+
+    def cultural_fit_many(self, client_id, candidate_ids):
+        if not client_id:
+            return np.full(len(candidate_ids), 0.5)
+        return np.array([self.fits.get(str(cid), 0.5) for cid in candidate_ids])
+
+
+@pytest.fixture
+def engine():
+    engine = object.__new__(Phase3SemanticEngine)
+    engine.model = HashEncoder()
+    engine.company_preferences = defaultdict(dict)
+    engine.cache = OrderedDict()
+    engine.cache_max_entries = 4
+    engine.encode_batch_size = 16
+    engine.ann_retrieve_limit = 1000
+    engine.vector_store = None
+    engine.match_executor = MatchingExecutor(workers=0)
+    engine.feature_store = StaticFeatureStore(
+        {'bench_candidate_1': 0.9, 'bench_candidate_4': 0.2},
+        {'client_a': {'scoring_weights': {'semantic': 0.30, 'experience': 0.40, 'skills': 0.20, 'location': 0.10}}}
+    )
+    engine._sync_company_preferences()
+    return engine
+
+
+JOBS = [
+    JOB,
+    dict(JOB, id='remote_job', location='Remote (India)', experience_level='junior', client_id='client_a'),
+    dict(JOB, id='no_requirements_job', requirements='', location='', experience_level='lead'),
+]
+
+
+def test_score_candidates_matches_per_pair(engine):
+    candidates = generate_candidates(60)
+    for job in JOBS:
+        batched = engine.score_candidates(job, candidates, job.get('client_id'))
+        for i, candidate in enumerate(candidates):
+            assert float(batched['total_score'][i]) == pytest.approx(
+                per_pair_score(engine, job, candidate), abs=TOLERANCE)
+
+
+def test_score_matrix_matches_per_pair(engine):
+    candidates = generate_candidates(60, seed=7)
+    matrix = engine.score_matrix(JOBS, candidates)
+    for j, job in enumerate(JOBS):
+        for i, candidate in enumerate(candidates):
+            assert float(matrix['total_score'][j, i]) == pytest.approx(
+                per_pair_score(engine, job, candidate), abs=TOLERANCE)
+
+
+def test_top_k_keeps_best_per_pair_scores(engine):
+    candidates = generate_candidates(80, seed=3)
+    expected = sorted(candidates, key=lambda c: -per_pair_score(engine, JOB, c))[:5]
+    top = engine.match_candidates(JOB, candidates, top_k=5)
+    assert [m['candidate_id'] for m in top] == [c['id'] for c in expected]
+
+
+def test_streamed_batches_keep_the_same_top_k(engine):
+    candidates = generate_candidates(90, seed=11)
+    batches = [candidates[i:i + 25] for i in range(0, len(candidates), 25)]
+    seen, tops = 0, {}
+    for seen, tops in engine.stream_top_k(JOBS, iter(batches), 5):
+        pass
+    assert seen == len(candidates)
+    for job in JOBS:
+        expected = engine.match_candidates(job, candidates, top_k=5)
+        assert [m['candidate_id'] for m in tops[job['id']]] == [m['candidate_id'] for m in expected]
+        assert [m['total_score'] for m in tops[job['id']]] == pytest.approx([m['total_score'] for m in expected], abs=TOLERANCE)
+
+
+def test_streamed_retrieval_shortlists_through_the_ann_index(engine):
+    from semantic_engine.vector_store import CandidateVectorStore
+    engine.vector_store = CandidateVectorStore(path=':memory:')
+    candidates = generate_candidates(120, seed=5)
+    by_id = {c['id']: c for c in candidates}
+    batches = [candidates[i:i + 40] for i in range(0, len(candidates), 40)]
+    fetched = []
+
+    def fetch(ids):
+        fetched.extend(ids)
+        return [by_id[cid] for cid in ids]
+
+    pool_size, shortlist = engine.retrieve_candidate_batches(JOB, iter(batches), 30, fetch)
+    assert pool_size == len(candidates)
+    assert len(shortlist) == 30 and fetched == [c['id'] for c in shortlist]
+    assert engine.vector_store.candidate_count() == len(candidates)
+
+    pool_size, shortlist = engine.retrieve_candidate_batches(JOB, iter(batches), 500, fetch)
+    assert pool_size == len(candidates) and shortlist == candidates
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Candidate Search Benchmark
+Compares a full substring scan (what the $regex query does) against the
+gateway's trigram search index on synthetic candidates (no database needed)
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+GATEWAY_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'gateway')
+sys.path.insert(0, os.path.abspath(GATEWAY_DIR))
+
+from bson import ObjectId
+
+from app.candidate_search import CandidateSearchIndex, candidate_record
+
+SKILLS = ["python", "java", "javascript", "react", "node", "sql", "aws", "docker",
+          "kubernetes", "machine learning", "go", "django", "fastapi", "spark"]
+LOCATIONS = ["Mumbai", "Pune", "Bangalore", "Delhi", "Hyderabad", "Chennai", "Remote"]
+FIRST_NAMES = ["Aarav", "Diya", "Ishaan", "Kavya", "Rohan", "Saanvi", "Vihaan", "Anaya"]
+QUERIES = [
+    {'text': 'kavya'},
+    {'skills': 'fastapi', 'location': 'pune'},
+    {'skills': 'machine learning', 'experience_min': 5},
+    {'text': 'gmail', 'seniority_tokens': ['senior', 'lead']},
+]
+
+def generate_candidates(count: int, seed: int = 42) -> list:
+    """Generate synthetic candidate documents"""
+    rng = random.Random(seed)
+    docs = []
+    for i in range(count):
+        name = f"{rng.choice(FIRST_NAMES)} {i}"
+        docs.append({
+            '_id': ObjectId(),
+            'name': name,
+            'email': f"{name.replace(' ', '.').lower()}@{rng.choice(['gmail.com', 'example.org'])}",
+            'technical_skills': ", ".join(rng.sample(SKILLS, rng.randint(2, 6))),
+            'seniority_level': rng.choice(["junior", "mid", "senior", "lead"]),
+            'education_level': rng.choice(["BTech", "MTech", "MBA", "PhD"]),
+            'location': rng.choice(LOCATIONS),
+            'experience_years': rng.randint(0, 15),
+            'status': 'applied'
+        })
+    return docs
+
+def naive_page(records: list, query: dict, limit: int, after: str = None) -> tuple:
+    """Scan every record the way an unindexed case-insensitive $regex does"""
+    def matches(r):
+        if query.get('text') and not any(r[f] and query['text'].encode() in r[f]
+                                         for f in ('name', 'email', 'technical_skills')):
+            return False
+        if query.get('skills') and not (r['technical_skills'] and query['skills'].encode() in r['technical_skills']):
+            return False
+        if query.get('location') and not (r['location'] and query['location'] in r['location']):
+            return False
+        if query.get('seniority_tokens') and not any(t in (r['seniority_level'] or '') for t in query['seniority_tokens']):
+            return False
+        if query.get('experience_min') is not None and not r['experience'] >= query['experience_min']:
+            return False
+        return True
+    hits = [r['id'] for r in records if matches(r) and (after is None or r['id'] > after)]
+    return hits[:limit], len(hits)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the gateway candidate search index")
+    parser.add_argument("--candidates", type=int, default=1_000_000, help="Synthetic candidates to index")
+    parser.add_argument("--limit", type=int, default=50, help="Page size")
+    parser.add_argument("--pages", type=int, default=20, help="Keyset pages to walk per query")
+    args = parser.parse_args()
+
+    docs = generate_candidates(args.candidates)
+    records = sorted((candidate_record(d) for d in docs), key=lambda r: r['id'])
+
+    index = CandidateSearchIndex()
+    start = time.perf_counter()
+    index.build(records)
+    print(f"Index build: {time.perf_counter() - start:.1f}s for {args.candidates} candidates")
+
+    for query in QUERIES:
+        start = time.perf_counter()
+        expected, expected_total = naive_page(records, query, args.limit)
+        naive_s = time.perf_counter() - start
+
+        cursor, index_s, result = None, 0.0, None
+        for page in range(args.pages):
+            start = time.perf_counter()
+            result = index.search(limit=args.limit, after=cursor, **query)
+            index_s += time.perf_counter() - start
+            if page == 0:
+                assert result['ids'] == expected, f"first page differs for {query}"
+                first = result
+            cursor = result['next_cursor']
+            if cursor is None:
+                break
+
+        estimate = "estimated" if first['total_estimated'] else "exact"
+        print(f"{query}: scan {naive_s * 1000:.0f} ms/page, index {index_s / (page + 1) * 1000:.1f} ms/page "
+              f"over {page + 1} keyset pages, total {first['total']} ({estimate}) vs {expected_total}")
+
+if __name__ == "__main__":
+    main()
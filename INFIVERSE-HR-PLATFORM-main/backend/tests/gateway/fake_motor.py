@@ -0,0 +1,84 @@
+"""
+Motor-style async wrappers over mongomock for gateway unit tests
+Only what the gateway modules use: awaited collection methods and async cursors
+"""
+
+import mongomock
+
+
+class FakeCursor:
+    """Async iteration over a mongomock cursor; sort/limit/skip/batch_size chain like Motor's"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._iterator = None
+
+    def sort(self, *args, **kwargs):
+        self._cursor = self._cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, count):
+        self._cursor = self._cursor.limit(count)
+        return self
+
+    def skip(self, count):
+        self._cursor = self._cursor.skip(count)
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    def __aiter__(self):
+        self._iterator = iter(self._cursor)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length=None):
+        docs = list(self._cursor)
+        return docs if length is None else docs[:length]
+
+
+class FakeCollection:
+    """Collection whose methods are awaited; `calls` records the method names used"""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self.calls = []
+
+    def find(self, *args, **kwargs):
+        return FakeCursor(self._collection.find(*args, **kwargs))
+
+    def aggregate(self, pipeline, **kwargs):
+        return FakeCursor(iter(list(self._collection.aggregate(pipeline))))
+
+    def __getattr__(self, name):
+        method = getattr(self._collection, name)
+
+        async def call(*args, **kwargs):
+            self.calls.append(name)
+            return method(*args, **kwargs)
+
+        return call
+
+
+class FakeDatabase:
+    """db.<collection> and db[<collection>] return FakeCollections over one mongomock database"""
+
+    def __init__(self, name="gateway_test"):
+        self._db = mongomock.MongoClient()[name]
+        self._collections = {}
+
+    def __getitem__(self, name):
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(self._db[name])
+        return self._collections[name]
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
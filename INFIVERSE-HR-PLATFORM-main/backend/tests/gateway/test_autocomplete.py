@@ -0,0 +1,125 @@
+"""
+Job Autocomplete Index Tests
+Prefix top-k against a brute-force ranking, one-typo completion and job counts
+"""
+
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("mongomock")
+
+GATEWAY_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'gateway')
+sys.path.insert(0, os.path.abspath(GATEWAY_DIR))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bson import ObjectId
+
+from app.autocomplete import JobAutocompleteIndex, PrefixTrie, extract_skills, prefix_keys
+from fake_motor import FakeDatabase
+
+WORDS = ["python", "pytorch", "pyspark", "java", "javascript", "react", "redis", "rust", "ruby", "go", "golang",
+         "docker", "django", "data", "database", "devops"]
+
+
+def _job(title, requirements="", location="Pune", status="active", age_days=0):
+    return {"_id": ObjectId(), "title": title, "department": "Engineering", "location": location,
+            "requirements": requirements, "status": status,
+            "created_at": datetime(2024, 1, 1) - timedelta(days=age_days)}
+
+
+def _index(docs):
+    index = JobAutocompleteIndex()
+    index._state = JobAutocompleteIndex.build_state(docs)
+    return index
+
+
+def test_trie_top_k_matches_brute_force():
+    rng = random.Random(7)
+    trie = PrefixTrie(cache_size=5)
+    ranks = {}
+    for entry in range(300):
+        key = rng.choice(WORDS) + str(entry % 7)
+        ranks[entry] = (rng.randint(0, 50), entry)
+        trie.put(entry, {key}, ranks[entry])
+    keys = {entry: next(iter(trie._keys[entry])) for entry in ranks}
+    # Updates and removals invalidate the cached top entries on their paths
+    for entry in range(0, 300, 3):
+        ranks[entry] = (-1, entry)
+        trie.put(entry, {keys[entry]}, ranks[entry])
+    for entry in range(1, 300, 10):
+        trie.discard(entry)
+        del ranks[entry]
+
+    for prefix in ["p", "py", "ja", "java", "r", "d", "data", "go1", "x", ""]:
+        expected = sorted((e for e in ranks if keys[e].startswith(prefix)), key=ranks.__getitem__)[:5]
+        assert trie.complete(prefix, 5) == expected
+    assert len(trie) == len(ranks)
+
+
+def test_fuzzy_completion_tolerates_one_typo():
+    trie = PrefixTrie()
+    for i, word in enumerate(WORDS):
+        trie.put(word, prefix_keys(word), (i, word))
+    assert trie.complete("pyhton", 5) == []
+    assert trie.complete_fuzzy("pyhton", 5)[0] == "python"      # swapped letters
+    assert trie.complete_fuzzy("pythn", 5)[0] == "python"       # missing letter
+    assert trie.complete_fuzzy("dockar", 5) == ["docker"]       # wrong letter
+    assert trie.complete_fuzzy("kubernetes", 5) == []
+
+
+def test_jobs_complete_any_word_newest_first_with_typos():
+    docs = [_job("Senior Python Developer", age_days=3), _job("Python Data Engineer", age_days=1),
+            _job("Java Developer"), _job("Python Intern", status="closed")]
+    index = _index(docs)
+    assert [j["title"] for j in index.jobs("pyth")] == ["Python Data Engineer", "Senior Python Developer"]
+    assert [j["title"] for j in index.jobs("developer")] == ["Java Developer", "Senior Python Developer"]
+    assert [j["title"] for j in index.jobs("data eng")] == ["Python Data Engineer"]
+    assert [j["title"] for j in index.jobs("devloper")] == ["Java Developer", "Senior Python Developer"]
+    assert index.jobs("devloper", typos=False) == []
+
+
+def test_skill_job_counts_count_each_job_once():
+    docs = [_job("A", "Python, python, Django"), _job("B", "Python, FastAPI"), _job("C", "Python")]
+    index = _index(docs)
+    # "python" in job A is the same skill, not a fourth job; the most used spelling is shown
+    assert index.skills("py") == [{"id": "Python", "label": "Python", "job_count": 3}]
+    assert index.skills("fast") == [{"id": "FastAPI", "label": "FastAPI", "job_count": 1}]
+
+    # Removing a job takes back exactly what it added
+    JobAutocompleteIndex._apply(index._state, str(docs[0]["_id"]), None)
+    assert index.skills("py") == [{"id": "Python", "label": "Python", "job_count": 2}]
+    assert index.skills("djan") == []
+
+
+def test_extract_skills_tokens():
+    assert extract_skills("Python, C++ / Node.js; 5+ years\nAWS") == {"Python", "C++", "Node.js", "5+", "years", "AWS"}
+    assert extract_skills(None) == set()
+
+
+@pytest.mark.asyncio
+async def test_writes_and_foreign_inserts_are_visible_on_the_next_lookup():
+    db = FakeDatabase()
+    docs = [_job("Backend Engineer", "Go, Redis"), _job("Frontend Engineer", "React", location="Mumbai")]
+    await db.jobs.insert_many(docs)
+    index = JobAutocompleteIndex()
+    index.sync_seconds = 0.0
+    await index.rebuild(db)
+    assert [s["label"] for s in index.locations("m")] == ["Mumbai"]
+
+    await db.jobs.update_one({"_id": docs[1]["_id"]}, {"$set": {"status": "closed"}})
+    index.note_write(docs[1]["_id"])
+    await db.jobs.insert_one(_job("Platform Engineer", "Redis, Kubernetes", location="Remote"))
+
+    assert await index.ensure_ready(db) is True
+    assert index.locations("m") == []
+    assert [j["title"] for j in index.jobs("engineer")] == ["Backend Engineer", "Platform Engineer"]
+    assert index.skills("red") == [{"id": "Redis", "label": "Redis", "job_count": 2}]
+    assert index.get_stats()["active_jobs"] == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,93 @@
+"""
+Gateway Batch Fallback Tests
+One candidate scan for many jobs: results per requested id, each job document scored once
+"""
+
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("mongomock")
+pytest.importorskip("fastapi")
+
+GATEWAY_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'gateway')
+sys.path.insert(0, os.path.abspath(GATEWAY_DIR))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bson import ObjectId
+
+import app.main as gateway
+from fake_motor import FakeDatabase
+
+
+async def _database():
+    db = FakeDatabase()
+    await db.jobs.insert_many([
+        {"_id": ObjectId(), "id": "legacy-1", "title": "Python Developer", "requirements": "Python, Django, 3+ years", "location": "Pune"},
+        {"_id": ObjectId(), "title": "Java Developer", "requirements": "Java, Spring", "location": "Mumbai"},
+    ])
+    await db.candidates.insert_many([
+        {"name": f"Candidate {i}", "email": f"c{i}@example.org", "location": "Pune" if i % 2 else "Mumbai",
+         "technical_skills": "python django" if i % 3 else "java spring", "experience_years": i % 6}
+        for i in range(25)
+    ])
+    return db
+
+
+async def _collect(monkeypatch, db, job_ids, limit=5, batch_size=4):
+    async def get_mongo_db():
+        return db
+
+    monkeypatch.setattr(gateway, "get_mongo_db", get_mongo_db)
+    monkeypatch.setattr(gateway, "FALLBACK_MATCH_BATCH_SIZE", batch_size)
+    return [record async for record in gateway._iter_batch_fallback(job_ids, limit)]
+
+
+@pytest.mark.asyncio
+async def test_each_requested_id_is_answered_under_that_id(monkeypatch):
+    db = await _database()
+    python_job = await db.jobs.find_one({"id": "legacy-1"})
+    java_job = await db.jobs.find_one({"title": "Java Developer"})
+    job_ids = ["legacy-1", str(python_job["_id"]), str(java_job["_id"]), "missing"]
+
+    records = await _collect(monkeypatch, db, job_ids)
+
+    assert sorted(r["job_id"] for r in records) == sorted(job_ids)
+    by_id = {r["job_id"]: r for r in records}
+    assert by_id["missing"]["error"] == "Job not found"
+    assert by_id["legacy-1"]["matches"] == by_id[str(python_job["_id"])]["matches"]
+    assert len(by_id["legacy-1"]["matches"]) == 5
+    assert all(r["candidates_scored"] == 25 for r in records if "error" not in r)
+
+
+@pytest.mark.asyncio
+async def test_a_job_requested_twice_is_scored_once_in_batches(monkeypatch):
+    db = await _database()
+    python_job = await db.jobs.find_one({"id": "legacy-1"})
+    batches = []
+    score_batch = gateway._score_fallback_batch
+
+    def recording(profiles, tops, docs, seq, limit):
+        batches.append((sorted(profiles), len(docs)))
+        return score_batch(profiles, tops, docs, seq, limit)
+
+    monkeypatch.setattr(gateway, "_score_fallback_batch", recording)
+    records = await _collect(monkeypatch, db, ["legacy-1", str(python_job["_id"])])
+
+    assert [size for _, size in batches] == [4, 4, 4, 4, 4, 4, 1]
+    assert all(profiles == [str(python_job["_id"])] for profiles, _ in batches)
+    assert len(records) == 2
+
+
+@pytest.mark.asyncio
+async def test_batched_scoring_keeps_the_single_pass_ranking(monkeypatch):
+    db = await _database()
+    java_job = await db.jobs.find_one({"title": "Java Developer"})
+    batched = await _collect(monkeypatch, db, [str(java_job["_id"])], limit=7, batch_size=3)
+    single = await _collect(monkeypatch, db, [str(java_job["_id"])], limit=7, batch_size=1000)
+    assert batched[0]["matches"] == single[0]["matches"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,195 @@
+"""
+Bulk Candidate Ingestion Tests
+Per-row results of unordered bulk writes, progress accounting and resuming
+background uploads after an interruption or a lost lease (mongomock, no server)
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("mongomock")
+
+GATEWAY_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'gateway')
+sys.path.insert(0, os.path.abspath(GATEWAY_DIR))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bson import ObjectId
+
+from app.bulk_ingest import BulkCandidateIngestor
+from fake_motor import FakeCollection, FakeDatabase
+
+
+def _rows(count, start=0):
+    return [{"name": f"Candidate {i}", "email": f"c{i}@example.org", "experience_years": str(i % 10)}
+            for i in range(start, start + count)]
+
+
+async def _database():
+    db = FakeDatabase()
+    await db.candidates.create_index("email", unique=True)
+    return db
+
+
+def _ingestor(batch_size=4):
+    ingestor = BulkCandidateIngestor()
+    ingestor.batch_size = batch_size
+    ingestor.lease_seconds = 60
+    return ingestor
+
+
+async def _drain(ingestor):
+    while ingestor._tasks:
+        await asyncio.gather(*list(ingestor._tasks.values()))
+
+
+class RacingCandidates(FakeCollection):
+    """Another writer inserts `emails` between the dedupe lookup and the bulk write"""
+
+    def __init__(self, collection, emails):
+        super().__init__(collection)
+        self.emails = list(emails)
+
+    async def bulk_write(self, requests, **kwargs):
+        for email in self.emails:
+            self._collection.insert_one({"email": email, "name": "Other writer"})
+        self.emails = []
+        return self._collection.bulk_write(requests, **kwargs)
+
+
+class FailingOnce(FakeCollection):
+    """Raises from the first call of `method` matching `when`, then behaves normally"""
+
+    def __init__(self, collection, method, when=lambda *args: True):
+        super().__init__(collection)
+        self.method, self.when, self.failed = method, when, False
+
+    def __getattr__(self, name):
+        call = super().__getattr__(name)
+        if name != self.method:
+            return call
+
+        async def failing(*args, **kwargs):
+            if not self.failed and self.when(*args):
+                self.failed = True
+                raise ConnectionError("connection reset")
+            return await call(*args, **kwargs)
+
+        return failing
+
+
+@pytest.mark.asyncio
+async def test_rows_get_one_result_each():
+    db = await _database()
+    await db.candidates.insert_one({"email": "c1@example.org", "name": "Existing"})
+    rows = _rows(4) + [{"name": "No email"}, {"name": "Repeat", "email": "c0@example.org"}]
+    ingestor = _ingestor(batch_size=100)
+    inserted = []
+    ingestor.on_inserted.append(inserted.append)
+
+    results = await ingestor.ingest(db, rows, None)
+
+    assert [r["row"] for r in results] == [1, 2, 3, 4, 5, 6]
+    assert [r["status"] for r in results] == ["inserted", "duplicate", "inserted", "inserted", "error", "duplicate"]
+    assert results[4]["error"] == "Candidate 5: Email is required"
+    assert results[5]["candidate_id"] == results[0]["candidate_id"]
+    assert sorted(d["email"] for d in inserted) == ["c0@example.org", "c2@example.org", "c3@example.org"]
+    assert await db.candidates.count_documents({}) == 4
+
+
+@pytest.mark.asyncio
+async def test_duplicate_key_from_a_racing_writer_is_reported_per_row():
+    db = await _database()
+    db._collections["candidates"] = RacingCandidates(db._db["candidates"], ["c1@example.org", "c3@example.org"])
+    job_id = str(ObjectId())
+
+    results = await _ingestor(batch_size=100).ingest(db, _rows(4), job_id)
+
+    assert [r["status"] for r in results] == ["inserted", "duplicate", "inserted", "duplicate"]
+    assert results[1]["error"] == "Candidate 2: Email c1@example.org already exists"
+    raced = await db.candidates.find_one({"email": "c3@example.org"})
+    assert results[3]["candidate_id"] == str(raced["_id"])
+    # Every row, new or raced, is linked to the job once
+    applications = await db.job_applications.find({"job_id": job_id}).to_list()
+    assert sorted(a["candidate_id"] for a in applications) == sorted(r["candidate_id"] for r in results)
+
+
+@pytest.mark.asyncio
+async def test_background_upload_reports_progress_and_rows():
+    db = await _database()
+    await db.candidates.insert_one({"email": "c5@example.org", "name": "Existing"})
+    rows = _rows(10)
+    rows[7] = {"name": "No email"}
+    ingestor = _ingestor()
+
+    upload_id = await ingestor.submit(db, rows, None, "recruiter-1")
+    await _drain(ingestor)
+    report = await ingestor.status(db, upload_id, include_rows=True)
+
+    assert report["status"] == "completed" and report["created_by"] == "recruiter-1"
+    assert report["candidates_received"] == 10 and report["processed_rows"] == 10 and report["progress"] == 1.0
+    assert report["candidates_inserted"] == 8 and report["duplicates"] == 1 and report["failed"] == 1
+    assert report["total_errors"] == 2
+    assert report["errors"] == ["Candidate 6: Email c5@example.org already exists", "Candidate 8: Email is required"]
+    assert [r["row"] for r in report["results"]] == list(range(1, 11))
+    assert await db.bulk_upload_chunks.count_documents({"rows": {"$exists": True}}) == 0
+
+
+@pytest.mark.asyncio
+async def test_interrupted_upload_resumes_without_duplicating_rows():
+    db = await _database()
+    # The second chunk's rows are written, then its progress update fails
+    db._collections["bulk_uploads"] = FailingOnce(
+        db._db["bulk_uploads"], "update_one", lambda query, *rest: query.get("next_chunk") == 1)
+    ingestor = _ingestor()
+
+    upload_id = await ingestor.submit(db, _rows(10), None, None)
+    await _drain(ingestor)
+    interrupted = await db.bulk_uploads.find_one({"_id": ObjectId(upload_id)})
+    assert interrupted["status"] == "running" and interrupted["next_chunk"] == 1
+    assert "connection reset" in interrupted["last_error"]
+    assert await db.candidates.count_documents({}) == 8
+
+    assert await ingestor.resume(db) == 1
+    await _drain(ingestor)
+    report = await ingestor.status(db, upload_id, include_rows=True)
+
+    # Rows 5-8 were already in the database; the resumed chunk recognises them as its own
+    assert report["status"] == "completed"
+    assert report["processed_rows"] == 10 and report["candidates_inserted"] == 10
+    assert report["duplicates"] == 0 and report["errors"] == []
+    assert [r["status"] for r in report["results"]] == ["inserted"] * 10
+    assert await db.candidates.count_documents({}) == 10
+
+
+@pytest.mark.asyncio
+async def test_upload_leased_elsewhere_waits_for_the_lease_to_expire():
+    db = await _database()
+    ingestor, other = _ingestor(), _ingestor()
+    other._start = lambda db, upload_id: None   # the other process crashes before doing any work
+
+    upload_id = await other.submit(db, _rows(6), None, None)
+    await db.bulk_uploads.update_one({"_id": ObjectId(upload_id)}, {"$set": {
+        "status": "running", "lease_owner": other._owner,
+        "lease_until": datetime.now(timezone.utc) + timedelta(seconds=60)}})
+
+    assert await ingestor.resume(db) == 0
+    ingestor._start(db, upload_id)
+    await _drain(ingestor)
+    assert (await ingestor.status(db, upload_id))["processed_rows"] == 0
+
+    await db.bulk_uploads.update_one({"_id": ObjectId(upload_id)}, {"$set": {
+        "lease_until": datetime.now(timezone.utc) - timedelta(seconds=1)}})
+    assert await ingestor.resume(db) == 1
+    await _drain(ingestor)
+    report = await ingestor.status(db, upload_id)
+    assert report["status"] == "completed" and report["candidates_inserted"] == 6
+    upload = await db.bulk_uploads.find_one({"_id": ObjectId(upload_id)})
+    assert upload["lease_owner"] is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
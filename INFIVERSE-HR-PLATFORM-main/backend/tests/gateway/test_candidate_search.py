@@ -0,0 +1,137 @@
+"""
+Candidate Search Index Tests
+The trigram/inverted index must return what the case-insensitive $regex scan does,
+including candidates written since the last build
+"""
+
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("mongomock")
+
+GATEWAY_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'gateway')
+sys.path.insert(0, os.path.abspath(GATEWAY_DIR))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bson import ObjectId
+
+from app.candidate_search import CandidateSearchIndex, candidate_record
+from benchmark_candidate_search import QUERIES, generate_candidates, naive_page
+from fake_motor import FakeDatabase
+
+
+def _index(docs, **settings):
+    index = CandidateSearchIndex()
+    index.sync_seconds = 0.0
+    for name, value in settings.items():
+        setattr(index, name, value)
+    index.build([candidate_record(d) for d in docs])
+    return index
+
+
+def _records(docs):
+    return sorted((candidate_record(d) for d in docs), key=lambda r: r['id'])
+
+
+@pytest.mark.parametrize("query", QUERIES + [{'text': 'go'}, {'location': 'mum'}, {'text': 'zzz-no-match'}])
+def test_pages_equal_the_regex_scan(query):
+    docs = generate_candidates(3000, seed=1)
+    index, records = _index(docs), _records(docs)
+
+    first = index.search(limit=50, **query)
+    expected, expected_total = naive_page(records, query, 50)
+    assert first['ids'] == expected
+    assert first['total'] == expected_total and first['total_estimated'] is False
+
+    # Keyset pages walk every match once, in _id order
+    cursor, seen = None, []
+    while True:
+        result = index.search(limit=50, after=cursor, **query)
+        assert result['ids'] == naive_page(records, query, 50, after=cursor)[0]
+        seen += result['ids']
+        cursor = result['next_cursor']
+        if cursor is None:
+            break
+    assert seen == naive_page(records, query, len(records))[0]
+
+
+def test_estimated_total_is_close_to_the_scan():
+    docs = generate_candidates(5000, seed=2)
+    index = _index(docs, exact_count_limit=100, count_sample=500)
+    query = {'skills': 'java'}
+    result = index.search(limit=20, **query)
+    _, expected_total = naive_page(_records(docs), query, 20)
+    assert result['total_estimated'] is True
+    assert abs(result['total'] - expected_total) <= 0.1 * expected_total
+
+
+def test_filters_scope_and_offset():
+    docs = generate_candidates(500, seed=3)
+    docs[0]['status'] = 'hired'
+    index = _index(docs)
+    scope = [str(d['_id']) for d in docs[:100]]
+
+    result = index.search(statuses=['hired'])
+    assert result['ids'] == [str(docs[0]['_id'])]
+    scoped = index.search(scope_ids=scope, experience_min=5, experience_max=9, limit=1000)
+    assert scoped['ids'] == sorted(str(d['_id']) for d in docs[:100] if 5 <= d['experience_years'] <= 9)
+    assert index.search(scope_ids=scope, limit=10, offset=10)['ids'] == sorted(scope)[10:20]
+
+
+def test_upsert_and_remove_overlay_the_snapshot():
+    docs = generate_candidates(200, seed=4)
+    index = _index(docs)
+    changed = dict(docs[5], technical_skills='cobol, fortran')
+    added = dict(docs[6], _id=ObjectId(), name='Zorawar New')
+    index.upsert(changed)
+    index.upsert(added)
+    index.remove(docs[7]['_id'])
+
+    assert index.search(skills='cobol')['ids'] == [str(docs[5]['_id'])]
+    assert index.search(text='zorawar')['ids'] == [str(added['_id'])]
+    assert str(docs[7]['_id']) not in index.search(limit=1000)['ids']
+    # The changed candidate no longer matches its old skills through the snapshot
+    old_skill = docs[5]['technical_skills'].split(', ')[0]
+    assert str(docs[5]['_id']) not in index.search(skills=old_skill, limit=1000)['ids']
+    assert index.get_stats()['overlay_candidates'] == 3
+
+
+@pytest.mark.asyncio
+async def test_writes_are_visible_on_the_next_search():
+    db = FakeDatabase()
+    docs = generate_candidates(300, seed=5)
+    await db.candidates.insert_many(docs)
+    index = CandidateSearchIndex()
+    index.sync_seconds = 0.0
+    await index.rebuild(db)
+    assert index.search(limit=1000)['total'] == 300
+
+    # Written through the gateway: noted, re-read by the next search
+    await db.candidates.update_one({'_id': docs[0]['_id']}, {'$set': {'name': 'Quillon Renamed'}})
+    index.note_write(docs[0]['_id'])
+    await db.candidates.delete_one({'_id': docs[1]['_id']})
+    index.note_write(docs[1]['_id'])
+    # Inserted by another service: picked up by _id
+    other = dict(docs[2], _id=ObjectId(), name='Quillon Other')
+    await db.candidates.insert_one(other)
+
+    assert await index.ensure_ready(db) is True
+    result = index.search(text='quillon')
+    assert result['ids'] == sorted([str(docs[0]['_id']), str(other['_id'])])
+    assert index.search(limit=1000)['total'] == 300
+    assert index.get_stats()['pending_writes'] == 0
+
+
+@pytest.mark.asyncio
+async def test_disabled_index_is_never_used():
+    index = CandidateSearchIndex()
+    index.enabled = False
+    assert await index.ensure_ready(FakeDatabase()) is False
+    assert index.ready is False
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
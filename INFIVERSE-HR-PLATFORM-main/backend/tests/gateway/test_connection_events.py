@@ -0,0 +1,122 @@
+"""
+Connection Event Broker Tests
+Replay after a reconnect pages forward through the SQLite log, a pruned gap is
+announced with a reset event, and live events are delivered once
+"""
+
+import os
+import sys
+
+import pytest
+
+GATEWAY_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'gateway')
+sys.path.insert(0, os.path.abspath(GATEWAY_DIR))
+
+from app.connection_events import ConnectionEventBroker
+
+RESET = {"event": "reset", "reason": "events_unavailable"}
+
+
+@pytest.fixture
+def make_broker(tmp_path):
+    brokers = []
+
+    def make(replay_limit=100, max_events=10000):
+        broker = ConnectionEventBroker()
+        broker.log_path = str(tmp_path / "events.db")
+        broker.replay_limit = replay_limit
+        broker.log_max_events = max_events
+        broker.poll_seconds = 60
+        brokers.append(broker)
+        return broker
+
+    yield make
+    for broker in brokers:
+        if broker._tail_task is not None:
+            broker._tail_task.cancel()
+
+
+async def _publish(broker, channel, count, start=0):
+    return [await broker.publish(channel, {"event": "connected", "n": i}) for i in range(start, start + count)]
+
+
+async def _drain(subscription):
+    items = []
+    while True:
+        item = await subscription.get(timeout=0.01)
+        if item is None:
+            return items
+        items.append(item)
+
+
+@pytest.mark.asyncio
+async def test_reconnect_replays_every_missed_event_in_pages(make_broker):
+    broker = make_broker(replay_limit=100)
+    offsets = await _publish(broker, "client:1", 250)
+    await _publish(broker, "client:2", 10)
+
+    subscription = await broker.subscribe("client:1", after=offsets[4])
+    items = await _drain(subscription)
+    subscription.close()
+
+    assert [offset for offset, _ in items] == offsets[5:]
+    assert [event["n"] for _, event in items] == list(range(5, 250))
+    assert broker.get_stats()["replayed"] == 245 and broker.get_stats()["resets"] == 0
+
+
+@pytest.mark.asyncio
+async def test_events_published_during_replay_are_delivered_once(make_broker):
+    broker = make_broker(replay_limit=10)
+    offsets = await _publish(broker, "client:1", 30)
+
+    subscription = await broker.subscribe("client:1", after=0)
+    first = [await subscription.get(timeout=0.01) for _ in range(15)]
+    offsets += await _publish(broker, "client:1", 5, start=30)
+    items = first + await _drain(subscription)
+    subscription.close()
+
+    assert [offset for offset, _ in items] == offsets
+    assert [event["n"] for _, event in items] == list(range(35))
+
+
+@pytest.mark.asyncio
+async def test_pruned_events_are_announced_with_a_reset(make_broker):
+    broker = make_broker(replay_limit=100, max_events=50)
+    offsets = await _publish(broker, "client:1", 200)
+
+    subscription = await broker.subscribe("client:1", after=offsets[9])
+    items = await _drain(subscription)
+    subscription.close()
+
+    first_kept = offsets.index(items[1][0])
+    assert first_kept > 10
+    assert items[0] == (offsets[first_kept] - 1, RESET)
+    assert [offset for offset, _ in items[1:]] == offsets[first_kept:]
+
+    # Reconnecting from the reset's id replays the rest without another reset
+    again = await broker.subscribe("client:1", after=items[0][0])
+    assert [offset for offset, _ in await _drain(again)] == offsets[first_kept:]
+    again.close()
+    assert broker.get_stats()["resets"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_replay_read_sends_a_reset(make_broker, monkeypatch):
+    broker = make_broker()
+    offsets = await _publish(broker, "client:1", 5)
+
+    def broken(*args):
+        raise OSError("database is locked")
+
+    monkeypatch.setattr(broker._log, "read_channel", broken)
+    subscription = await broker.subscribe("client:1", after=offsets[1])
+    items = await _drain(subscription)
+    subscription.close()
+
+    # The reset carries the client's own offset, so its next reconnect asks for the same events again
+    assert items == [(offsets[1], RESET)]
+    assert broker.get_stats()["log_errors"] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,143 @@
+"""
+Rate Limiter Tests
+GCRA budgets against an injected clock: bursts, refill, key eviction, Retry-After
+and falling back to local buckets when Redis is unavailable
+"""
+
+import os
+import sys
+
+import pytest
+
+GATEWAY_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'gateway')
+sys.path.insert(0, os.path.abspath(GATEWAY_DIR))
+
+from app.rate_limiter import RateLimitDecision, RateLimiter
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def _limiter(clock, max_keys=100):
+    limiter = RateLimiter(clock=clock)
+    limiter.redis_url = ""
+    limiter.max_keys = max_keys
+    return limiter
+
+
+@pytest.mark.asyncio
+async def test_burst_is_allowed_then_refused():
+    limiter = _limiter(FakeClock())
+    decisions = [await limiter.hit("ip:/v1/jobs", 6) for _ in range(7)]
+
+    assert [d.allowed for d in decisions] == [True] * 6 + [False]
+    assert [d.remaining for d in decisions[:6]] == [5, 4, 3, 2, 1, 0]
+    # 6 per minute: the next slot opens one emission interval (10s) after the first request
+    assert decisions[6].retry_after == pytest.approx(10.0)
+    assert limiter.get_stats()["allowed"] == 6 and limiter.get_stats()["limited"] == 1
+
+
+@pytest.mark.asyncio
+async def test_budget_refills_one_request_per_emission_interval():
+    clock = FakeClock()
+    limiter = _limiter(clock)
+    for _ in range(6):
+        await limiter.hit("key", 6)
+
+    clock.advance(9.999)
+    assert (await limiter.hit("key", 6)).allowed is False
+    clock.advance(0.001)
+    assert (await limiter.hit("key", 6)).allowed is True
+    assert (await limiter.hit("key", 6)).allowed is False
+
+    # A full window idle restores the whole burst, and no more
+    clock.advance(120)
+    assert [(await limiter.hit("key", 6)).allowed for _ in range(7)] == [True] * 6 + [False]
+
+
+@pytest.mark.asyncio
+async def test_refused_requests_do_not_spend_budget():
+    clock = FakeClock()
+    limiter = _limiter(clock)
+    for _ in range(12):
+        await limiter.hit("key", 6)
+    clock.advance(10)
+    assert (await limiter.hit("key", 6)).allowed is True
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_key_is_evicted():
+    limiter = _limiter(FakeClock(), max_keys=2)
+    for _ in range(3):
+        await limiter.hit("a", 3)
+    await limiter.hit("b", 3)
+    # Refused, but still seen: the limited client stays tracked and "b" goes first
+    assert (await limiter.hit("a", 3)).allowed is False
+    await limiter.hit("c", 3)
+
+    assert list(limiter._tat) == ["a", "c"]
+    assert (await limiter.hit("a", 3)).allowed is False
+    assert limiter.get_stats()["evicted_keys"] == 1
+    assert limiter.get_stats()["tracked_keys"] == 2
+
+
+@pytest.mark.asyncio
+async def test_evicted_key_starts_with_a_full_budget():
+    limiter = _limiter(FakeClock(), max_keys=1)
+    for _ in range(3):
+        await limiter.hit("a", 3)
+    await limiter.hit("b", 3)
+    assert "a" not in limiter._tat
+    assert [(await limiter.hit("a", 3)).allowed for _ in range(3)] == [True] * 3
+
+
+def test_retry_after_header_rounds_up_to_whole_seconds():
+    assert RateLimitDecision(False, 6, 0, 9.2).headers() == {
+        "X-RateLimit-Limit": "6", "X-RateLimit-Remaining": "0", "Retry-After": "10"}
+    assert RateLimitDecision(False, 6, 0, 0.01).headers()["Retry-After"] == "1"
+    assert "Retry-After" not in RateLimitDecision(True, 6, 4, 0.0).headers()
+
+
+@pytest.mark.asyncio
+async def test_redis_decision_is_used_and_failures_fall_back_locally():
+    clock = FakeClock()
+    limiter = _limiter(clock)
+    limiter.redis_url = "redis://example:6379"
+    limiter.redis_retry_seconds = 30
+    calls = []
+
+    async def script(keys, args):
+        calls.append((keys, args))
+        return [0, 0, 2500]
+
+    limiter._redis, limiter._redis_script = object(), script
+    decision = await limiter.hit("key", 6)
+    assert decision == RateLimitDecision(False, 6, 0, 2.5)
+    assert calls == [(["gateway:ratelimit:key"], [10000.0, 60000.0])]
+
+    async def broken(keys, args):
+        raise ConnectionError("redis down")
+
+    limiter._redis_script = broken
+    assert (await limiter.hit("key", 6)).allowed is True
+    assert limiter.get_stats()["backend"] == "local" and limiter.get_stats()["redis_errors"] == 1
+
+    # Redis is not retried until the back-off has passed
+    limiter._redis_script = script
+    await limiter.hit("key", 6)
+    assert len(calls) == 1
+    clock.advance(30)
+    await limiter.hit("key", 6)
+    assert len(calls) == 2 and limiter.get_stats()["backend"] == "redis"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
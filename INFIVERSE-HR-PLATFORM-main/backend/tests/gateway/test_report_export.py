@@ -0,0 +1,145 @@
+"""
+Job Report Export Tests
+Range header parsing, resuming a CSV export from its last checkpoint and giving up
+on an export that keeps failing (mongomock, files in a temporary directory)
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("mongomock")
+pytest.importorskip("motor")
+
+GATEWAY_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'gateway')
+sys.path.insert(0, os.path.abspath(GATEWAY_DIR))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bson import ObjectId
+
+from app.report_export import JobReportExporter, ReportExportError, parse_range
+from fake_motor import FakeDatabase
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("bytes=0-99", (0, 99)),
+    ("bytes=10-", (10, 999)),
+    ("bytes=990-5000", (990, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=0-1,5-9", None),
+    ("items=0-9", None),
+    ("bytes=a-b", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=1000-1200", "bytes=20-10", "bytes=-0"])
+def test_unsatisfiable_range_is_an_error(header):
+    with pytest.raises(ReportExportError, match="Range not satisfiable"):
+        parse_range(header, 1000)
+
+
+async def _database(applications=7):
+    db = FakeDatabase()
+    job_id = ObjectId()
+    await db.jobs.insert_one({"_id": job_id, "title": "Data Engineer", "department": "Data", "location": "Pune"})
+    for i in range(applications):
+        candidate = await db.candidates.insert_one({"name": f"Candidate {i}", "email": f"c{i}@example.org"})
+        await db.job_applications.insert_one({"job_id": str(job_id), "candidate_id": str(candidate.inserted_id),
+                                              "status": "applied"})
+    return db, str(job_id)
+
+
+def _exporter(tmp_path, monkeypatch, stored):
+    exporter = JobReportExporter()
+    exporter.directory = str(tmp_path)
+    exporter.batch_size = 2
+    exporter.max_attempts = 3
+
+    async def store(db, oid, path, filename, chunk_size=1 << 20):
+        with open(path, "rb") as f:
+            stored[str(oid)] = f.read()
+
+    monkeypatch.setattr(exporter, "_store", store)
+    return exporter
+
+
+async def _drain(exporter):
+    while exporter._tasks:
+        await asyncio.gather(*list(exporter._tasks.values()))
+
+
+async def _expected_csv(exporter, db, job_id):
+    job_doc = await exporter._find_job(db, job_id)
+    return b"".join([chunk async for chunk in exporter.stream_csv(db, job_id, job_doc)])
+
+
+@pytest.mark.asyncio
+async def test_interrupted_csv_export_resumes_from_its_checkpoint(tmp_path, monkeypatch):
+    db, job_id = await _database()
+    stored = {}
+    exporter = _exporter(tmp_path, monkeypatch, stored)
+    append = JobReportExporter._append
+    appends = []
+
+    def torn_append(path, data):
+        appends.append(data)
+        if len(appends) == 3:
+            # The second batch is half written when the process loses its storage
+            append(path, data[:len(data) // 2])
+            raise OSError("disk unavailable")
+        append(path, data)
+
+    monkeypatch.setattr(exporter, "_append", torn_append)
+    export_id = await exporter.submit(db, job_id, "csv", 7, "recruiter-1")
+    await _drain(exporter)
+
+    export = await db.report_exports.find_one({"_id": ObjectId(export_id)})
+    assert export["status"] == "running" and export["attempts"] == 1
+    assert export["rows_written"] == 2 and export["last_error"] == "disk unavailable"
+    assert os.path.getsize(exporter._path(export_id, "csv")) > export["bytes_written"]
+
+    assert await exporter.resume(db) == 1
+    await _drain(exporter)
+
+    report = await exporter.status(db, export_id)
+    assert report["status"] == "completed" and report["rows_written"] == 7 and report["attempts"] == 0
+    # The torn bytes were dropped and the second batch written once
+    expected = await _expected_csv(exporter, db, job_id)
+    assert stored[export_id] == expected
+    assert expected.count(b"\n") == 8
+    assert not os.path.exists(exporter._path(export_id, "csv"))
+
+
+@pytest.mark.asyncio
+async def test_export_failing_every_run_is_marked_failed(tmp_path, monkeypatch):
+    db, job_id = await _database()
+    exporter = _exporter(tmp_path, monkeypatch, {})
+
+    async def broken(*args, **kwargs):
+        raise RuntimeError("cursor killed")
+        yield
+
+    monkeypatch.setattr(exporter, "iter_batches", broken)
+    export_id = await exporter.submit(db, job_id, "csv", 7, None)
+    await _drain(exporter)
+    for _ in range(2):
+        assert await exporter.resume(db) == 1
+        await _drain(exporter)
+
+    report = await exporter.status(db, export_id)
+    assert report["status"] == "failed" and report["attempts"] == 3
+    assert report["error"] == "cursor killed"
+    assert await exporter.resume(db) == 0
+    # A new request starts a fresh export rather than reviving the failed one
+    assert await exporter.submit(db, job_id, "csv", 7, None) != export_id
+    await _drain(exporter)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
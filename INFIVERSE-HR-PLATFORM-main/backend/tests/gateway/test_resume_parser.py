@@ -0,0 +1,61 @@
+"""
+Resume Archive Expansion Tests
+Zip uploads are counted before any member is inflated and oversized members are never read
+"""
+
+import io
+import os
+import sys
+import zipfile
+
+import pytest
+
+GATEWAY_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'gateway')
+sys.path.insert(0, os.path.abspath(GATEWAY_DIR))
+
+from app.resume_parser import ResumeParseError, ResumeParser
+
+
+def _zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def _parser(max_batch_files=5, max_bytes=1024):
+    parser = ResumeParser()
+    parser.max_batch_files = max_batch_files
+    parser.max_bytes = max_bytes
+    return parser
+
+
+def test_parseable_members_are_read():
+    content = _zip([("a.pdf", b"%PDF-1.4"), ("notes/b.txt", b"Jane Doe"), ("c.docx", b"skip"), ("big.txt", b"x" * 4096)])
+    files = _parser().expand_archive(content, "resumes.zip")
+    # The oversized member is listed empty so it is reported as an error, not inflated
+    assert files == [("a.pdf", b"%PDF-1.4"), ("notes/b.txt", b"Jane Doe"), ("big.txt", b"")]
+
+
+def test_too_many_members_are_refused_before_reading(monkeypatch):
+    content = _zip([(f"{i}.txt", b"resume") for i in range(6)] + [("readme.md", b"ignored")])
+
+    def read(*args, **kwargs):
+        raise AssertionError("member inflated")
+
+    monkeypatch.setattr(zipfile.ZipFile, "read", read)
+    with pytest.raises(ResumeParseError, match="holds 6 files; at most 5 files per batch"):
+        _parser().expand_archive(content, "resumes.zip")
+    # Room left in the batch counts, not just the per-batch limit
+    with pytest.raises(ResumeParseError):
+        _parser(max_batch_files=10).expand_archive(content, "resumes.zip", max_files=3)
+
+
+def test_invalid_archive_is_a_parse_error():
+    with pytest.raises(ResumeParseError, match="not a valid zip archive"):
+        _parser().expand_archive(b"not a zip", "broken.zip")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
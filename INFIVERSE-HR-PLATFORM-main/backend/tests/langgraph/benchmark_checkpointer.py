@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Checkpointer Benchmark
+Measures MongoDBSaver checkpoint write and read latency and stored size against
+workflow state size, comparing the old JSON documents with binary delta checkpoints.
+Uses DATABASE_URL (or --mongodb-uri); falls back to in-memory mongomock when unset
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+
+LANGGRAPH_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'langgraph')
+sys.path.insert(0, os.path.abspath(LANGGRAPH_DIR))
+
+from bson import BSON
+from app.mongodb_checkpointer import MongoDBSaver
+
+def make_state(size_kb: int, step: int) -> dict:
+    """Workflow state: a large resume and matching context that stay fixed, small channels that change each step"""
+    return {
+        "resume_text": ("Senior engineer with Python, FastAPI and MongoDB experience. " * 17 * size_kb)[:size_kb * 1024],
+        "match_context": [{"candidate_id": i, "score": 80 + i % 20, "skills": ["python", "sql"]} for i in range(size_kb)],
+        "status": f"step-{step}",
+        "messages": [f"Notification {i} sent" for i in range(step + 1)],
+    }
+
+def make_checkpoint(size_kb: int, step: int) -> dict:
+    return {
+        "v": 1,
+        "ts": f"2024-01-01T00:{step // 60:02d}:{step % 60:02d}",
+        "id": f"checkpoint-{step}",
+        "channel_values": make_state(size_kb, step),
+        # Fixed channels keep version 1, the changing ones are bumped every step
+        "channel_versions": {"resume_text": 1, "match_context": 1, "status": step + 1, "messages": step + 1},
+        "versions_seen": {},
+    }
+
+def legacy_document(thread_id: str, checkpoint: dict) -> dict:
+    """Document as written before binary checkpoints (JSON strings of the full state every step)"""
+    return {
+        "thread_id": thread_id,
+        "thread_ts": checkpoint["ts"],
+        "checkpoint": {
+            "v": checkpoint["v"],
+            "ts": checkpoint["ts"],
+            "id": checkpoint["id"],
+            "channel_values": json.dumps(checkpoint["channel_values"]),
+            "channel_versions": json.dumps(checkpoint["channel_versions"]),
+            "versions_seen": json.dumps(checkpoint["versions_seen"]),
+        },
+        "metadata": {},
+        "parent_config": None,
+        "created_at": datetime.utcnow()
+    }
+
+def run(saver: MongoDBSaver, size_kb: int, steps: int, legacy: bool) -> dict:
+    collection = saver._db[saver._collection_name]
+    thread_id = f"bench-{'json' if legacy else 'binary'}-{size_kb}kb"
+    collection.delete_many({"thread_id": thread_id})
+
+    write_ms, stored = [], 0
+    config = {"configurable": {"thread_id": thread_id}}
+    for step in range(steps):
+        checkpoint = make_checkpoint(size_kb, step)
+        start = time.perf_counter()
+        if legacy:
+            doc = legacy_document(thread_id, checkpoint)
+            collection.update_one({"thread_id": thread_id, "thread_ts": doc["thread_ts"]}, {"$set": doc}, upsert=True)
+        else:
+            config = saver.put(config, checkpoint, {"step": step})
+        write_ms.append((time.perf_counter() - start) * 1000)
+
+    for doc in collection.find({"thread_id": thread_id}):
+        stored += len(BSON.encode(doc))
+
+    read_ms = []
+    for step in range(steps):
+        start = time.perf_counter()
+        saver.get_tuple({"configurable": {"thread_id": thread_id, "thread_ts": make_checkpoint(size_kb, step)["ts"]}})
+        read_ms.append((time.perf_counter() - start) * 1000)
+
+    collection.delete_many({"thread_id": thread_id})
+    return {
+        "write_ms": statistics.median(write_ms),
+        "read_ms": statistics.median(read_ms),
+        "stored_kb": stored / 1024 / steps
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MongoDBSaver checkpoint latency against state size")
+    parser.add_argument("--sizes", default="4,64,512,2048", help="Comma separated state sizes in KB")
+    parser.add_argument("--steps", type=int, default=30, help="Checkpoints written per thread")
+    parser.add_argument("--mongodb-uri", default=os.getenv("DATABASE_URL"), help="MongoDB to benchmark against")
+    parser.add_argument("--db-name", default="langgraph_checkpoint_benchmark", help="Database to write to")
+    args = parser.parse_args()
+
+    client = None
+    if not args.mongodb_uri:
+        import mongomock
+        client = mongomock.MongoClient()
+        print("DATABASE_URL not set: using in-memory mongomock (no network or disk time)")
+    saver = MongoDBSaver(mongodb_uri=args.mongodb_uri, db_name=args.db_name, client=client)
+
+    print(f"{'state':>8} | {'format':>6} | {'write ms':>9} | {'read ms':>8} | {'stored KB/checkpoint':>20}")
+    for size_kb in [int(s) for s in args.sizes.split(",")]:
+        for legacy in (True, False):
+            result = run(saver, size_kb, args.steps, legacy)
+            print(f"{size_kb:>6}KB | {'json' if legacy else 'binary':>6} | {result['write_ms']:>9.2f} | "
+                  f"{result['read_ms']:>8.2f} | {result['stored_kb']:>20.1f}")
+    print(f"Snapshot every {saver.snapshot_interval} checkpoints; compression ratio {saver.get_stats()['compression_ratio']}")
+    saver.close()
+
+if __name__ == "__main__":
+    main()
@@ -121,6 +121,22 @@ LEVEL_THRESHOLDS = {
     "guru": 500
 }
 
+# Scheduled decay/expiry sweeps (see utils/decay_engine.py); decay is retroactive
+# from last_decay, or created_at for users that have never been swept
+DECAY_SWEEP_ENABLED = os.getenv("DECAY_SWEEP_ENABLED", "true").lower() == "true"
+DECAY_SWEEP_INTERVAL_SECONDS = int(os.getenv("DECAY_SWEEP_INTERVAL_SECONDS", "3600"))
+DECAY_SWEEP_CHUNK_SIZE = int(os.getenv("DECAY_SWEEP_CHUNK_SIZE", "1000"))
+
+# Materialized statistics reconciliation
+STATS_RECONCILE_ENABLED = os.getenv("STATS_RECONCILE_ENABLED", "true").lower() == "true"
+STATS_RECONCILE_INTERVAL_SECONDS = int(os.getenv("STATS_RECONCILE_INTERVAL_SECONDS", "21600"))
+
+# Event-sourced balance ledger
+BALANCE_SNAPSHOT_INTERVAL = int(os.getenv("BALANCE_SNAPSHOT_INTERVAL", "100"))
+BALANCE_EVENT_RETENTION_DAYS = int(os.getenv("BALANCE_EVENT_RETENTION_DAYS", "365"))
+BALANCE_COMPACTION_ENABLED = os.getenv("BALANCE_COMPACTION_ENABLED", "true").lower() == "true"
+BALANCE_COMPACTION_INTERVAL_SECONDS = int(os.getenv("BALANCE_COMPACTION_INTERVAL_SECONDS", "86400"))
+
 # Q-learning hyperparameters
 ALPHA = float(os.getenv("ALPHA", "0.15"))
 GAMMA = float(os.getenv("GAMMA", "0.9"))
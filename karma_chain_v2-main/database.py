@@ -80,6 +80,18 @@ def karma_events_col():
 def rnanubandhan_col():
     return _get_collection("rnanubandhan_relationships")
 
+@property
+def karma_stats_col():
+    return _get_collection("karma_stats")
+
+@property
+def balance_events_col():
+    return _get_collection("balance_events")
+
+@property
+def balance_snapshots_col():
+    return _get_collection("balance_snapshots")
+
 # Fallback for direct access (backwards compatibility)
 try:
     db = get_db()
@@ -92,6 +104,9 @@ try:
         death_events_col = db["death_events"]
         karma_events_col = db["karma_events"]
         rnanubandhan_col = db["rnanubandhan_relationships"]
+        karma_stats_col = db["karma_stats"]
+        balance_events_col = db["balance_events"]
+        balance_snapshots_col = db["balance_snapshots"]
     else:
         # Create mock collections that return empty results
         class MockCollection:
@@ -110,6 +125,9 @@ try:
         death_events_col = MockCollection()
         karma_events_col = MockCollection()
         rnanubandhan_col = MockCollection()
+        karma_stats_col = MockCollection()
+        balance_events_col = MockCollection()
+        balance_snapshots_col = MockCollection()
 except Exception as e:
     logger.warning(f"Database initialization failed: {e}")
     # Create mock collections
@@ -129,6 +147,9 @@ except Exception as e:
     death_events_col = MockCollection()
     karma_events_col = MockCollection()
     rnanubandhan_col = MockCollection()
+    karma_stats_col = MockCollection()
+    balance_events_col = MockCollection()
+    balance_snapshots_col = MockCollection()
 
 def close_client():
     global _client, _db
@@ -16,6 +16,10 @@ from routes.analytics import router as analytics_router  # Karmic Analytics rout
 from routes.v1.karma.lifecycle import router as lifecycle_router  # Karma Lifecycle Engine router
 # from routes import user, admin  # These modules don't exist yet
 from database import close_client
+from utils.prediction_service import prediction_service
+from utils.decay_engine import start_decay_scheduler, stop_decay_scheduler
+from utils.karma_stats import start_stats_reconcile_scheduler, stop_stats_reconcile_scheduler
+from utils.balance_ledger import balance_ledger, start_balance_compaction_scheduler, stop_balance_compaction_scheduler
 import os
 
 @asynccontextmanager
@@ -23,8 +27,26 @@ async def lifespan(app: FastAPI):
     # Startup
     # Create analytics exports directory if it doesn't exist
     os.makedirs("./analytics_exports", exist_ok=True)
+    # Load the current Q-table for batched Agami scoring
+    try:
+        prediction_service.refresh_q_table()
+    except Exception:
+        pass
+    try:
+        balance_ledger.ensure_indexes()
+    except Exception:
+        pass
+    # Token decay and expiry run as scheduled sweeps instead of per request
+    start_decay_scheduler()
+    # Materialized stats counters are reconciled against the ledger periodically
+    start_stats_reconcile_scheduler()
+    # Balance history is compacted behind the retention window
+    start_balance_compaction_scheduler()
     yield
     # Shutdown
+    stop_decay_scheduler()
+    stop_stats_reconcile_scheduler()
+    stop_balance_compaction_scheduler()
     try:
         close_client()
     except Exception:
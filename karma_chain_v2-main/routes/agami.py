@@ -6,8 +6,9 @@ This module provides API endpoints for Agami (future karma) prediction.
 
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from utils.agami_predictor import agami_predictor
+from utils.prediction_service import prediction_service
 from validation_middleware import validation_dependency
 
 router = APIRouter()
@@ -17,6 +18,10 @@ class AgamiPredictionRequest(BaseModel):
     user_id: str
     scenario: Optional[Dict[str, Any]] = None
 
+class BatchPredictionRequest(BaseModel):
+    """Request model for batched Agami scoring"""
+    user_ids: List[str]
+
 class ContextWeightsRequest(BaseModel):
     """Request model for updating context weights"""
     context_key: str
@@ -59,7 +64,7 @@ async def get_agami_prediction(user_id: str, _: bool = Depends(validation_depend
         dict: Agami karma prediction
     """
     try:
-        prediction = agami_predictor.predict_agami_karma(user_id=user_id)
+        prediction = prediction_service.get_prediction(user_id)
         return {
             "status": "success",
             "user_id": user_id,
@@ -70,6 +75,49 @@ async def get_agami_prediction(user_id: str, _: bool = Depends(validation_depend
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting Agami prediction: {str(e)}")
 
+@router.post("/api/v1/agami/batch")
+async def batch_agami_scores(request: BatchPredictionRequest, _: bool = Depends(validation_dependency)):
+    """
+    Score many users at once from the prediction service feature store.
+    
+    Users that are not yet in the feature store are loaded from the database first.
+    
+    Args:
+        request (BatchPredictionRequest): Users to score
+        
+    Returns:
+        dict: Score summaries per user
+    """
+    try:
+        missing = [uid for uid in request.user_ids if not prediction_service.has_user(uid)]
+        if missing:
+            from database import users_col
+            prediction_service.load_users(users_col.find(
+                {"user_id": {"$in": missing}}, {"user_id": 1, "role": 1, "balances": 1}
+            ))
+        not_found = [uid for uid in request.user_ids if not prediction_service.has_user(uid)]
+        user_ids = [uid for uid in request.user_ids if prediction_service.has_user(uid)]
+        return {
+            "status": "success",
+            "scores": prediction_service.score_batch(user_ids) if user_ids else [],
+            "not_found": not_found
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error scoring users: {str(e)}")
+
+@router.get("/api/v1/agami/service-stats")
+async def get_prediction_service_stats(_: bool = Depends(validation_dependency)):
+    """
+    Get prediction service feature store and cache statistics.
+    
+    Returns:
+        dict: Service statistics
+    """
+    return {
+        "status": "success",
+        "stats": prediction_service.get_stats()
+    }
+
 @router.post("/api/v1/agami/context-weights")
 async def update_context_weights(request: ContextWeightsRequest, _: bool = Depends(validation_dependency)):
     """
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException
 from database import users_col
-from utils.tokens import apply_decay_and_expiry
+from utils.decay_engine import lazy_decay
 from utils.merit import compute_user_merit_score
 from config import TOKEN_ATTRIBUTES
 
@@ -11,7 +11,7 @@ def view_balance(user_id: str):
     user = users_col.find_one({"user_id": user_id})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    user = apply_decay_and_expiry(user)
+    user = lazy_decay(user)
     merit_score = compute_user_merit_score(user)
     return {
         "user_id": user_id,
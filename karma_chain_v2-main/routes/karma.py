@@ -4,7 +4,7 @@ from typing import Optional, Dict, Any, List
 from datetime import datetime, timezone
 import uuid
 from database import users_col, transactions_col, karma_events_col
-from utils.tokens import apply_decay_and_expiry
+from utils.decay_engine import lazy_decay
 from utils.merit import compute_user_merit_score, determine_role_from_merit
 from utils.paap import get_total_paap_score, apply_paap_tokens, classify_paap_action
 from utils.loka import calculate_net_karma
@@ -13,6 +13,8 @@ from utils.karma_schema import calculate_weighted_karma_score
 from utils.karma_engine import evaluate_action_karma, determine_corrective_guidance
 from utils.qlearning import q_learning_step, atonement_q_learning_step
 from utils.utils_user import create_user_if_missing
+from utils.karma_stats import record_transaction
+from utils.balance_ledger import apply_balance_change, get_balance_at, balance_ledger
 from validation_middleware import validation_dependency, validation_middleware
 from config import TOKEN_ATTRIBUTES, ACTIONS, REWARD_MAP, INTENT_MAP, ATONEMENT_REWARDS
 import logging
@@ -129,8 +131,8 @@ async def get_karma_profile(user_id: str, _: bool = Depends(validation_dependenc
                 last_updated=datetime.now(timezone.utc)
             )
         
-        # Apply decay and expiry
-        user = apply_decay_and_expiry(user)
+        # Decay and expiry in closed form (materialized by scheduled sweeps)
+        user = lazy_decay(user)
         
         # Calculate various karma scores
         merit_score = compute_user_merit_score(user)
@@ -272,8 +274,8 @@ async def log_action(req: LogActionRequest, _: bool = Depends(validation_depende
         if not user:
             user = create_user_if_missing(req.user_id, req.role or "learner")
         
-        # Apply decay/expiry
-        user = apply_decay_and_expiry(user)
+        # Decay/expiry in closed form; sweeps persist it outside the request path
+        user = lazy_decay(user)
         
         # Evaluate karmic impact using the karma engine
         karma_evaluation = evaluate_action_karma(user, req.action, req.intensity or 1.0)
@@ -334,9 +336,6 @@ async def log_action(req: LogActionRequest, _: bool = Depends(validation_depende
                 # Store the updated balances for authorization
                 changes_to_authorize["updated_balances"] = user["balances"]
         
-        # Update Sanchita/Prarabdha/Rnanubandhan if applicable
-        _update_advanced_karma_types(req.user_id, karma_evaluation)
-        
         # Recompute merit & role
         user_after = user
         merit_score = compute_user_merit_score(user_after)
@@ -378,29 +377,26 @@ async def log_action(req: LogActionRequest, _: bool = Depends(validation_depende
                 transaction_id=str(uuid.uuid4())
             )
         
-        # Apply the authorized changes
+        # Apply the authorized changes as a single ledger event
+        balance_deltas = {}
         if req.action in REWARD_MAP:
             token = REWARD_MAP[req.action]["token"]
             # Apply the reward
-            users_col.update_one(
-                {"user_id": req.user_id},
-                {"$inc": {f"balances.{token}": reward_value}}
-            )
+            balance_deltas[token] = reward_value
         
         if paap_generated and paap_severity:
-            # Update database with Paap changes
-            users_col.update_one(
-                {"user_id": req.user_id},
-                {"$set": {"balances": user["balances"]}}
-            )
+            # Paap changes are increments too, so stored balances keep their
+            # undecayed values until the next sweep
+            balance_deltas[f"PaapTokens.{paap_severity}"] = paap_value
+        
+        # The role change is applied in the same update
+        apply_balance_change(req.user_id, balance_deltas, "log_action", ref=event_id,
+                             fields={"role": new_role})
         
         # Apply advanced karma type updates if any
         # (These are handled separately by _update_advanced_karma_types which should also be authorized)
         _update_advanced_karma_types(req.user_id, karma_evaluation)
         
-        # Apply role change if authorized
-        users_col.update_one({"user_id": req.user_id}, {"$set": {"role": new_role}})
-        
         # Log transaction
         transaction_id = str(uuid.uuid4())
         intent = INTENT_MAP.get(req.action, "unknown")
@@ -417,6 +413,7 @@ async def log_action(req: LogActionRequest, _: bool = Depends(validation_depende
             "context": req.context,
             "metadata": req.metadata
         })
+        record_transaction(req.user_id)
         
         # Generate corrective recommendations
         corrective_recommendations = karma_evaluation["corrective_recommendations"]
@@ -537,8 +534,8 @@ async def submit_atonement(req: AtonementSubmissionRequest, _: bool = Depends(va
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        # Apply decay/expiry
-        user = apply_decay_and_expiry(user)
+        # Decay/expiry in closed form; sweeps persist it outside the request path
+        user = lazy_decay(user)
         
         # Get the severity class from the atonement plan
         severity_class = "minor"
@@ -598,6 +595,7 @@ async def submit_atonement(req: AtonementSubmissionRequest, _: bool = Depends(va
             )
         
         # Apply authorized changes
+        balance_deltas = {}
         if severity_class in ATONEMENT_REWARDS:
             reward_info = ATONEMENT_REWARDS[severity_class]
             paap_reduction = abs(reward_info["value"])
@@ -606,13 +604,11 @@ async def submit_atonement(req: AtonementSubmissionRequest, _: bool = Depends(va
             token = reward_info["token"]
             if token.startswith("PaapTokens."):
                 paap_severity = token.split(".")[1]
-                users_col.update_one(
-                    {"user_id": req.user_id},
-                    {"$inc": {f"balances.PaapTokens.{paap_severity}": -paap_reduction}}
-                )
+                balance_deltas[f"PaapTokens.{paap_severity}"] = -paap_reduction
         
-        # Apply role change if authorized
-        users_col.update_one({"user_id": req.user_id}, {"$set": {"role": new_role}})
+        # Apply the Paap reduction and role change if authorized
+        apply_balance_change(req.user_id, balance_deltas, "atonement", ref=req.plan_id,
+                             fields={"role": new_role})
         
         # Log transaction
         transaction_id = str(uuid.uuid4())
@@ -631,6 +627,7 @@ async def submit_atonement(req: AtonementSubmissionRequest, _: bool = Depends(va
                 "amount": req.amount
             }
         })
+        record_transaction(req.user_id)
         
         # Calculate karma adjustment
         karma_adjustment = reward_value  # Positive reward for completing atonement
@@ -704,6 +701,42 @@ async def submit_atonement(req: AtonementSubmissionRequest, _: bool = Depends(va
         logger.error(f"{'Database error' if 'pymongo' in type(e).__module__ else 'Error'} submitting atonement for user {req.user_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=msg)
 
+@router.get("/karma/{user_id}/balances/at")
+async def get_balance_at_time(user_id: str, at: Optional[datetime] = None, _: bool = Depends(validation_dependency)):
+    """
+    Get a user's balances at a point in time.
+
+    Args:
+        user_id (str): The ID of the user
+        at (datetime, optional): Point in time, defaults to now
+
+    Returns:
+        dict: Balances rebuilt from the nearest snapshot plus the event tail
+    """
+    result = get_balance_at(user_id, at)
+    if not result:
+        raise HTTPException(status_code=404, detail="No balance history for user at the requested time")
+    return result
+
+@router.get("/karma/{user_id}/balances/replay")
+async def replay_balance_history(user_id: str, since: datetime, until: Optional[datetime] = None,
+                                 _: bool = Depends(validation_dependency)):
+    """
+    Replay a user's balance changes over an audit window.
+
+    Args:
+        user_id (str): The ID of the user
+        since (datetime): Start of the audit window
+        until (datetime, optional): End of the audit window, defaults to now
+
+    Returns:
+        dict: Opening balances and every change in the window with running balances
+    """
+    result = balance_ledger.replay(user_id, since, until)
+    if not result:
+        raise HTTPException(status_code=404, detail="No balance history for user at the requested time")
+    return result
+
 def _update_advanced_karma_types(user_id: str, karma_evaluation: Dict[str, Any]):
     """
     Update advanced karma types (Sanchita, Prarabdha, Rnanubandhan) based on evaluation.
@@ -712,20 +745,17 @@ def _update_advanced_karma_types(user_id: str, karma_evaluation: Dict[str, Any])
     updates = {}
     
     if karma_evaluation["sanchita_change"] != 0:
-        updates["balances.SanchitaKarma"] = karma_evaluation["sanchita_change"]
+        updates["SanchitaKarma"] = karma_evaluation["sanchita_change"]
         
     if karma_evaluation["prarabdha_change"] != 0:
-        updates["balances.PrarabdhaKarma"] = karma_evaluation["prarabdha_change"]
+        updates["PrarabdhaKarma"] = karma_evaluation["prarabdha_change"]
         
     if karma_evaluation["rnanubandhan_change"] != 0:
         # This is simplified - you would need to determine the severity class
-        updates["balances.Rnanubandhan.minor"] = karma_evaluation["rnanubandhan_change"]
+        updates["Rnanubandhan.minor"] = karma_evaluation["rnanubandhan_change"]
     
     if updates:
-        users_col.update_one(
-            {"user_id": user_id},
-            {"$inc": updates}
-        )
+        apply_balance_change(user_id, updates, "advanced_karma")
 
 # Module score calculation functions
 def _calculate_finance_score(user: Dict) -> float:
@@ -2,6 +2,8 @@ from fastapi import APIRouter, HTTPException
 from models import RedeemRequest
 from database import users_col, transactions_col
 from utils.tokens import apply_decay_and_expiry, now_utc
+from utils.karma_stats import record_transaction
+from utils.balance_ledger import apply_balance_change
 from config import TOKEN_ATTRIBUTES
 
 router = APIRouter()
@@ -16,7 +18,7 @@ def redeem(req: RedeemRequest):
     user = apply_decay_and_expiry(user)
     bal = user["balances"].get(req.token_type, 0.0)
     if bal >= req.amount and req.amount > 0:
-        users_col.update_one({"user_id": req.user_id}, {"$inc": {f"balances.{req.token_type}": -float(req.amount)}})
+        apply_balance_change(req.user_id, {req.token_type: -float(req.amount)}, "redeem")
         transactions_col.insert_one({
             "user_id": req.user_id,
             "action": "redeem",
@@ -24,6 +26,7 @@ def redeem(req: RedeemRequest):
             "amount": float(req.amount),
             "timestamp": now_utc()
         })
+        record_transaction(req.user_id)
         return {"message": f"Redeemed {req.amount} {req.token_type}", "remaining": bal - req.amount}
     else:
         raise HTTPException(status_code=400, detail="Insufficient balance or invalid amount")
@@ -220,6 +220,7 @@ async def simulate_lifecycle_cycles(request: SimulateCycleRequest):
         # Import required modules for simulation
         from utils.karma_lifecycle import KarmaLifecycleEngine
         from database import users_col
+        from utils.karma_stats import record_user_created
         import random
         import time
         
@@ -255,6 +256,7 @@ async def simulate_lifecycle_cycles(request: SimulateCycleRequest):
                 "created_at": datetime.now(timezone.utc)
             }
             users_col.insert_one(initial_user)
+            record_user_created()
             initial_users.append(user_id)
         
         # Track simulation statistics
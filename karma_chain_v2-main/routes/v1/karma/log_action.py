@@ -2,7 +2,8 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
 from database import users_col
-from utils.tokens import apply_decay_and_expiry, now_utc
+from utils.tokens import now_utc
+from utils.decay_engine import lazy_decay
 from utils.merit import compute_user_merit_score, determine_role_from_merit
 from utils.transactions import log_transaction
 from utils.qlearning import q_learning_step
@@ -10,6 +11,8 @@ from utils.utils_user import create_user_if_missing
 from utils.paap import classify_paap_action, apply_paap_tokens
 from utils.atonement import create_atonement_plan
 from utils.rnanubandhan import rnanubandhan_manager  # Import Rnanubandhan manager
+from utils.prediction_service import notify_karma_event
+from utils.balance_ledger import apply_balance_change
 from config import ROLE_SEQUENCE, ACTIONS, INTENT_MAP, REWARD_MAP, CHEAT_PUNISHMENT_LEVELS, CHEAT_PUNISHMENT_RESET_DAYS
 from datetime import timedelta, timezone
 import logging
@@ -58,8 +61,8 @@ def log_action(req: LogActionRequest):
                 "database_status": "unavailable"
             }
 
-        # Apply decay/expiry
-        user = apply_decay_and_expiry(user)
+        # Decay/expiry is applied by scheduled sweeps (utils/decay_engine.py),
+        # not on the action logging path
 
         # Handle cheat action with progressive punishment
         if req.action == "cheat":
@@ -96,19 +99,19 @@ def log_action(req: LogActionRequest):
             )
             
             # Update user's balances and cheat history
-            users_col.update_one(
-                {"user_id": req.user_id},
-                {
-                    "$inc": {f"balances.{token}": reward_value},
-                    "$set": {"cheat_history": recent_cheats}
-                }
+            apply_balance_change(
+                req.user_id,
+                {token: reward_value},
+                "log_action",
+                fields={"cheat_history": recent_cheats}
             )
             
             # Recompute merit & role
-            user_after = users_col.find_one({"user_id": req.user_id})
+            user_after = lazy_decay(users_col.find_one({"user_id": req.user_id}))
             merit_score = compute_user_merit_score(user_after)
             new_role = determine_role_from_merit(merit_score)
             users_col.update_one({"user_id": req.user_id}, {"$set": {"role": new_role}})
+            notify_karma_event(req.user_id, {**user_after, "role": new_role})
             
             # Log transaction
             try:
@@ -164,12 +167,9 @@ def log_action(req: LogActionRequest):
                 req.user_id, req.role, req.action, REWARD_MAP[req.action]["value"]
             )
         
-            # Update token balances
+            # Token reward and any Paap are applied as a single ledger event
             token = REWARD_MAP[req.action]["token"]
-            users_col.update_one(
-                {"user_id": req.user_id},
-                {"$inc": {f"balances.{token}": reward_value}}
-            )
+            balance_deltas = {token: reward_value}
             
             # Apply Paap tokens if applicable
             paap_applied = False
@@ -178,21 +178,22 @@ def log_action(req: LogActionRequest):
                 user, severity, paap_value = apply_paap_tokens(user, req.action, 1.0)
                 paap_applied = True
                 
-                # Update database
-                users_col.update_one(
-                    {"user_id": req.user_id},
-                    {"$set": {"balances": user["balances"]}}
-                )
+                # Increment only, so the stored balances keep their undecayed
+                # values until the next sweep
+                balance_deltas[f"PaapTokens.{severity}"] = paap_value
                 
                 # Create an appeal stub if requested
                 if req.note and "auto_appeal" in req.note.lower():
                     create_atonement_plan(req.user_id, req.action, paap_severity)
+            
+            apply_balance_change(req.user_id, balance_deltas, "log_action")
         
             # Recompute merit & role
-            user_after = users_col.find_one({"user_id": req.user_id})
+            user_after = lazy_decay(users_col.find_one({"user_id": req.user_id}))
             merit_score = compute_user_merit_score(user_after)
             new_role = determine_role_from_merit(merit_score)
             users_col.update_one({"user_id": req.user_id}, {"$set": {"role": new_role}})
+            notify_karma_event(req.user_id, {**user_after, "role": new_role})
         
             # Log transaction
             reward_tier = "high" if token == "PunyaTokens" else "medium" if token == "SevaPoints" else "low"
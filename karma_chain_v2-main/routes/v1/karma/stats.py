@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException
-from database import users_col, transactions_col, atonements_col
-from utils.tokens import apply_decay_and_expiry
+from utils.karma_stats import karma_stats
+from utils.decay_engine import lazy_decay
 from utils.merit import compute_user_merit_score
 from utils.paap import get_total_paap_score
 from utils.loka import calculate_net_karma
@@ -13,26 +13,15 @@ async def get_user_stats(user_id: str):
     """
     Get comprehensive karma statistics for a user.
     """
-    user = users_col.find_one({"user_id": user_id})
+    user, action_stats = karma_stats.get_user_stats(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    user = apply_decay_and_expiry(user)
+    user = lazy_decay(user)
     merit_score = compute_user_merit_score(user)
     paap_score = get_total_paap_score(user)
     net_karma = calculate_net_karma(user)
     
-    # Get action statistics
-    total_actions = transactions_col.count_documents({"user_id": user_id})
-    pending_atonements = atonements_col.count_documents({
-        "user_id": user_id, 
-        "status": "pending"
-    })
-    completed_atonements = atonements_col.count_documents({
-        "user_id": user_id, 
-        "status": "completed"
-    })
-    
     return {
         "status": "success",
         "user_id": user_id,
@@ -41,11 +30,7 @@ async def get_user_stats(user_id: str):
         "paap_score": paap_score,
         "net_karma": net_karma,
         "balances": user.get("balances", {}),
-        "action_stats": {
-            "total_actions": total_actions,
-            "pending_atonements": pending_atonements,
-            "completed_atonements": completed_atonements
-        },
+        "action_stats": action_stats,
         "token_attributes": TOKEN_ATTRIBUTES
     }
 
@@ -54,15 +39,7 @@ async def get_system_stats():
     """
     Get system-wide karma statistics.
     """
-    total_users = users_col.count_documents({})
-    total_actions = transactions_col.count_documents({})
-    total_atonements = atonements_col.count_documents({})
-    
     return {
         "status": "success",
-        "system_stats": {
-            "total_users": total_users,
-            "total_actions": total_actions,
-            "total_atonements": total_atonements
-        }
-    }
\ No newline at end of file
+        "system_stats": karma_stats.get_system_stats()
+    }
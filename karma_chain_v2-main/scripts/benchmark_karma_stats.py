@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark for materialized karma statistics.
+
+Seeds a ledger of users, transactions and atonements at increasing sizes and
+compares the previous count_documents based stats queries against reads from
+the materialized counters. Materialized reads should stay flat as the ledger
+grows while counting grows with it.
+
+Large sizes (up to 10M transactions) need a real MongoDB via MONGO_URI; without
+it the benchmark falls back to mongomock and is limited to small sizes.
+
+Usage:
+    MONGO_URI=mongodb://localhost:27017 python scripts/benchmark_karma_stats.py \\
+        [--sizes 10000,100000,1000000,10000000] [--users 10000] [--reads 200]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.karma_stats import KarmaStatsEngine
+
+MOCK_MAX_TRANSACTIONS = 100000
+INSERT_BATCH = 10000
+
+
+def get_database():
+    """Get a scratch database on MONGO_URI, or mongomock when unset"""
+    uri = os.getenv("MONGO_URI")
+    if uri:
+        from pymongo import MongoClient
+        client = MongoClient(uri, tz_aware=True)
+        client.drop_database("karma_stats_benchmark")
+        return client["karma_stats_benchmark"], False
+    import mongomock
+    return mongomock.MongoClient(tz_aware=True)["karma_stats_benchmark"], True
+
+
+def seed(db, n_users: int, n_transactions: int, seed_value: int = 42):
+    """Grow the ledger to n_transactions, one atonement per 20 transactions"""
+    rng = random.Random(seed_value + n_transactions)
+    if db.users.estimated_document_count() == 0:
+        db.users.insert_many([{"user_id": f"bench_user_{i:06d}", "role": "learner"} for i in range(n_users)])
+        db.users.create_index("user_id")
+        db.transactions.create_index("user_id")
+        db.atonements.create_index([("user_id", 1), ("status", 1)])
+
+    missing = n_transactions - db.transactions.estimated_document_count()
+    while missing > 0:
+        batch = min(INSERT_BATCH, missing)
+        db.transactions.insert_many([
+            {"user_id": f"bench_user_{rng.randrange(n_users):06d}", "action": "help"} for _ in range(batch)
+        ])
+        db.atonements.insert_many([
+            {"user_id": f"bench_user_{rng.randrange(n_users):06d}", "status": rng.choice(["pending", "completed"])}
+            for _ in range(max(1, batch // 20))
+        ])
+        missing -= batch
+
+
+def time_reads(func, user_ids, reads: int):
+    """Median latency in milliseconds over a number of reads"""
+    samples = []
+    for i in range(reads):
+        start = time.perf_counter()
+        func(user_ids[i % len(user_ids)])
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def run_benchmark(sizes, n_users: int, reads: int):
+    db, is_mock = get_database()
+    engine = KarmaStatsEngine(users=db.users, transactions=db.transactions,
+                              atonements=db.atonements, stats=db.karma_stats)
+    user_ids = [f"bench_user_{i:06d}" for i in range(n_users)]
+
+    def counted_user(user_id):
+        db.users.find_one({"user_id": user_id})
+        db.transactions.count_documents({"user_id": user_id})
+        db.atonements.count_documents({"user_id": user_id, "status": "pending"})
+        db.atonements.count_documents({"user_id": user_id, "status": "completed"})
+
+    def counted_system(_):
+        db.users.count_documents({})
+        db.transactions.count_documents({})
+        db.atonements.count_documents({})
+
+    results = {"backend": "mongomock" if is_mock else "mongodb", "users": n_users, "runs": []}
+    for size in sizes:
+        if is_mock and size > MOCK_MAX_TRANSACTIONS:
+            print(f"Skipping {size} transactions: set MONGO_URI for sizes above {MOCK_MAX_TRANSACTIONS}",
+                  file=sys.stderr)
+            continue
+        seed(db, n_users, size)
+        reconcile = engine.reconcile()
+        results["runs"].append({
+            "transactions": size,
+            "reconcile_s": reconcile["duration_ms"] / 1000,
+            "user_counted_ms": time_reads(counted_user, user_ids, reads),
+            "user_materialized_ms": time_reads(engine.get_user_stats, user_ids, reads),
+            "system_counted_ms": time_reads(counted_system, user_ids, max(1, reads // 10)),
+            "system_materialized_ms": time_reads(lambda _: engine.get_system_stats(), user_ids, reads),
+        })
+        print(json.dumps(results["runs"][-1]), file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark materialized karma statistics")
+    parser.add_argument("--sizes", default="10000,100000,1000000,10000000",
+                        help="Comma-separated transaction counts")
+    parser.add_argument("--users", type=int, default=10000, help="Number of users")
+    parser.add_argument("--reads", type=int, default=200, help="Reads timed per measurement")
+    args = parser.parse_args()
+
+    sizes = sorted(int(s) for s in args.sizes.split(","))
+    results = run_benchmark(sizes, args.users, args.reads)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the batched Karma Prediction Service.
+
+Builds a synthetic user population (100k users by default), then compares
+per-user scoring through the existing predictors against vectorized batch
+scoring and cached lookups in the prediction service.
+
+Usage:
+    python scripts/benchmark_prediction_service.py [--users 100000] [--sample 2000]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from config import ACTIONS, ROLE_SEQUENCE
+from utils.prediction_service import KarmaPredictionService
+from utils.agami_predictor import AgamiKarmaPredictor
+from utils.karmic_predictor import karmic_predictor
+
+
+def generate_population(n_users: int, seed: int = 42):
+    """Generate synthetic user documents"""
+    rng = random.Random(seed)
+    users = []
+    for i in range(n_users):
+        users.append({
+            "user_id": f"bench_user_{i:06d}",
+            "role": rng.choice(ROLE_SEQUENCE),
+            "balances": {
+                "DharmaPoints": rng.uniform(0, 300),
+                "SevaPoints": rng.uniform(0, 200),
+                "PunyaTokens": rng.uniform(0, 100),
+                "PaapTokens": {
+                    "minor": rng.uniform(0, 20),
+                    "medium": rng.uniform(0, 10),
+                    "maha": rng.uniform(0, 5)
+                },
+                "DridhaKarma": rng.uniform(0, 100),
+                "AdridhaKarma": rng.uniform(0, 100),
+                "SanchitaKarma": rng.uniform(0, 500),
+                "PrarabdhaKarma": rng.uniform(0, 200),
+                "Rnanubandhan": {
+                    "minor": rng.uniform(0, 10),
+                    "medium": rng.uniform(0, 10),
+                    "major": rng.uniform(0, 5)
+                }
+            }
+        })
+    return users
+
+
+def per_user_scoring(users, q_table):
+    """Score users one at a time through the existing predictors"""
+    predictor = AgamiKarmaPredictor()
+    for user in users:
+        predictions = predictor._predict_from_q_table(user, q_table)
+        predictor._calculate_agami_karma(user, predictions)
+        karmic_predictor.predict_behavioral_trends(user)
+
+
+def run_benchmark(n_users: int, sample: int):
+    users = generate_population(n_users)
+    q_table = np.random.default_rng(7).normal(size=(len(ROLE_SEQUENCE), len(ACTIONS)))
+    results = {"users": n_users}
+
+    # Baseline: per-user recomputation on a sample, extrapolated to the population
+    sample_users = users[:min(sample, n_users)]
+    start = time.perf_counter()
+    per_user_scoring(sample_users, q_table)
+    per_user_seconds = time.perf_counter() - start
+    results["per_user_us"] = per_user_seconds / len(sample_users) * 1e6
+    results["per_user_population_s_estimated"] = per_user_seconds / len(sample_users) * n_users
+
+    service = KarmaPredictionService(initial_capacity=n_users)
+    service.set_q_table(q_table)
+
+    start = time.perf_counter()
+    service.load_users(users)
+    results["feature_load_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scores = service.score_matrix()
+    results["batch_score_matrix_s"] = time.perf_counter() - start
+    assert len(scores["user_ids"]) == n_users
+
+    start = time.perf_counter()
+    service.score_batch()
+    results["batch_score_dicts_s"] = time.perf_counter() - start
+
+    # Incremental updates: one event per user for a random 10% of the population
+    rng = random.Random(1)
+    event_users = rng.sample(range(n_users), max(1, n_users // 10))
+    start = time.perf_counter()
+    for i in event_users:
+        service.apply_karma_event(users[i]["user_id"], "SevaPoints", 10)
+    results["incremental_event_us"] = (time.perf_counter() - start) / len(event_users) * 1e6
+
+    # Cached full predictions: populate once, then measure hit latency
+    service._cache.update((u["user_id"], {"user_id": u["user_id"]}) for u in sample_users)
+    start = time.perf_counter()
+    for user in sample_users:
+        service.get_prediction(user["user_id"])
+    results["cache_hit_us"] = (time.perf_counter() - start) / len(sample_users) * 1e6
+
+    results["speedup_vs_per_user"] = (
+        results["per_user_population_s_estimated"] / results["batch_score_matrix_s"]
+        if results["batch_score_matrix_s"] else None
+    )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Karma Prediction Service")
+    parser.add_argument("--users", type=int, default=100000, help="Synthetic population size")
+    parser.add_argument("--sample", type=int, default=2000, help="Users scored through the per-user baseline")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.users, args.sample)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+"""
+KarmaChain Load and Soak Benchmark
+
+Drives the KarmaChain API in-process against a local Mongo stand-in
+(mongomock) so runs are reproducible without a database server. Records
+p50/p95/p99 latency and throughput per operation plus RSS over time, and
+writes the results as JSON so regressions can be compared across commits.
+
+Usage:
+    python tests/load_benchmark.py --profile load --output reports/load.json
+    python tests/load_benchmark.py --profile soak --output reports/soak.json
+    python tests/load_benchmark.py --compare reports/load.json
+"""
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Callable
+import logging
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+PROFILES = {
+    # Short, fixed-size run for per-commit comparison
+    "load": {"duration": 30, "users": 200, "concurrency": 4, "sample_interval": 1.0},
+    # Long run to surface memory growth and latency drift
+    "soak": {"duration": 1800, "users": 2000, "concurrency": 4, "sample_interval": 10.0},
+}
+
+# Relative weights of each operation in the request mix
+OPERATION_MIX = {
+    "log_action": 40,
+    "unified_event": 30,
+    "analytics_trends": 5,
+    "analytics_live_metrics": 5,
+    "graph_network": 10,
+    "graph_create_debt": 10,
+}
+
+LIFE_ACTIONS = ["completing_lessons", "helping_peers", "solving_doubts", "selfless_service", "cheat"]
+ROLES = ["learner", "volunteer", "seva", "guru"]
+
+
+def install_mongo_stand_in():
+    """Route every MongoClient created by the app to an in-memory mongomock client"""
+    try:
+        import mongomock
+    except ImportError:
+        sys.exit("mongomock is required for the load benchmark: pip install mongomock")
+    import pymongo
+    pymongo.MongoClient = mongomock.MongoClient
+
+
+def current_rss_bytes() -> int:
+    """Current resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Peak RSS is the best portable fallback (KiB on Linux, bytes on macOS)
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if sys.platform == "darwin" else usage * 1024
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100.0 * len(sorted_values)) - 1
+    return sorted_values[max(0, min(len(sorted_values) - 1, rank))]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+class KarmaLoadBenchmark:
+    """Closed-loop load generator for the KarmaChain API"""
+
+    def __init__(self, duration: float, users: int, concurrency: int,
+                 sample_interval: float, seed: int = 42):
+        self.duration = duration
+        self.users = users
+        self.concurrency = concurrency
+        self.sample_interval = sample_interval
+        self.seed = seed
+
+        from fastapi.testclient import TestClient
+        import main
+        self.client = TestClient(main.app)
+
+        self.latencies: Dict[str, List[float]] = {name: [] for name in OPERATION_MIX}
+        self.errors: Dict[str, int] = {name: 0 for name in OPERATION_MIX}
+        self.rss_samples: List[Dict[str, Any]] = []
+        self.lock = threading.Lock()
+        self.completed = 0
+
+        self.operations: Dict[str, Callable[[random.Random], Any]] = {
+            "log_action": self._log_action,
+            "unified_event": self._unified_event,
+            "analytics_trends": self._analytics_trends,
+            "analytics_live_metrics": self._analytics_live_metrics,
+            "graph_network": self._graph_network,
+            "graph_create_debt": self._graph_create_debt,
+        }
+
+    def _user_id(self, rng: random.Random) -> str:
+        return f"bench_user_{rng.randrange(self.users):06d}"
+
+    def _log_action(self, rng: random.Random):
+        return self.client.post("/v1/log-action/", json={
+            "user_id": self._user_id(rng),
+            "action": rng.choice(LIFE_ACTIONS),
+            "role": rng.choice(ROLES)
+        })
+
+    def _unified_event(self, rng: random.Random):
+        return self.client.post("/v1/event/", json={
+            "type": "life_event",
+            "data": {
+                "user_id": self._user_id(rng),
+                "action": rng.choice(LIFE_ACTIONS),
+                "role": rng.choice(ROLES)
+            },
+            "source": "load_benchmark"
+        })
+
+    def _analytics_trends(self, rng: random.Random):
+        return self.client.get("/api/v1/api/v1/analytics/karma_trends", params={"weeks": 4})
+
+    def _analytics_live_metrics(self, rng: random.Random):
+        return self.client.get("/api/v1/api/v1/analytics/metrics/live")
+
+    def _graph_network(self, rng: random.Random):
+        return self.client.get(f"/api/v1/rnanubandhan/{self._user_id(rng)}")
+
+    def _graph_create_debt(self, rng: random.Random):
+        debtor = self._user_id(rng)
+        receiver = self._user_id(rng)
+        while receiver == debtor and self.users > 1:
+            receiver = self._user_id(rng)
+        return self.client.post("/api/v1/rnanubandhan/create-debt", json={
+            "debtor_id": debtor,
+            "receiver_id": receiver,
+            "action_type": "break_promise",
+            "severity": rng.choice(["minor", "medium", "major"]),
+            "amount": round(rng.uniform(1, 10), 2)
+        })
+
+    def seed_users(self):
+        """Create the benchmark population so every operation has data to read"""
+        rng = random.Random(self.seed)
+        for i in range(self.users):
+            self.client.post("/v1/log-action/", json={
+                "user_id": f"bench_user_{i:06d}",
+                "action": "completing_lessons",
+                "role": rng.choice(ROLES)
+            })
+
+    def _sample_rss(self, started: float):
+        self.rss_samples.append({
+            "t": round(time.perf_counter() - started, 3),
+            "rss_mb": round(current_rss_bytes() / (1024 * 1024), 2),
+            "completed": self.completed
+        })
+
+    def _worker(self, worker_id: int, deadline: float):
+        rng = random.Random(self.seed + worker_id)
+        names = list(OPERATION_MIX)
+        weights = [OPERATION_MIX[n] for n in names]
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                response = self.operations[name](rng)
+                failed = response.status_code >= 500
+            except Exception as e:
+                logger.debug(f"{name} raised {e}")
+                failed = True
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self.lock:
+                self.latencies[name].append(elapsed_ms)
+                if failed:
+                    self.errors[name] += 1
+                self.completed += 1
+
+    def run(self) -> Dict[str, Any]:
+        """Seed the store, run the request mix for the configured duration and summarize"""
+        seed_start = time.perf_counter()
+        self.seed_users()
+        seed_seconds = time.perf_counter() - seed_start
+
+        started = time.perf_counter()
+        deadline = started + self.duration
+        self._sample_rss(started)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = [pool.submit(self._worker, i, deadline) for i in range(self.concurrency)]
+            while not all(f.done() for f in futures):
+                time.sleep(min(self.sample_interval, max(0.0, deadline - time.perf_counter()) + 0.05))
+                self._sample_rss(started)
+            for f in futures:
+                f.result()
+        elapsed = time.perf_counter() - started
+        self._sample_rss(started)
+
+        return self.summarize(elapsed, seed_seconds)
+
+    def summarize(self, elapsed: float, seed_seconds: float) -> Dict[str, Any]:
+        operations = {}
+        all_latencies = []
+        for name, values in self.latencies.items():
+            ordered = sorted(values)
+            all_latencies.extend(values)
+            operations[name] = {
+                "count": len(values),
+                "errors": self.errors[name],
+                "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+                "mean_ms": round(sum(values) / len(values), 3) if values else 0.0,
+                "p50_ms": round(percentile(ordered, 50), 3),
+                "p95_ms": round(percentile(ordered, 95), 3),
+                "p99_ms": round(percentile(ordered, 99), 3),
+                "max_ms": round(ordered[-1], 3) if ordered else 0.0,
+            }
+        ordered = sorted(all_latencies)
+        rss = [s["rss_mb"] for s in self.rss_samples]
+        return {
+            "meta": {
+                "git_commit": git_commit(),
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "store": "mongomock",
+                "config": {
+                    "duration": self.duration,
+                    "users": self.users,
+                    "concurrency": self.concurrency,
+                    "sample_interval": self.sample_interval,
+                    "seed": self.seed,
+                    "mix": OPERATION_MIX
+                }
+            },
+            "overall": {
+                "requests": len(all_latencies),
+                "errors": sum(self.errors.values()),
+                "elapsed_s": round(elapsed, 3),
+                "seed_s": round(seed_seconds, 3),
+                "throughput_rps": round(len(all_latencies) / elapsed, 2) if elapsed else 0.0,
+                "p50_ms": round(percentile(ordered, 50), 3),
+                "p95_ms": round(percentile(ordered, 95), 3),
+                "p99_ms": round(percentile(ordered, 99), 3),
+                "rss_start_mb": rss[0] if rss else None,
+                "rss_end_mb": rss[-1] if rss else None,
+                "rss_peak_mb": max(rss) if rss else None,
+            },
+            "operations": operations,
+            "rss_samples": self.rss_samples
+        }
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """
+    Compare a run against a baseline.
+
+    Returns:
+        list: Human-readable regressions; empty when within tolerance
+    """
+    regressions = []
+    for name, stats in current["operations"].items():
+        base = baseline.get("operations", {}).get(name)
+        if not base or not stats["count"] or not base["count"]:
+            continue
+        for key in ["p50_ms", "p95_ms", "p99_ms"]:
+            if base[key] and stats[key] > base[key] * (1 + max_regression):
+                regressions.append(f"{name}.{key}: {base[key]} -> {stats[key]}")
+    base_rps = baseline.get("overall", {}).get("throughput_rps")
+    rps = current["overall"]["throughput_rps"]
+    if base_rps and rps < base_rps * (1 - max_regression):
+        regressions.append(f"overall.throughput_rps: {base_rps} -> {rps}")
+    base_rss = baseline.get("overall", {}).get("rss_peak_mb")
+    rss = current["overall"]["rss_peak_mb"]
+    if base_rss and rss and rss > base_rss * (1 + max_regression):
+        regressions.append(f"overall.rss_peak_mb: {base_rss} -> {rss}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KarmaChain load and soak benchmark")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="load")
+    parser.add_argument("--duration", type=float, help="Seconds to run the request mix")
+    parser.add_argument("--users", type=int, help="Number of seeded users")
+    parser.add_argument("--concurrency", type=int, help="Concurrent client threads")
+    parser.add_argument("--sample-interval", type=float, help="Seconds between RSS samples")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    parser.add_argument("--compare", help="Baseline JSON results to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="Allowed relative regression before failing (default 0.25)")
+    args = parser.parse_args()
+
+    config = dict(PROFILES[args.profile])
+    for key in ["duration", "users", "concurrency", "sample_interval"]:
+        value = getattr(args, key)
+        if value is not None:
+            config[key] = value
+
+    install_mongo_stand_in()
+    # The app prints Q-learning debug lines to stdout; keep stdout for results only
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        benchmark = KarmaLoadBenchmark(seed=args.seed, **config)
+        results = benchmark.run()
+    results["meta"]["profile"] = args.profile
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    overall = results["overall"]
+    print(f"{overall['requests']} requests in {overall['elapsed_s']}s "
+          f"({overall['throughput_rps']} req/s), p50={overall['p50_ms']}ms "
+          f"p95={overall['p95_ms']}ms p99={overall['p99_ms']}ms, "
+          f"RSS {overall['rss_start_mb']} -> {overall['rss_end_mb']} MB", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.max_regression)
+        if regressions:
+            print("Regressions against baseline:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            sys.exit(1)
+        print("No regressions against baseline", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Test suite for the event-sourced karma balance ledger
+"""
+
+import sys
+import os
+import pytest
+from datetime import datetime, timezone, timedelta
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import utils.balance_ledger as ledger_module
+from utils.balance_ledger import BalanceLedger
+from utils.decay_engine import DecayEngine
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+class Clock:
+    """Deterministic clock advanced by the tests"""
+    def __init__(self):
+        self.now = START
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, **kwargs):
+        self.now = self.now + timedelta(**kwargs)
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ledger_module, "now_utc", clock)
+    return clock
+
+def get_test_ledger(snapshot_interval=3, retention_days=30):
+    """Get a ledger over fresh in-memory collections with one user"""
+    mongomock = pytest.importorskip("mongomock")
+    db = mongomock.MongoClient(tz_aware=True).db
+    db.users.insert_one({
+        "user_id": "ledger_user",
+        "balances": {"DharmaPoints": 0.0, "SevaPoints": 0.0, "PaapTokens": {"minor": 0.0}},
+        "token_meta": {},
+        "last_decay": START
+    })
+    ledger = BalanceLedger(users=db.users, events=db.events, snapshots=db.snapshots,
+                           snapshot_interval=snapshot_interval, retention_days=retention_days)
+    return ledger, db
+
+def test_point_in_time_balances(clock):
+    """Balances at any earlier time are rebuilt from a snapshot and a short tail"""
+    ledger, db = get_test_ledger()
+    history = []
+    for i in range(7):
+        clock.advance(hours=1)
+        ledger.apply("ledger_user", {"DharmaPoints": 10, "PaapTokens.minor": 1}, "test", ref=f"tx{i}")
+        history.append((clock.now, 10.0 * (i + 1)))
+
+    # seq 1 anchors history, then every third event is snapshotted
+    assert [s["seq"] for s in db.snapshots.find().sort("seq", 1)] == [1, 3, 6]
+    assert db.users.find_one({"user_id": "ledger_user"})["ledger_seq"] == 7
+
+    for at, expected in history:
+        result = ledger.get_balance_at("ledger_user", at)
+        assert result["balances"]["DharmaPoints"] == pytest.approx(expected)
+        assert result["events_replayed"] < 3
+    assert ledger.get_balance_at("ledger_user", START) is None
+
+def test_replay_includes_decay_sweeps(clock):
+    """Recorded decay sweeps replay to the balances the sweep stored"""
+    ledger, db = get_test_ledger(snapshot_interval=100)
+    clock.advance(hours=1)
+    ledger.apply("ledger_user", {"SevaPoints": 100}, "test")
+
+    swept_at = clock.advance(days=10)
+    DecayEngine(collection=db.users).run_sweep(now=swept_at)
+    ledger.record_decay_sweep(swept_at)
+    clock.advance(hours=1)
+    ledger.apply("ledger_user", {"SevaPoints": 5}, "test")
+
+    stored = db.users.find_one({"user_id": "ledger_user"})["balances"]["SevaPoints"]
+    result = ledger.get_balance_at("ledger_user", clock.now)
+    assert result["stored_balances"]["SevaPoints"] == pytest.approx(stored)
+    assert stored < 105
+
+def test_audit_replay_window(clock):
+    """An audit replay reports opening balances and each change in the window"""
+    ledger, _ = get_test_ledger()
+    for _ in range(4):
+        clock.advance(hours=1)
+        ledger.apply("ledger_user", {"DharmaPoints": 5}, "test")
+    since = clock.now
+    for _ in range(2):
+        clock.advance(hours=1)
+        ledger.apply("ledger_user", {"DharmaPoints": -2}, "test")
+
+    audit = ledger.replay("ledger_user", since, clock.now)
+    assert audit["opening_balances"]["DharmaPoints"] == pytest.approx(20.0)
+    assert [e["balances"]["DharmaPoints"] for e in audit["events"]] == [18.0, 16.0]
+    assert audit["closing_balances"]["DharmaPoints"] == pytest.approx(16.0)
+
+def test_compaction_bounds_history(clock):
+    """Compaction snapshots open tails and drops history behind retention"""
+    ledger, db = get_test_ledger(snapshot_interval=100, retention_days=30)
+    for _ in range(5):
+        clock.advance(days=1)
+        ledger.apply("ledger_user", {"DharmaPoints": 1}, "test")
+    ledger.record_decay_sweep(clock.now)
+
+    stats = ledger.compact(now=clock.now)
+    assert stats["snapshots_written"] == 1
+    assert stats["events_deleted"] == 0
+
+    clock.advance(days=60)
+    ledger.apply("ledger_user", {"DharmaPoints": 1}, "test")
+    stats = ledger.compact(now=clock.now)
+    assert stats["events_deleted"] == 5
+    assert stats["snapshots_deleted"] == 1
+    assert stats["sweeps_deleted"] == 1
+
+    result = ledger.get_balance_at("ledger_user", clock.now)
+    assert result["balances"]["DharmaPoints"] == pytest.approx(6.0)
+    assert result["events_replayed"] == 0
+    assert ledger.get_balance_at("ledger_user", START + timedelta(days=2)) is None
+
+def test_resets_replay_to_stored_balances(clock):
+    """Balance replacements (per-user decay, rebirth) replay like increments"""
+    ledger, db = get_test_ledger(snapshot_interval=100)
+    clock.advance(hours=1)
+    ledger.apply("ledger_user", {"SevaPoints": 100, "PaapTokens.minor": 2}, "test")
+
+    decayed_at = clock.advance(days=10)
+    ledger.reset("ledger_user", {"DharmaPoints": 0.0, "SevaPoints": 90.0, "PaapTokens": {"minor": 2.0}},
+                 "decay", fields={"token_meta": {}, "last_decay": decayed_at})
+    clock.advance(hours=1)
+    ledger.apply("ledger_user", {"SevaPoints": 5}, "test", fields={"role": "volunteer"})
+
+    user = db.users.find_one({"user_id": "ledger_user"})
+    assert user["role"] == "volunteer"
+    assert user["ledger_seq"] == 3
+    result = ledger.get_balance_at("ledger_user", clock.now)
+    assert result["stored_balances"] == user["balances"]
+    assert result["stored_balances"]["SevaPoints"] == pytest.approx(95.0)
+
+    before = ledger.get_balance_at("ledger_user", decayed_at - timedelta(minutes=1))
+    assert before["stored_balances"]["SevaPoints"] == pytest.approx(100.0)
+
+def test_materialized_decay_is_recorded(clock, monkeypatch):
+    """Write paths that materialize decay go through the ledger"""
+    from utils import tokens
+    ledger, db = get_test_ledger(snapshot_interval=100)
+    monkeypatch.setattr(ledger_module, "balance_ledger", ledger)
+    monkeypatch.setattr(tokens, "now_utc", clock)
+    clock.advance(hours=1)
+    ledger.apply("ledger_user", {"SevaPoints": 100}, "test")
+
+    clock.advance(days=30)
+    tokens.apply_decay_and_expiry(db.users.find_one({"user_id": "ledger_user"}))
+
+    user = db.users.find_one({"user_id": "ledger_user"})
+    assert user["balances"]["SevaPoints"] < 100
+    assert db.events.find_one({"seq": 2})["source"] == "decay"
+    assert ledger.get_balance_at("ledger_user", clock.now)["stored_balances"] == user["balances"]
@@ -0,0 +1,152 @@
+"""
+Test suite for the scheduled Karma Decay Engine
+"""
+
+import sys
+import os
+import pytest
+from datetime import datetime, timezone, timedelta
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from config import TOKEN_ATTRIBUTES
+from utils.decay_engine import DecayEngine, compute_decayed_state, lazy_decay, decay_factor
+
+NOW = datetime(2025, 6, 1, tzinfo=timezone.utc)
+
+def get_test_user(days_since_decay=10, seva_created_days_ago=30):
+    """Get a user document last decayed some days before NOW"""
+    return {
+        "user_id": "decay_user_001",
+        "role": "volunteer",
+        "balances": {
+            "DharmaPoints": 100.0,
+            "SevaPoints": 80.0,
+            "PunyaTokens": 40.0,
+            "AdridhaKarma": 20.0,
+            "PaapTokens": {"minor": 5.0}
+        },
+        "token_meta": {
+            "SevaPoints": {"created_at": NOW - timedelta(days=seva_created_days_ago)},
+            "PunyaTokens": {"created_at": NOW - timedelta(days=10)}
+        },
+        "last_decay": NOW - timedelta(days=days_since_decay)
+    }
+
+def test_compute_decayed_state_closed_form():
+    """Balances decay exponentially with elapsed days"""
+    user = get_test_user(days_since_decay=10)
+    balances, meta, changed = compute_decayed_state(user, NOW)
+
+    assert changed
+    seva_rate = TOKEN_ATTRIBUTES["SevaPoints"]["daily_decay"]
+    assert balances["SevaPoints"] == pytest.approx(80.0 * (1 - seva_rate) ** 10)
+    assert balances["DharmaPoints"] == 100.0  # no decay configured
+    assert balances["PaapTokens"] == {"minor": 5.0}
+    assert meta["SevaPoints"]["last_update"] == NOW
+    # Input document is not modified
+    assert user["balances"]["SevaPoints"] == 80.0
+
+def test_expiry_zeroes_balance():
+    """Tokens older than their expiry window are zeroed"""
+    expiry_days = TOKEN_ATTRIBUTES["SevaPoints"]["expiry_days"]
+    user = get_test_user(days_since_decay=1, seva_created_days_ago=expiry_days)
+    balances, _, _ = compute_decayed_state(user, NOW)
+    assert balances["SevaPoints"] == 0.0
+    assert balances["PunyaTokens"] > 0
+
+def test_no_elapsed_time_is_a_no_op():
+    """Nothing changes when last_decay is not in the past"""
+    user = get_test_user(days_since_decay=0)
+    balances, _, changed = compute_decayed_state(user, NOW)
+    assert not changed
+    assert balances == user["balances"]
+
+def test_lazy_decay_composes_with_sweeps():
+    """Sweeping part-way and decaying the rest lazily equals one lazy decay"""
+    user = get_test_user(days_since_decay=20)
+    direct = lazy_decay(user, NOW)
+
+    midpoint = NOW - timedelta(days=7)
+    balances, meta, _ = compute_decayed_state(user, midpoint)
+    swept = dict(user, balances=balances, token_meta=meta, last_decay=midpoint)
+    via_sweep = lazy_decay(swept, NOW)
+
+    for token in ["SevaPoints", "PunyaTokens", "AdridhaKarma"]:
+        assert via_sweep["balances"][token] == pytest.approx(direct["balances"][token])
+    assert direct["last_decay"] == user["last_decay"]
+
+def test_decay_factor():
+    """Decay factor is 1 for no decay or no elapsed time"""
+    assert decay_factor(0.0, 10) == 1.0
+    assert decay_factor(0.01, 0) == 1.0
+    assert decay_factor(0.01, 2) == pytest.approx(0.99 ** 2)
+
+def test_build_pipeline_covers_decaying_tokens():
+    """The sweep pipeline updates every decaying token and last_decay"""
+    pipeline = DecayEngine(collection=object()).build_pipeline(NOW)
+    updates = pipeline[0]["$set"]
+    for token, attrs in TOKEN_ATTRIBUTES.items():
+        if attrs.get("daily_decay", 0.0) > 0:
+            assert f"balances.{token}" in updates
+        assert f"token_meta.{token}.last_update" in updates
+    assert updates["last_decay"] == NOW
+
+def test_sweep_matches_closed_form():
+    """A chunked server-side sweep produces the same balances as the closed form"""
+    mongomock = pytest.importorskip("mongomock")
+    collection = mongomock.MongoClient(tz_aware=True).db.users
+
+    users = []
+    for i in range(5):
+        user = get_test_user(days_since_decay=5 + i)
+        user["user_id"] = f"decay_user_{i:03d}"
+        users.append(user)
+    legacy = get_test_user(days_since_decay=3)
+    legacy["user_id"] = "decay_user_legacy"
+    legacy["last_decay"] = legacy["last_decay"].isoformat()
+    users.append(legacy)
+    collection.insert_many([dict(u) for u in users])
+
+    stats = DecayEngine(collection=collection, chunk_size=2).run_sweep(now=NOW)
+    assert stats["chunks"] == 3
+    assert stats["users_scanned"] == 6
+    assert stats["users_updated"] + stats["legacy_users_updated"] == 6
+
+    for user in users:
+        expected, _, _ = compute_decayed_state(user, NOW)
+        stored = collection.find_one({"user_id": user["user_id"]})
+        for token in ["DharmaPoints", "SevaPoints", "PunyaTokens", "AdridhaKarma"]:
+            assert stored["balances"][token] == pytest.approx(expected[token])
+        assert stored["balances"]["PaapTokens"] == {"minor": 5.0}
+
+def test_users_without_last_decay_are_swept_from_created_at():
+    """Missing last_decay falls back to created_at on reads and in sweeps"""
+    mongomock = pytest.importorskip("mongomock")
+    collection = mongomock.MongoClient(tz_aware=True).db.users
+
+    unswept = get_test_user()
+    unswept["user_id"] = "decay_user_unswept"
+    del unswept["last_decay"]
+    unswept["created_at"] = NOW - timedelta(days=12)
+    legacy = dict(unswept, user_id="decay_user_legacy_created", created_at=unswept["created_at"].isoformat())
+    brand_new = dict(unswept, user_id="decay_user_no_dates")
+    del brand_new["created_at"]
+    collection.insert_many([dict(unswept), dict(legacy), dict(brand_new)])
+
+    # Reads decay retroactively from created_at
+    seva_rate = TOKEN_ATTRIBUTES["SevaPoints"]["daily_decay"]
+    expected = 80.0 * (1 - seva_rate) ** 12
+    assert lazy_decay(unswept, NOW)["balances"]["SevaPoints"] == pytest.approx(expected)
+
+    stats = DecayEngine(collection=collection).run_sweep(now=NOW)
+    assert stats["users_updated"] == 2
+    assert stats["legacy_users_updated"] == 1
+    for user_id in ["decay_user_unswept", "decay_user_legacy_created"]:
+        stored = collection.find_one({"user_id": user_id})
+        assert stored["balances"]["SevaPoints"] == pytest.approx(expected)
+        assert stored["last_decay"] == NOW
+
+    # With no dates at all the sweep starts the clock without decaying
+    stored = collection.find_one({"user_id": "decay_user_no_dates"})
+    assert stored["balances"]["SevaPoints"] == 80.0
+    assert stored["last_decay"] == NOW
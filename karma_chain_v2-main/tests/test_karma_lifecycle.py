@@ -71,12 +71,13 @@ class TestKarmaLifecycleEngine(unittest.TestCase):
         
         self.assertIn(self.test_user_id, str(context.exception))
     
+    @patch('utils.karma_lifecycle.apply_balance_change')
     @patch('utils.karma_lifecycle.users_col')
-    def test_update_prarabdha(self, mock_users_col):
+    def test_update_prarabdha(self, mock_users_col, mock_apply_balance_change):
         """Test updating user Prarabdha counter"""
         # Setup mocks
         mock_users_col.find_one.return_value = self.mock_user
-        mock_users_col.update_one.return_value = None
+        mock_apply_balance_change.return_value = {"balances": {"PrarabdhaKarma": 75.0}}
         
         # Test
         new_prarabdha = self.lifecycle_engine.update_prarabdha(self.test_user_id, 25.0)
@@ -84,7 +85,11 @@ class TestKarmaLifecycleEngine(unittest.TestCase):
         # Assertions
         self.assertEqual(new_prarabdha, 75.0)  # 50.0 + 25.0
         mock_users_col.find_one.assert_called_once_with({"user_id": self.test_user_id})
-        mock_users_col.update_one.assert_called_once()
+        # The change is recorded in the balance ledger as an increment
+        mock_apply_balance_change.assert_called_once_with(
+            self.test_user_id, {"PrarabdhaKarma": 25.0}, "prarabdha_update"
+        )
+        mock_users_col.update_one.assert_not_called()
     
     @patch('utils.karma_lifecycle.users_col')
     def test_check_death_threshold_not_reached(self, mock_users_col):
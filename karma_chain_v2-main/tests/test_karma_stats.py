@@ -0,0 +1,85 @@
+"""
+Test suite for materialized karma statistics
+"""
+
+import sys
+import os
+import pytest
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.karma_stats import KarmaStatsEngine, GLOBAL_STATS_ID
+
+def get_test_engine():
+    """Get a statistics engine over fresh in-memory collections"""
+    mongomock = pytest.importorskip("mongomock")
+    db = mongomock.MongoClient(tz_aware=True).db
+    engine = KarmaStatsEngine(users=db.users, transactions=db.transactions,
+                              atonements=db.atonements, stats=db.karma_stats)
+    return engine, db
+
+def seed_ledger(db):
+    """Insert users, transactions and atonements without touching counters"""
+    db.users.insert_many([{"user_id": f"stats_user_{i}", "role": "learner"} for i in range(3)])
+    db.transactions.insert_many([{"user_id": "stats_user_0", "action": "help"} for _ in range(4)])
+    db.transactions.insert_many([{"user_id": "stats_user_1", "action": "help"} for _ in range(2)])
+    db.atonements.insert_many([
+        {"user_id": "stats_user_0", "status": "pending"},
+        {"user_id": "stats_user_0", "status": "completed"},
+        {"user_id": "stats_user_1", "status": "pending"},
+    ])
+
+def test_unreconciled_user_is_counted_and_backfilled():
+    """First read counts the ledger once and stores the result on the user"""
+    engine, db = get_test_engine()
+    seed_ledger(db)
+
+    user, action_stats = engine.get_user_stats("stats_user_0")
+    assert user["user_id"] == "stats_user_0"
+    assert action_stats == {"total_actions": 4, "pending_atonements": 1, "completed_atonements": 1}
+    stored = db.users.find_one({"user_id": "stats_user_0"})["action_stats"]
+    assert stored["total_actions"] == 4
+    assert "reconciled_at" in stored
+
+def test_counters_follow_writes():
+    """Write hooks keep per-user and global counters current without recounting"""
+    engine, db = get_test_engine()
+    seed_ledger(db)
+    engine.reconcile()
+
+    engine.record_transaction("stats_user_2")
+    engine.record_atonement_created("stats_user_2")
+    engine.record_atonement_completed("stats_user_2")
+    engine.record_user_created()
+
+    _, action_stats = engine.get_user_stats("stats_user_2")
+    assert action_stats == {"total_actions": 1, "pending_atonements": 0, "completed_atonements": 1}
+    assert engine.get_system_stats() == {"total_users": 4, "total_actions": 7, "total_atonements": 4}
+
+def test_reconcile_corrects_drift():
+    """Reconciliation rewrites only users whose counters drifted"""
+    engine, db = get_test_engine()
+    seed_ledger(db)
+    first = engine.reconcile()
+    assert first["users_corrected"] == 3
+    assert first["totals"] == {"total_users": 3, "total_actions": 6, "total_atonements": 3}
+
+    db.users.update_one({"user_id": "stats_user_1"}, {"$inc": {"action_stats.total_actions": 5}})
+    db.karma_stats.update_one({"_id": GLOBAL_STATS_ID}, {"$inc": {"total_actions": 5}})
+    second = engine.reconcile()
+    assert second["users_corrected"] == 1
+    assert engine.get_user_stats("stats_user_1")[1]["total_actions"] == 2
+    assert engine.get_system_stats()["total_actions"] == 6
+
+def test_missing_user_and_failed_hooks():
+    """Unknown users return nothing and counter failures never raise"""
+    class BrokenCollection:
+        def update_one(self, *args, **kwargs):
+            raise RuntimeError("database unavailable")
+
+        def find_one(self, *args, **kwargs):
+            return None
+
+    engine = KarmaStatsEngine(users=BrokenCollection(), stats=BrokenCollection())
+    assert engine.get_user_stats("nobody") == (None, {})
+    engine.record_transaction("nobody")
+    engine.record_user_created()
@@ -0,0 +1,38 @@
+"""
+Test suite for the load benchmark result helpers
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from tests.load_benchmark import percentile, compare_results
+
+def make_results(p95=10.0, rps=100.0, rss=120.0):
+    """Build a minimal results document"""
+    return {
+        "overall": {"throughput_rps": rps, "rss_peak_mb": rss},
+        "operations": {
+            "log_action": {"count": 100, "p50_ms": 5.0, "p95_ms": p95, "p99_ms": 20.0}
+        }
+    }
+
+def test_percentile_nearest_rank():
+    """Percentiles use the nearest-rank definition"""
+    values = sorted(float(v) for v in range(1, 101))
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([], 95) == 0.0
+    assert percentile([3.0], 99) == 3.0
+
+def test_compare_results_within_tolerance():
+    """Small changes are not reported as regressions"""
+    assert compare_results(make_results(p95=11.0), make_results(), 0.25) == []
+
+def test_compare_results_flags_regressions():
+    """Latency, throughput and memory regressions are reported"""
+    regressions = compare_results(make_results(p95=20.0, rps=50.0, rss=200.0), make_results(), 0.25)
+    assert any("log_action.p95_ms" in r for r in regressions)
+    assert any("throughput_rps" in r for r in regressions)
+    assert any("rss_peak_mb" in r for r in regressions)
@@ -0,0 +1,205 @@
+"""
+Test suite for the batched Karma Prediction Service
+"""
+
+import sys
+import os
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from config import ACTIONS, ROLE_SEQUENCE
+from utils.prediction_service import KarmaPredictionService, extract_features
+from utils.agami_predictor import AgamiKarmaPredictor
+from utils.karmic_predictor import karmic_predictor
+from utils.loka import calculate_net_karma
+from utils.merit import compute_user_merit_score
+from utils.paap import get_total_paap_score
+from utils.karma_schema import calculate_weighted_karma_score
+
+def get_test_users():
+    """Get a small population with different roles and balances"""
+    return [
+        {
+            "user_id": "pred_user_001",
+            "role": "volunteer",
+            "balances": {
+                "DharmaPoints": 50, "SevaPoints": 30, "PunyaTokens": 25,
+                "PaapTokens": {"minor": 5, "medium": 3, "maha": 1},
+                "DridhaKarma": 40, "AdridhaKarma": 20,
+                "SanchitaKarma": 100, "PrarabdhaKarma": 50,
+                "Rnanubandhan": {"minor": 10, "medium": 5, "major": 2}
+            }
+        },
+        {
+            "user_id": "pred_user_002",
+            "role": "learner",
+            "balances": {"DharmaPoints": 5, "SevaPoints": 0, "PunyaTokens": 0,
+                         "PaapTokens": {"medium": 40}}
+        },
+        {
+            "user_id": "pred_user_003",
+            "role": "guru",
+            "balances": {"DharmaPoints": 300, "SevaPoints": 200, "PunyaTokens": 90,
+                         "DridhaKarma": 90, "AdridhaKarma": 5,
+                         "Rnanubandhan": {"major": 30}}
+        }
+    ]
+
+def get_test_q_table():
+    """Get a Q-table with a distinct ranking per role"""
+    q_table = np.zeros((len(ROLE_SEQUENCE), len(ACTIONS)))
+    q_table[0] = [0.5, 0.1, 0.9, 0.0, -1.0]
+    q_table[1] = [0.0, 0.8, 0.2, 0.6, -0.5]
+    q_table[3] = [0.3, 0.3, 0.1, 0.9, 0.0]
+    return q_table
+
+def test_extract_features_matches_scalar_scores():
+    """Feature vectors reproduce merit, paap and weighted karma"""
+    service = KarmaPredictionService()
+    users = get_test_users()
+    service.load_users(users)
+
+    for user, score in zip(users, service.score_batch([u["user_id"] for u in users])):
+        assert abs(score["merit_score"] - compute_user_merit_score(user)) < 1e-9
+        assert abs(score["paap_score"] - get_total_paap_score(user)) < 1e-9
+        assert abs(score["net_karma"] - calculate_net_karma(user)) < 1e-9
+        assert abs(score["weighted_karma"] - calculate_weighted_karma_score(user)) < 1e-9
+
+def test_batch_scores_match_agami_predictor():
+    """Vectorized Agami projection equals the per-user predictor"""
+    q_table = get_test_q_table()
+    service = KarmaPredictionService()
+    service.set_q_table(q_table)
+    users = get_test_users()
+    service.load_users(users)
+    predictor = AgamiKarmaPredictor()
+
+    for user, score in zip(users, service.score_batch()):
+        predictions = predictor._predict_from_q_table(user, q_table)
+        agami = predictor._calculate_agami_karma(user, predictions)
+        assert abs(score["projected_merit_score"] - agami["projected_merit_score"]) < 1e-9
+        assert abs(score["projected_paap_score"] - agami["projected_paap_score"]) < 1e-9
+        assert abs(score["projected_net_karma"] - agami["projected_net_karma"]) < 1e-9
+        assert abs(score["expected_change"] - agami["expected_change"]) < 1e-9
+        assert score["projected_role"] == agami["projected_role"]
+        assert score["confidence"] == predictions["confidence"]
+
+def test_guidance_score_matches_karmic_predictor():
+    """Vectorized guidance score equals KarmicPredictor"""
+    service = KarmaPredictionService()
+    users = get_test_users()
+    service.load_users(users)
+
+    for user, score in zip(users, service.score_batch()):
+        trends = karmic_predictor.predict_behavioral_trends(user)
+        assert score["guidance_score"] == trends["guidance_score"]
+
+def test_incremental_event_updates_features():
+    """Applying an event equals re-extracting features from the updated document"""
+    service = KarmaPredictionService(initial_capacity=1)
+    users = get_test_users()
+    service.load_users(users)
+    assert len(service) == 3
+
+    service.apply_karma_event("pred_user_002", "SevaPoints", 10)
+    service.apply_karma_event("pred_user_002", "PaapTokens", 2, severity="minor")
+    service.apply_karma_event("pred_user_002", "Rnanubandhan", 4, severity="medium", role="volunteer")
+
+    updated = get_test_users()[1]
+    updated["role"] = "volunteer"
+    updated["balances"]["SevaPoints"] = 10
+    updated["balances"]["PaapTokens"]["minor"] = 2
+    updated["balances"]["Rnanubandhan"] = {"medium": 4}
+
+    row = service._index["pred_user_002"]
+    assert np.allclose(service._features[row], extract_features(updated))
+    assert service.score_batch(["pred_user_002"])[0]["role"] == "volunteer"
+
+def test_prediction_cache_invalidation(monkeypatch):
+    """Cached predictions are reused until a karma event arrives for the user"""
+    service = KarmaPredictionService()
+    calls = []
+
+    def fake_predict(user_id, scenario=None):
+        calls.append(user_id)
+        return {"user_id": user_id, "call": len(calls)}
+
+    from utils import agami_predictor as agami_module
+    monkeypatch.setattr(agami_module.agami_predictor, "predict_agami_karma", fake_predict)
+
+    first = service.get_prediction("pred_user_001")
+    second = service.get_prediction("pred_user_001")
+    assert first is second
+    assert calls == ["pred_user_001"]
+
+    service.on_karma_event("pred_user_001", get_test_users()[0])
+    third = service.get_prediction("pred_user_001")
+    assert third["call"] == 2
+
+    stats = service.get_stats()
+    assert stats["cache_hits"] == 1
+    assert stats["cache_misses"] == 2
+
+def test_remove_user_keeps_index_consistent():
+    """Removing a user compacts the matrix without corrupting other rows"""
+    service = KarmaPredictionService()
+    users = get_test_users()
+    service.load_users(users)
+    before = {s["user_id"]: s["merit_score"] for s in service.score_batch()}
+
+    service.remove_user("pred_user_001")
+    assert not service.has_user("pred_user_001")
+    after = {s["user_id"]: s["merit_score"] for s in service.score_batch()}
+    assert after == {k: v for k, v in before.items() if k != "pred_user_001"}
+
+def test_q_table_update_invalidates_affected_roles(monkeypatch):
+    """Saving a Q-table drops cached predictions only for roles whose Q-values changed"""
+    service = KarmaPredictionService()
+    # Sparse enough that confidence is below its 0.9 cap
+    q_table = np.zeros((len(ROLE_SEQUENCE), len(ACTIONS)))
+    q_table[ROLE_SEQUENCE.index("learner"), 0] = 0.5
+    q_table[ROLE_SEQUENCE.index("volunteer"), 1] = 0.8
+    service.set_q_table(q_table)
+
+    def fake_predict(user_id, scenario=None):
+        role = {"pred_user_001": "volunteer", "pred_user_002": "learner"}[user_id]
+        return {"user_id": user_id, "current_state": {"role": role}}
+
+    from utils import agami_predictor as agami_module
+    monkeypatch.setattr(agami_module.agami_predictor, "predict_agami_karma", fake_predict)
+    volunteer = service.get_prediction("pred_user_001")
+    learner = service.get_prediction("pred_user_002")
+
+    # Same non-zero pattern, so confidence is unchanged and only the learner row differs
+    updated = q_table.copy()
+    updated[ROLE_SEQUENCE.index("learner"), 0] = 0.7
+    service.on_q_table_saved(updated)
+
+    assert service.get_prediction("pred_user_001") is volunteer
+    assert service.get_prediction("pred_user_002") is not learner
+    assert np.array_equal(service._q_table, updated)
+
+    # A change in confidence is reported by every prediction
+    updated[ROLE_SEQUENCE.index("seva"), 0] = 0.4
+    service.on_q_table_saved(updated)
+    assert service.get_stats()["cached_predictions"] == 0
+
+def test_ledger_writes_refresh_features(monkeypatch):
+    """Balance writes through the ledger update the global service's feature rows"""
+    mongomock = __import__("pytest").importorskip("mongomock")
+    from utils import prediction_service as service_module
+    from utils.balance_ledger import BalanceLedger
+
+    service = KarmaPredictionService()
+    monkeypatch.setattr(service_module, "prediction_service", service)
+    db = mongomock.MongoClient(tz_aware=True).db
+    db.users.insert_one({**get_test_users()[1], "user_id": "ledger_pred_user"})
+    ledger = BalanceLedger(users=db.users, events=db.events, snapshots=db.snapshots)
+
+    ledger.apply("ledger_pred_user", {"SevaPoints": 10, "PaapTokens.medium": -5}, "test",
+                 fields={"role": "volunteer"})
+
+    stored = db.users.find_one({"user_id": "ledger_pred_user"})
+    row = service._index["ledger_pred_user"]
+    assert np.allclose(service._features[row], extract_features(stored))
+    assert service.score_batch(["ledger_pred_user"])[0]["role"] == "volunteer"
@@ -4,6 +4,7 @@ from database import users_col, transactions_col, appeals_col, atonements_col
 from bson import ObjectId
 from utils.qlearning import atonement_q_learning_step
 from utils.merit import compute_user_merit_score, determine_role_from_merit
+from utils.karma_stats import record_transaction, record_atonement_created, record_atonement_completed
 
 def serialize_mongodb_doc(doc):
     """Helper function to serialize MongoDB documents"""
@@ -86,6 +87,7 @@ def create_atonement_plan(user_id, paap_action, severity_class):
     
     # Store atonement plan in atonements collection
     atonements_col.insert_one(plan)
+    record_atonement_created(user_id)
     
     return serialize_mongodb_doc(plan)
 
@@ -218,14 +220,17 @@ def mark_atonement_completed(user_id: str, atonement_plan_id: str):
                 'timestamp': datetime.now(timezone.utc),
                 'plan_id': atonement_plan_id
             })
+            record_transaction(user_id)
     
     # Mark atonement as completed
-    atonements_col.update_one(
-        {'plan_id': atonement_plan_id},
+    result = atonements_col.update_one(
+        {'plan_id': atonement_plan_id, 'status': {'$ne': 'completed'}},
         {'$set': {
             'status': 'completed',
             'completed_at': datetime.now(timezone.utc)
         }}
     )
+    if result.modified_count:
+        record_atonement_completed(user_id)
     
     return True
\ No newline at end of file
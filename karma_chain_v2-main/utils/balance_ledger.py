@@ -0,0 +1,535 @@
+"""
+Event-Sourced Karma Balance Ledger
+
+Every balance change is applied to the user document and appended to the
+``balance_events`` collection under a per-user sequence number, so the two
+never disagree about ordering. Every ``BALANCE_SNAPSHOT_INTERVAL`` events the
+post-update balances are stored in ``balance_snapshots``.
+
+Increments go through ``apply``; writes that replace the balances outright
+(materialized per-user decay, loka rebirth resets) go through ``reset``. No
+other code should write ``balances`` on the users collection, otherwise
+point-in-time replays drift from the stored balances.
+
+A point-in-time balance is the nearest snapshot at or before that time plus
+the short tail of events after it. Scheduled decay sweeps are recorded once as
+global ``decay_sweep`` markers and replayed through the same closed-form decay
+the sweep used, so replays match what was stored.
+
+A compaction job snapshots every user with an open tail and drops events and
+snapshots that fall behind the retention window.
+"""
+
+import asyncio
+import copy
+import logging
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, List, Optional
+
+from pymongo import ReturnDocument
+
+from config import (
+    BALANCE_SNAPSHOT_INTERVAL, BALANCE_EVENT_RETENTION_DAYS,
+    BALANCE_COMPACTION_ENABLED, BALANCE_COMPACTION_INTERVAL_SECONDS
+)
+from utils.decay_engine import compute_decayed_state
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+EVENT_BALANCE_DELTA = "balance_delta"
+EVENT_BALANCE_RESET = "balance_reset"
+EVENT_DECAY_SWEEP = "decay_sweep"
+
+# Non-balance fields that replays need to decay balances the way reads do
+_REPLAYED_FIELDS = ("token_meta", "last_decay")
+
+_USER_PROJECTION = {"balances": 1, "token_meta": 1, "last_decay": 1, "created_at": 1, "ledger_seq": 1, "role": 1}
+
+
+def now_utc():
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Ensure timezone-aware datetime
+    if value is not None and value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _apply_delta(balances: Dict[str, Any], path: str, amount: float):
+    """Increment a dotted balance path such as ``PaapTokens.minor``"""
+    node = balances
+    parts = path.split(".")
+    for part in parts[:-1]:
+        node = node.setdefault(part, {})
+    node[parts[-1]] = node.get(parts[-1], 0) + amount
+
+
+class BalanceLedger:
+    """Append-only balance events with periodic per-user snapshots"""
+
+    def __init__(self, users=None, events=None, snapshots=None,
+                 snapshot_interval: int = BALANCE_SNAPSHOT_INTERVAL,
+                 retention_days: int = BALANCE_EVENT_RETENTION_DAYS):
+        """
+        Initialize the balance ledger.
+
+        Args:
+            users: Users collection, defaults to database.users_col
+            events: Balance events collection, defaults to database.balance_events_col
+            snapshots: Snapshot collection, defaults to database.balance_snapshots_col
+            snapshot_interval (int): Events between automatic snapshots
+            retention_days (int): Days of history kept by compaction
+        """
+        self._users = users
+        self._events = events
+        self._snapshots = snapshots
+        self.snapshot_interval = max(1, snapshot_interval)
+        self.retention_days = retention_days
+        self.last_compaction: Optional[Dict[str, Any]] = None
+
+    @property
+    def users(self):
+        if self._users is None:
+            from database import users_col
+            return users_col
+        return self._users
+
+    @property
+    def events(self):
+        if self._events is None:
+            from database import balance_events_col
+            return balance_events_col
+        return self._events
+
+    @property
+    def snapshots(self):
+        if self._snapshots is None:
+            from database import balance_snapshots_col
+            return balance_snapshots_col
+        return self._snapshots
+
+    def ensure_indexes(self):
+        """Create the indexes point-in-time queries and compaction rely on"""
+        self.events.create_index([("user_id", 1), ("seq", 1)])
+        self.events.create_index([("type", 1), ("timestamp", 1)])
+        self.snapshots.create_index([("user_id", 1), ("seq", -1)])
+        self.snapshots.create_index([("user_id", 1), ("timestamp", -1)])
+
+    # ------------------------------------------------------------------
+    # Write path
+    # ------------------------------------------------------------------
+
+    def apply(self, user_id: str, deltas: Dict[str, float], source: str,
+              ref: Optional[str] = None, fields: Optional[Dict[str, Any]] = None) -> Optional[Dict]:
+        """
+        Apply balance increments to a user and record them as one event.
+
+        Args:
+            user_id (str): The user's ID
+            deltas (dict): Increments keyed by balance path, e.g.
+                {"SevaPoints": 5.0, "PaapTokens.minor": 1.0}
+            source (str): What caused the change, e.g. "log_action"
+            ref (str, optional): Related transaction or request ID
+            fields (dict, optional): Other user fields to $set in the same
+                update, e.g. {"cheat_history": [...]}
+
+        Returns:
+            dict: The user document after the update, or None if the user is
+            missing or no balance changed
+        """
+        deltas = {path: float(amount) for path, amount in deltas.items() if amount}
+        if not deltas:
+            if fields:
+                # Nothing to record, but the fields (e.g. role) still change
+                user = self.users.find_one_and_update(
+                    {"user_id": user_id}, {"$set": fields},
+                    projection=_USER_PROJECTION, return_document=ReturnDocument.AFTER
+                )
+                if user:
+                    self._notify_prediction_service(user_id, user)
+            return None
+
+        update = {"$inc": {**{f"balances.{path}": amount for path, amount in deltas.items()}, "ledger_seq": 1}}
+        if fields:
+            update["$set"] = fields
+        event = {
+            "type": EVENT_BALANCE_DELTA,
+            "deltas": [{"path": path, "amount": amount} for path, amount in deltas.items()]
+        }
+        return self._commit(user_id, update, event, source, ref)
+
+    def reset(self, user_id: str, balances: Dict[str, Any], source: str,
+              ref: Optional[str] = None, fields: Optional[Dict[str, Any]] = None) -> Optional[Dict]:
+        """
+        Replace a user's balances and record the new balances as one event.
+
+        Args:
+            user_id (str): The user's ID
+            balances (dict): The complete balances map after the change
+            source (str): What caused the change, e.g. "decay" or "rebirth"
+            ref (str, optional): Related transaction or request ID
+            fields (dict, optional): Other user fields to $set in the same
+                update; ``token_meta`` and ``last_decay`` are also replayed
+
+        Returns:
+            dict: The user document after the update, or None if the user is missing
+        """
+        fields = fields or {}
+        event = {"type": EVENT_BALANCE_RESET, "balances": copy.deepcopy(balances)}
+        for key in _REPLAYED_FIELDS:
+            if key in fields:
+                event[key] = copy.deepcopy(fields[key])
+        update = {"$set": {**fields, "balances": balances}, "$inc": {"ledger_seq": 1}}
+        return self._commit(user_id, update, event, source, ref)
+
+    def _commit(self, user_id: str, update: Dict[str, Any], event: Dict[str, Any],
+                source: str, ref: Optional[str]) -> Optional[Dict]:
+        """Apply an update that bumps ledger_seq and append the matching event"""
+        timestamp = now_utc()
+        user = self.users.find_one_and_update(
+            {"user_id": user_id},
+            update,
+            projection=_USER_PROJECTION,
+            return_document=ReturnDocument.AFTER
+        )
+        if not user:
+            logger.warning(f"Balance change for unknown user {user_id} was not applied")
+            return None
+
+        seq = user["ledger_seq"]
+        try:
+            self.events.insert_one({
+                "event_id": str(uuid.uuid4()),
+                "user_id": user_id,
+                "seq": seq,
+                "source": source,
+                "ref": ref,
+                "timestamp": timestamp,
+                **event
+            })
+            # The first event anchors the user's history; later ones bound the replay tail
+            if seq == 1 or seq % self.snapshot_interval == 0:
+                self._write_snapshot(user_id, user, timestamp)
+        except Exception as e:
+            # The balance is already applied; a missing seq shows up as a gap in audits
+            logger.error(f"Failed to record balance event {seq} for user {user_id}: {e}")
+        self._notify_prediction_service(user_id, user)
+        return user
+
+    def _notify_prediction_service(self, user_id: str, user: Dict):
+        """Refresh the user's prediction features; every balance write passes through here"""
+        try:
+            from utils.prediction_service import notify_karma_event
+            notify_karma_event(user_id, {**user, "user_id": user_id})
+        except Exception as e:
+            logger.warning(f"Failed to notify prediction service for user {user_id}: {e}")
+
+    def record_decay_sweep(self, swept_at: datetime):
+        """Record that a decay sweep materialized decay for every user at swept_at"""
+        self.events.insert_one({
+            "event_id": str(uuid.uuid4()),
+            "type": EVENT_DECAY_SWEEP,
+            "user_id": None,
+            "timestamp": swept_at
+        })
+
+    def _write_snapshot(self, user_id: str, user: Dict, timestamp: datetime):
+        self.snapshots.insert_one({
+            "user_id": user_id,
+            "seq": user.get("ledger_seq", 0),
+            "balances": user.get("balances", {}),
+            "token_meta": user.get("token_meta", {}),
+            "last_decay": user.get("last_decay"),
+            # Decay anchor for users that have never been swept
+            "created_at": user.get("created_at"),
+            "timestamp": timestamp
+        })
+
+    def snapshot_user(self, user_id: str) -> bool:
+        """
+        Snapshot a user's current balances.
+
+        Returns:
+            bool: True if a snapshot was written
+        """
+        user = self.users.find_one(
+            {"user_id": user_id},
+            _USER_PROJECTION
+        )
+        if not user:
+            return False
+        self._write_snapshot(user_id, user, now_utc())
+        return True
+
+    # ------------------------------------------------------------------
+    # Read path
+    # ------------------------------------------------------------------
+
+    def _nearest_snapshot(self, user_id: str, at: datetime) -> Optional[Dict]:
+        return self.snapshots.find_one(
+            {"user_id": user_id, "timestamp": {"$lte": at}},
+            sort=[("seq", -1), ("timestamp", -1)]
+        )
+
+    def _tail(self, user_id: str, snapshot: Dict, at: datetime) -> List[Dict]:
+        """Events after a snapshot up to at, with decay sweeps merged in time order"""
+        deltas = list(self.events.find({
+            "user_id": user_id,
+            "seq": {"$gt": snapshot["seq"]},
+            "timestamp": {"$lte": at}
+        }).sort("seq", 1))
+        sweeps = list(self.events.find({
+            "type": EVENT_DECAY_SWEEP,
+            "timestamp": {"$gt": snapshot["timestamp"], "$lte": at}
+        }).sort("timestamp", 1))
+        return sorted(deltas + sweeps, key=lambda event: _as_utc(event["timestamp"]))
+
+    def _replay(self, snapshot: Dict, events: List[Dict]) -> Dict[str, Any]:
+        state = {
+            "balances": copy.deepcopy(snapshot.get("balances", {})),
+            "token_meta": copy.deepcopy(snapshot.get("token_meta", {})),
+            "last_decay": snapshot.get("last_decay"),
+            "created_at": snapshot.get("created_at"),
+            "seq": snapshot.get("seq", 0)
+        }
+        for event in events:
+            if event["type"] == EVENT_DECAY_SWEEP:
+                swept_at = _as_utc(event["timestamp"])
+                balances, meta, _ = compute_decayed_state(state, swept_at)
+                state.update(balances=balances, token_meta=meta, last_decay=swept_at)
+            elif event["type"] == EVENT_BALANCE_RESET:
+                state["balances"] = copy.deepcopy(event["balances"])
+                for key in _REPLAYED_FIELDS:
+                    if key in event:
+                        state[key] = copy.deepcopy(event[key])
+                state["seq"] = event["seq"]
+            else:
+                for delta in event["deltas"]:
+                    _apply_delta(state["balances"], delta["path"], delta["amount"])
+                state["seq"] = event["seq"]
+        return state
+
+    def get_balance_at(self, user_id: str, at: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """
+        Reconstruct a user's balances at a point in time.
+
+        Args:
+            user_id (str): The user's ID
+            at (datetime, optional): Point in time, defaults to now
+
+        Returns:
+            dict: Stored balances at that time, the decayed balances a read
+            would have returned, and replay metadata; None if the time falls
+            before the user's recorded history
+        """
+        at = _as_utc(at) or now_utc()
+        snapshot = self._nearest_snapshot(user_id, at)
+        if not snapshot:
+            return None
+        events = self._tail(user_id, snapshot, at)
+        state = self._replay(snapshot, events)
+        decayed, _, _ = compute_decayed_state(state, at)
+        return {
+            "user_id": user_id,
+            "as_of": at,
+            "seq": state["seq"],
+            "balances": decayed,
+            "stored_balances": state["balances"],
+            "snapshot_seq": snapshot["seq"],
+            "events_replayed": len(events)
+        }
+
+    def replay(self, user_id: str, since: datetime, until: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """
+        Replay a user's balance history for an audit window.
+
+        Replay starts from the nearest snapshot before ``since`` rather than
+        from the beginning of the ledger.
+
+        Args:
+            user_id (str): The user's ID
+            since (datetime): Start of the audit window
+            until (datetime, optional): End of the audit window, defaults to now
+
+        Returns:
+            dict: Opening balances and each event in the window with the
+            running stored balances after it; None if since falls before the
+            user's recorded history
+        """
+        since = _as_utc(since)
+        until = _as_utc(until) or now_utc()
+        snapshot = self._nearest_snapshot(user_id, since)
+        if not snapshot:
+            return None
+
+        events = self._tail(user_id, snapshot, until)
+        opening = [event for event in events if _as_utc(event["timestamp"]) <= since]
+        state = self._replay(snapshot, opening)
+        opening_balances = copy.deepcopy(state["balances"])
+
+        entries = []
+        for event in events[len(opening):]:
+            state = self._replay(state, [event])
+            entries.append({
+                "type": event["type"],
+                "seq": event.get("seq"),
+                "source": event.get("source"),
+                "ref": event.get("ref"),
+                "deltas": event.get("deltas", []),
+                "timestamp": event["timestamp"],
+                "balances": copy.deepcopy(state["balances"])
+            })
+
+        return {
+            "user_id": user_id,
+            "since": since,
+            "until": until,
+            "opening_balances": opening_balances,
+            "events": entries,
+            "closing_balances": state["balances"]
+        }
+
+    # ------------------------------------------------------------------
+    # Compaction
+    # ------------------------------------------------------------------
+
+    def compact(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Snapshot open tails and prune history behind the retention window.
+
+        Every user whose latest snapshot is behind their sequence number or
+        behind the latest decay sweep gets a fresh snapshot. For each user the
+        newest snapshot before the retention cutoff becomes the base: older
+        snapshots and the events it covers are deleted, as are decay sweep
+        markers that no remaining snapshot needs.
+
+        Args:
+            now (datetime, optional): Compaction time, defaults to the current time
+
+        Returns:
+            dict: Compaction statistics
+        """
+        now = now or now_utc()
+        cutoff = now - timedelta(days=self.retention_days)
+        start = time.perf_counter()
+        stats = {"started_at": now.isoformat(), "snapshots_written": 0,
+                 "snapshots_deleted": 0, "events_deleted": 0, "sweeps_deleted": 0}
+
+        latest = {
+            row["_id"]: row
+            for row in self.snapshots.aggregate([
+                {"$group": {"_id": "$user_id", "seq": {"$max": "$seq"}, "timestamp": {"$max": "$timestamp"}}}
+            ], allowDiskUse=True)
+        }
+        last_sweep = self.events.find_one({"type": EVENT_DECAY_SWEEP}, sort=[("timestamp", -1)])
+        last_sweep_at = _as_utc(last_sweep["timestamp"]) if last_sweep else None
+
+        for user in self.users.find(
+            {"ledger_seq": {"$exists": True}},
+            {"user_id": 1, "balances": 1, "token_meta": 1, "last_decay": 1, "created_at": 1, "ledger_seq": 1}
+        ):
+            previous = latest.get(user["user_id"])
+            behind = (
+                previous is None
+                or previous["seq"] < user["ledger_seq"]
+                or (last_sweep_at is not None and _as_utc(previous["timestamp"]) < last_sweep_at)
+            )
+            if behind:
+                self._write_snapshot(user["user_id"], user, now)
+                stats["snapshots_written"] += 1
+
+        for base in self.snapshots.aggregate([
+            {"$match": {"timestamp": {"$lte": cutoff}}},
+            {"$group": {"_id": "$user_id", "seq": {"$max": "$seq"}, "timestamp": {"$max": "$timestamp"}}}
+        ], allowDiskUse=True):
+            user_id = base["_id"]
+            stats["snapshots_deleted"] += self.snapshots.delete_many(
+                {"user_id": user_id, "timestamp": {"$lt": base["timestamp"]}}
+            ).deleted_count
+            stats["events_deleted"] += self.events.delete_many(
+                {"user_id": user_id, "seq": {"$lte": base["seq"]}}
+            ).deleted_count
+
+        oldest = self.snapshots.find_one({}, sort=[("timestamp", 1)])
+        if oldest:
+            stats["sweeps_deleted"] = self.events.delete_many(
+                {"type": EVENT_DECAY_SWEEP, "timestamp": {"$lte": oldest["timestamp"]}}
+            ).deleted_count
+
+        stats["duration_ms"] = (time.perf_counter() - start) * 1000
+        self.last_compaction = stats
+        logger.info(f"Balance ledger compaction completed: {stats}")
+        return stats
+
+
+class BalanceCompactionScheduler:
+    """Scheduler that compacts the balance ledger at a fixed interval"""
+
+    def __init__(self, ledger: Optional[BalanceLedger] = None, config: Optional[dict] = None):
+        """Initialize the compaction scheduler"""
+        self.config = config or {}
+        self.ledger = ledger or BalanceLedger()
+        self.interval_seconds = self.config.get("interval_seconds", BALANCE_COMPACTION_INTERVAL_SECONDS)
+        self.enabled = self.config.get("enabled", BALANCE_COMPACTION_ENABLED)
+        self.running = False
+        self.task = None
+
+    async def start_scheduler(self):
+        """Start the compaction scheduler"""
+        if not self.enabled:
+            logger.info("Balance ledger compaction is disabled")
+            return
+
+        self.running = True
+        logger.info(f"Balance ledger compaction started, running every {self.interval_seconds} seconds")
+
+        while self.running:
+            await asyncio.sleep(self.interval_seconds)
+            await self._perform_compaction()
+
+    async def _perform_compaction(self):
+        """Run one compaction off the event loop"""
+        try:
+            await asyncio.to_thread(self.ledger.compact)
+        except Exception as e:
+            logger.error(f"Error during balance ledger compaction: {str(e)}")
+
+    def stop_scheduler(self):
+        """Stop the compaction scheduler"""
+        self.running = False
+        if self.task:
+            self.task.cancel()
+        logger.info("Balance ledger compaction stopped")
+
+# Global instances
+balance_ledger = BalanceLedger()
+balance_compaction_scheduler = BalanceCompactionScheduler(balance_ledger)
+
+# Convenience functions
+def apply_balance_change(user_id: str, deltas: Dict[str, float], source: str,
+                         ref: Optional[str] = None, fields: Optional[Dict[str, Any]] = None) -> Optional[Dict]:
+    """Apply and record a balance change"""
+    return balance_ledger.apply(user_id, deltas, source, ref, fields)
+
+def reset_balances(user_id: str, balances: Dict[str, Any], source: str,
+                   ref: Optional[str] = None, fields: Optional[Dict[str, Any]] = None) -> Optional[Dict]:
+    """Replace and record a user's balances"""
+    return balance_ledger.reset(user_id, balances, source, ref, fields)
+
+def get_balance_at(user_id: str, at: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    """Reconstruct a user's balances at a point in time"""
+    return balance_ledger.get_balance_at(user_id, at)
+
+def start_balance_compaction_scheduler():
+    """Start the compaction scheduler as a background task"""
+    balance_compaction_scheduler.task = asyncio.create_task(balance_compaction_scheduler.start_scheduler())
+    return balance_compaction_scheduler.task
+
+def stop_balance_compaction_scheduler():
+    """Stop the compaction scheduler"""
+    balance_compaction_scheduler.stop_scheduler()
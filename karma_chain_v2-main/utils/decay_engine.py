@@ -0,0 +1,347 @@
+"""
+Karma Decay Engine
+
+Applies time-based token decay and expiry outside of the request path.
+
+Decay is exponential (balance * (1 - daily_decay) ** days), so applying it in
+several steps gives the same result as applying it once. That lets the engine
+split the work in two:
+
+1. Scheduled sweeps materialize decay and expiry for every user in chunks,
+   using server-side pipeline updates so balances never leave the database.
+2. Reads between sweeps compute the decayed balances lazily in closed form
+   from ``last_decay`` without writing anything back.
+
+Decay is retroactive: a balance is decayed for the whole time since
+``last_decay``, not from when it is next read or swept. A sweep that is late
+or skipped loses nothing, and a read always shows the balance as of now. A
+user without ``last_decay`` is decayed from ``created_at``. If that is missing
+too, the next sweep starts the clock by writing ``last_decay``.
+"""
+
+import asyncio
+import copy
+import logging
+import time
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+from config import TOKEN_ATTRIBUTES, DECAY_SWEEP_CHUNK_SIZE, DECAY_SWEEP_INTERVAL_SECONDS, DECAY_SWEEP_ENABLED
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Dates stored as strings sort before every BSON date, so comparing against
+# this floor tells real dates apart from legacy string values in a pipeline.
+_DATE_FLOOR = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MS_PER_DAY = 86400000.0
+
+# Users whose decay anchor the server-side pipeline can do date arithmetic on:
+# last_decay is a date, or it is unset and created_at is a date or unset.
+# Everyone else is swept by DecayEngine._sweep_legacy.
+_PIPELINE_FILTER = {"$or": [
+    {"last_decay": {"$type": "date"}},
+    {"last_decay": None, "$or": [{"created_at": {"$type": "date"}}, {"created_at": None}]}
+]}
+
+
+def now_utc():
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value, default: datetime) -> datetime:
+    if value is None:
+        return default
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    # Ensure timezone-aware datetime
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def decay_factor(daily_decay: float, days: float) -> float:
+    """Closed-form decay multiplier for a number of elapsed days"""
+    if daily_decay <= 0 or days <= 0:
+        return 1.0
+    return (1 - daily_decay) ** days
+
+
+def decay_anchor(user_doc: Dict, now: datetime) -> datetime:
+    """When decay was last materialized: ``last_decay``, else ``created_at``, else now"""
+    return _as_utc(user_doc.get("last_decay") or user_doc.get("created_at"), now)
+
+
+def compute_decayed_state(user_doc: Dict, now: Optional[datetime] = None) -> Tuple[Dict, Dict, bool]:
+    """
+    Compute decayed balances and token metadata for a user without writing.
+
+    Args:
+        user_doc (dict): User document from database
+        now (datetime, optional): Evaluation time, defaults to the current time
+
+    Returns:
+        tuple: (balances, token_meta, changed) where changed is False when no
+        time has elapsed since the last decay
+    """
+    now = now or now_utc()
+    last_decay = decay_anchor(user_doc, now)
+    delta_days = (now - last_decay).total_seconds() / 86400.0
+    balances = copy.deepcopy(user_doc.get("balances", {}))
+    meta = copy.deepcopy(user_doc.get("token_meta", {}))
+    if delta_days <= 0:
+        return balances, meta, False
+
+    for token, attrs in TOKEN_ATTRIBUTES.items():
+        decay_rate = attrs.get("daily_decay", 0.0)
+        if decay_rate > 0 and balances.get(token, 0) > 0:
+            balances[token] = max(balances[token] * decay_factor(decay_rate, delta_days), 0.0)
+
+        created = _as_utc(meta.get(token, {}).get("created_at"), now)
+        expiry_days = attrs.get("expiry_days", None)
+        if expiry_days:
+            if (now - created).days >= expiry_days:
+                balances[token] = 0.0
+
+        meta.setdefault(token, {})["last_update"] = now
+
+    return balances, meta, True
+
+
+def lazy_decay(user_doc: Dict, now: Optional[datetime] = None) -> Dict:
+    """
+    Return a copy of a user document with decay and expiry applied in closed form.
+
+    The stored document is not modified and ``last_decay`` is left untouched,
+    so the next sweep still decays from the last materialized point.
+
+    Args:
+        user_doc (dict): User document from database
+        now (datetime, optional): Evaluation time
+
+    Returns:
+        dict: User document view with decayed balances
+    """
+    if not user_doc:
+        return user_doc
+    balances, _, _ = compute_decayed_state(user_doc, now)
+    view = dict(user_doc)
+    view["balances"] = balances
+    return view
+
+
+class DecayEngine:
+    """Chunked, server-side decay and expiry sweeps over the users collection"""
+
+    def __init__(self, collection=None, chunk_size: int = DECAY_SWEEP_CHUNK_SIZE):
+        """
+        Initialize the decay engine.
+
+        Args:
+            collection: Users collection, defaults to database.users_col
+            chunk_size (int): Number of users updated per bulk operation
+        """
+        self._collection = collection
+        self.chunk_size = chunk_size
+        self.last_sweep: Optional[Dict[str, Any]] = None
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            from database import users_col
+            return users_col
+        return self._collection
+
+    def build_pipeline(self, now: datetime) -> List[Dict[str, Any]]:
+        """
+        Build the update pipeline that applies decay and expiry server-side.
+
+        Args:
+            now (datetime): Sweep time
+
+        Returns:
+            list: Aggregation pipeline for update_many
+        """
+        # Same anchor as decay_anchor: last_decay, else created_at, else now
+        anchor = {"$ifNull": ["$last_decay", {"$ifNull": ["$created_at", now]}]}
+        elapsed_days = {"$max": [0, {"$divide": [
+            {"$subtract": [now, anchor]}, _MS_PER_DAY
+        ]}]}
+
+        updates: Dict[str, Any] = {}
+        for token, attrs in TOKEN_ATTRIBUTES.items():
+            decay_rate = attrs.get("daily_decay", 0.0)
+            expiry_days = attrs.get("expiry_days", None)
+            balance = f"$balances.{token}"
+
+            value: Any = balance
+            if decay_rate > 0:
+                value = {"$cond": [
+                    {"$gt": [balance, 0]},
+                    {"$max": [{"$multiply": [balance, {"$pow": [1 - decay_rate, elapsed_days]}]}, 0.0]},
+                    balance
+                ]}
+            if expiry_days:
+                created = {"$ifNull": [f"$token_meta.{token}.created_at", now]}
+                value = {"$cond": [
+                    {"$and": [
+                        {"$gte": [created, _DATE_FLOOR]},
+                        {"$lte": [created, now - timedelta(days=expiry_days)]}
+                    ]},
+                    0.0,
+                    value
+                ]}
+            if value is not balance:
+                updates[f"balances.{token}"] = value
+            updates[f"token_meta.{token}.last_update"] = now
+
+        updates["last_decay"] = now
+        return [{"$set": updates}]
+
+    def _sweep_legacy(self, ids: List[Any], now: datetime) -> int:
+        """
+        Decay users whose decay anchor is not stored as a date.
+
+        These are legacy documents written before timestamps were normalized,
+        so they are rare and handled client-side one at a time.
+        """
+        updated = 0
+        for user_doc in self.collection.find(
+            {"_id": {"$in": ids}, "$nor": [_PIPELINE_FILTER]},
+            {"balances": 1, "token_meta": 1, "last_decay": 1, "created_at": 1}
+        ):
+            balances, meta, changed = compute_decayed_state(user_doc, now)
+            if not changed:
+                continue
+            self.collection.update_one(
+                {"_id": user_doc["_id"]},
+                {"$set": {"balances": balances, "token_meta": meta, "last_decay": now}}
+            )
+            updated += 1
+        return updated
+
+    def _record_in_ledger(self, now: datetime):
+        """Mark the sweep in the balance ledger so point-in-time replays include it"""
+        if self._collection is not None:
+            # Only sweeps over the live users collection belong in the ledger
+            return
+        try:
+            from utils.balance_ledger import balance_ledger
+            balance_ledger.record_decay_sweep(now)
+        except Exception as e:
+            logger.warning(f"Failed to record decay sweep in balance ledger: {e}")
+
+    def _refresh_predictions(self):
+        """Reload prediction features, since the sweep changed every stored balance"""
+        if self._collection is not None:
+            return
+        try:
+            from utils.prediction_service import prediction_service
+            prediction_service.reload_loaded_users()
+        except Exception as e:
+            logger.warning(f"Failed to refresh prediction service after decay sweep: {e}")
+
+    def run_sweep(self, now: Optional[datetime] = None, chunk_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Apply decay and expiry to every user in chunks.
+
+        Args:
+            now (datetime, optional): Sweep time, defaults to the current time
+            chunk_size (int, optional): Overrides the configured chunk size
+
+        Returns:
+            dict: Sweep statistics
+        """
+        now = now or now_utc()
+        chunk_size = chunk_size or self.chunk_size
+        pipeline = self.build_pipeline(now)
+        start = time.perf_counter()
+        stats = {
+            "started_at": now.isoformat(),
+            "chunks": 0,
+            "users_scanned": 0,
+            "users_updated": 0,
+            "legacy_users_updated": 0
+        }
+
+        last_id = None
+        while True:
+            query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+            ids = [doc["_id"] for doc in self.collection.find(query, {"_id": 1}).sort("_id", 1).limit(chunk_size)]
+            if not ids:
+                break
+            last_id = ids[-1]
+
+            result = self.collection.update_many(
+                {"_id": {"$in": ids}, **_PIPELINE_FILTER},
+                pipeline
+            )
+            stats["chunks"] += 1
+            stats["users_scanned"] += len(ids)
+            stats["users_updated"] += result.modified_count
+            stats["legacy_users_updated"] += self._sweep_legacy(ids, now)
+
+        stats["duration_ms"] = (time.perf_counter() - start) * 1000
+        self.last_sweep = stats
+        self._record_in_ledger(now)
+        self._refresh_predictions()
+        logger.info(f"Decay sweep completed: {stats}")
+        return stats
+
+
+class DecayScheduler:
+    """Scheduler that runs decay sweeps at a fixed interval"""
+
+    def __init__(self, engine: Optional[DecayEngine] = None, config: Optional[dict] = None):
+        """Initialize the decay scheduler"""
+        self.config = config or {}
+        self.engine = engine or DecayEngine()
+        self.interval_seconds = self.config.get("interval_seconds", DECAY_SWEEP_INTERVAL_SECONDS)
+        self.enabled = self.config.get("enabled", DECAY_SWEEP_ENABLED)
+        self.running = False
+        self.task = None
+
+    async def start_scheduler(self):
+        """Start the decay sweep scheduler"""
+        if not self.enabled:
+            logger.info("Decay scheduler is disabled")
+            return
+
+        self.running = True
+        logger.info(f"Decay scheduler started, sweeping every {self.interval_seconds} seconds")
+
+        while self.running:
+            await self._perform_sweep()
+            await asyncio.sleep(self.interval_seconds)
+
+    async def _perform_sweep(self):
+        """Run one sweep off the event loop"""
+        try:
+            await asyncio.to_thread(self.engine.run_sweep)
+        except Exception as e:
+            logger.error(f"Error during decay sweep: {str(e)}")
+
+    def stop_scheduler(self):
+        """Stop the decay sweep scheduler"""
+        self.running = False
+        if self.task:
+            self.task.cancel()
+        logger.info("Decay scheduler stopped")
+
+# Global instances
+decay_engine = DecayEngine()
+decay_scheduler = DecayScheduler(decay_engine)
+
+# Convenience functions
+def run_decay_sweep(now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Run a decay sweep over all users"""
+    return decay_engine.run_sweep(now)
+
+def start_decay_scheduler():
+    """Start the decay scheduler as a background task"""
+    decay_scheduler.task = asyncio.create_task(decay_scheduler.start_scheduler())
+    return decay_scheduler.task
+
+def stop_decay_scheduler():
+    """Stop the decay scheduler"""
+    decay_scheduler.stop_scheduler()
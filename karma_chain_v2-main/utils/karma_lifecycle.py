@@ -11,6 +11,8 @@ from config import LOKA_THRESHOLDS, KARMA_FACTORS
 from utils.event_bus import EventBus, Channel, publish_karma_lifecycle
 from utils.sovereign_bridge import emit_karma_signal, SignalType
 from utils.karma_engine import compute_karma
+from utils.karma_stats import record_user_created
+from utils.balance_ledger import apply_balance_change, balance_ledger
 
 class KarmaLifecycleEngine:
     """Manages the karmic lifecycle of users in the KarmaChain system"""
@@ -52,13 +54,14 @@ class KarmaLifecycleEngine:
         
         balances = user.get("balances", {})
         current_prarabdha = balances.get("PrarabdhaKarma", 0.0)
-        new_prarabdha = current_prarabdha + increment
         
-        # Update the user's Prarabdha karma
-        users_col.update_one(
-            {"user_id": user_id},
-            {"$set": {"balances.PrarabdhaKarma": new_prarabdha}}
-        )
+        # Update the user's Prarabdha karma as a ledger increment, so concurrent
+        # updates are not lost and the change is replayable
+        updated = apply_balance_change(user_id, {"PrarabdhaKarma": increment}, "prarabdha_update")
+        if updated:
+            new_prarabdha = updated.get("balances", {}).get("PrarabdhaKarma", 0.0)
+        else:
+            new_prarabdha = current_prarabdha + increment
         
         # Emit prarabdha update to Sovereign Core for authorization
         event_metadata = {
@@ -333,6 +336,12 @@ class KarmaLifecycleEngine:
         
         # Insert new user into database
         users_col.insert_one(new_user)
+        record_user_created()
+        # Anchor the new user's balance history at the inherited balances
+        try:
+            balance_ledger.snapshot_user(new_user_id)
+        except Exception as e:
+            print(f"Failed to snapshot inherited balances for {new_user_id}: {e}")
         
         # Mark original user as deceased
         users_col.update_one(
@@ -471,6 +480,7 @@ def simulate_lifecycle_cycles(cycles: int = 50, initial_users: int = 10) -> Dict
             "created_at": datetime.now(timezone.utc)
         }
         users_col.insert_one(initial_user)
+        record_user_created()
         initial_user_ids.append(user_id)
     
     # Track simulation statistics
@@ -0,0 +1,337 @@
+"""
+Materialized Karma Statistics
+
+Keeps karma statistics as counters that are updated on every transaction,
+atonement and user write, so stats endpoints are answered with a single read
+instead of counting whole collections.
+
+Per-user counters live on the user document under ``action_stats`` and the
+system-wide counters live in a single ``karma_stats`` document. Counters are
+best effort on the write path; a periodic reconciliation sweep recomputes them
+from the source collections and corrects any drift.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, Tuple
+
+from config import STATS_RECONCILE_ENABLED, STATS_RECONCILE_INTERVAL_SECONDS
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+GLOBAL_STATS_ID = "global"
+USER_COUNTERS = ["total_actions", "pending_atonements", "completed_atonements"]
+GLOBAL_COUNTERS = ["total_users", "total_actions", "total_atonements"]
+
+
+def now_utc():
+    return datetime.now(timezone.utc)
+
+
+class KarmaStatsEngine:
+    """Incrementally maintained per-user and global karma statistics"""
+
+    def __init__(self, users=None, transactions=None, atonements=None, stats=None):
+        """
+        Initialize the statistics engine.
+
+        Collections default to the ones in database.py and are resolved lazily
+        so tests and benchmarks can pass their own.
+        """
+        self._users = users
+        self._transactions = transactions
+        self._atonements = atonements
+        self._stats = stats
+        self.last_reconcile: Optional[Dict[str, Any]] = None
+
+    @property
+    def users(self):
+        if self._users is None:
+            from database import users_col
+            return users_col
+        return self._users
+
+    @property
+    def transactions(self):
+        if self._transactions is None:
+            from database import transactions_col
+            return transactions_col
+        return self._transactions
+
+    @property
+    def atonements(self):
+        if self._atonements is None:
+            from database import atonements_col
+            return atonements_col
+        return self._atonements
+
+    @property
+    def stats(self):
+        if self._stats is None:
+            from database import karma_stats_col
+            return karma_stats_col
+        return self._stats
+
+    # ------------------------------------------------------------------
+    # Write path
+    # ------------------------------------------------------------------
+
+    def _inc_user(self, user_id: str, changes: Dict[str, int]):
+        self.users.update_one(
+            {"user_id": user_id},
+            {"$inc": {f"action_stats.{k}": v for k, v in changes.items()}}
+        )
+
+    def _inc_global(self, changes: Dict[str, int]):
+        self.stats.update_one(
+            {"_id": GLOBAL_STATS_ID},
+            {"$inc": changes, "$set": {"updated_at": now_utc()}},
+            upsert=True
+        )
+
+    def _safely(self, description: str, func, *args):
+        # Counters must never fail the write they describe; reconciliation repairs drift
+        try:
+            func(*args)
+        except Exception as e:
+            logger.warning(f"Failed to update karma stats for {description}: {e}")
+
+    def record_transaction(self, user_id: str, include_user: bool = True):
+        """
+        Count a new transaction.
+
+        Args:
+            user_id (str): Owner of the transaction
+            include_user (bool): False when the caller already incremented
+                ``action_stats.total_actions`` in its own user update
+        """
+        if include_user:
+            self._safely(f"transaction of {user_id}", self._inc_user, user_id, {"total_actions": 1})
+        self._safely("transaction totals", self._inc_global, {"total_actions": 1})
+
+    def record_atonement_created(self, user_id: str):
+        """Count a new pending atonement plan"""
+        self._safely(f"atonement of {user_id}", self._inc_user, user_id, {"pending_atonements": 1})
+        self._safely("atonement totals", self._inc_global, {"total_atonements": 1})
+
+    def record_atonement_completed(self, user_id: str):
+        """Move an atonement plan from pending to completed"""
+        self._safely(f"atonement of {user_id}", self._inc_user, user_id,
+                     {"pending_atonements": -1, "completed_atonements": 1})
+
+    def record_user_created(self, count: int = 1):
+        """Count newly created users"""
+        self._safely("user totals", self._inc_global, {"total_users": count})
+
+    # ------------------------------------------------------------------
+    # Read path
+    # ------------------------------------------------------------------
+
+    def _count_user(self, user_id: str) -> Dict[str, int]:
+        return {
+            "total_actions": self.transactions.count_documents({"user_id": user_id}),
+            "pending_atonements": self.atonements.count_documents({"user_id": user_id, "status": "pending"}),
+            "completed_atonements": self.atonements.count_documents({"user_id": user_id, "status": "completed"}),
+        }
+
+    def get_user_stats(self, user_id: str) -> Tuple[Optional[Dict], Dict[str, int]]:
+        """
+        Get a user document and their action statistics in one read.
+
+        Users that have never been reconciled are counted once and backfilled.
+
+        Args:
+            user_id (str): The user's ID
+
+        Returns:
+            tuple: (user_doc or None, action_stats)
+        """
+        user = self.users.find_one({"user_id": user_id})
+        if not user:
+            return None, {}
+        action_stats = user.get("action_stats") or {}
+        if "reconciled_at" not in action_stats:
+            counts = self._count_user(user_id)
+            self._safely(f"backfill of {user_id}", self.users.update_one,
+                         {"user_id": user_id},
+                         {"$set": {"action_stats": {**counts, "reconciled_at": now_utc()}}})
+            action_stats = counts
+        return user, {k: max(0, int(action_stats.get(k, 0))) for k in USER_COUNTERS}
+
+    def _count_global(self) -> Dict[str, int]:
+        return {
+            "total_users": self.users.count_documents({}),
+            "total_actions": self.transactions.count_documents({}),
+            "total_atonements": self.atonements.count_documents({}),
+        }
+
+    def get_system_stats(self) -> Dict[str, int]:
+        """
+        Get system-wide statistics from the materialized document.
+
+        Returns:
+            dict: total_users, total_actions and total_atonements
+        """
+        doc = self.stats.find_one({"_id": GLOBAL_STATS_ID})
+        if not doc or "reconciled_at" not in doc:
+            counts = self._count_global()
+            self._safely("global backfill", self.stats.update_one,
+                         {"_id": GLOBAL_STATS_ID},
+                         {"$set": {**counts, "reconciled_at": now_utc(), "updated_at": now_utc()}},
+                         True)
+            return counts
+        return {k: max(0, int(doc.get(k, 0))) for k in GLOBAL_COUNTERS}
+
+    # ------------------------------------------------------------------
+    # Reconciliation
+    # ------------------------------------------------------------------
+
+    def reconcile(self, chunk_size: int = 1000) -> Dict[str, Any]:
+        """
+        Recompute every counter from the source collections and fix drift.
+
+        Counts are grouped server-side; only users whose stored counters differ
+        are written. Increments that land while the sweep runs may be off by
+        one until the next sweep.
+
+        Args:
+            chunk_size (int): Users read per batch
+
+        Returns:
+            dict: Reconciliation statistics
+        """
+        start = time.perf_counter()
+        reconciled_at = now_utc()
+
+        actions = {
+            row["_id"]: row["count"]
+            for row in self.transactions.aggregate([
+                {"$group": {"_id": "$user_id", "count": {"$sum": 1}}}
+            ], allowDiskUse=True)
+        }
+        atonement_counts: Dict[str, Dict[str, int]] = {}
+        total_atonements = 0
+        for row in self.atonements.aggregate([
+            {"$group": {"_id": {"user_id": "$user_id", "status": "$status"}, "count": {"$sum": 1}}}
+        ], allowDiskUse=True):
+            total_atonements += row["count"]
+            key = row["_id"]
+            atonement_counts.setdefault(key.get("user_id"), {})[key.get("status")] = row["count"]
+
+        users_scanned = 0
+        users_corrected = 0
+        cursor = self.users.find({}, {"user_id": 1, "action_stats": 1})
+        if hasattr(cursor, "batch_size"):
+            cursor = cursor.batch_size(chunk_size)
+        for user in cursor:
+            users_scanned += 1
+            user_id = user.get("user_id")
+            per_status = atonement_counts.get(user_id, {})
+            expected = {
+                "total_actions": actions.get(user_id, 0),
+                "pending_atonements": per_status.get("pending", 0),
+                "completed_atonements": per_status.get("completed", 0),
+            }
+            stored = user.get("action_stats") or {}
+            if "reconciled_at" in stored and all(stored.get(k) == v for k, v in expected.items()):
+                continue
+            self.users.update_one(
+                {"_id": user["_id"]},
+                {"$set": {"action_stats": {**expected, "reconciled_at": reconciled_at}}}
+            )
+            users_corrected += 1
+
+        totals = {
+            "total_users": users_scanned,
+            "total_actions": sum(actions.values()),
+            "total_atonements": total_atonements,
+        }
+        self.stats.update_one(
+            {"_id": GLOBAL_STATS_ID},
+            {"$set": {**totals, "reconciled_at": reconciled_at, "updated_at": reconciled_at}},
+            upsert=True
+        )
+
+        result = {
+            "reconciled_at": reconciled_at.isoformat(),
+            "users_scanned": users_scanned,
+            "users_corrected": users_corrected,
+            "totals": totals,
+            "duration_ms": (time.perf_counter() - start) * 1000
+        }
+        self.last_reconcile = result
+        logger.info(f"Karma stats reconciliation completed: {result}")
+        return result
+
+
+class StatsReconcileScheduler:
+    """Scheduler that reconciles materialized statistics at a fixed interval"""
+
+    def __init__(self, engine: Optional[KarmaStatsEngine] = None, config: Optional[dict] = None):
+        """Initialize the reconciliation scheduler"""
+        self.config = config or {}
+        self.engine = engine or KarmaStatsEngine()
+        self.interval_seconds = self.config.get("interval_seconds", STATS_RECONCILE_INTERVAL_SECONDS)
+        self.enabled = self.config.get("enabled", STATS_RECONCILE_ENABLED)
+        self.running = False
+        self.task = None
+
+    async def start_scheduler(self):
+        """Start the reconciliation scheduler"""
+        if not self.enabled:
+            logger.info("Karma stats reconciliation is disabled")
+            return
+
+        self.running = True
+        logger.info(f"Karma stats reconciliation started, running every {self.interval_seconds} seconds")
+
+        while self.running:
+            await self._perform_reconcile()
+            await asyncio.sleep(self.interval_seconds)
+
+    async def _perform_reconcile(self):
+        """Run one reconciliation off the event loop"""
+        try:
+            await asyncio.to_thread(self.engine.reconcile)
+        except Exception as e:
+            logger.error(f"Error during karma stats reconciliation: {str(e)}")
+
+    def stop_scheduler(self):
+        """Stop the reconciliation scheduler"""
+        self.running = False
+        if self.task:
+            self.task.cancel()
+        logger.info("Karma stats reconciliation stopped")
+
+# Global instances
+karma_stats = KarmaStatsEngine()
+stats_reconcile_scheduler = StatsReconcileScheduler(karma_stats)
+
+# Convenience functions
+def record_transaction(user_id: str, include_user: bool = True):
+    """Count a new transaction"""
+    karma_stats.record_transaction(user_id, include_user)
+
+def record_atonement_created(user_id: str):
+    """Count a new pending atonement plan"""
+    karma_stats.record_atonement_created(user_id)
+
+def record_atonement_completed(user_id: str):
+    """Move an atonement plan from pending to completed"""
+    karma_stats.record_atonement_completed(user_id)
+
+def record_user_created(count: int = 1):
+    """Count newly created users"""
+    karma_stats.record_user_created(count)
+
+def start_stats_reconcile_scheduler():
+    """Start the reconciliation scheduler as a background task"""
+    stats_reconcile_scheduler.task = asyncio.create_task(stats_reconcile_scheduler.start_scheduler())
+    return stats_reconcile_scheduler.task
+
+def stop_stats_reconcile_scheduler():
+    """Stop the reconciliation scheduler"""
+    stats_reconcile_scheduler.stop_scheduler()
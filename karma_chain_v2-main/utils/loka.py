@@ -1,5 +1,6 @@
 from config import LOKA_THRESHOLDS
 from utils.merit import compute_user_merit_score
+from utils.balance_ledger import reset_balances
 
 def calculate_net_karma(user):
     """
@@ -116,6 +117,7 @@ def apply_rebirth(user_id, carryover):
     Returns:
         dict: Updated user document
     """
+    from datetime import datetime, timezone
     from database import users_col
     
     # Get the user
@@ -147,19 +149,13 @@ def apply_rebirth(user_id, carryover):
         new_balances["PaapTokens"]["medium"] = paap_per_category
         new_balances["PaapTokens"]["maha"] = paap_per_category
     
-    # Update user with new state
-    users_col.update_one(
-        {"user_id": user_id},
-        {
-            "$set": {
-                "balances": new_balances,
-                "role": carryover["starting_level"],
-                "rebirth_count": user.get("rebirth_count", 0) + 1,
-                "last_rebirth": {"timestamp": datetime.now(timezone.utc), "carryover": carryover}
-            },
-            "$unset": {"atonement_plans": ""}  # Clear atonement plans
-        }
-    )
+    # Update user with new state; the balance reset is recorded in the ledger
+    reset_balances(user_id, new_balances, "rebirth", fields={
+        "role": carryover["starting_level"],
+        "rebirth_count": user.get("rebirth_count", 0) + 1,
+        "last_rebirth": {"timestamp": datetime.now(timezone.utc), "carryover": carryover}
+    })
+    users_col.update_one({"user_id": user_id}, {"$unset": {"atonement_plans": ""}})  # Clear atonement plans
     
     # Return updated user
     return users_col.find_one({"user_id": user_id})
\ No newline at end of file
@@ -0,0 +1,564 @@
+"""
+Karma Prediction Service
+
+This module provides batched, cached inference on top of the Agami and karmic
+predictors. Instead of re-deriving features from the raw user document on every
+request, the service keeps a per-user feature matrix that is updated
+incrementally as karma events arrive, scores any set of users with vectorized
+numpy operations, and caches full predictions until the user's state changes.
+
+Every balance write goes through utils.balance_ledger, which notifies this
+service; Q-learning updates install the new Q-table here as it is saved, and
+decay sweeps reload the loaded rows, so cached predictions never outlive the
+state they were computed from.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Iterable
+
+import numpy as np
+
+from config import ACTIONS, ROLE_SEQUENCE, REWARD_MAP, LEVEL_THRESHOLDS, TOKEN_ATTRIBUTES
+from utils.event_bus import EventBusMessage, subscribe_to_karma_feedback, subscribe_to_karma_lifecycle
+
+logger = logging.getLogger(__name__)
+
+# Column layout of the feature matrix
+FEATURES = [
+    "DharmaPoints",
+    "SevaPoints",
+    "PunyaTokens",
+    "Paap.minor",
+    "Paap.medium",
+    "Paap.maha",
+    "DridhaKarma",
+    "AdridhaKarma",
+    "SanchitaKarma",
+    "PrarabdhaKarma",
+    "Rnanubandhan.total",
+    "Rnanubandhan.weighted",
+]
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURES)}
+N_FEATURES = len(FEATURES)
+
+# Linear weights shared with utils.merit / utils.loka / utils.paap
+MERIT_WEIGHTS = np.zeros(N_FEATURES)
+MERIT_WEIGHTS[FEATURE_INDEX["DharmaPoints"]] = 1.0
+MERIT_WEIGHTS[FEATURE_INDEX["SevaPoints"]] = 1.2
+MERIT_WEIGHTS[FEATURE_INDEX["PunyaTokens"]] = 3.0
+
+PAAP_WEIGHTS = np.zeros(N_FEATURES)
+for _severity, _attrs in TOKEN_ATTRIBUTES["PaapTokens"].items():
+    PAAP_WEIGHTS[FEATURE_INDEX[f"Paap.{_severity}"]] = _attrs["multiplier"]
+
+WEIGHTED_KARMA_WEIGHTS = np.zeros(N_FEATURES)
+for _karma_type in ["DridhaKarma", "AdridhaKarma", "SanchitaKarma", "PrarabdhaKarma"]:
+    WEIGHTED_KARMA_WEIGHTS[FEATURE_INDEX[_karma_type]] = TOKEN_ATTRIBUTES[_karma_type].get("weight", 1.0)
+WEIGHTED_KARMA_WEIGHTS[FEATURE_INDEX["Rnanubandhan.weighted"]] = 1.0
+
+_ROLE_THRESHOLDS = sorted(LEVEL_THRESHOLDS.items(), key=lambda x: x[1])
+_THRESHOLD_VALUES = np.array([thr for _, thr in _ROLE_THRESHOLDS], dtype=float)
+_THRESHOLD_ROLES = [role for role, _ in _ROLE_THRESHOLDS]
+
+
+def _as_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def extract_features(user_doc: Dict) -> np.ndarray:
+    """
+    Build the feature vector for a single user document.
+
+    Args:
+        user_doc (dict): User document from database
+
+    Returns:
+        np.ndarray: Feature vector laid out as FEATURES
+    """
+    vector = np.zeros(N_FEATURES)
+    balances = user_doc.get("balances", {}) or {}
+
+    for token in ["DharmaPoints", "SevaPoints", "PunyaTokens",
+                  "DridhaKarma", "AdridhaKarma", "SanchitaKarma", "PrarabdhaKarma"]:
+        vector[FEATURE_INDEX[token]] = _as_float(balances.get(token, 0))
+
+    paap_tokens = balances.get("PaapTokens", {})
+    if isinstance(paap_tokens, dict):
+        for severity in TOKEN_ATTRIBUTES["PaapTokens"]:
+            vector[FEATURE_INDEX[f"Paap.{severity}"]] = _as_float(paap_tokens.get(severity, 0))
+
+    rnanubandhan = balances.get("Rnanubandhan", {})
+    if isinstance(rnanubandhan, dict):
+        for severity, amount in rnanubandhan.items():
+            amount_val = _as_float(amount)
+            multiplier = TOKEN_ATTRIBUTES["Rnanubandhan"].get(severity, {}).get("multiplier", 1.0)
+            vector[FEATURE_INDEX["Rnanubandhan.total"]] += amount_val
+            vector[FEATURE_INDEX["Rnanubandhan.weighted"]] += amount_val * multiplier
+
+    return vector
+
+
+def _role_index(role: Optional[str]) -> int:
+    return ROLE_SEQUENCE.index(role) if role in ROLE_SEQUENCE else 0
+
+
+def roles_from_merit(merit_scores: np.ndarray) -> List[str]:
+    """Vectorized equivalent of utils.merit.determine_role_from_merit"""
+    positions = np.searchsorted(_THRESHOLD_VALUES, merit_scores, side="right") - 1
+    positions = np.clip(positions, 0, len(_THRESHOLD_ROLES) - 1)
+    return [_THRESHOLD_ROLES[p] for p in positions]
+
+
+class KarmaPredictionService:
+    """Incremental feature store with vectorized scoring and a prediction cache"""
+
+    def __init__(self, initial_capacity: int = 1024, cache_size: int = 10000):
+        """
+        Initialize the prediction service.
+
+        Args:
+            initial_capacity (int): Number of user rows to pre-allocate
+            cache_size (int): Maximum number of cached full predictions
+        """
+        self.lock = threading.RLock()
+        self._features = np.zeros((initial_capacity, N_FEATURES))
+        self._roles = np.zeros(initial_capacity, dtype=np.int8)
+        self._index: Dict[str, int] = {}
+        self._user_ids: List[str] = []
+
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Role index each cached prediction was computed for, so a Q-table
+        # update only drops predictions for the roles whose Q-values changed
+        self._cache_roles: Dict[str, int] = {}
+        # Bumped on every invalidation so a prediction computed while its
+        # user was invalidated is not cached
+        self._cache_generation = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        self._q_table = np.zeros((len(ROLE_SEQUENCE), len(ACTIONS)))
+        self._role_deltas = np.zeros((len(ROLE_SEQUENCE), N_FEATURES))
+        self._confidence = 0.0
+        self.set_q_table(self._q_table)
+
+    # ------------------------------------------------------------------
+    # Feature store
+    # ------------------------------------------------------------------
+
+    def _ensure_capacity(self, rows: int):
+        capacity = self._features.shape[0]
+        if rows <= capacity:
+            return
+        new_capacity = max(rows, capacity * 2)
+        features = np.zeros((new_capacity, N_FEATURES))
+        features[:capacity] = self._features
+        roles = np.zeros(new_capacity, dtype=np.int8)
+        roles[:capacity] = self._roles
+        self._features = features
+        self._roles = roles
+
+    def _row_for(self, user_id: str) -> int:
+        row = self._index.get(user_id)
+        if row is None:
+            row = len(self._user_ids)
+            self._ensure_capacity(row + 1)
+            self._index[user_id] = row
+            self._user_ids.append(user_id)
+        return row
+
+    def upsert_user(self, user_doc: Dict):
+        """
+        Replace a user's feature row from their current document.
+
+        Args:
+            user_doc (dict): User document from database
+        """
+        user_id = user_doc["user_id"]
+        vector = extract_features(user_doc)
+        with self.lock:
+            row = self._row_for(user_id)
+            self._features[row] = vector
+            self._roles[row] = _role_index(user_doc.get("role"))
+            self._drop_cached(user_id)
+
+    def load_users(self, user_docs: Iterable[Dict]) -> int:
+        """
+        Bulk-load a population of user documents.
+
+        Args:
+            user_docs (iterable): User documents
+
+        Returns:
+            int: Number of users loaded
+        """
+        count = 0
+        for user_doc in user_docs:
+            if "user_id" not in user_doc:
+                continue
+            self.upsert_user(user_doc)
+            count += 1
+        return count
+
+    def warm_from_db(self, batch_size: int = 1000) -> int:
+        """Load every user from the users collection into the feature store"""
+        from database import users_col
+        cursor = users_col.find({}, {"user_id": 1, "role": 1, "balances": 1})
+        if hasattr(cursor, "batch_size"):
+            cursor = cursor.batch_size(batch_size)
+        return self.load_users(cursor)
+
+    def apply_karma_event(self, user_id: str, token: str, delta: float,
+                          severity: Optional[str] = None, role: Optional[str] = None):
+        """
+        Apply a single balance change to a user's feature row.
+
+        Args:
+            user_id (str): The user's ID
+            token (str): Token that changed (e.g. "SevaPoints", "PaapTokens")
+            delta (float): Amount added to the token balance
+            severity (str, optional): Severity class for PaapTokens/Rnanubandhan
+            role (str, optional): User role after the event
+        """
+        with self.lock:
+            row = self._row_for(user_id)
+            if token == "PaapTokens" and severity:
+                self._features[row, FEATURE_INDEX[f"Paap.{severity}"]] += delta
+            elif token == "Rnanubandhan" and severity:
+                multiplier = TOKEN_ATTRIBUTES["Rnanubandhan"].get(severity, {}).get("multiplier", 1.0)
+                self._features[row, FEATURE_INDEX["Rnanubandhan.total"]] += delta
+                self._features[row, FEATURE_INDEX["Rnanubandhan.weighted"]] += delta * multiplier
+            elif token in FEATURE_INDEX:
+                self._features[row, FEATURE_INDEX[token]] += delta
+            if role is not None:
+                self._roles[row] = _role_index(role)
+            self._drop_cached(user_id)
+
+    def remove_user(self, user_id: str):
+        """Drop a user from the feature store and cache"""
+        with self.lock:
+            row = self._index.pop(user_id, None)
+            self._drop_cached(user_id)
+            if row is None:
+                return
+            last = len(self._user_ids) - 1
+            if row != last:
+                moved = self._user_ids[last]
+                self._features[row] = self._features[last]
+                self._roles[row] = self._roles[last]
+                self._user_ids[row] = moved
+                self._index[moved] = row
+            self._features[last] = 0
+            self._roles[last] = 0
+            self._user_ids.pop()
+
+    def has_user(self, user_id: str) -> bool:
+        return user_id in self._index
+
+    def __len__(self) -> int:
+        return len(self._user_ids)
+
+    # ------------------------------------------------------------------
+    # Q-table
+    # ------------------------------------------------------------------
+
+    def set_q_table(self, q_table: np.ndarray):
+        """
+        Install a Q-table and precompute the per-role projected balance deltas.
+
+        The Agami projection adds the rewards of the top three actions for the
+        user's role, so it only depends on the role and can be computed once
+        per Q-table instead of once per user.
+        """
+        q_table = np.asarray(q_table, dtype=float)
+        role_deltas = np.zeros((len(ROLE_SEQUENCE), N_FEATURES))
+        for role_index in range(len(ROLE_SEQUENCE)):
+            if role_index < q_table.shape[0]:
+                role_q_values = q_table[role_index]
+            else:
+                role_q_values = np.zeros(len(ACTIONS))
+            ranked = [
+                (float(role_q_values[i]), action)
+                for i, action in enumerate(ACTIONS) if i < len(role_q_values)
+            ]
+            # Stable sort keeps ACTIONS order among ties, as in AgamiKarmaPredictor
+            ranked.sort(key=lambda x: x[0], reverse=True)
+            for _, action in ranked[:3]:
+                if action in REWARD_MAP:
+                    token = REWARD_MAP[action]["token"]
+                    role_deltas[role_index, FEATURE_INDEX[token]] += float(REWARD_MAP[action]["value"])
+
+        if q_table.size == 0:
+            confidence = 0.0
+        else:
+            confidence = min(0.9, (np.count_nonzero(q_table) / q_table.size) * 2)
+
+        with self.lock:
+            previous, previous_confidence = self._q_table, self._confidence
+            self._q_table = q_table
+            self._role_deltas = role_deltas
+            self._confidence = confidence
+            if previous.shape != q_table.shape or previous_confidence != confidence:
+                # Confidence is reported in every prediction
+                self._clear_cache()
+            else:
+                changed = set(np.flatnonzero((previous != q_table).any(axis=1)).tolist())
+                if changed:
+                    stale = [uid for uid, role in self._cache_roles.items() if role in changed]
+                    for user_id in stale:
+                        self._drop_cached(user_id)
+
+    def refresh_q_table(self):
+        """Reload the Q-table from the database"""
+        from utils.agami_predictor import agami_predictor
+        self.set_q_table(agami_predictor._get_q_table())
+
+    def on_q_table_saved(self, q_table: np.ndarray):
+        """Install a Q-table that Q-learning has just written to the database"""
+        self.set_q_table(np.array(q_table, dtype=float))
+
+    # ------------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------------
+
+    def _score_rows(self, features: np.ndarray, roles: np.ndarray) -> Dict[str, np.ndarray]:
+        merit = features @ MERIT_WEIGHTS
+        paap = features @ PAAP_WEIGHTS
+        net_karma = merit - paap
+        weighted_karma = features @ WEIGHTED_KARMA_WEIGHTS
+
+        projected = features + self._role_deltas[roles]
+        projected_merit = projected @ MERIT_WEIGHTS
+        projected_paap = np.maximum(0, paap * 0.9)
+        projected_net = projected_merit - projected_paap
+
+        # Guidance score as in KarmicPredictor._calculate_guidance_score
+        dridha = features[:, FEATURE_INDEX["DridhaKarma"]]
+        adridha = features[:, FEATURE_INDEX["AdridhaKarma"]]
+        total_stable = dridha + adridha
+        safe_total = np.where(total_stable == 0, 1.0, total_stable)
+        dridha_ratio = np.where(total_stable == 0, 0.5, dridha / safe_total)
+        adridha_ratio = np.where(total_stable == 0, 0.5, adridha / safe_total)
+        debt = features[:, FEATURE_INDEX["Rnanubandhan.total"]]
+
+        guidance = np.full(len(features), 50.0)
+        guidance += np.select(
+            [net_karma > 100, net_karma > 50, net_karma < -50, net_karma < 0],
+            [20, 10, -20, -10], default=0
+        )
+        guidance += np.select([dridha_ratio > 0.7, adridha_ratio > 0.7], [15, -10], default=0)
+        guidance += np.select([debt > 50, debt > 20], [-15, -5], default=0)
+        guidance = np.clip(guidance, 0, 100)
+
+        return {
+            "merit_score": merit,
+            "paap_score": paap,
+            "net_karma": net_karma,
+            "weighted_karma": weighted_karma,
+            "projected_merit_score": projected_merit,
+            "projected_paap_score": projected_paap,
+            "projected_net_karma": projected_net,
+            "expected_change": projected_net - net_karma,
+            "guidance_score": guidance,
+        }
+
+    def score_matrix(self, user_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Score users in one vectorized pass and return column arrays.
+
+        Args:
+            user_ids (list, optional): Users to score; all loaded users if omitted
+
+        Returns:
+            dict: "user_ids" plus one numpy array per score
+        """
+        with self.lock:
+            if user_ids is None:
+                rows = np.arange(len(self._user_ids))
+                user_ids = list(self._user_ids)
+            else:
+                missing = [uid for uid in user_ids if uid not in self._index]
+                if missing:
+                    raise ValueError(f"Users not loaded in prediction service: {missing[:5]}")
+                rows = np.fromiter((self._index[uid] for uid in user_ids), dtype=np.int64, count=len(user_ids))
+            features = self._features[rows]
+            roles = self._roles[rows].astype(np.int64)
+            scores = self._score_rows(features, roles)
+        scores["user_ids"] = user_ids
+        scores["role"] = [ROLE_SEQUENCE[r] for r in roles]
+        scores["projected_role"] = roles_from_merit(scores["projected_merit_score"])
+        return scores
+
+    def score_batch(self, user_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Score users in one vectorized pass.
+
+        Args:
+            user_ids (list, optional): Users to score; all loaded users if omitted
+
+        Returns:
+            list: One score summary per user
+        """
+        scores = self.score_matrix(user_ids)
+        confidence = self._confidence
+        results = []
+        for i, user_id in enumerate(scores["user_ids"]):
+            results.append({
+                "user_id": user_id,
+                "role": scores["role"][i],
+                "net_karma": float(scores["net_karma"][i]),
+                "merit_score": float(scores["merit_score"][i]),
+                "paap_score": float(scores["paap_score"][i]),
+                "weighted_karma": float(scores["weighted_karma"][i]),
+                "projected_merit_score": float(scores["projected_merit_score"][i]),
+                "projected_paap_score": float(scores["projected_paap_score"][i]),
+                "projected_net_karma": float(scores["projected_net_karma"][i]),
+                "projected_role": scores["projected_role"][i],
+                "expected_change": float(scores["expected_change"][i]),
+                "guidance_score": float(scores["guidance_score"][i]),
+                "confidence": confidence,
+            })
+        return results
+
+    # ------------------------------------------------------------------
+    # Prediction cache
+    # ------------------------------------------------------------------
+
+    def _drop_cached(self, user_id: str):
+        # Callers hold self.lock
+        self._cache.pop(user_id, None)
+        self._cache_roles.pop(user_id, None)
+        self._cache_generation += 1
+
+    def _clear_cache(self):
+        # Callers hold self.lock
+        self._cache.clear()
+        self._cache_roles.clear()
+        self._cache_generation += 1
+
+    def get_prediction(self, user_id: str) -> Dict[str, Any]:
+        """
+        Get the full Agami prediction for a user, served from cache when the
+        user's state has not changed since it was computed.
+
+        Args:
+            user_id (str): The user's ID
+
+        Returns:
+            dict: Agami karma prediction
+        """
+        with self.lock:
+            cached = self._cache.get(user_id)
+            if cached is not None:
+                self._cache.move_to_end(user_id)
+                self.cache_hits += 1
+                return cached
+            self.cache_misses += 1
+            generation = self._cache_generation
+
+        from utils.agami_predictor import agami_predictor
+        prediction = agami_predictor.predict_agami_karma(user_id)
+
+        role = (prediction.get("current_state") or {}).get("role")
+        with self.lock:
+            if generation != self._cache_generation:
+                return prediction
+            self._cache[user_id] = prediction
+            self._cache_roles[user_id] = _role_index(role)
+            if len(self._cache) > self.cache_size:
+                evicted, _ = self._cache.popitem(last=False)
+                self._cache_roles.pop(evicted, None)
+        return prediction
+
+    def invalidate(self, user_id: Optional[str] = None):
+        """
+        Invalidate cached predictions.
+
+        Args:
+            user_id (str, optional): User to invalidate; clears everything if omitted
+        """
+        with self.lock:
+            if user_id is None:
+                self._clear_cache()
+            else:
+                self._drop_cached(user_id)
+
+    def on_karma_event(self, user_id: str, user_doc: Optional[Dict] = None):
+        """
+        Handle a karma event for a user: refresh their feature row if the
+        post-event document is known, and drop any cached prediction.
+
+        Args:
+            user_id (str): The user's ID
+            user_doc (dict, optional): User document after the event
+        """
+        if user_doc is not None and "balances" in user_doc:
+            self.upsert_user(user_doc)
+        else:
+            self.invalidate(user_id)
+
+    def reload_loaded_users(self, batch_size: int = 1000) -> int:
+        """
+        Re-read every loaded user's row from the database and clear the cache.
+
+        Used after a decay sweep, which changes stored balances for everyone
+        without going through per-user events.
+
+        Returns:
+            int: Number of rows reloaded
+        """
+        from database import users_col
+        with self.lock:
+            user_ids = list(self._user_ids)
+            self._clear_cache()
+        reloaded = 0
+        for start in range(0, len(user_ids), batch_size):
+            chunk = user_ids[start:start + batch_size]
+            reloaded += self.load_users(users_col.find(
+                {"user_id": {"$in": chunk}}, {"user_id": 1, "role": 1, "balances": 1}
+            ))
+        return reloaded
+
+    def _handle_bus_message(self, message: EventBusMessage):
+        user_id = (message.payload or {}).get("user_id")
+        if user_id:
+            self.invalidate(user_id)
+
+    def subscribe_to_event_bus(self):
+        """Invalidate cached predictions when feedback or lifecycle events are published"""
+        subscribe_to_karma_feedback(self._handle_bus_message)
+        subscribe_to_karma_lifecycle(self._handle_bus_message)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get feature store and cache statistics"""
+        with self.lock:
+            lookups = self.cache_hits + self.cache_misses
+            return {
+                "users_loaded": len(self._user_ids),
+                "feature_capacity": int(self._features.shape[0]),
+                "cached_predictions": len(self._cache),
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses,
+                "cache_hit_rate": self.cache_hits / lookups if lookups else 0.0,
+                "q_table_confidence": self._confidence,
+                "timestamp": datetime.now(timezone.utc).isoformat()
+            }
+
+# Global instance
+prediction_service = KarmaPredictionService()
+prediction_service.subscribe_to_event_bus()
+
+# Convenience functions
+def score_users(user_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Score users in a vectorized batch"""
+    return prediction_service.score_batch(user_ids)
+
+def notify_karma_event(user_id: str, user_doc: Optional[Dict] = None):
+    """Notify the prediction service that a user's karma changed"""
+    prediction_service.on_karma_event(user_id, user_doc)
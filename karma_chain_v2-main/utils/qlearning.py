@@ -3,6 +3,7 @@ import numpy as np
 from database import qtable_col, users_col
 from config import ACTIONS, ROLE_SEQUENCE, ALPHA, GAMMA, REWARD_MAP, CHEAT_PUNISHMENT_LEVELS, ATONEMENT_REWARDS
 from utils.merit import determine_role_from_merit
+from utils.balance_ledger import apply_balance_change
 
 states = ROLE_SEQUENCE[:]
 n_states = len(states)
@@ -38,6 +39,12 @@ def load_q_table():
 def save_q_table():
     # Use timezone-aware datetime (fix for Python 3.12+)
     qtable_col.replace_one({}, {"q": Q.tolist(), "updated_at": datetime.datetime.now(datetime.timezone.utc)}, upsert=True)
+    # Cached Agami predictions for the updated roles are now stale
+    try:
+        from utils.prediction_service import prediction_service
+        prediction_service.on_q_table_saved(Q)
+    except Exception as e:
+        print(f"WARNING: Failed to update prediction service Q-table: {e}")
 
 def q_learning_step(user_id: str, state: str, action: str, reward: float):
     load_q_table()  # Lazy-load Q-table on first use
@@ -172,19 +179,8 @@ def atonement_q_learning_step(user_id: str, severity_class: str):
         Q[s, a] = Q[s, a] + ALPHA * (reward_value + GAMMA * float(np.max(Q[next_state])) - Q[s, a])
         save_q_table()
     
-    # Update user's balance with the reward
-    if token.startswith("PaapTokens."):
-        # Handle nested PaapTokens structure
-        paap_severity = token.split(".")[1]
-        users_col.update_one(
-            {"user_id": user_id},
-            {"$inc": {f"balances.PaapTokens.{paap_severity}": reward_value}}
-        )
-    else:
-        # Handle regular tokens
-        users_col.update_one(
-            {"user_id": user_id},
-            {"$inc": {f"balances.{token}": reward_value}}
-        )
+    # Update user's balance with the reward (nested PaapTokens.<severity>
+    # tokens are already balance paths)
+    apply_balance_change(user_id, {token: reward_value}, "atonement", ref=severity_class)
     
     return reward_value, next_role
\ No newline at end of file
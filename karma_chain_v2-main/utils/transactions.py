@@ -1,4 +1,5 @@
 from database import transactions_col, users_col
+from utils.karma_stats import record_transaction
 from datetime import datetime, timezone
 import logging
 
@@ -28,10 +29,12 @@ def log_transaction(user_id, action, reward, intent, reward_tier, punishment_nam
             {"user_id": user_id},
             {
                 "$setOnInsert": {"history": []},
-                "$push": {"history": tx}
+                "$push": {"history": tx},
+                "$inc": {"action_stats.total_actions": 1}
             },
             upsert=True
         )
+        record_transaction(user_id, include_user=False)
     except Exception as e:
         logger.error(f"Error logging transaction for user {user_id}: {str(e)}")
         # Re-raise the exception so it can be handled upstream
@@ -1,6 +1,7 @@
 from database import users_col
 from datetime import datetime
 from utils.tokens import now_utc
+from utils.karma_stats import record_user_created
 from config import ROLE_SEQUENCE, TOKEN_ATTRIBUTES
 
 def create_user_if_missing(user_id: str, role: str = "learner"):
@@ -31,4 +32,5 @@ def create_user_if_missing(user_id: str, role: str = "learner"):
         "cheat_history": []  # Initialize empty cheat history for progressive punishment system
     }
     users_col.insert_one(doc)
+    record_user_created()
     return doc